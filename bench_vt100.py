@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# module name: bench_vt100
+# local_dependencies: cofable.py
+# author: Cof-Lee
+# this module uses the GPL-3.0 open source protocol
+
+"""
+vt100转普通文本性能测试，对比旧版实现（Vt100ToPlaintextLegacy，只保留在此脚本里）与cofable.Vt100ToPlaintext的处理速度
+"""
+
+import io
+import re
+import sys
+import time
+import contextlib
+
+from cofable import Vt100ToPlaintext
+
+
+class Vt100ToPlaintextLegacy:
+    """
+    旧版的vt100转普通文本实现（按ESC拆分后逐块正则匹配），已由<Vt100ToPlaintext>代替，只保留在此脚本里做性能对比
+    """
+
+    def __init__(self, vt100_data_bytes=b''):
+        self.vt100_data_bytes = vt100_data_bytes
+        self.plain_text_block_list = []
+
+    def parse(self):
+        vt100_data_bytes_split_list = self.vt100_data_bytes.split(b'\033')
+        vt100_data_bytes_split_list_new = [x for x in vt100_data_bytes_split_list if x]  # 新列表不含空元素
+        if len(vt100_data_bytes_split_list_new) == 0:
+            print(f"Vt100ToPlaintextLegacy.parse: 本次接收到的信息拆分后列表为空")
+            return ""
+            # ★★★★★★ 对一次recv接收后的信息拆分后的每个属性块进行解析，普通输出模式 ★★★★★★
+        for block_bytes in vt100_data_bytes_split_list_new:
+            block_str = block_bytes.decode("utf8").replace("\r\n", "\n")
+            # ★匹配 [m 或 [0m  -->清除所有属性
+            match_pattern = r'^\[0{,1}m'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
+                # 在self.terminal_text里输出解析后的内容
+                new_block_str = block_str[ret.end():]
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
+                if len(new_block_str) > 0:
+                    self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [01m 到 [08m  [01;34m  [01;34;42m   -->字体风格
+            match_pattern = r'^\[([0-9]{1,2};){,3}[0-9]{1,2}m'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
+                new_block_str = block_str[ret.end():]
+                # output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1]
+                self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [C  [8C  -->[数字C  向右移动vt100_cursor（text_cursor光标在本轮for循环结束后，一次recv处理完成后，再显示）
+            match_pattern = r'^\[[0-9]*C'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
+                new_block_str = block_str[ret.end():]
+                # output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1].replace("\0", "")
+                # 有时匹配了控制序列后，在其末尾还会有回退符，这里得再匹配一次
+                self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [K  -->从当前vt100_cursor光标位置向右清除到本行行尾所有内容
+            match_pattern = r'^\[K'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
+                # 有时匹配了控制序列后，在其末尾还会有回退符，这里得再匹配一次
+                new_block_str = block_str[ret.end():]
+                self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [H  -->vt100_cursor光标回到屏幕开头，复杂清屏，一般vt100光标回到开头后，插入的内容会覆盖原界面的内容，未覆盖到的内容还得继续展示
+            match_pattern = r'^\[H'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
+                continue
+            # ★匹配 [42D  -->vt100_cursor光标左移42格，一般vt100光标回到当前行开头后，插入的内容会覆盖同行相应位置的内容，
+            # 未覆盖的地方不动它，不折行，不产生新行
+            match_pattern = r'^\[[0-9]*D'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # 匹配到之后，可能 block_bytes[ret.end():] 是新的内容，要覆盖同一行相应长度的字符
+                # need to copy_current_page_move_cursor_to_head_and_cover_content
+                new_block_str = block_str[ret.end():]
+                # output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1]
+                # print("TerminalFrontend.process_received_bytes_on_normal_mode ★匹配 [数字D -->光标左移n格，复杂清屏",
+                #       block_str.encode("utf8"))
+                self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [J  -->清空屏幕，一般和[H一起出现
+            match_pattern = r'^\[J'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: ★单独匹配到了 {match_pattern}")
+                continue
+            # ★匹配  b'\x08'  -->回退符，向左移动光标
+            match_pattern = b'\x08'
+            ret = re.search(match_pattern, block_bytes)
+            if ret is not None:
+                continue
+            # ★匹配  b'\x07'  -->响铃
+            match_pattern = b'\x07'
+            ret = re.search(match_pattern, block_bytes)
+            if ret is not None:
+                continue
+            # ★匹配  b'\x0d'  --> '\r'
+            match_pattern = '^\\r'
+            new_block_str = block_str.replace("\r\n", "\n")
+            ret = re.search(match_pattern, new_block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: ★单独匹配到了 {match_pattern}")
+                self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [6;26H  -->光标移动到指定行列，普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
+            match_pattern = r'^\[\d{1,};\d{1,}H'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
+                # 匹配到之后，可能 block_bytes[ret.end():] 没有其他内容了，要覆盖的内容在接下来的几轮循环
+                # 如果有内容，那就输出呗
+                new_block_str = block_str[ret.end():]
+                if len(new_block_str) > 0:
+                    self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [?25h  [?2004h  -->  显示光标；普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
+            match_pattern = r'^\[\?\d{1,}h'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
+                # 匹配到之后，可能 block_bytes[ret.end():] 有其他内容
+                new_block_str = block_str[ret.end():]
+                if len(new_block_str) > 0:
+                    self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★匹配 [?25l  [?2004l  -->  隐藏光标；普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
+            match_pattern = r'^\[\?\d{1,}l'
+            ret = re.search(match_pattern, block_str)
+            if ret is not None:
+                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
+                # 匹配到之后，可能 block_bytes[ret.end():] 之后有个\r（光标移到行首）
+                new_block_str = block_str[ret.end():]
+                if len(new_block_str) > 0:
+                    match_pattern = '^\\r'
+                    ret = re.search(match_pattern, new_block_str)
+                    if ret is not None:
+                        new_block_str2 = new_block_str[1:]
+                        self.plain_text_block_list.append(new_block_str2)
+                    else:
+                        self.plain_text_block_list.append(new_block_str)
+                continue
+            # ★★最后，未匹配到任何属性（非控制序列，非特殊字符如\x08\x07这些）则视为普通文本，使用默认颜色方案
+            # print("TerminalFrontend.process_received_bytes_on_normal_mode: 最后未匹配到任何属性，视为普通文本，使用默认颜色方案")
+            self.plain_text_block_list.append(block_str)
+        return "".join(self.plain_text_block_list)
+
+
+def bench_vt100_main(argv):
+    """
+    vt100转普通文本性能测试，生成带颜色/中文/进度条回退/[K清除的模拟巡检输出，对比旧版与新版的处理速度(MB/s)
+    用法: python bench_vt100.py [数据大小MB，默认为8]
+    """
+    data_size_mb = float(argv[0]) if len(argv) > 0 else 8.0
+    sample_bytes = (b'\x1b[?2004h[root@host-01 ~]# ls --color\r\n'
+                    b'\x1b[0m\x1b[01;34mbin\x1b[0m  \x1b[01;32mstart.sh\x1b[0m  readme.txt  '
+                    + '中文目录'.encode('utf8') + b'\r\n'
+                    b'progress  10%\x08\x08\x0820%\x1b[3D30%\r\x1b[Kdone\r\n'
+                    b'Filesystem      Size  Used Avail Use% Mounted on\r\n'
+                    b'/dev/vda1        40G   12G   26G  32% /\r\n'
+                    b'\x1b]0;root@host-01:~\x07\x1b[?2004l\r')
+    data_bytes = sample_bytes * max(1, int(data_size_mb * 1024 * 1024 / len(sample_bytes)))
+    real_size_mb = len(data_bytes) / 1024 / 1024
+    print(f"bench_vt100_main: 测试数据 {real_size_mb:.2f} MB")
+    for parser_class in (Vt100ToPlaintextLegacy, Vt100ToPlaintext):
+        time_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # 旧版每块都会打印调试信息，不计入输出
+            parser_class(vt100_data_bytes=data_bytes).parse()
+        time_used = time.perf_counter() - time_start
+        print(f"bench_vt100_main: {parser_class.__name__:<24} {time_used:8.3f} 秒  {real_size_mb / time_used:8.2f} MB/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(bench_vt100_main(sys.argv[1:]))
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # coding=utf-8
 # module name: cofable
-# external_dependencies: paramiko, pyglet, pyperclip, openpyxl, schedule
+# external_dependencies: paramiko, pyglet, pyperclip, openpyxl, schedule, zstandard(可选)
 # local_dependencies: cofnet.py
 # author: Cof-Lee
 # start_date: 2024-01-17
@@ -19,14 +19,43 @@
 ★. 使用多线程，每台主机用一个线程去巡检，并发几个线程                                     2024年1月25日 完成
 ★. 巡检作业执行完成情况的统计，执行完成，连接超时，认证失败                                2024年1月28日 基本完成
 ★. 程序运行后，所有类的对象都要分别加载到一个全局列表里                                   已完成
+    ↑ 2026年10月18日 全局列表改为ResourceObjList，维护oid/名称索引，按oid或名称查找资源对象不再遍历列表
 ★. 巡检命令输出保存到数据库                                                          2024年1月27日 基本完成
+    ↑ 2026年10月18日 输出改为zlib/zstd压缩的BLOB保存（output_format列区分格式），旧库可用 python cofable.py migrate-output-blob 转换
+    ↑ 2026年10月18日 每条命令执行完即交给SSHOperatorOutputPipeline（数据库/日志文件/普通文本接收端），不再整台主机的输出留在内存里
+    ↑ 压缩及写文件由作业的输出写入线程（SSHOperatorOutputWriter）完成，不占用asyncio事件循环，暂存超过1秒的输出定时写入数据库
+★. 巡检作业记录分页加载，启动时只加载最新一页，主机作业状态在查看作业详情时才加载             2026年10月18日 完成
 ★. 定时/周期触发巡检模板作业                                                         2024年3月14日 定时的已完成
 ★. 本次作业命令输出与最近一次（上一次）输出做对比
 ★. 巡检命令输出做基础信息提取与判断并触发告警，告警如何通知人类用户？
 ★. Credential密钥保存时，会有换行符，sql语句不支持，需要修改，已将密钥字符串转为base64      2024年2月25日 完成
 ★. 主机 允许添加若干条ip，含ip地址范围
-★. 巡检命令中有sleep N 之类的命令时，要判断是否完成，根据shell提示符进行判断
+★. 主机组展开改为HostGroupResolver，缓存每个组展开后的主机，编辑时检测循环包含                 2026年10月18日 完成
+★. 巡检命令中有sleep N 之类的命令时，要判断是否完成，根据shell提示符进行判断                 2026年10月18日 完成
+    ↑ 登录后学习shell提示符，命令输出持续读取到提示符出现为止（或空闲/总时长超时），不再固定等待后只recv一次
 ★. 编辑或创建巡检代码时，要求能设置每条命令的 交互回复及其他细节                           已完成
+★. 巡检代码块可选exec_command执行方式，每行命令单独开通道并发执行，分别获取stdout/stderr/退出码   2026年10月18日 完成
+★. 巡检作业可停止，巡检模板可设置单条命令超时/单台主机截止时间/整个作业截止时间            2026年10月18日 完成
+★. 巡检模板可开启自适应并发数，按登录耗时/认证失败/登录超时自动增减并发数(AIMD)，变化过程保存到作业记录  2026年10月18日 完成
+★. 登录超时/连接失败的主机按指数退避重试（排在所有主机之后），连续多次无法连接的主机熔断，先探测ssh端口再登录  2026年10月18日 完成
+★. 巡检作业详情改为订阅作业事件总线，只更新状态有变化的主机行，不再每秒重建整个主机列表      2026年10月18日 完成
+★. 无界面运行：run-template执行指定巡检模板，daemon常驻执行定时巡检，均不导入tkinter/pyglet/pyperclip  2026年10月18日 完成
+    ↑ 日志输出到stderr，每个作业结束后向stdout输出一行json格式的作业摘要
+★. 巡检模板的定时执行/周期执行(cron表达式)/After都由一个调度线程按触发时间堆调度，可设置上次作业未结束时的处理方式  2026年10月18日 完成
+    ↑ 挂起/休眠唤醒后错过的触发只补执行一次（超过SCHEDULER_MISFIRE_GRACE_TIME则跳过），定时触发的作业同时最多执行SCHEDULER_MAX_RUNNING_JOBS个
+★. 巡检模板可选择PROCESS_SHARDS多进程分片执行引擎，主机按cpu核数分到多个工作进程巡检，由主进程汇总状态并保存输出  2026年10月18日 完成
+    ↑ 工作进程只巡检并把主机状态、压缩后的输出行、可否连接发回主进程，数据库只由主进程写入
+    ↑ 工作进程以只读方式打开数据库（不建表不升级，没有写线程），巡检模板及巡检代码块由主进程直接传入
+★. 巡检代码块可选择INVOKE_SHELL_PIPELINE流水线执行方式，一次发送多条命令，按结束标记拆分各命令的输出  2026年10月18日 完成
+    ↑ 高延迟链路上不用每条命令等一个往返，需要交互的命令仍逐条执行，只适用于sh/bash等linux shell
+    ↑ 首次执行前探测是否为POSIX shell，网络设备等自动改为逐条执行；命令超时等未正常结束时发送Ctrl-C回到提示符并恢复回显
+★. 巡检代码块的命令可来自本地文件或git仓库，巡检模板设置了运行前更新code时，每次作业开始前重新读取   2026年10月18日 完成
+★. 巡检代码块可选择SCRIPT脚本执行方式，整个代码块生成一个脚本用sftp上传后只执行一次，按结束标记拆分各命令的输出  2026年10月18日 完成
+    ↑ 脚本以内容哈希命名缓存在目标主机的~/.cofable/目录，命令不变时不再上传，每台主机每个代码块只需一个往返
+★. 巡检代码的每行命令可设置执行条件（输出匹配正则/退出码），满足时跳到指定标签、跳过剩余命令或终止本主机巡检  2026年10月18日 完成
+    ↑ 条件正则在作业开始时编译一次（CodeConditionMatcher），不符合的平台/上下文不再执行后面无意义的命令
+★. 巡检作业按主机历史巡检用时从长到短开始巡检（LPT），慢主机先开始，减少作业最后只剩几台慢主机的长尾  2026年10月18日 完成
+    ↑ 每台主机的用时为指数加权平均值，保存在tb_host_duration_stats表，没有历史用时的新主机排在最前/中位数/最后可选
 ★. 没有创建项目时，就创建其他资源，要生成默认的项目，名为default的项目                     2024年3月7日 完成
 ★. shell通道设置字符界面宽度及长度                                                    2024年3月8日 完成
 ★. 输出巡检实时状态，及进度展示                                                       2024年3月15日 完成
@@ -40,6 +69,8 @@
 ★. 主机命令在线批量执行，在“主机组”界面，对这一组主机在线下发命令
 ★. 首次登录后，对输出进行判断，有的设备首次登录后会要求改密码，或者长时间未登录的设备要求修改密码
 ★. 不同巡检线程都去读写sqlite3数据库文件时，报错了，得加个锁                               2024年3月23日 完成
+    ↑ 2026年10月18日 改为SqliteStorage：长期保持的只读连接池 + 单一写线程合并排队的写操作批量提交，WAL模式，建表只在启动时执行一次
+★. ssh连接池，已认证的连接按主机及凭据复用，巡检代码块/多次作业/终端会话只新开通道，不再重复登录   2026年10月18日 完成
 ★. 在vt100终端里实现了 光标的左右移动及插入/删除字符                                      2024年3月23日 完成
 ★. 实现 vt100终端的 普通输出 与 应用输出模式的切换                                       2024年3月27日 完成
 ★. 实现 复制会话日志到文件，以及在会话中查找字符串                                        2024年3月29日 完成
@@ -48,6 +79,9 @@
 ★. 在向Terminal终端会话粘贴内容时，如果内容有多行，需要弹出确认框，用户确认才发送要粘贴的内容    2024年4月3日 完成
 ★. 支持用户自定义高亮字符设置（着色方案），支持正则表达式匹配并设置显示样式，每台主机可单独设置着色方案    2024年4月6日 完成
 ★. 优化了vt100输出显示逻辑，先输出内容，后上色（系统自带的颜色属性）                         2024年4月9日 完成
+    ↑ 2026年10月18日 vt100数据改由Vt100Tokenizer一个预编译正则单次扫描拆分，终端普通模式与巡检日志转普通文本共用，
+      Vt100ToPlaintext逐行模拟光标（\r \b [nD [nC [K 覆盖及宽字符），可用 python bench_vt100.py 对比新旧版速度
+    ↑ 2026年10月18日 通道分段读取的数据经Vt100StreamDecoder，在中文字符或控制序列中间断开的部分暂存到下一段，终端会话连续读取合并后再交给前端
 ★. 修复了tkinter.Text组件的索引操作错误导致的闪退问题，以及引入结束线程机制，防止内存泄露      2024年4月12日 完成
 ★. 处理用户自定义配色方案时，需要使用多线程，速度才够快                                    2024年4月16日 完成
 ★. 优化输出逻辑，提升显示速度，如 TerminalFrontend.app_mode_print_all 这个函数           2024年4月17日 完成
@@ -55,6 +89,7 @@
 ★. 修改了主机登录认证凭据结构，之前是所有凭据都保存在Host.credential_oid_list里，现在改为单个登录认证凭据  2024年4月27日 完成
 ★. 新增工具：ip计算器                                                                2024年4月30日 完成
 ★. 新增工具：批量ping检测                                                            2024年5月3日 完成
+★. 巡检模板可选择asyncio协程执行引擎，一台主机一个协程，可同时巡检数千台主机                2026年10月18日 完成
 
 【资源操作逻辑】
 ★创建-资源        CreateResourceInFrame.show()  →  SaveResourceInMainWindow.save()
@@ -84,33 +119,70 @@ cofable项目目录/venv/Scripts> pyinstaller.exe -F --add-data ../../builtin_re
 
 # internal dependencies:
 import io
+import sys
 import os
+import pathlib
 import threading
 import uuid
 import time
 import re
 import sqlite3
 import base64
-import sched
+import hashlib
+import zlib
 import queue
 import struct
 import ctypes
 import random
 import socket
 import array
-import tkinter
-from tkinter import messagebox
-from tkinter import filedialog
-from tkinter import ttk
-from tkinter import font
-from tkinter import colorchooser
+import asyncio
+import contextlib
+import collections
+import heapq
+import json
+import datetime
+import signal
+import subprocess
+import unicodedata
+import multiprocessing
 from multiprocessing.dummy import Pool as ThreadPool
 from concurrent.futures import ThreadPoolExecutor
 # external dependencies:
 import paramiko
-import pyglet
-import pyperclip
-import openpyxl
+
+# GUI dependencies: 由cofable_import_gui_modules()在创建程序主界面前导入，无界面运行（run-template、daemon）时不导入
+tkinter = None
+messagebox = None
+filedialog = None
+ttk = None
+font = None
+colorchooser = None
+pyglet = None
+pyperclip = None
+openpyxl = None
+
+
+def cofable_import_gui_modules():
+    """
+    导入界面相关的依赖（tkinter、字体、剪贴板、xlsx导入导出），只在启动程序主界面时调用
+    """
+    global tkinter, messagebox, filedialog, ttk, font, colorchooser, pyglet, pyperclip, openpyxl
+    import tkinter
+    from tkinter import messagebox
+    from tkinter import filedialog
+    from tkinter import ttk
+    from tkinter import font
+    from tkinter import colorchooser
+    import pyglet
+    import pyperclip
+    import openpyxl
+
+
+try:
+    import zstandard  # 可选依赖，已安装时巡检输出使用zstd压缩保存，未安装则使用zlib
+except ImportError:
+    zstandard = None
 
 # import schedule
 
@@ -138,29 +210,154 @@ FIRST_AUTH_METHOD_PASSWORD = 1
 CODE_SOURCE_LOCAL = 0
 CODE_SOURCE_FILE = 1
 CODE_SOURCE_GIT = 2
+# 代码来源为本地文件或git仓库时，文件里以 CODE_SOURCE_SECTION_HEADER 开头的行为节标题，每节为一条命令（可为多行），见InspectionCodeBlock.parse_code_source_text()
+CODE_SOURCE_SECTION_HEADER = "#@"
+CODE_SOURCE_GIT_CACHE_DIR = "code_source_git_cache"  # 代码来源git仓库浅克隆到本地的缓存目录
+GIT_COMMAND_TIMEOUT = 120  # 克隆或拉取代码来源git仓库的超时时间，秒
 EXECUTION_METHOD_NONE = 0
 EXECUTION_METHOD_AT = 1
 EXECUTION_METHOD_CROND = 2
-EXECUTION_METHOD_AFTER = 3
-CODE_POST_WAIT_TIME_DEFAULT = 0.2  # 命令发送后等待的时间，秒，这里不能为0（如果设置得太小，则可能收不到本次命令的回复消息）
+EXECUTION_METHOD_AFTER = 3  # 首次在启动（或保存巡检模板）后execution_after_time秒执行，之后每次在上一次作业结束后间隔execution_after_time秒执行
+# 巡检模板定时执行，所有巡检模板共用一个调度线程，见<TemplateScheduler>
+SCHEDULE_OVERLAP_POLICY_SKIP = 0  # 触发时上一次作业还未结束，跳过本次
+SCHEDULE_OVERLAP_POLICY_QUEUE = 1  # 触发时上一次作业还未结束，等它结束后再执行（最多排队一次）
+SCHEDULE_OVERLAP_POLICY_PARALLEL = 2  # 触发时不管上一次作业，直接执行
+SCHEDULER_MAX_RUNNING_JOBS = 4  # 定时触发的作业最多同时执行几个，超出的按触发顺序等待
+SCHEDULER_MISFIRE_GRACE_TIME = 300.0  # 错过触发时间（挂起/休眠后唤醒）多久以内仍执行，秒，超过则跳过本次，周期执行的多次错过只算一次
+SCHEDULER_MAX_WAIT_TIME = 60.0  # 调度线程单次最长等待时间，秒，修改系统时间或挂起唤醒后，最迟这么久会重新检查
+CRON_NEXT_FIRE_SEARCH_DAYS = 366 * 5  # 计算cron表达式下次触发时间时最多向后查找几天，如 0 0 30 2 * 永远不会触发
+CODE_POST_WAIT_TIME_DEFAULT = 0.2  # 未学习到shell提示符时，命令输出后通道空闲多久认为输出已结束，秒，这里不能为0（如果设置得太小，则可能收不全本次命令的回复消息）
 MAX_INTERACTIVE_COUNT = 5000  # 最大交互处理次数，在 SSHOperator.process_code_interactive()里使用，防止交互时进入死循环
-MAX_EXEC_WAIT_COUNT = 10000  # 判断巡检线程超时最大等待次数，此参数乘以CODE_POST_WAIT_TIME_DEFAULT为等待超时时间
 LOGIN_AUTH_TIMEOUT = 30  # 登录等待超时，秒
+LOGIN_OUTPUT_IDLE_TIMEOUT = 1.0  # 登录后读取欢迎信息及shell提示符时，通道空闲（无新输出）多久认为登录输出已结束，秒
+CODE_EXEC_IDLE_TIMEOUT_DEFAULT = 10.0  # 已学习到shell提示符但迟迟未出现时，通道空闲多久认为命令输出已结束，秒
+CODE_EXEC_HARD_TIMEOUT_DEFAULT = 600.0  # 单条命令最长等待时间，秒，超时则不再等待此命令的输出，巡检模板可单独设置(code_exec_timeout)
+HOST_DEADLINE_DEFAULT = 0  # 单台主机巡检最长用时，秒，0为不限制，超时则不再执行该主机剩余的命令，标记为超时，线程去巡检下一台主机
+JOB_DEADLINE_DEFAULT = 0  # 整个巡检作业最长用时，秒，0为不限制，超时则中止所有未完成的主机，还未开始的主机不再巡检
+JOB_TIMEOUT_SETTING_MAX = 86400  # 巡检模板界面上 命令超时/主机截止时间/作业截止时间 可设置的最大值，秒
+CHANNEL_RECV_POLL_INTERVAL = 0.1  # 读取通道时单次阻塞等待的最长时间，秒，有数据到达会立即返回，不是固定等待
+CHANNEL_RECV_BUFFER_SIZE = 65535  # 单次recv读取的最大字节数，命令输出超过此长度时会循环读取
+VT100_STREAM_PENDING_MAX_LEN = 4096  # <Vt100StreamDecoder>最多暂存多少字节的不完整字符/控制序列，超过则不再等待，直接交给下游
+TERMINAL_RECV_COALESCE_SIZE = 262144  # 终端会话一次交给前端解析的最大字节数，通道里已有数据时连续读取合并后再交给前端
+# SSHOperator.recv_until_prompt() 结束读取的原因
+RECV_END_REASON_PROMPT = 0  # 输出最后一行为已学习到的shell提示符
+RECV_END_REASON_SENTINEL = 1  # 输出最后一行匹配到了指定的结束标记（如交互提问关键词）
+RECV_END_REASON_IDLE = 2  # 通道空闲超时
+RECV_END_REASON_HARD_TIMEOUT = 3  # 命令总用时超时
+RECV_END_REASON_CLOSED = 4  # 通道已被关闭
+RECV_END_REASON_CANCELLED = 5  # 巡检作业已被取消，或已超过主机/作业的截止时间
+RECV_END_REASON_ERROR = 6  # 读取或发送时出错（异常）
+# <CancelToken>被取消的原因
+CANCEL_REASON_NONE = 0
+CANCEL_REASON_USER = 1  # 用户点击了停止作业
+CANCEL_REASON_HOST_DEADLINE = 2  # 超过了单台主机巡检的截止时间
+CANCEL_REASON_JOB_DEADLINE = 3  # 超过了整个巡检作业的截止时间
+# ssh登录结果，自适应并发控制<AdaptiveConcurrencyController>据此调整并发数
+LOGIN_RESULT_UNKNOWN = 0
+LOGIN_RESULT_SUCCEED = 1
+LOGIN_RESULT_AUTH_FAILED = 2  # 认证失败（TACACS等认证服务器过载时也会表现为认证失败）
+LOGIN_RESULT_TIMEOUT = 3  # tcp连接、ssh握手或认证超时
+LOGIN_RESULT_FAILED = 4  # 其他失败，如连接被拒绝、主机不可达，与并发数无关
+# 登录失败重试（巡检模板login_retry_times/login_retry_interval），只重试 LOGIN_RESULT_TIMEOUT 及 LOGIN_RESULT_FAILED，认证失败不重试（避免账号被锁）
+LOGIN_RETRY_TIMES_DEFAULT = 0  # 默认不重试
+LOGIN_RETRY_TIMES_MAX = 10
+LOGIN_RETRY_INTERVAL_DEFAULT = 10.0  # 第1次重试前的等待时间，秒，之后每次翻倍，并加上±50%的随机抖动
+LOGIN_RETRY_BACKOFF_MAX = 600.0  # 重试等待时间上限，秒
+# 主机熔断（巡检模板circuit_breaker_threshold），连续N次作业都无法连接的主机，之后的作业先用tcp连接探测，探测不通则直接判为失败
+CIRCUIT_BREAKER_THRESHOLD_DEFAULT = 0  # 0为不熔断
+CIRCUIT_BREAKER_THRESHOLD_MAX = 100
+CIRCUIT_BREAKER_PROBE_TIMEOUT = 3.0  # 熔断中的主机，探测ssh端口的tcp连接超时，秒，远小于LOGIN_AUTH_TIMEOUT
+# 主机巡检顺序（巡检模板host_schedule_order），按历史巡检用时从长到短开始巡检，见<HostDurationStats>
+HOST_SCHEDULE_ORDER_LIST = 0  # 按主机列表顺序
+HOST_SCHEDULE_ORDER_LONGEST_FIRST = 1  # 按历史巡检用时的指数加权平均值从长到短（LPT）
+NEW_HOST_SCHEDULE_SLOT_FIRST = 0  # 没有历史用时的主机排在最前，用时未知的主机可能很慢，先开始不会拖长作业
+NEW_HOST_SCHEDULE_SLOT_MEDIAN = 1  # 没有历史用时的主机按已知主机用时的中位数排序
+NEW_HOST_SCHEDULE_SLOT_LAST = 2  # 没有历史用时的主机排在最后
+HOST_DURATION_EWMA_ALPHA = 0.3  # 主机最近一次巡检用时在平均用时中的权重，越大越快适应主机用时的变化
 CODE_EXEC_METHOD_INVOKE_SHELL = 0
 CODE_EXEC_METHOD_EXEC_COMMAND = 1
+CODE_EXEC_METHOD_INVOKE_SHELL_PIPELINE = 2
+# 流水线执行方式（CODE_EXEC_METHOD_INVOKE_SHELL_PIPELINE），在invoke_shell里连续发送多条命令，每条命令后跟一条输出结束标记的echo命令，
+# 再按结束标记把连在一起的输出拆分回每条命令的输出，不用每条命令都等一个网络往返，只适用于sh/bash等支持echo及$?的shell
+CODE_PIPELINE_WINDOW_SIZE = 16  # 已发送但还未收到结束标记的命令数上限
+CODE_PIPELINE_WINDOW_MAX_BYTES = 2048  # 已发送但还未执行完的命令字节数上限，不超过终端的输入缓冲区（一般为4096字节）
+CODE_PIPELINE_MARKER_PREFIX = "COF_MARK_"
+CODE_PIPELINE_PROBE_TIMEOUT = 5.0  # 首次流水线执行前探测目标主机是否为POSIX shell的最长等待时间，秒
+CODE_PIPELINE_RESYNC_TIMEOUT = 10.0  # 流水线未正常结束时，发送Ctrl-C后等待shell提示符的最长时间，秒
+CODE_EXEC_METHOD_SCRIPT = 3
+# 脚本执行方式（CODE_EXEC_METHOD_SCRIPT），整个巡检代码块生成一个脚本，每条命令后跟一条输出结束标记的echo命令（同流水线执行方式），
+# 用sftp上传到目标主机后只开一个exec通道执行一次，再按结束标记拆分回每条命令的输出，只适用于sh/bash等linux shell
+SCRIPT_REMOTE_DIR = ".cofable"  # 脚本上传到目标主机登录用户家目录下的此目录，不放在/tmp下，其他用户无法替换脚本
+SCRIPT_NOT_FOUND_MARKER = "COF_SCRIPT_NOT_FOUND"  # 目标主机上还没有要执行的脚本时输出此标记，需上传后再执行
+SCRIPT_START_INDEX_ENV = "COF_SCRIPT_START_INDEX"  # 执行脚本时设置此环境变量，序号小于它的命令不执行，执行条件跳转到后面的命令时使用
+# 巡检命令输出在数据库里的保存格式（表中output_format列）
+OUTPUT_STORAGE_FORMAT_BASE64 = 0  # 旧版本程序保存的格式，base64文本保存在*_b64列
+OUTPUT_STORAGE_FORMAT_ZLIB = 1  # zlib压缩后的BLOB保存在*_blob列
+OUTPUT_STORAGE_FORMAT_ZSTD = 2  # zstd压缩后的BLOB保存在*_blob列，需要安装zstandard
+OUTPUT_STORAGE_ZLIB_LEVEL = 6
+OUTPUT_STORAGE_ZSTD_LEVEL = 3
+OUTPUT_STORAGE_MIGRATE_BATCH_SIZE = 500  # 旧格式输出转换为压缩BLOB时，每个事务转换多少行
+# 巡检命令输出的流式保存（SSHOperatorOutputPipeline），每条命令执行完即交给各输出接收端，不再整台主机的输出都留在内存里
+OUTPUT_SINK_HOST_BUFFER_BUDGET = 1024 * 1024  # 每台主机在内存里最多暂存多少字节（压缩后）待写入数据库的输出，超过即交给写线程
+OUTPUT_SINK_FLUSH_INTERVAL = 1.0  # 待写入数据库的输出最多暂存多久，秒，作业中途退出时最多丢失这段时间内的输出
+OUTPUT_WRITER_THREAD_NUM = 2  # 每个巡检作业的输出写入线程数（SSHOperatorOutputWriter），压缩及写文件在这些线程里完成
+OUTPUT_WRITER_QUEUE_SIZE = 1024  # 每个输出写入线程最多排队多少个待处理的输出，满了则巡检线程的push()等待、协程在发送下一条命令前等待
 AUTH_METHOD_SSH_PASS = 0
 AUTH_METHOD_SSH_KEY = 1
+# ssh连接池（SSHTransportPool），已认证的ssh连接按(地址,端口,用户名,认证方式,密码/密钥指纹)复用，巡检作业/终端只需在其上新开通道
+SSH_TRANSPORT_POOL_MAX_SIZE = 1024  # 池中最多保持多少个ssh连接，超出时新建的连接用完即关闭
+SSH_TRANSPORT_IDLE_TTL = 300.0  # 连接空闲（无通道在使用）超过多久即关闭，秒
+SSH_TRANSPORT_MAX_CHANNELS = 8  # 一个ssh连接上最多同时开几个通道，OpenSSH默认MaxSessions为10
+SSH_TRANSPORT_HEALTH_CHECK_IDLE = 30.0  # 连接空闲超过多久后，复用前先发一个SSH_MSG_IGNORE检测连接是否还可用，秒
+SSH_TRANSPORT_POOL_CLEANUP_INTERVAL = 30.0  # 后台线程每隔多久清理一次空闲超时的连接，秒
+# exec_command执行方式（CODE_EXEC_METHOD_EXEC_COMMAND），每行命令在同一ssh连接上单独开一个通道执行，同一巡检代码块的命令可并发执行
+EXEC_COMMAND_CONCURRENCY_DEFAULT = 4  # 一个巡检代码块同时执行几行命令（同时开几个exec通道）
+EXEC_COMMAND_CONCURRENCY_MAX = SSH_TRANSPORT_MAX_CHANNELS - 1  # 并发上限，留一个通道给invoke_shell
 INTERACTIVE_PROCESS_METHOD_ONETIME = 0
 INTERACTIVE_PROCESS_METHOD_ONCE = 0
 INTERACTIVE_PROCESS_METHOD_TWICE = 1
 INTERACTIVE_PROCESS_METHOD_LOOP = 2
+# 命令执行条件（OneLineCode.condition_type），一行命令执行完成后判断，满足时执行condition_action，见<CodeConditionMatcher>
+CODE_CONDITION_NONE = 0  # 不判断，按顺序执行下一行命令
+CODE_CONDITION_OUTPUT_MATCH = 1  # 本行命令的输出匹配condition_pattern正则（不区分大小写）
+CODE_CONDITION_OUTPUT_NOT_MATCH = 2  # 本行命令的输出不匹配condition_pattern正则
+CODE_CONDITION_EXIT_STATUS_NONZERO = 3  # 本行命令的退出码不为0，invoke_shell方式没有退出码，不会满足
+CODE_CONDITION_EXIT_STATUS_ZERO = 4  # 本行命令的退出码为0，invoke_shell方式没有退出码，不会满足
+CODE_CONDITION_ACTION_SKIP_REST = 0  # 跳过本巡检代码块的剩余命令
+CODE_CONDITION_ACTION_GOTO_LABEL = 1  # 跳到本巡检代码块里标签为condition_goto_label的命令继续执行，只能向后跳
+CODE_CONDITION_ACTION_ABORT_HOST = 2  # 不再执行本主机的剩余命令（含之后的巡检代码块），主机仍算巡检完成
 DEFAULT_JOB_FORKS = 5  # 巡检作业时，目标主机的巡检并发数（同时巡检几台主机）
+MAX_JOB_FORKS = 8192  # 巡检并发数上限，asyncio协程模式下可同时巡检数千台主机
+# 巡检作业执行引擎
+JOB_EXEC_MODE_THREAD_POOL = 0  # 线程池，一台主机占用一个线程，并发数即线程数
+JOB_EXEC_MODE_ASYNCIO = 1  # asyncio协程，一台主机一个协程，只有登录认证、保存输出等阻塞操作才交给少量线程处理
+JOB_EXEC_MODE_PROCESS_SHARDS = 2  # 多进程分片，主机分到多个工作进程，每个进程一个线程池，不再受限于一个进程的GIL
+ASYNCIO_JOB_BLOCKING_WORKERS = 64  # asyncio协程模式下，处理阻塞操作（ssh认证、关闭连接、保存输出）的线程数上限
+# 多进程分片模式下，工作进程发回主进程的消息，均为 (消息类型, 参数1, 参数2)
+SHARD_MSG_HOST_JOB_STATUS = 0  # (类型, host_index, HostJobStatus.get_status_tuple())
+SHARD_MSG_OUTPUT_ROWS = 1  # (类型, output_row_list, interactive_output_row_list) 压缩后的命令输出行，由主进程写入数据库
+SHARD_MSG_HOST_REACHABLE = 2  # (类型, host_oid, is_reachable) 由主进程记录到主机熔断记录
+SHARD_MSG_SHARD_FINISHED = 3  # (类型, shard_index, None) 工作进程已巡检完分到的所有主机（或出错退出）
+PROCESS_SHARD_POLL_INTERVAL = 1.0  # 主进程等待消息的超时时间，超时后检查作业是否已停止、工作进程是否异常退出，秒
+PROCESS_SHARD_JOIN_TIMEOUT = 10.0  # 作业结束时等待工作进程退出的时间，超时则强制结束，秒
+# 自适应巡检并发数（巡检模板adaptive_forks为COF_YES时），以forks为初始值，按登录耗时、认证失败、登录超时加性增/乘性减（AIMD）
+ADAPTIVE_FORKS_MAX_MULTIPLE = 4  # 并发数最多增长到 forks 的几倍（线程池模式下线程池按此上限创建）
+ADAPTIVE_FORKS_DECREASE_FACTOR = 0.5  # 出现拥塞信号时，并发数乘以此系数
+ADAPTIVE_FORKS_LATENCY_FACTOR = 3.0  # 登录耗时超过基准耗时（已观测到的最小登录耗时）的几倍，视为拥塞
+ADAPTIVE_FORKS_LATENCY_MIN_EXCESS = 2.0  # 且登录耗时至少比基准耗时多几秒，才视为拥塞，避免登录很快时的抖动，秒
+ADAPTIVE_FORKS_WAIT_INTERVAL = 0.5  # 线程等待并发名额时，最长多久检查一次作业是否已停止，秒
+ADAPTIVE_FORKS_HISTORY_MAX_LEN = 512  # 作业记录里最多保存多少个并发数变化点，超过时隔一个删一个
 # 巡检作业状态
 INSPECTION_JOB_EXEC_STATE_UNKNOWN = 0
 INSPECTION_JOB_EXEC_STATE_STARTED = 1
 INSPECTION_JOB_EXEC_STATE_COMPLETED = 2
 INSPECTION_JOB_EXEC_STATE_PART_COMPLETED = 3
 INSPECTION_JOB_EXEC_STATE_FAILED = 4
+INSPECTION_JOB_EVENT_HOST_STATUS = 0  # 作业事件：主机作业状态有变化
+INSPECTION_JOB_EVENT_HOST_PROGRESS = 1  # 作业事件：主机作业状态未变，巡检进度有变化
+INSPECTION_JOB_EVENT_JOB_FINISHED = 2  # 作业事件：作业已结束，之后不再有事件
+INSPECTION_JOB_EVENT_DRAIN_INTERVAL = 200  # 作业详情界面取出作业事件的间隔，毫秒
+INSPECTION_JOB_EVENT_DRAIN_MAX_NUM = 5000  # 作业详情界面每次最多取出多少个事件，剩余的下次再取，避免卡住界面
 FIND_CREDENTIAL_STATUS_SUCCEED = 0
 FIND_CREDENTIAL_STATUS_TIMEOUT = 1
 FIND_CREDENTIAL_STATUS_FAILED = 2
@@ -196,6 +393,12 @@ FONT_TYPE_ITALIC = 2
 FONT_TYPE_BOLD_ITALIC = 3
 VT100_TERMINAL_MODE_NORMAL = 0
 VT100_TERMINAL_MODE_APP = 1
+# <Vt100Tokenizer>拆分出的token类型
+VT100_TOKEN_TEXT = 0  # 普通文本（已解码为str，不含控制字符）
+VT100_TOKEN_CSI = 1  # ESC [ 参数 结束字符，如 [01;34m  [K  [?2004h
+VT100_TOKEN_OSC = 2  # ESC ] 内容 BEL或ESC\，如设置窗口标题
+VT100_TOKEN_ESC = 3  # 其他ESC序列，如 ESC=  ESC>  ESC(B
+VT100_TOKEN_CTRL = 4  # 单个控制字符，如 \r \n \b \x07，不完整的ESC序列也作为单个控制字符
 # 调用某对象的发起对象类型
 CALL_BACK_CLASS_CREATE_RESOURCE = 0
 CALL_BACK_CLASS_EDIT_RESOURCE = 1
@@ -203,6 +406,12 @@ CALL_BACK_CLASS_LIST_RESOURCE = 2
 # 一个终端会话的当前所处模式，显示的Text类型
 CURRENT_TERMINAL_TEXT_NORMAL = 0
 CURRENT_TERMINAL_TEXT_APP = 1
+# 本地sqlite3数据库存储层<SqliteStorage>的参数
+SQLITE_READ_CONNECTION_POOL_SIZE = 4  # 长期保持的只读连接数，读操作从池中借用连接，用完归还
+SQLITE_BUSY_TIMEOUT = 30  # 数据库被其他连接锁住时的最长等待时间，秒
+SQLITE_WRITE_BATCH_MAX_TASKS = 256  # 写线程一个事务里最多合并多少个排队的写操作
+SQLITE_SCHEMA_VERSION = 10  # 数据库结构版本，保存在数据库的 PRAGMA user_version 里，升级步骤见 SqliteStorage.init_schema()
+INSPECTION_JOB_RECORD_PAGE_SIZE = 50  # 巡检作业记录分页加载，每页加载多少条作业记录（按开始时间从新到旧）
 
 
 def cofable_stop_thread(thread):
@@ -251,6 +460,95 @@ def cofable_stop_thread_silently(thread):
         print("cofable_stop_thread_silently: PyThreadState_SetAsyncExc failed")
 
 
+def cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, table_name, column_name, column_define):
+    """
+    旧版本程序创建的数据库表没有新增的列，若表中不存在此列，则添加此列，已存在则不做任何操作
+    :param sqlite_cursor: 已连接数据库的游标
+    :param table_name: <str> 表名，如 "tb_inspection_template"
+    :param column_name: <str> 列名，如 "job_exec_mode"
+    :param column_define: <str> 列的类型及默认值，如 "int default 0"
+    """
+    sqlite_cursor.execute(f"PRAGMA table_info({table_name})")
+    existed_column_name_list = [column_info[1] for column_info in sqlite_cursor.fetchall()]
+    if len(existed_column_name_list) != 0 and column_name not in existed_column_name_list:
+        print(f"cofable_sqlite3_add_column_if_not_existed: 表 {table_name} 添加列 {column_name}")
+        sqlite_cursor.execute(f"alter table {table_name} add column {column_name} {column_define}")
+
+
+def cofable_sqlite3_create_unique_index_if_not_existed(sqlite_cursor, index_name, table_name, column_name_list):
+    """
+    为旧版本程序创建的数据库表添加唯一索引，若表中已有重复记录（按column_name_list判断），则只保留最先插入的那一条，
+    其余的重复记录移到表 <table_name>__duplicate 里保存（不删除），并打印这些记录的唯一键
+    :param sqlite_cursor: 已连接数据库的游标
+    :param index_name: <str> 索引名，如 "uq_inspection_job_invoke_shell_output"
+    :param table_name: <str> 表名
+    :param column_name_list: <list[str]> 组成唯一键的列名
+    """
+    sqlite_cursor.execute("select name from sqlite_master where type='index' and name=?", (index_name,))
+    if len(sqlite_cursor.fetchall()) != 0:
+        return
+    column_names = ", ".join(column_name_list)
+    duplicate_where_sql = f"where rowid not in (select min(rowid) from {table_name} group by {column_names})"
+    sqlite_cursor.execute(f"select {column_names} from {table_name} {duplicate_where_sql} order by rowid")
+    duplicate_key_list = sqlite_cursor.fetchall()
+    if len(duplicate_key_list) > 0:
+        duplicate_table_name = table_name + "__duplicate"
+        sqlite_cursor.execute(f"create table if not exists {duplicate_table_name} as select * from {table_name} where 0")
+        sqlite_cursor.execute(f"insert into {duplicate_table_name} select * from {table_name} {duplicate_where_sql} order by rowid")
+        sqlite_cursor.execute(f"delete from {table_name} {duplicate_where_sql}")
+        print(f"cofable_sqlite3_create_unique_index_if_not_existed: 表 {table_name} 有{len(duplicate_key_list)}条重复记录，",
+              f"已移到表 {duplicate_table_name}，({column_names}) 分别为:")
+        for duplicate_key in duplicate_key_list:
+            print(f"    {duplicate_key}")
+    sqlite_cursor.execute(f"create unique index {index_name} on {table_name} ({column_names})")
+
+
+def cofable_sqlite3_rebuild_table(sqlite_cursor, table_name, create_table_sql, column_name_list, select_column_list=None,
+                                  where_sql=''):
+    """
+    sqlite不支持给已有的表添加主键，只能重建表：旧表改名为<table_name>__old → 按新定义建表 → 按插入顺序复制数据 → 删除旧表
+    复制时主键冲突的重复记录只保留先复制的那条
+    :param sqlite_cursor: 已连接数据库的游标，需在事务中调用
+    :param table_name: <str> 表名
+    :param create_table_sql: <str> 新表的建表语句
+    :param column_name_list: <list[str]> 新表要写入的列
+    :param select_column_list: <list[str]> 从旧表读取的列或表达式，与column_name_list一一对应，默认同column_name_list
+    :param where_sql: <str> 读取旧表时的过滤条件，如 "where rowid in (...)"
+    """
+    old_table_name = table_name + "__old"
+    if select_column_list is None:
+        select_column_list = column_name_list
+    sqlite_cursor.execute(f"alter table {table_name} rename to {old_table_name}")
+    sqlite_cursor.execute(create_table_sql)
+    sql_list = [f"insert or ignore into {table_name} ({', '.join(column_name_list)})",
+                f"select {', '.join(select_column_list)} from {old_table_name} {where_sql} order by rowid"]
+    sqlite_cursor.execute(" ".join(sql_list))
+    sqlite_cursor.execute(f"drop table {old_table_name}")
+
+
+def cofable_compress_output_bytes(output_bytes):
+    """
+    压缩巡检命令输出（原始vt100字节），返回 (output_format, 压缩后的bytes)，bytes直接作为BLOB保存到数据库
+    """
+    if zstandard is not None:
+        return OUTPUT_STORAGE_FORMAT_ZSTD, zstandard.ZstdCompressor(level=OUTPUT_STORAGE_ZSTD_LEVEL).compress(output_bytes)
+    return OUTPUT_STORAGE_FORMAT_ZLIB, zlib.compress(output_bytes, OUTPUT_STORAGE_ZLIB_LEVEL)
+
+
+def cofable_decompress_output_bytes(output_format, stored_value):
+    """
+    按保存格式还原巡检命令输出，旧格式为base64文本，新格式为压缩的BLOB
+    """
+    if output_format == OUTPUT_STORAGE_FORMAT_ZLIB:
+        return zlib.decompress(stored_value)
+    if output_format == OUTPUT_STORAGE_FORMAT_ZSTD:
+        if zstandard is None:
+            print("cofable_decompress_output_bytes: 此输出为zstd压缩格式，需要安装zstandard才能读取")
+            return b''
+        return zstandard.ZstdDecompressor().decompress(stored_value)
+    return base64.b64decode(stored_value)
+
+
 class Project:
     """
     项目，是一个全局概念，一个项目包含若干资源（认证凭据，受管主机，巡检代码，巡检模板等）
@@ -276,21 +574,9 @@ class Project:
         self.last_modify_timestamp = last_modify_timestamp  # <float>
 
     def save(self):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_project'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_project"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_project (oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "create_timestamp double,",
-                        "last_modify_timestamp double )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_project where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -312,9 +598,6 @@ class Project:
                         f"oid='{self.oid}'"]
             print(" ".join(sql_list))
             sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
 
     def update(self, name='default', description='default', last_modify_timestamp=None, create_timestamp=None, global_info=None):
         if name is not None:
@@ -329,6 +612,7 @@ class Project:
             self.create_timestamp = create_timestamp
         if global_info is not None:
             self.global_info = global_info
+        self.global_info.project_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
@@ -367,31 +651,9 @@ class Credential:
         self.global_info = global_info
 
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_credential'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_credential";'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # ★若未查询到有此表，则创建此表★
-        if len(result) == 0:
-            sql_list = ["create table tb_credential  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "create_timestamp double,",
-                        "cred_type int,"
-                        "username varchar(128),",
-                        "password varchar(256),",
-                        "private_key_b64 varchar(8192),",
-                        "privilege_escalation_method int,",
-                        "privilege_escalation_username varchar(128),",
-                        "privilege_escalation_password varchar(256),",
-                        "auth_url varchar(2048),",
-                        "ssl_verify int,",
-                        "last_modify_timestamp double )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # ★开始插入数据/更新数据
         sql = f"select * from tb_credential where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -447,9 +709,6 @@ class Credential:
                         "where",
                         f"oid='{self.oid}'"]
             sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
 
     def update(self, name=None, description=None, project_oid=None, cred_type=None,
                username=None, password=None, private_key=None,
@@ -507,6 +766,7 @@ class Credential:
             self.create_timestamp = create_timestamp
         if global_info is not None:
             self.global_info = global_info
+        self.global_info.credential_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
@@ -545,28 +805,9 @@ class Host:
         self.login_credential_oid = credential_object.oid
 
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_host"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_host  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "create_timestamp double,",
-                        "address varchar(256),",
-                        "port int,",
-                        "last_modify_timestamp double,",
-                        "login_protocol int,"
-                        "first_auth_method int,",
-                        "login_credential_oid varchar(36),",
-                        "custome_tag_config_scheme_oid varchar(36) )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_host where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -613,9 +854,6 @@ class Host:
                         f"oid='{self.oid}'"]
             sqlite_cursor.execute(" ".join(sql_list))
         # ★查询是否有名为'tb_host_credential_oid_list'的表★  这个废弃了
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
 
     def update(self, name=None, description=None, project_oid=None, address=None,
                port=None, last_modify_timestamp=None, create_timestamp=None,
@@ -644,6 +882,7 @@ class Host:
             self.first_auth_method = first_auth_method
         if custome_tag_config_scheme_oid is not None:
             self.custome_tag_config_scheme_oid = custome_tag_config_scheme_oid
+        self.global_info.host_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
@@ -668,7 +907,7 @@ class HostGroup:
             self.create_timestamp = create_timestamp
         self.last_modify_timestamp = last_modify_timestamp  # <float>
         self.host_oid_list = []
-        self.host_group_oid_list = []  # 不能包含自己
+        self.host_group_oid_list = []  # 不能包含自己，也不能循环包含，见 HostGroupResolver.is_host_group_cycle()
         self.global_info = global_info
 
     def add_host(self, host):
@@ -681,22 +920,10 @@ class HostGroup:
             pass
 
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host_group'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_host_group"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_host_group  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "create_timestamp double,",
-                        "last_modify_timestamp double )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.host_group_resolver.invalidate_host_group(self.oid)  # 组内主机或下级组可能已修改，缓存的展开结果失效
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_host_group where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -724,15 +951,6 @@ class HostGroup:
                         "where",
                         f"oid='{self.oid}'"]
             sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_host_group_include_host_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_host_group_include_host_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql = "create table tb_host_group_include_host_list  ( host_group_oid varchar(36),\
-                            host_index int, host_oid varchar(36) );"
-            sqlite_cursor.execute(sql)
         # 开始插入数据
         sql = f"delete from tb_host_group_include_host_list where host_group_oid='{self.oid}' "
         sqlite_cursor.execute(sql)  # 每次保存host前，先删除所有host内容，再去重新插入（既可用于新建，又可用于更新）
@@ -744,15 +962,7 @@ class HostGroup:
                         f"{host_index},",
                         f"'{host_oid}' )"]
             sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_host_group_include_host_group_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_host_group_include_host_group_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql = "create table tb_host_group_include_host_group_list  ( host_group_oid varchar(36),\
-                                group_index int, group_oid varchar(36) );"
-            sqlite_cursor.execute(sql)
+            host_index += 1
         # 开始插入数据
         sql = f"delete from tb_host_group_include_host_group_list where host_group_oid='{self.oid}' "
         sqlite_cursor.execute(sql)  # 每次保存group前，先删除所有group内容，再去重新插入（既可用于新建，又可用于更新）
@@ -764,9 +974,7 @@ class HostGroup:
                         f"{group_index},",
                         f"'{group_oid}' )"]
             sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+            group_index += 1
 
     def update(self, name=None, description=None, project_oid=None, last_modify_timestamp=None,
                create_timestamp=None, global_info=None):
@@ -784,6 +992,7 @@ class HostGroup:
             self.create_timestamp = create_timestamp
         if global_info is not None:
             self.global_info = global_info
+        self.global_info.host_group_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
@@ -794,7 +1003,9 @@ class InspectionCodeBlock:
     """
 
     def __init__(self, name='default', description='default', project_oid='default', code_source=CODE_SOURCE_LOCAL,
-                 last_modify_timestamp=0, oid=None, create_timestamp=None, global_info=None):
+                 last_modify_timestamp=0, oid=None, create_timestamp=None, global_info=None,
+                 code_exec_method=CODE_EXEC_METHOD_INVOKE_SHELL, exec_command_concurrency=EXEC_COMMAND_CONCURRENCY_DEFAULT,
+                 code_source_path='', code_source_git_url=''):
         if oid is None:
             self.oid = uuid.uuid4().__str__()  # <str>
         else:
@@ -807,33 +1018,33 @@ class InspectionCodeBlock:
         else:
             self.create_timestamp = create_timestamp
         self.code_source = code_source  # <int> 可为本地的命令，也可为git仓库里的写有命令的某文件
+        self.code_source_path = code_source_path  # <str> 代码来源为CODE_SOURCE_FILE时为本地文件路径，为CODE_SOURCE_GIT时为仓库里的文件路径
+        self.code_source_git_url = code_source_git_url  # <str> 代码来源为CODE_SOURCE_GIT时的git仓库地址
         self.last_modify_timestamp = last_modify_timestamp  # <float>
         self.code_list = []  # 元素为 <OneLineCode> 对象，一条命令为一个元素，按顺序执行
         self.global_info = global_info
+        # <int> 执行方式，CODE_EXEC_METHOD_INVOKE_SHELL 交互式shell里逐行执行（默认），
+        # CODE_EXEC_METHOD_EXEC_COMMAND 每行命令单独一个exec通道执行（非交互，适合linux主机，stdout/stderr/退出码分开获取），
+        # CODE_EXEC_METHOD_INVOKE_SHELL_PIPELINE 交互式shell里流水线执行（连续发送多条命令，适合高延迟链路上的linux主机），
+        # CODE_EXEC_METHOD_SCRIPT 所有命令生成一个脚本上传后只执行一次（适合命令较多或有多行命令的linux主机）
+        self.code_exec_method = code_exec_method
+        self.exec_command_concurrency = exec_command_concurrency  # <int> exec_command方式时，同时执行几行命令，为1则逐行执行
 
     def add_code_line(self, one_line_code):
         if isinstance(one_line_code, OneLineCode):
             one_line_code.code_index = len(self.code_list)
             self.code_list.append(one_line_code)
 
+    def __getstate__(self):
+        # 多进程分片模式下作为参数传给工作进程，不含global_info，由工作进程设置为它自己的<GlobalInfo>
+        state = self.__dict__.copy()
+        state['global_info'] = None
+        return state
+
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_code_block'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_code_block"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_inspection_code_block  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "create_timestamp double,",
-                        "code_source int,",
-                        "last_modify_timestamp double )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_inspection_code_block where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -844,15 +1055,22 @@ class InspectionCodeBlock:
                         "project_oid,",
                         "create_timestamp,",
                         "code_source,",
-                        "last_modify_timestamp )  values ",
+                        "last_modify_timestamp,",
+                        "code_exec_method,",
+                        "exec_command_concurrency,",
+                        "code_source_path,",
+                        "code_source_git_url )  values ",
                         f"('{self.oid}',",
                         f"'{self.name}',",
                         f"'{self.description}',",
                         f"'{self.project_oid}',",
                         f"{self.create_timestamp},",
                         f"{self.code_source},",
-                        f"{self.last_modify_timestamp} )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+                        f"{self.last_modify_timestamp},",
+                        f"{self.code_exec_method},",
+                        f"{self.exec_command_concurrency},",
+                        "?, ? )"]  # 文件路径、git仓库地址由用户输入，使用参数绑定
+            sqlite_cursor.execute(" ".join(sql_list), (self.code_source_path, self.code_source_git_url))
         else:  # ★★ 若查询到有此项记录，则更新此项记录 ★★
             sql_list = ["update tb_inspection_code_block set ",
                         f"name='{self.name}',",
@@ -860,59 +1078,44 @@ class InspectionCodeBlock:
                         f"project_oid='{self.project_oid}',",
                         f"create_timestamp={self.create_timestamp},",
                         f"code_source={self.code_source},",
-                        f"last_modify_timestamp={self.last_modify_timestamp}",
+                        f"last_modify_timestamp={self.last_modify_timestamp},",
+                        f"code_exec_method={self.code_exec_method},",
+                        f"exec_command_concurrency={self.exec_command_concurrency},",
+                        "code_source_path=?,",
+                        "code_source_git_url=?",
                         "where",
                         f"oid='{self.oid}'"]
-            sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_inspection_code_block_include_code_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_code_block_include_code_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql_list = ["create table tb_inspection_code_block_include_code_list  ( inspection_code_block_oid varchar(36),",
-                        "code_index int,",
-                        "code_content varchar(2048),",
-                        "code_post_wait_time double,",
-                        "need_interactive int,",
-                        "interactive_question_keyword varchar(512),",
-                        "interactive_answer varchar(512),",
-                        "interactive_process_method int,",
-                        "description varchar(2048)",
-                        " )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+            sqlite_cursor.execute(" ".join(sql_list), (self.code_source_path, self.code_source_git_url))
         # 开始插入数据
         # ★每次保存代码前，先删除所有code内容，再去重新插入
         sql = f"delete from tb_inspection_code_block_include_code_list where inspection_code_block_oid='{self.oid}'"
         sqlite_cursor.execute(sql)
+        # 命令内容使用参数绑定，来自文件或git仓库的多行命令（脚本）里常有引号
+        sql_list = ["insert into tb_inspection_code_block_include_code_list (inspection_code_block_oid,",
+                    "code_index,",
+                    "code_content,",
+                    "code_post_wait_time,",
+                    "need_interactive,",
+                    "interactive_question_keyword,",
+                    "interactive_answer,"
+                    "interactive_process_method,",
+                    "description,",
+                    "label,",
+                    "condition_type,",
+                    "condition_pattern,",
+                    "condition_action,",
+                    "condition_goto_label",
+                    " ) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"]
         for code in self.code_list:
-            sql_list = ["insert into tb_inspection_code_block_include_code_list (inspection_code_block_oid,",
-                        "code_index,",
-                        "code_content,",
-                        "code_post_wait_time,",
-                        "need_interactive,",
-                        "interactive_question_keyword,",
-                        "interactive_answer,"
-                        "interactive_process_method,",
-                        "description",
-                        " ) values",
-                        f"( '{self.oid}',",
-                        f"{code.code_index},",
-                        f"'{code.code_content}',",
-                        f"{code.code_post_wait_time},",
-                        f"{code.need_interactive},",
-                        f"'{code.interactive_question_keyword}',",
-                        f"'{code.interactive_answer}',",
-                        f"{code.interactive_process_method},",
-                        f"'{code.description}'",
-                        " )"]
-            sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+            sqlite_cursor.execute(" ".join(sql_list), (self.oid, code.code_index, code.code_content, code.code_post_wait_time,
+                                                       code.need_interactive, code.interactive_question_keyword,
+                                                       code.interactive_answer, code.interactive_process_method, code.description,
+                                                       code.label, code.condition_type, code.condition_pattern,
+                                                       code.condition_action, code.condition_goto_label))
 
     def update(self, name=None, description=None, project_oid=None, code_source=None,
-               last_modify_timestamp=None, create_timestamp=None, global_info=None):
+               last_modify_timestamp=None, create_timestamp=None, global_info=None,
+               code_exec_method=None, exec_command_concurrency=None, code_source_path=None, code_source_git_url=None):
         if name is not None:
             self.name = name
         if description is not None:
@@ -921,6 +1124,14 @@ class InspectionCodeBlock:
             self.project_oid = project_oid
         if code_source is not None:
             self.code_source = code_source
+        if code_source_path is not None:
+            self.code_source_path = code_source_path
+        if code_source_git_url is not None:
+            self.code_source_git_url = code_source_git_url
+        if code_exec_method is not None:
+            self.code_exec_method = code_exec_method
+        if exec_command_concurrency is not None:
+            self.exec_command_concurrency = exec_command_concurrency
         if last_modify_timestamp is not None:
             self.last_modify_timestamp = last_modify_timestamp
         else:
@@ -929,9 +1140,136 @@ class InspectionCodeBlock:
             self.create_timestamp = create_timestamp
         if global_info is not None:
             self.global_info = global_info
+        self.global_info.inspection_code_block_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
+    def update_code_from_source(self):
+        """
+        代码来源为本地文件（CODE_SOURCE_FILE）或git仓库（CODE_SOURCE_GIT）时，重新读取命令，有变化则保存，返回是否读取成功，
+        读取失败时（文件不存在、git仓库无法访问等）仍保留原有的命令
+        """
+        try:
+            if self.code_source == CODE_SOURCE_FILE:
+                code_source_file_path = self.code_source_path
+            elif self.code_source == CODE_SOURCE_GIT:
+                code_source_file_path = os.path.join(self.update_git_repo_cache(), self.code_source_path)
+            else:
+                return False
+            with open(code_source_file_path, 'r', encoding='utf8') as f:
+                code_source_text = f.read()
+        except (OSError, UnicodeDecodeError, subprocess.SubprocessError, ValueError) as err:
+            print(f"InspectionCodeBlock.update_code_from_source: 巡检代码块 {self.name} 读取代码来源失败 {err}")
+            return False
+        code_list = self.parse_code_source_text(code_source_text)
+        if len(code_list) == 0:
+            print(f"InspectionCodeBlock.update_code_from_source: 巡检代码块 {self.name} 的代码来源文件里没有命令")
+            return False
+        if [(code.code_content, code.description) for code in code_list] == \
+                [(code.code_content, code.description) for code in self.code_list]:
+            return True  # 命令未变化，不用保存
+        print(f"InspectionCodeBlock.update_code_from_source: 巡检代码块 {self.name} 的命令已更新，共{len(code_list)}条")
+        self.copy_code_settings(self.code_list, code_list)
+        self.code_list = code_list  # 整体替换，正在执行此巡检代码块的作业仍使用原来的列表
+        self.last_modify_timestamp = time.time()
+        self.save()
+        return True
+
+    @staticmethod
+    def copy_code_settings(old_code_list, new_code_list):
+        """
+        代码来源文件里只有命令及描述，命令内容相同的行沿用原来设置的等待时间、交互问答、标签及执行条件，
+        有多行相同命令时按出现的先后顺序一一对应，新增的命令为默认设置
+        """
+        old_code_dict = {}  # key为命令内容，value为原来命令内容相同的<OneLineCode>，按顺序排列
+        for old_code in old_code_list:
+            old_code_dict.setdefault(old_code.code_content, collections.deque()).append(old_code)
+        for new_code in new_code_list:
+            same_code_deque = old_code_dict.get(new_code.code_content)
+            if not same_code_deque:
+                continue
+            old_code = same_code_deque.popleft()
+            new_code.code_post_wait_time = old_code.code_post_wait_time
+            new_code.need_interactive = old_code.need_interactive
+            new_code.interactive_question_keyword = old_code.interactive_question_keyword
+            new_code.interactive_answer = old_code.interactive_answer
+            new_code.interactive_process_method = old_code.interactive_process_method
+            new_code.label = old_code.label
+            new_code.condition_type = old_code.condition_type
+            new_code.condition_pattern = old_code.condition_pattern
+            new_code.condition_action = old_code.condition_action
+            new_code.condition_goto_label = old_code.condition_goto_label
+
+    def update_git_repo_cache(self):
+        """
+        把代码来源git仓库浅克隆（已克隆过则拉取最新提交）到本地CODE_SOURCE_GIT_CACHE_DIR目录下，返回仓库目录，
+        git命令失败或超时时抛出subprocess的异常，仓库地址以-开头（会被git当作选项）时抛出ValueError；
+        需要认证的仓库使用ssh密钥或在仓库地址里带上token，不会等待输入密码
+        """
+        if self.code_source_git_url.startswith("-"):
+            raise ValueError(f"git仓库地址不能以-开头: {self.code_source_git_url}")
+        repo_dir = os.path.join(CODE_SOURCE_GIT_CACHE_DIR, hashlib.sha256(self.code_source_git_url.encode('utf8')).hexdigest()[:16])
+        if os.path.isdir(os.path.join(repo_dir, ".git")):
+            git_arg_list_list = [["git", "-C", repo_dir, "fetch", "--depth", "1", "origin"],
+                                 ["git", "-C", repo_dir, "reset", "--hard", "FETCH_HEAD"]]
+        else:
+            git_arg_list_list = [["git", "clone", "--depth", "1", "--", self.code_source_git_url, repo_dir]]
+        for git_arg_list in git_arg_list_list:
+            subprocess.run(git_arg_list, capture_output=True, timeout=GIT_COMMAND_TIMEOUT, check=True,
+                           env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+        return repo_dir
+
+    @staticmethod
+    def parse_code_source_text(code_source_text):
+        """
+        把代码来源文件的内容拆分为<OneLineCode>列表：
+        有以CODE_SOURCE_SECTION_HEADER（#@）开头的节标题行时，每节为一条命令（可为多行，适合脚本执行方式），节标题之后的文字为命令描述，
+        第一个节标题行之前的内容（如 #!/bin/bash）并入第一节；没有节标题行时，每个非空且不以#开头的行为一条命令
+        """
+        line_list = code_source_text.splitlines()
+        code_list = []
+        if not any(line.startswith(CODE_SOURCE_SECTION_HEADER) for line in line_list):
+            for line in line_list:
+                if line.strip() != '' and not line.lstrip().startswith("#"):
+                    code_list.append(OneLineCode(code_index=len(code_list), code_content=line.strip()))
+            return code_list
+        section_list = []  # 元素为 [描述, 行列表]
+        head_line_list = []
+        for line in line_list:
+            if line.startswith(CODE_SOURCE_SECTION_HEADER):
+                section_list.append([line[len(CODE_SOURCE_SECTION_HEADER):].strip(), head_line_list if len(section_list) == 0 else []])
+            elif len(section_list) == 0:
+                head_line_list.append(line)
+            else:
+                section_list[-1][1].append(line)
+        for description, section_line_list in section_list:
+            code_content = "\n".join(section_line_list).strip("\n")
+            if code_content.strip() != '':
+                code_list.append(OneLineCode(code_index=len(code_list), code_content=code_content, description=description))
+        return code_list
+
+    def build_script(self):
+        """
+        生成脚本执行方式（CODE_EXEC_METHOD_SCRIPT）上传到目标主机的脚本，返回 (script_token, script_bytes, interpreter)，
+        每条命令后插入一条输出结束标记的echo命令，开头把stderr合并到stdout；script_token取自命令内容的sha256，
+        命令不变则脚本不变，目标主机上已上传过的脚本可直接执行
+        ★第一条命令以 #! 开头时使用它指定的解释器（如/bin/bash），否则使用/bin/sh
+        """
+        code_content_list = [code.code_content.rstrip() for code in self.code_list]
+        script_token = hashlib.sha256("\n".join(code_content_list).encode('utf8')).hexdigest()[:16]
+        interpreter = "/bin/sh"
+        if len(code_content_list) != 0 and code_content_list[0].startswith("#!"):
+            interpreter = code_content_list[0][2:].split("\n", 1)[0].strip()
+        demuxer = ShellPipelineDemuxer(token=script_token)
+        script_line_list = [f"#!{interpreter}", "exec 2>&1"]
+        for cmd_index, code_content in enumerate(code_content_list):
+            # 执行条件跳转到后面的命令时，设置环境变量SCRIPT_START_INDEX_ENV重新执行脚本，之前的命令不再执行
+            script_line_list.append(f'if [ "${{{SCRIPT_START_INDEX_ENV}:-0}}" -le {cmd_index} ]; then')
+            script_line_list.append(code_content)
+            script_line_list.append(demuxer.get_marker_command(cmd_index))
+            script_line_list.append("fi")
+        return script_token, ("\n".join(script_line_list) + "\n").encode('utf8'), interpreter
+
 
 class InspectionTemplate:
     """
@@ -943,7 +1281,12 @@ class InspectionTemplate:
                  execution_method=EXECUTION_METHOD_NONE, execution_at_time=0.0,
                  execution_after_time=0.0, execution_crond_time='default', update_code_on_launch=COF_FALSE,
                  last_modify_timestamp=0, oid=None, create_timestamp=None, forks=DEFAULT_JOB_FORKS, save_output_to_file=COF_YES,
-                 output_file_name_style=OUTPUT_FILE_NAME_STYLE_DATE_DIR__HOSTNAME, global_info=None):
+                 output_file_name_style=OUTPUT_FILE_NAME_STYLE_DATE_DIR__HOSTNAME, job_exec_mode=JOB_EXEC_MODE_THREAD_POOL,
+                 code_exec_timeout=CODE_EXEC_HARD_TIMEOUT_DEFAULT, host_deadline=HOST_DEADLINE_DEFAULT,
+                 job_deadline=JOB_DEADLINE_DEFAULT, adaptive_forks=COF_NO, login_retry_times=LOGIN_RETRY_TIMES_DEFAULT,
+                 login_retry_interval=LOGIN_RETRY_INTERVAL_DEFAULT, circuit_breaker_threshold=CIRCUIT_BREAKER_THRESHOLD_DEFAULT,
+                 schedule_overlap_policy=SCHEDULE_OVERLAP_POLICY_SKIP, host_schedule_order=HOST_SCHEDULE_ORDER_LONGEST_FIRST,
+                 new_host_schedule_slot=NEW_HOST_SCHEDULE_SLOT_FIRST, global_info=None):
         if oid is None:
             self.oid = uuid.uuid4().__str__()  # <str>
         else:
@@ -969,6 +1312,17 @@ class InspectionTemplate:
         self.launch_template_trigger_oid = ''  # <str> CronDetectionTrigger对象的oid，此信息不保存到数据库
         self.save_output_to_file = save_output_to_file  # 保存巡检输出到文本文件，一台主机的巡检输出为一个txt文件
         self.output_file_name_style = output_file_name_style  # 保存巡检输出的文本文件名称风格
+        self.job_exec_mode = job_exec_mode  # <int> 巡检作业执行引擎，JOB_EXEC_MODE_THREAD_POOL/ASYNCIO/PROCESS_SHARDS
+        self.code_exec_timeout = code_exec_timeout  # <float> 单条命令最长等待时间，秒
+        self.host_deadline = host_deadline  # <float> 单台主机巡检最长用时，秒，0为不限制
+        self.job_deadline = job_deadline  # <float> 整个巡检作业最长用时，秒，0为不限制
+        self.adaptive_forks = adaptive_forks  # <int> 是否自适应并发数，以forks为初始值，按登录情况自动增减，见<AdaptiveConcurrencyController>
+        self.login_retry_times = login_retry_times  # <int> 登录超时或连接失败时最多重试几次，重试排在所有主机之后
+        self.login_retry_interval = login_retry_interval  # <float> 第1次重试前的等待时间，秒，之后指数退避
+        self.circuit_breaker_threshold = circuit_breaker_threshold  # <int> 主机连续几次作业无法连接后熔断，0为不熔断，见<HostCircuitBreaker>
+        self.schedule_overlap_policy = schedule_overlap_policy  # <int> 定时触发时上一次作业还未结束的处理方式 SCHEDULE_OVERLAP_POLICY_*
+        self.host_schedule_order = host_schedule_order  # <int> 主机巡检顺序 HOST_SCHEDULE_ORDER_*，见<HostDurationStats>
+        self.new_host_schedule_slot = new_host_schedule_slot  # <int> 按历史用时排序时，没有历史用时的主机的位置 NEW_HOST_SCHEDULE_SLOT_*
         self.global_info = global_info
 
     def add_host(self, host):
@@ -980,31 +1334,16 @@ class InspectionTemplate:
     def add_inspection_code_block(self, inspection_code):
         self.inspection_code_block_oid_list.append(inspection_code.oid)
 
+    def __getstate__(self):
+        # 多进程分片模式下作为参数传给工作进程，不含global_info，由工作进程设置为它自己的<GlobalInfo>
+        state = self.__dict__.copy()
+        state['global_info'] = None
+        return state
+
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_template'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_template"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_inspection_template  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "create_timestamp double,",
-                        "execution_method int,",
-                        "execution_at_time double,",
-                        "execution_after_time,",
-                        "execution_crond_time varchar(128),",
-                        "last_modify_timestamp double,",
-                        "update_code_on_launch int,",
-                        "forks int,",
-                        "save_output_to_file int,",
-                        "output_file_name_style int )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_inspection_template where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -1022,7 +1361,18 @@ class InspectionTemplate:
                         "update_code_on_launch,",
                         "forks,",
                         "save_output_to_file,",
-                        "output_file_name_style ) values",
+                        "output_file_name_style,",
+                        "job_exec_mode,",
+                        "code_exec_timeout,",
+                        "host_deadline,",
+                        "job_deadline,",
+                        "adaptive_forks,",
+                        "login_retry_times,",
+                        "login_retry_interval,",
+                        "circuit_breaker_threshold,",
+                        "schedule_overlap_policy,",
+                        "host_schedule_order,",
+                        "new_host_schedule_slot ) values",
                         f"('{self.oid}',",
                         f"'{self.name}',",
                         f"'{self.description}',",
@@ -1036,7 +1386,18 @@ class InspectionTemplate:
                         f"{self.update_code_on_launch},",
                         f"{self.forks},",
                         f"{self.save_output_to_file},",
-                        f"{self.output_file_name_style} )"]
+                        f"{self.output_file_name_style},",
+                        f"{self.job_exec_mode},",
+                        f"{self.code_exec_timeout},",
+                        f"{self.host_deadline},",
+                        f"{self.job_deadline},",
+                        f"{self.adaptive_forks},",
+                        f"{self.login_retry_times},",
+                        f"{self.login_retry_interval},",
+                        f"{self.circuit_breaker_threshold},",
+                        f"{self.schedule_overlap_policy},",
+                        f"{self.host_schedule_order},",
+                        f"{self.new_host_schedule_slot} )"]
             sqlite_cursor.execute(" ".join(sql_list))
         else:  # ★★ 若查询到有此项记录，则更新此项记录 ★★
             sql_list = ["update tb_inspection_template set ",
@@ -1052,21 +1413,21 @@ class InspectionTemplate:
                         f"update_code_on_launch={self.update_code_on_launch},",
                         f"forks={self.forks},",
                         f"save_output_to_file={self.save_output_to_file},",
-                        f"output_file_name_style={self.output_file_name_style}",
+                        f"output_file_name_style={self.output_file_name_style},",
+                        f"job_exec_mode={self.job_exec_mode},",
+                        f"code_exec_timeout={self.code_exec_timeout},",
+                        f"host_deadline={self.host_deadline},",
+                        f"job_deadline={self.job_deadline},",
+                        f"adaptive_forks={self.adaptive_forks},",
+                        f"login_retry_times={self.login_retry_times},",
+                        f"login_retry_interval={self.login_retry_interval},",
+                        f"circuit_breaker_threshold={self.circuit_breaker_threshold},",
+                        f"schedule_overlap_policy={self.schedule_overlap_policy},",
+                        f"host_schedule_order={self.host_schedule_order},",
+                        f"new_host_schedule_slot={self.new_host_schedule_slot}",
                         "where",
                         f"oid='{self.oid}'"]
             sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_inspection_template_include_host_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_template_include_host_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql_list = ["create table tb_inspection_template_include_host_list",
-                        "( inspection_template_oid varchar(36),",
-                        "host_index int,",
-                        "host_oid varchar(36) )"]
-            sqlite_cursor.execute(" ".join(sql_list))
         # 开始插入数据
         sql = f"delete from tb_inspection_template_include_host_list where inspection_template_oid='{self.oid}' "
         sqlite_cursor.execute(sql)  # 每次保存host前，先删除所有host内容，再去重新插入（既可用于新建，又可用于更新）
@@ -1078,17 +1439,7 @@ class InspectionTemplate:
                         f"{host_index},",
                         f"'{host_oid}' )"]
             sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_inspection_template_include_group_list'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_template_include_group_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql_list = [
-                "create table tb_inspection_template_include_group_list  ( inspection_template_oid varchar(36),",
-                "group_index int,",
-                "group_oid varchar(36) )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+            host_index += 1
         # 开始插入数据
         sql = f"delete from tb_inspection_template_include_group_list where inspection_template_oid='{self.oid}' "
         sqlite_cursor.execute(sql)  # 每次保存group前，先删除所有group内容，再去重新插入（既可用于新建，又可用于更新）
@@ -1102,17 +1453,7 @@ class InspectionTemplate:
                         f"{group_index},",
                         f"'{group_oid}' )"]
             sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_inspection_template_include_inspection_code_block_list'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_template_include_inspection_code_block_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql_list = ["create table tb_inspection_template_include_inspection_code_block_list",
-                        "(inspection_template_oid varchar(36), ",
-                        "inspection_code_block_index int, ",
-                        "inspection_code_block_oid varchar(36) )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+            group_index += 1
         # 开始插入数据
         sql = f"delete from tb_inspection_template_include_inspection_code_block_list where inspection_template_oid='{self.oid}' "
         sqlite_cursor.execute(sql)  # 每次保存inspection_code_block前，先删除所有inspection_code_block内容，再去重新插入（既可用于新建，又可用于更新）
@@ -1127,15 +1468,14 @@ class InspectionTemplate:
                         f"'{inspection_code_block_oid}' )"]
             sqlite_cursor.execute(" ".join(sql_list))
             inspection_code_block_index += 1
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
 
     def update(self, name=None, description=None, project_oid=None,
                execution_method=None, execution_at_time=None,
                execution_after_time=None, execution_crond_time=None, update_code_on_launch=None,
                last_modify_timestamp=None, create_timestamp=None, forks=None, save_output_to_file=None, output_file_name_style=None,
-               global_info=None):
+               job_exec_mode=None, code_exec_timeout=None, host_deadline=None, job_deadline=None, adaptive_forks=None,
+               login_retry_times=None, login_retry_interval=None, circuit_breaker_threshold=None, schedule_overlap_policy=None,
+               host_schedule_order=None, new_host_schedule_slot=None, global_info=None):
         if name is not None:
             self.name = name  # <str>
         if description is not None:
@@ -1158,6 +1498,28 @@ class InspectionTemplate:
             self.save_output_to_file = save_output_to_file
         if output_file_name_style is not None:
             self.output_file_name_style = output_file_name_style
+        if job_exec_mode is not None:
+            self.job_exec_mode = job_exec_mode
+        if code_exec_timeout is not None:
+            self.code_exec_timeout = code_exec_timeout
+        if host_deadline is not None:
+            self.host_deadline = host_deadline
+        if job_deadline is not None:
+            self.job_deadline = job_deadline
+        if adaptive_forks is not None:
+            self.adaptive_forks = adaptive_forks
+        if login_retry_times is not None:
+            self.login_retry_times = login_retry_times
+        if login_retry_interval is not None:
+            self.login_retry_interval = login_retry_interval
+        if circuit_breaker_threshold is not None:
+            self.circuit_breaker_threshold = circuit_breaker_threshold
+        if schedule_overlap_policy is not None:
+            self.schedule_overlap_policy = schedule_overlap_policy
+        if host_schedule_order is not None:
+            self.host_schedule_order = host_schedule_order
+        if new_host_schedule_slot is not None:
+            self.new_host_schedule_slot = new_host_schedule_slot
         if last_modify_timestamp is not None:
             self.last_modify_timestamp = last_modify_timestamp
         else:
@@ -1166,6 +1528,7 @@ class InspectionTemplate:
             self.create_timestamp = create_timestamp
         if global_info is not None:
             self.global_info = global_info
+        self.global_info.inspection_template_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
@@ -1197,14 +1560,8 @@ class LaunchTemplateTrigger:
         self.global_info = global_info
 
     def start_crond_job(self):  # 入口函数
-        if self.inspection_template_obj.execution_method == EXECUTION_METHOD_AT:
-            self.start_template_at()
-        elif self.inspection_template_obj.execution_method == EXECUTION_METHOD_AFTER:
-            self.start_template_after()
-        elif self.inspection_template_obj.execution_method == EXECUTION_METHOD_CROND:
-            self.start_template_crond()
-        else:
-            pass
+        # 定时执行/周期执行/After都交给全局唯一的巡检模板调度器，执行方式为无时只从调度器移除
+        self.global_info.template_scheduler.add_template(self.inspection_template_obj)
 
     def existed_uncompleted_inspection_job(self):
         existed_inspection_job_obj_list = self.global_info.get_inspection_job_record_obj_by_inspection_template_oid(
@@ -1219,37 +1576,316 @@ class LaunchTemplateTrigger:
         else:
             return False
 
-    def sched_start_job(self):
-        print(f"LaunchTemplateTrigger.sched_start_job: 开始启动巡检作业: {self.inspection_template_obj.name}")
-        inspect_job_name = "job@" + self.inspection_template_obj.name + "@" + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        current_inspection_job_obj = LaunchInspectionJob(name=inspect_job_name,
-                                                         project_oid=self.inspection_template_obj.project_oid,
-                                                         inspection_template=self.inspection_template_obj,
-                                                         global_info=self.global_info)
-        launch_job_thread = threading.Thread(target=current_inspection_job_obj.start_job)
-        launch_job_thread.start()  # 线程start后，不要join()，主界面才不会卡住
+    def update(self):
+        self.start_crond_job()
+
+
+class CronExpression:
+    """
+    cron表达式，5个字段：分 时 日 月 星期，每个字段支持 *、数字、a-b范围、/n步长及逗号分隔的列表，星期的0和7都是周日，
+    解析时把每个字段展开为允许值的集合；日和星期都有限制（不以*开头）时，满足其一即可，同Linux cron
+    """
+    field_range_list = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression=''):
+        self.expression = expression
+        field_list = expression.split()
+        if len(field_list) != 5:
+            raise ValueError(f"cron表达式应为5个字段（分 时 日 月 星期）: {expression}")
+        value_list_list = [self.parse_field(field, low, high) for field, (low, high) in zip(field_list, self.field_range_list)]
+        self.minute_list = value_list_list[0]  # 有序，计算下次触发时间时按顺序查找
+        self.hour_set = set(value_list_list[1])
+        self.day_set = set(value_list_list[2])
+        self.month_set = set(value_list_list[3])
+        self.weekday_set = {weekday % 7 for weekday in value_list_list[4]}
+        self.is_day_restricted = not field_list[2].startswith('*')
+        self.is_weekday_restricted = not field_list[4].startswith('*')
+
+    @staticmethod
+    def parse_field(field, low, high):
+        """
+        把一个字段展开为有序的允许值列表，格式错误或超出范围时抛出ValueError
+        """
+        value_set = set()
+        for part in field.split(','):
+            range_str, _, step_str = part.partition('/')
+            step = int(step_str) if step_str != '' else 1
+            if range_str == '*':
+                start, end = low, high
+            elif '-' in range_str:
+                start_str, end_str = range_str.split('-', 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(range_str)
+                end = high if step_str != '' else start  # 5/15 表示从5开始每隔15
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"cron表达式字段超出范围: {field}")
+            value_set.update(range(start, end + 1, step))
+        return sorted(value_set)
+
+    @staticmethod
+    def is_valid(expression):
+        try:
+            CronExpression(expression)
+        except ValueError:
+            return False
+        return True
+
+    def is_day_matched(self, fire_datetime):
+        is_day_matched = fire_datetime.day in self.day_set
+        is_weekday_matched = (fire_datetime.weekday() + 1) % 7 in self.weekday_set  # datetime的周一为0，cron的周日为0
+        if self.is_day_restricted and self.is_weekday_restricted:
+            return is_day_matched or is_weekday_matched
+        return is_day_matched and is_weekday_matched
+
+    def get_next_fire_time(self, after_time):
+        """
+        返回after_time之后（不含）的下一个触发时间戳，按本地时间计算，CRON_NEXT_FIRE_SEARCH_DAYS天内都不会触发时返回None，
+        月、日、时不匹配时直接跳到下个月、下一天、下个小时，不逐分钟查找
+        """
+        fire_datetime = datetime.datetime.fromtimestamp(after_time).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        end_datetime = fire_datetime + datetime.timedelta(days=CRON_NEXT_FIRE_SEARCH_DAYS)
+        while fire_datetime < end_datetime:
+            if fire_datetime.month not in self.month_set:
+                if fire_datetime.month == 12:
+                    fire_datetime = fire_datetime.replace(year=fire_datetime.year + 1, month=1, day=1, hour=0, minute=0)
+                else:
+                    fire_datetime = fire_datetime.replace(month=fire_datetime.month + 1, day=1, hour=0, minute=0)
+                continue
+            if not self.is_day_matched(fire_datetime):
+                fire_datetime = (fire_datetime + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if fire_datetime.hour not in self.hour_set:
+                fire_datetime = (fire_datetime + datetime.timedelta(hours=1)).replace(minute=0)
+                continue
+            for minute in self.minute_list:
+                if minute >= fire_datetime.minute:
+                    return fire_datetime.replace(minute=minute).timestamp()
+            fire_datetime = (fire_datetime + datetime.timedelta(hours=1)).replace(minute=0)
+        return None
+
+
+class TemplateScheduler:
+    """
+    巡检模板调度器，全局只有一个，所有巡检模板的定时执行/周期执行/After都由它的一个调度线程负责，
+    待触发的巡检模板按触发时间放在一个堆里，调度线程只等待到堆顶的触发时间，不再每个巡检模板一个sched调度器及线程；
+    周期执行的巡检模板在加入时解析好cron表达式，每次触发时算好下一次触发时间再放回堆里；
+    触发时按巡检模板的schedule_overlap_policy处理上一次作业还未结束的情况，同时执行的作业数不超过max_running_job_num
+    """
 
-    def start_template_at(self):
+    def __init__(self, global_info=None, max_running_job_num=SCHEDULER_MAX_RUNNING_JOBS):
+        self.global_info = global_info
+        self.max_running_job_num = max_running_job_num
+        self.condition = threading.Condition()  # 以下所有状态都在此条件变量的锁内修改，有变化时唤醒调度线程
+        self.schedule_heap = []  # 元素为 (触发时间戳, 调度序号, template_oid)，按触发时间排序的堆
+        self.schedule_seq = 0
+        self.template_schedule_seq_dict = {}  # key为template_oid，value为其有效的调度序号，巡检模板修改或删除后，堆里旧的元素作废
+        self.cron_expression_dict = {}  # key为template_oid，value为解析好的<CronExpression>
+        self.running_job_num_dict = {}  # key为template_oid，value为正在执行的作业数
+        self.running_job_num = 0
+        self.waiting_template_oid_deque = collections.deque()  # 已触发，但同时执行的作业数已满，按触发顺序等待执行的巡检模板
+        self.queued_template_oid_set = set()  # 上一次作业还未结束，等它结束后再执行一次的巡检模板
+        self.scheduler_thread = None  # 第一次加入巡检模板时才创建
+        self.is_stopped = False
+        self.is_cancel_job_on_stop = False  # stop(cancel_running_job=True)后，之后才开始的作业也立即停止
+        # key为作业线程<threading.Thread>，value为其<LaunchInspectionJob>（线程刚启动、还未创建作业对象时为None），作业结束后移除
+        self.job_thread_dict = {}
+
+    def add_template(self, inspection_template_obj):
+        """
+        按巡检模板的执行方式计算首次触发时间并加入调度，巡检模板修改后再次调用即可（之前的调度作废），执行方式为无时只移除
+        """
+        with self.condition:
+            self.template_schedule_seq_dict.pop(inspection_template_obj.oid, None)
+            self.cron_expression_dict.pop(inspection_template_obj.oid, None)
+            fire_time = self.get_first_fire_time(inspection_template_obj)
+            if fire_time is not None:
+                self.push_schedule(inspection_template_obj.oid, fire_time)
+                print(f"TemplateScheduler.add_template: 巡检模板 {inspection_template_obj.name} 下次执行时间",
+                      time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fire_time)))
+            if self.scheduler_thread is None:
+                self.scheduler_thread = threading.Thread(target=self.run, daemon=True)  # 守护线程，程序退出时不用等待
+                self.scheduler_thread.start()
+            self.condition.notify_all()
+
+    def remove_template(self, template_oid):
+        """
+        巡检模板删除时调用，已触发还在等待执行的也不再执行，正在执行的作业不受影响
+        """
+        with self.condition:
+            self.template_schedule_seq_dict.pop(template_oid, None)
+            self.cron_expression_dict.pop(template_oid, None)
+            self.queued_template_oid_set.discard(template_oid)
+            self.waiting_template_oid_deque = collections.deque(waiting_template_oid for waiting_template_oid in self.waiting_template_oid_deque
+                                                                if waiting_template_oid != template_oid)
+
+    def stop(self, cancel_running_job=False):
+        """
+        停止调度，不再触发新的作业；cancel_running_job为False时正在执行的作业不受影响，
+        为True时停止调度器启动的所有作业（含还在更新巡检代码、未开始巡检的作业），可再用is_all_job_finished()等待其结束
+        """
+        with self.condition:
+            self.is_stopped = True
+            if cancel_running_job:
+                self.is_cancel_job_on_stop = True
+                for launch_job_obj in self.job_thread_dict.values():
+                    if launch_job_obj is not None:
+                        launch_job_obj.cancel()
+            self.condition.notify_all()
+
+    def is_all_job_finished(self):
+        """
+        调度器启动的作业是否都已结束（作业记录已保存，无界面运行时已放入finished_inspection_job_record_queue）
+        """
+        with self.condition:
+            return len(self.job_thread_dict) == 0
+
+    def join_job_threads(self, timeout=None):
+        """
+        等待调度器启动的作业线程都退出，timeout为每个线程的最长等待时间  ★阻塞型函数
+        """
+        with self.condition:
+            job_thread_list = list(self.job_thread_dict)
+        for job_thread in job_thread_list:
+            job_thread.join(timeout)
+
+    def get_first_fire_time(self, inspection_template_obj):
         current_time = time.time()
-        if self.inspection_template_obj.execution_at_time > current_time:
-            sched_obj = sched.scheduler(time.time, time.sleep)  # 创建一个调度器
-            # enter()函数参数1为等待的时间（秒），参数2为优先级，参数3为到时间后要调度的函数
-            sched_obj.enter(self.inspection_template_obj.execution_at_time - current_time, 1, self.sched_start_job)
-            # 运行调度器，默认是blocking=True，阻塞模式，等时间到了才运行，运行回调函数后才继续
-            sched_t = threading.Thread(target=sched_obj.run)
-            sched_t.start()  # 线程start后，不要join()，主界面才不会卡住
-        else:
-            at_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.inspection_template_obj.execution_at_time))
-            print(f"LaunchTemplateTrigger.start_template_at: 巡检模板 {self.inspection_template_obj.name} 时间已过: {at_time}")
-
-    def start_template_after(self):
-        pass
+        if inspection_template_obj.execution_method == EXECUTION_METHOD_AT:
+            if inspection_template_obj.execution_at_time > current_time:
+                return inspection_template_obj.execution_at_time
+            at_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(inspection_template_obj.execution_at_time))
+            print(f"TemplateScheduler.get_first_fire_time: 巡检模板 {inspection_template_obj.name} 时间已过: {at_time}")
+        elif inspection_template_obj.execution_method == EXECUTION_METHOD_AFTER:
+            if inspection_template_obj.execution_after_time > 0:
+                return current_time + inspection_template_obj.execution_after_time
+            print(f"TemplateScheduler.get_first_fire_time: 巡检模板 {inspection_template_obj.name} After间隔须大于0秒")
+        elif inspection_template_obj.execution_method == EXECUTION_METHOD_CROND:
+            try:
+                cron_expression = CronExpression(inspection_template_obj.execution_crond_time)
+            except ValueError as err:
+                print(f"TemplateScheduler.get_first_fire_time: 巡检模板 {inspection_template_obj.name} {err}")
+                return None
+            self.cron_expression_dict[inspection_template_obj.oid] = cron_expression
+            fire_time = cron_expression.get_next_fire_time(current_time)
+            if fire_time is None:
+                print(f"TemplateScheduler.get_first_fire_time: 巡检模板 {inspection_template_obj.name} cron表达式不会触发:",
+                      inspection_template_obj.execution_crond_time)
+            return fire_time
+        return None
 
-    def start_template_crond(self):
-        pass
+    def push_schedule(self, template_oid, fire_time):
+        self.schedule_seq += 1
+        self.template_schedule_seq_dict[template_oid] = self.schedule_seq
+        heapq.heappush(self.schedule_heap, (fire_time, self.schedule_seq, template_oid))
 
-    def update(self):
-        self.start_crond_job()
+    def run(self):
+        """
+        调度线程，等待到堆顶的触发时间（最长SCHEDULER_MAX_WAIT_TIME秒），触发所有已到时间的巡检模板
+        """
+        with self.condition:
+            while not self.is_stopped:
+                current_time = time.time()
+                while len(self.schedule_heap) != 0 and self.schedule_heap[0][0] <= current_time:
+                    fire_time, schedule_seq, template_oid = heapq.heappop(self.schedule_heap)
+                    if self.template_schedule_seq_dict.get(template_oid, None) != schedule_seq:
+                        continue  # 巡检模板已修改或删除，此次调度已作废
+                    del self.template_schedule_seq_dict[template_oid]
+                    self.fire_template(template_oid, fire_time, current_time)
+                if len(self.schedule_heap) == 0:
+                    wait_time = SCHEDULER_MAX_WAIT_TIME
+                else:
+                    wait_time = min(self.schedule_heap[0][0] - current_time, SCHEDULER_MAX_WAIT_TIME)
+                self.condition.wait(wait_time)
+
+    def fire_template(self, template_oid, fire_time, current_time):
+        inspection_template_obj = self.global_info.get_inspection_template_by_oid(template_oid)
+        if inspection_template_obj is None:
+            return
+        # 周期执行的先算好下一次触发时间，挂起期间错过的多次触发只算这一次
+        cron_expression = self.cron_expression_dict.get(template_oid, None)
+        if inspection_template_obj.execution_method == EXECUTION_METHOD_CROND and cron_expression is not None:
+            next_fire_time = cron_expression.get_next_fire_time(max(fire_time, current_time))
+            if next_fire_time is not None:
+                self.push_schedule(template_oid, next_fire_time)
+        if current_time - fire_time > SCHEDULER_MISFIRE_GRACE_TIME:
+            print(f"TemplateScheduler.fire_template: 巡检模板 {inspection_template_obj.name} 错过触发时间",
+                  time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fire_time)), "已超过允许的延迟，跳过本次")
+            is_launched = False
+        else:
+            is_launched = self.request_launch(inspection_template_obj)
+        if not is_launched and inspection_template_obj.execution_method == EXECUTION_METHOD_AFTER:
+            self.push_schedule(template_oid, current_time + inspection_template_obj.execution_after_time)
+
+    def request_launch(self, inspection_template_obj):
+        """
+        触发一次作业，按巡检模板的schedule_overlap_policy处理上一次作业还未结束（或还在等待执行）的情况，
+        返回是否会执行（含排队等待执行）
+        """
+        template_oid = inspection_template_obj.oid
+        if self.running_job_num_dict.get(template_oid, 0) > 0 or template_oid in self.waiting_template_oid_deque:
+            if inspection_template_obj.schedule_overlap_policy == SCHEDULE_OVERLAP_POLICY_SKIP:
+                print(f"TemplateScheduler.request_launch: 巡检模板 {inspection_template_obj.name} 上一次作业还未结束，跳过本次")
+                return False
+            if inspection_template_obj.schedule_overlap_policy == SCHEDULE_OVERLAP_POLICY_QUEUE:
+                if template_oid in self.queued_template_oid_set:
+                    print(f"TemplateScheduler.request_launch: 巡检模板 {inspection_template_obj.name} 已有排队的作业，跳过本次")
+                    return False
+                print(f"TemplateScheduler.request_launch: 巡检模板 {inspection_template_obj.name} 上一次作业还未结束，结束后再执行")
+                self.queued_template_oid_set.add(template_oid)
+                return True
+        self.waiting_template_oid_deque.append(template_oid)
+        self.launch_waiting_jobs()
+        return True
+
+    def launch_waiting_jobs(self):
+        while len(self.waiting_template_oid_deque) != 0 and self.running_job_num < self.max_running_job_num and not self.is_stopped:
+            template_oid = self.waiting_template_oid_deque.popleft()
+            inspection_template_obj = self.global_info.get_inspection_template_by_oid(template_oid)
+            if inspection_template_obj is None:
+                continue
+            self.running_job_num += 1
+            self.running_job_num_dict[template_oid] = self.running_job_num_dict.get(template_oid, 0) + 1
+            launch_job_thread = threading.Thread(target=self.run_job, args=(inspection_template_obj,))
+            self.job_thread_dict[launch_job_thread] = None
+            launch_job_thread.start()  # 线程start后，不要join()，主界面才不会卡住
+        if len(self.waiting_template_oid_deque) != 0:
+            print(f"TemplateScheduler.launch_waiting_jobs: 已有{self.running_job_num}个定时作业在执行，",
+                  f"{len(self.waiting_template_oid_deque)}个等待执行")
+
+    def run_job(self, inspection_template_obj):
+        print(f"TemplateScheduler.run_job: 开始启动巡检作业: {inspection_template_obj.name}")
+        inspect_job_name = "job@" + inspection_template_obj.name + "@" + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        current_inspection_job_obj = LaunchInspectionJob(name=inspect_job_name,
+                                                         project_oid=inspection_template_obj.project_oid,
+                                                         inspection_template=inspection_template_obj,
+                                                         global_info=self.global_info)
+        with self.condition:
+            self.job_thread_dict[threading.current_thread()] = current_inspection_job_obj
+            if self.is_cancel_job_on_stop:
+                current_inspection_job_obj.cancel()
+        try:
+            current_inspection_job_obj.start_job()
+        finally:
+            self.on_job_finished(inspection_template_obj)
+
+    def on_job_finished(self, inspection_template_obj):
+        template_oid = inspection_template_obj.oid
+        with self.condition:
+            self.job_thread_dict.pop(threading.current_thread(), None)
+            self.running_job_num -= 1
+            self.running_job_num_dict[template_oid] -= 1
+            if self.running_job_num_dict[template_oid] == 0:
+                del self.running_job_num_dict[template_oid]
+                if template_oid in self.queued_template_oid_set:  # 排队的作业在上一次作业结束后执行
+                    self.queued_template_oid_set.discard(template_oid)
+                    self.waiting_template_oid_deque.append(template_oid)
+            # After方式在作业结束后再间隔execution_after_time秒执行
+            if (inspection_template_obj.execution_method == EXECUTION_METHOD_AFTER and not self.is_stopped
+                    and self.global_info.get_inspection_template_by_oid(template_oid) is not None):
+                self.push_schedule(template_oid, time.time() + inspection_template_obj.execution_after_time)
+            self.launch_waiting_jobs()
+            self.condition.notify_all()
 
 
 class HostJobStatus:
@@ -1271,6 +1907,110 @@ class HostJobStatus:
         self.sum_of_code_lines = sum_of_code_lines  # <int> 所有巡检代码段的代码总行数<OneLineCode>的数量
         self.current_exec_code_num = current_exec_code_num  # <int>当前执行了的总代码行数，从1开始
         # current_exec_code_num/sum_of_code_lines 为 执行总进度
+        self.event_bus = None  # <InspectionJobEventBus> 作业执行中才有，由LaunchInspectionJob.start_job()设置
+        self.host_index = 0  # <int> 在作业主机列表中的序号，发布作业事件时使用
+
+    def publish(self):
+        """
+        作业执行中，把本主机当前的作业状态及进度发布到作业事件总线
+        """
+        if self.event_bus is not None:
+            self.event_bus.publish_host_job_status(self)
+
+    def get_status_tuple(self):
+        """
+        多进程分片模式下，工作进程把主机作业状态以元组发回主进程，不传整个对象
+        """
+        return (self.job_status, self.find_credential_status, self.exec_timeout, self.start_time, self.end_time,
+                self.sum_of_code_block, self.current_exec_code_block, self.sum_of_code_lines, self.current_exec_code_num)
+
+    def set_status_tuple(self, status_tuple):
+        (self.job_status, self.find_credential_status, self.exec_timeout, self.start_time, self.end_time,
+         self.sum_of_code_block, self.current_exec_code_block, self.sum_of_code_lines, self.current_exec_code_num) = status_tuple
+
+
+class InspectionJobEventBus:
+    """
+    巡检作业事件总线，一个巡检作业一个，巡检线程（协程）发布主机作业状态变化及进度，
+    作业详情界面订阅后定时取出事件，只更新变化了的主机行，同时增量维护各状态的主机数，界面不用每次遍历所有主机；
+    事件为 (事件类型, host_index, job_status, current_exec_code_num, sum_of_code_lines, start_time, end_time)，
+    是发布时的快照，界面线程不直接读取巡检线程正在修改的<HostJobStatus>对象
+    """
+
+    def __init__(self, host_num=0):
+        self.lock = threading.Lock()
+        # 每台主机最近一次发布的事件，新订阅者以此为初始状态
+        self.host_event_list = [(INSPECTION_JOB_EVENT_HOST_STATUS, host_index, INSPECTION_JOB_EXEC_STATE_UNKNOWN, 0, 0, 0.0, 0.0)
+                                for host_index in range(host_num)]
+        self.status_count_list = [0] * (INSPECTION_JOB_EXEC_STATE_FAILED + 1)  # 下标为job_status，值为处于此状态的主机数
+        self.status_count_list[INSPECTION_JOB_EXEC_STATE_UNKNOWN] = host_num
+        self.subscriber_queue_list = []  # 每个订阅者一个<queue.SimpleQueue>，没有订阅者时事件不会堆积
+        self.is_finished = False
+
+    def publish(self, host_index, job_status, current_exec_code_num, sum_of_code_lines, start_time, end_time):
+        with self.lock:
+            last_job_status = self.host_event_list[host_index][2]
+            if last_job_status != job_status:
+                self.status_count_list[last_job_status] -= 1
+                self.status_count_list[job_status] += 1
+                event_type = INSPECTION_JOB_EVENT_HOST_STATUS
+            else:
+                event_type = INSPECTION_JOB_EVENT_HOST_PROGRESS
+            event = (event_type, host_index, job_status, current_exec_code_num, sum_of_code_lines, start_time, end_time)
+            self.host_event_list[host_index] = event
+            for subscriber_queue in self.subscriber_queue_list:
+                subscriber_queue.put(event)
+
+    def publish_host_job_status(self, host_job_status_obj):
+        self.publish(host_job_status_obj.host_index, host_job_status_obj.job_status, host_job_status_obj.current_exec_code_num,
+                     host_job_status_obj.sum_of_code_lines, host_job_status_obj.start_time, host_job_status_obj.end_time)
+
+    def finish(self):
+        """
+        作业结束时调用，通知所有订阅者不会再有事件了
+        """
+        with self.lock:
+            self.is_finished = True
+            for subscriber_queue in self.subscriber_queue_list:
+                subscriber_queue.put(self.get_finished_event())
+
+    @staticmethod
+    def get_finished_event():
+        return INSPECTION_JOB_EVENT_JOB_FINISHED, -1, INSPECTION_JOB_EXEC_STATE_UNKNOWN, 0, 0, 0.0, 0.0
+
+    def subscribe(self):
+        """
+        返回 (订阅队列, 每台主机的当前事件列表, 各状态的主机数列表)，三者在同一时刻取得，之后的变化都会放入订阅队列
+        """
+        subscriber_queue = queue.SimpleQueue()
+        with self.lock:
+            if self.is_finished:
+                subscriber_queue.put(self.get_finished_event())
+            else:
+                self.subscriber_queue_list.append(subscriber_queue)
+            return subscriber_queue, list(self.host_event_list), list(self.status_count_list)
+
+    def unsubscribe(self, subscriber_queue):
+        with self.lock:
+            if subscriber_queue in self.subscriber_queue_list:
+                self.subscriber_queue_list.remove(subscriber_queue)
+
+    def get_status_count_list(self):
+        with self.lock:
+            return list(self.status_count_list)
+
+
+class InspectionJobShardEventBus:
+    """
+    多进程分片模式下工作进程里的作业事件总线，主机作业状态不在本进程订阅，而是放入结果队列发回主进程，
+    由主进程更新其<HostJobStatus>对象后再发布到主进程的<InspectionJobEventBus>
+    """
+
+    def __init__(self, result_queue=None):
+        self.result_queue = result_queue  # <multiprocessing.Queue>
+
+    def publish_host_job_status(self, host_job_status_obj):
+        self.result_queue.put((SHARD_MSG_HOST_JOB_STATUS, host_job_status_obj.host_index, host_job_status_obj.get_status_tuple()))
 
 
 class LaunchInspectionJob:
@@ -1297,23 +2037,38 @@ class LaunchInspectionJob:
         else:
             self.inspection_template_oid = ""
         self.unduplicated_host_oid_list = []  # host_oid，无重复项
+        self.unduplicated_host_oid_set = set()  # 同unduplicated_host_oid_list，用于去重时O(1)判断是否已存在
         self.unduplicated_host_job_status_obj_list = []  # host的巡检作业状态信息<HostJobStatus>对象，与上面的unduplicated_host_oid_list一一对应
+        self.host_schedule_index_list = []  # 主机开始巡检的顺序，元素为host_index，start_job()时按巡检模板的host_schedule_order计算
         self.job_state = INSPECTION_JOB_EXEC_STATE_UNKNOWN  # 一个巡检作业的所有主机整体完成情况
         self.global_info = global_info
         self.start_time = 0.0
         self.end_time = 0.0
+        self.cancel_token = CancelToken()  # 作业的取消令牌，start_job()时按巡检模板设置截止时间，每台主机再创建子令牌
+        self.concurrency_controller = None  # <AdaptiveConcurrencyController> 巡检模板开启了自适应并发数时，start_job()时创建
+        self.code_condition_matcher = None  # <CodeConditionMatcher> start_job()时创建，所有主机共用
+        self.output_writer = None  # <SSHOperatorOutputWriter> start_job()时创建，所有主机的输出接收管道共用，作业结束时关闭
+        self.login_retry_lock = threading.Lock()
+        self.login_retry_heap = []  # 待重试登录的主机，元素为 (重试时间戳, host_index)，按时间排序的堆
+        self.login_retry_count_dict = {}  # key为host_index，value为已重试次数
+        self.event_bus = None  # <InspectionJobEventBus> start_job()主机去重后创建，作业详情界面订阅它来刷新主机状态
+        self.job_record_obj = None  # <InspectionJobRecord> start_job()时创建，作业结束后保存到数据库
+
+    def cancel(self):
+        """
+        停止作业，正在巡检的主机在下一个检查点（发送命令前、读取通道时）结束，还未开始的主机不再巡检
+        """
+        print(f"LaunchInspectionJob.cancel: 停止巡检作业 {self.name}")
+        self.cancel_token.cancel(CANCEL_REASON_USER)
 
     def get_unduplicated_host_oid_from_group(self, host_group_oid):  # 从主机组中获取非重复主机
-        host_group = self.global_info.get_host_group_by_oid(host_group_oid)
-        for host_oid in host_group.host_oid_list:
-            if host_oid in self.unduplicated_host_oid_list:
-                print("LaunchInspectionJob.get_unduplicated_host_oid_from_group:",
-                      f"重复主机: {self.global_info.get_host_by_oid(host_oid).name}")
+        # ★主机组（含所有下级主机组）展开后的主机列表由HostGroupResolver计算并缓存，组内已去重
+        for host_oid in self.global_info.host_group_resolver.get_host_oid_list_of_group(host_group_oid):
+            if host_oid in self.unduplicated_host_oid_set:
                 continue
             else:
+                self.unduplicated_host_oid_set.add(host_oid)
                 self.unduplicated_host_oid_list.append(host_oid)
-        for group_oid in host_group.host_group_oid_list:
-            self.get_unduplicated_host_oid_from_group(group_oid)
         return None
 
     def get_unduplicated_host_oid_from_inspection_template(self):  # 从巡检模板的主机列表及主机组列表中获取非重复主机
@@ -1321,11 +2076,12 @@ class LaunchInspectionJob:
             print("LaunchInspectionJob.get_unduplicated_host_oid_from_inspection_template: 巡检模板为空")
             return
         for host_oid in self.inspection_template.host_oid_list:
-            if host_oid in self.unduplicated_host_oid_list:
+            if host_oid in self.unduplicated_host_oid_set:
                 print("LaunchInspectionJob.get_unduplicated_host_oid_from_inspection_template:",
                       f"重复主机: {self.global_info.get_host_by_oid(host_oid).name}")
                 continue
             else:
+                self.unduplicated_host_oid_set.add(host_oid)
                 self.unduplicated_host_oid_list.append(host_oid)
         for host_group_oid in self.inspection_template.host_group_oid_list:
             self.get_unduplicated_host_oid_from_group(host_group_oid)
@@ -1334,11 +2090,10 @@ class LaunchInspectionJob:
             host_job_status_obj = HostJobStatus(host_oid=host_oid)  # job_status默认为INSPECTION_CODE_JOB_EXEC_STATE_UNKNOWN
             self.unduplicated_host_job_status_obj_list.append(host_job_status_obj)
 
-    def create_ssh_operator_invoke_shell(self, host_obj, host_job_status_obj, cred):
+    def get_inspection_code_block_obj_list(self, host_job_status_obj):
         """
-        正式执行巡检命令，输出信息保存到文件及数据库  ★阻塞型函数，非线程，要等待它完成
+        获取巡检模板的所有巡检代码块对象，同时统计巡检代码块及巡检命令总数
         """
-        # 先统计巡检代码块及巡检命令总数
         host_job_status_obj.sum_of_code_block = len(self.inspection_template.inspection_code_block_oid_list)
         inspection_code_block_obj_list = []
         host_job_status_obj.sum_of_code_lines = 0
@@ -1346,103 +2101,526 @@ class LaunchInspectionJob:
             inspection_code_block_obj = self.global_info.get_inspection_code_block_by_oid(inspection_code_block_oid)
             host_job_status_obj.sum_of_code_lines += len(inspection_code_block_obj.code_list)
             inspection_code_block_obj_list.append(inspection_code_block_obj)
-        # 创建 SSHOperator 对象，不论有多少个巡检代码块，只登录一次
+        return inspection_code_block_obj_list
+
+    def create_ssh_operator(self, host_obj, host_job_status_obj, cred, host_cancel_token):
         if cred.cred_type == CRED_TYPE_SSH_PASS:
             auth_method = AUTH_METHOD_SSH_PASS
         else:
             auth_method = AUTH_METHOD_SSH_KEY
         # 一个<SSHOperator>对象操作所有<InspectionCodeBlock>巡检代码块的所有命令
-        ssh_operator = SSHOperator(hostname=host_obj.address, port=host_obj.port, username=cred.username,
-                                   password=cred.password, private_key=cred.private_key, auth_method=auth_method,
-                                   timeout=LOGIN_AUTH_TIMEOUT, host_job_status_obj=host_job_status_obj)
-        ret = ssh_operator.create_invoke_shell()  # 创建ssh连接，不论有多少个巡检代码块，这里只用登录一次，登录后首次输出内容也是在这里获取
-        if ret != COF_STATUS_SUCCEED:
-            # 整体完成情况
-            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
-            print("LaunchInspectionJob.create_ssh_operator_invoke_shell: 目标主机",
-                  f"{host_obj.name} 巡检失败，远程方式: ssh <<<<<<<<<<<<<<<<<<")
-            return
-        # 巡检代码块不去重，依次执行，串行执行
-        inspection_code_block_index = 0
-        for inspection_code_block_obj in inspection_code_block_obj_list:
-            host_job_status_obj.current_exec_code_block = inspection_code_block_index
-            ssh_operator.run_invoke_shell(inspection_code_block_obj)  # ★★执行巡检命令，输出信息保存在 SSHOperator.output_list里
-            # 这里是判断 ssh_operator.run_invoke_shell() 完成情况
-            if ssh_operator.run_status == INSPECTION_JOB_EXEC_STATE_FAILED:
-                host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
-                print("LaunchInspectionJob.create_ssh_operator_invoke_shell:",
-                      f"巡检代码块: {inspection_code_block_obj.name} 已执行完成，结果：失败")
-            elif ssh_operator.run_status == INSPECTION_JOB_EXEC_STATE_COMPLETED:
-                # 部分完成，只是完成了当前巡检代码块，可能还有其他的巡检代码块
-                print("LaunchInspectionJob.create_ssh_operator_invoke_shell:",
-                      f"巡检代码块: {inspection_code_block_obj.name} 已执行完成，结果：成功")
-                host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_PART_COMPLETED
-            else:
-                print("LaunchInspectionJob.create_ssh_operator_invoke_shell: ",
-                      f"巡检代码块 {inspection_code_block_obj.name} 执行状态未知")
-                host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
-        # 巡检代码块命令执行完成后，关闭ssh连接
+        return SSHOperator(hostname=host_obj.address, port=host_obj.port, username=cred.username,
+                           password=cred.password, private_key=cred.private_key, auth_method=auth_method,
+                           timeout=LOGIN_AUTH_TIMEOUT, host_job_status_obj=host_job_status_obj,
+                           ssh_transport_pool=self.global_info.ssh_transport_pool,
+                           output_pipeline=self.create_output_pipeline(host_obj), cancel_token=host_cancel_token,
+                           code_exec_timeout=self.inspection_template.code_exec_timeout,
+                           code_condition_matcher=self.code_condition_matcher)
+
+    def create_output_pipeline(self, host_obj):
+        """
+        每台主机一个输出接收管道，命令输出都保存到sqlite数据库，巡检模板设置了自动保存巡检日志时，同时追加写入日志文件
+        ★1台主机所有巡检代码块的输出都保存在一个文件里（含首次登录后输出的信息）
+        """
+        sink_list = [self.create_output_sqlite_sink(host_obj)]
+        if self.inspection_template.save_output_to_file == COF_YES:
+            file_name = self.get_output_file_name(host_obj, self.inspection_template.output_file_name_style)
+            sink_list.append(SSHOperatorOutputFileSink(file_name=file_name))
+        return SSHOperatorOutputPipeline(sink_list=sink_list, output_writer=self.output_writer)
+
+    def create_output_sqlite_sink(self, host_obj):
+        return SSHOperatorOutputSqliteSink(sqlite_storage=self.global_info.sqlite_storage, job_oid=self.oid, host_obj=host_obj)
+
+    @staticmethod
+    def close_ssh_operator(ssh_operator):
+        """
+        关闭shell通道并归还连接，再把输出接收管道里暂存的输出都写出  ★阻塞型函数
+        """
         ssh_operator.close_invoke_shell()
-        # 如果ssh_operator.run_invoke_shell() 有输出信息，则判断是否需要输出信息保存到文件，
-        if len(ssh_operator.output_list) != 0:
-            # 1台主机所有巡检代码块的输出都保存在一个文件里里 （含首次登录后输出的信息）
-            if self.inspection_template.save_output_to_file == COF_YES:
-                self.save_ssh_operator_output_to_file(ssh_operator.output_list, host_obj, self.inspection_template.output_file_name_style)
-            # 输出信息保存到sqlite数据库★★
-            self.save_ssh_operator_invoke_shell_output_to_sqlite(ssh_operator.output_list, host_obj)
-        # 判断整体完成情况
-        if host_job_status_obj.exec_timeout == COF_NO and host_job_status_obj.find_credential_status == FIND_CREDENTIAL_STATUS_SUCCEED:
-            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_COMPLETED  # 全部完成（没有超时的，没有验证失败的）
-        print("LaunchInspectionJob.create_ssh_operator_invoke_shell: 目标主机",
-              f"{host_obj.name} 已巡检完成，远程方式: ssh <<<<<<<<<<<<<<<<<<")
+        if ssh_operator.output_pipeline is not None:
+            ssh_operator.output_pipeline.close()
 
-    def operator_job_thread(self, host_index):
+    @staticmethod
+    def is_invoke_shell_needed(inspection_code_block_obj_list):
         """
-        正式执行主机巡检任务，一台主机一个线程，本函数只处理一台主机，本函数调用self.create_ssh_operator_invoke_shell去执行命令
-        :param host_index:
-        :return:
+        有巡检代码块使用invoke_shell方式时才需要打开交互式shell，都是exec_command或脚本执行方式时只登录即可
         """
-        host_obj = self.global_info.get_host_by_oid(self.unduplicated_host_oid_list[host_index])
-        host_job_status_obj = self.unduplicated_host_job_status_obj_list[host_index]
-        if host_obj is None:
+        for inspection_code_block_obj in inspection_code_block_obj_list:
+            if inspection_code_block_obj.code_exec_method not in (CODE_EXEC_METHOD_EXEC_COMMAND, CODE_EXEC_METHOD_SCRIPT):
+                return True
+        return False
+
+    @staticmethod
+    def judge_completion_of_code_block(ssh_operator, host_job_status_obj, inspection_code_block_obj):
+        # 这里是判断 ssh_operator.run_invoke_shell() 或 ssh_operator.run_exec_command() 完成情况
+        if ssh_operator.run_status == INSPECTION_JOB_EXEC_STATE_FAILED:
             host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
-            host_job_status_obj.start_time = time.time()  # 开始计时
-            host_job_status_obj.end_time = time.time()  # 结束计时
-            return
-        print(f"\nLaunchInspectionJob.operator_job_thread >>>>> 目标主机：{host_obj.name} 开始巡检 <<<<<")
-        host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_STARTED
-        host_job_status_obj.start_time = time.time()  # 开始计时
-        if host_obj.login_protocol == LOGIN_PROTOCOL_SSH:
-            cred = self.global_info.get_credential_by_oid(host_obj.login_credential_oid)
-            if cred is None:
-                print("LaunchInspectionJob.operator_job_thread: Credential is None, Could not find correct credential")
-                host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED  # 无可用凭据，就退出巡检线程了，宣告失败
-                host_job_status_obj.find_credential_status = FIND_CREDENTIAL_STATUS_FAILED
-                host_job_status_obj.end_time = time.time()  # 结束计时
-                return
-            # ★★开始正式执行巡检命令，输出信息保存到文件及数据库★★ 阻塞型函数，要等待它完成
-            self.create_ssh_operator_invoke_shell(host_obj, host_job_status_obj, cred)
-        elif host_obj.login_protocol == LOGIN_PROTOCOL_TELNET:
-            print("LaunchInspectionJob.operator_job_thread: 使用telnet协议远程目标主机")
+            print("LaunchInspectionJob.judge_completion_of_code_block:",
+                  f"巡检代码块: {inspection_code_block_obj.name} 已执行完成，结果：失败")
+        elif ssh_operator.run_status == INSPECTION_JOB_EXEC_STATE_COMPLETED:
+            # 部分完成，只是完成了当前巡检代码块，可能还有其他的巡检代码块
+            print("LaunchInspectionJob.judge_completion_of_code_block:",
+                  f"巡检代码块: {inspection_code_block_obj.name} 已执行完成，结果：成功")
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_PART_COMPLETED
         else:
-            pass
-        # 完成情况由相应登录协议处理函数去判断，比如ssh由self.create_ssh_operator_invoke_shell去判断此主机的巡检情况
-        host_job_status_obj.end_time = time.time()  # 结束计时
-        print(f"LaunchInspectionJob.operator_job_thread: >>>>> 目标主机：{host_obj.name} 巡检完成 <<<<<")
+            print("LaunchInspectionJob.judge_completion_of_code_block: ",
+                  f"巡检代码块 {inspection_code_block_obj.name} 执行状态未知")
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+        host_job_status_obj.publish()
 
-    def save_ssh_operator_output_to_file(self, ssh_operator_output_obj_list, host, output_file_name_style):
+    def close_and_save_ssh_operator_output(self, ssh_operator, host_obj, host_job_status_obj):
         """
-        主机的一个巡检代码段所有命令输出信息都保存在一个文件里，不同的巡检代码段输出保存在不同文件里
-        :param ssh_operator_output_obj_list:
-        :param host:
-        :param output_file_name_style:
-        :return:
+        巡检代码块命令执行完成后，关闭ssh连接，保存输出信息，并判断整体完成情况  ★阻塞型函数
         """
-        localtime = time.localtime(time.time())
-        timestamp_date_list = [str(localtime.tm_year), self.fmt_time(localtime.tm_mon), self.fmt_time(localtime.tm_mday)]
-        timestamp_time_list = [str(localtime.tm_hour), str(localtime.tm_min), str(localtime.tm_sec)]
-        timestamp_date = "-".join(timestamp_date_list)  # 年月日，例：2024-01-25
-        timestamp_time = ".".join(timestamp_time_list)  # 时分秒，例：8.50.01
+        # 每条命令的输出在执行完成时已交给输出接收管道（文件、sqlite数据库），这里只需写出暂存的剩余部分
+        self.close_ssh_operator(ssh_operator)
+        # 判断整体完成情况，被停止或超过截止时间的主机不算完成
+        if ssh_operator.check_cancelled():
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+        elif host_job_status_obj.exec_timeout == COF_NO and host_job_status_obj.find_credential_status == FIND_CREDENTIAL_STATUS_SUCCEED:
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_COMPLETED  # 全部完成（没有超时的，没有验证失败的）
+        print("LaunchInspectionJob.close_and_save_ssh_operator_output: 目标主机",
+              f"{host_obj.name} 已巡检完成，远程方式: ssh <<<<<<<<<<<<<<<<<<")
+
+    def report_login_result(self, ssh_operator):
+        """
+        开启了自适应并发数时，把登录结果及耗时报告给并发控制器
+        """
+        if self.concurrency_controller is None or ssh_operator.login_result == LOGIN_RESULT_UNKNOWN:
+            return
+        self.concurrency_controller.report_login(ssh_operator.login_start_time, ssh_operator.login_result,
+                                                 ssh_operator.login_time_usage)
+
+    def process_login_result_of_host(self, host_index, host_obj, login_result):
+        """
+        一台主机巡检结束后调用：登录超时或连接失败且还有重试次数时，安排稍后重试（排在本轮所有主机之后），
+        否则把能否连接记录到主机熔断记录，返回是否已安排重试
+        """
+        if login_result in (LOGIN_RESULT_TIMEOUT, LOGIN_RESULT_FAILED) and not self.cancel_token.is_cancelled():
+            with self.login_retry_lock:
+                retry_count = self.login_retry_count_dict.get(host_index, 0)
+                if retry_count < self.inspection_template.login_retry_times:
+                    # 指数退避，并加上±50%的随机抖动，避免大量主机同时重试
+                    backoff = min(self.inspection_template.login_retry_interval * (2 ** retry_count), LOGIN_RETRY_BACKOFF_MAX)
+                    backoff *= random.uniform(0.5, 1.5)
+                    self.login_retry_count_dict[host_index] = retry_count + 1
+                    heapq.heappush(self.login_retry_heap, (time.time() + backoff, host_index))
+                    print(f"LaunchInspectionJob.process_login_result_of_host: 目标主机 {host_obj.name} 登录失败，",
+                          f"{backoff:.1f}秒后第{retry_count + 1}次重试")
+                    return True
+        if login_result in (LOGIN_RESULT_TIMEOUT, LOGIN_RESULT_FAILED):
+            self.record_host_reachable(host_obj, False)
+        elif login_result in (LOGIN_RESULT_SUCCEED, LOGIN_RESULT_AUTH_FAILED):
+            self.record_host_reachable(host_obj, True)
+        return False
+
+    def record_host_reachable(self, host_obj, is_reachable):
+        self.global_info.host_circuit_breaker.record_result(host_obj.oid, is_reachable)
+
+    def get_login_retry_wait_time(self):
+        """
+        返回距最早一台待重试主机到期还要等多久（秒），没有待重试的主机或作业已停止时返回None
+        """
+        with self.login_retry_lock:
+            if len(self.login_retry_heap) == 0 or self.cancel_token.is_cancelled():
+                return None
+            return self.cancel_token.get_time_left(self.login_retry_heap[0][0] - time.time())
+
+    def pop_due_login_retry_host_index_list(self):
+        host_index_list = []
+        with self.login_retry_lock:
+            while len(self.login_retry_heap) != 0 and self.login_retry_heap[0][0] <= time.time():
+                host_index_list.append(heapq.heappop(self.login_retry_heap)[1])
+        return host_index_list
+
+    def wait_for_login_retry(self):
+        """
+        一轮主机都巡检完后调用，等到最早的待重试主机到期，返回已到期的host_index列表，没有待重试的主机或作业已停止时返回空列表
+        """
+        while True:
+            wait_time = self.get_login_retry_wait_time()
+            if wait_time is None:
+                return []
+            if wait_time <= 0:
+                return self.pop_due_login_retry_host_index_list()
+            self.cancel_token.cancel_event.wait(wait_time)  # 用户停止作业时立即结束等待
+
+    async def async_wait_for_login_retry(self):
+        while True:
+            wait_time = self.get_login_retry_wait_time()
+            if wait_time is None:
+                return []
+            if wait_time <= 0:
+                return self.pop_due_login_retry_host_index_list()
+            await asyncio.sleep(min(wait_time, CHANNEL_RECV_POLL_INTERVAL * 10))
+
+    def is_host_circuit_open(self, host_obj):
+        return self.global_info.host_circuit_breaker.is_open(host_obj.oid, self.inspection_template.circuit_breaker_threshold)
+
+    def fail_host_of_open_circuit(self, ssh_operator, host_obj, host_job_status_obj):
+        """
+        熔断中的主机ssh端口探测不通，直接判为失败，不再登录
+        """
+        print(f"LaunchInspectionJob.fail_host_of_open_circuit: 目标主机 {host_obj.name} 已熔断，ssh端口探测失败，不再登录")
+        self.close_ssh_operator(ssh_operator)
+        host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+
+    def create_ssh_operator_invoke_shell(self, host_obj, host_job_status_obj, cred, host_cancel_token):
+        """
+        正式执行巡检命令，输出信息保存到文件及数据库  ★阻塞型函数，非线程，要等待它完成
+        返回登录结果 LOGIN_RESULT_*，熔断中且探测失败时为LOGIN_RESULT_UNKNOWN
+        """
+        # 先统计巡检代码块及巡检命令总数
+        inspection_code_block_obj_list = self.get_inspection_code_block_obj_list(host_job_status_obj)
+        # 创建 SSHOperator 对象，不论有多少个巡检代码块，只登录一次
+        ssh_operator = self.create_ssh_operator(host_obj, host_job_status_obj, cred, host_cancel_token)
+        # 熔断中的主机先探测ssh端口，探测通了才登录
+        if self.is_host_circuit_open(host_obj) and not ssh_operator.probe_tcp_port():
+            self.fail_host_of_open_circuit(ssh_operator, host_obj, host_job_status_obj)
+            return LOGIN_RESULT_UNKNOWN
+        if self.is_invoke_shell_needed(inspection_code_block_obj_list):
+            ret = ssh_operator.create_invoke_shell()  # 创建ssh连接，不论有多少个巡检代码块，这里只用登录一次，登录后首次输出内容也是在这里获取
+        else:
+            ret = ssh_operator.login()  # 都是exec_command方式，只登录，不打开shell
+        self.report_login_result(ssh_operator)
+        if ret != COF_STATUS_SUCCEED:
+            self.close_ssh_operator(ssh_operator)  # 可能已打开了shell通道，关闭并归还连接
+            # 整体完成情况
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            print("LaunchInspectionJob.create_ssh_operator_invoke_shell: 目标主机",
+                  f"{host_obj.name} 巡检失败，远程方式: ssh <<<<<<<<<<<<<<<<<<")
+            return ssh_operator.login_result
+        # 巡检代码块不去重，依次执行，串行执行
+        inspection_code_block_index = 0
+        for inspection_code_block_obj in inspection_code_block_obj_list:
+            if ssh_operator.check_cancelled():  # 作业已被停止或已超过截止时间，剩余的巡检代码块不再执行
+                break
+            if ssh_operator.is_host_aborted:  # 满足了终止本主机巡检的执行条件，剩余的巡检代码块不再执行
+                ssh_operator.skip_code_lines(sum(len(obj.code_list) for obj in inspection_code_block_obj_list[inspection_code_block_index:]))
+                break
+            host_job_status_obj.current_exec_code_block = inspection_code_block_index
+            # ★★执行巡检命令，输出信息保存在 SSHOperator.output_list里
+            if inspection_code_block_obj.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:
+                ssh_operator.run_exec_command(inspection_code_block_obj)
+            elif inspection_code_block_obj.code_exec_method == CODE_EXEC_METHOD_INVOKE_SHELL_PIPELINE:
+                ssh_operator.run_invoke_shell_pipeline(inspection_code_block_obj)
+            elif inspection_code_block_obj.code_exec_method == CODE_EXEC_METHOD_SCRIPT:
+                ssh_operator.run_script(inspection_code_block_obj)
+            else:
+                ssh_operator.run_invoke_shell(inspection_code_block_obj)
+            self.judge_completion_of_code_block(ssh_operator, host_job_status_obj, inspection_code_block_obj)
+            inspection_code_block_index += 1
+        # 巡检代码块命令执行完成后，关闭ssh连接，保存输出信息
+        self.close_and_save_ssh_operator_output(ssh_operator, host_obj, host_job_status_obj)
+        return ssh_operator.login_result
+
+    def prepare_operator_job(self, host_index):
+        """
+        开始巡检一台主机前的准备工作，返回 (host_obj, host_job_status_obj, cred, host_cancel_token)，
+        主机或凭据不存在时，已将主机作业状态设置为失败，返回的host_obj或cred为None；
+        主机的子令牌在开始计时时创建，单台主机截止时间包含查找凭据的用时
+        """
+        host_obj = self.global_info.get_host_by_oid(self.unduplicated_host_oid_list[host_index])
+        host_job_status_obj = self.unduplicated_host_job_status_obj_list[host_index]
+        if self.cancel_token.is_cancelled():  # 作业已被停止或已超过截止时间，还未开始的主机不再巡检
+            if self.cancel_token.is_deadline_exceeded():
+                host_job_status_obj.exec_timeout = COF_YES
+            host_obj = None
+        if host_obj is None:
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            host_job_status_obj.start_time = time.time()  # 开始计时
+            host_job_status_obj.end_time = time.time()  # 结束计时
+            host_job_status_obj.publish()
+            return None, host_job_status_obj, None, None
+        print(f"\nLaunchInspectionJob.prepare_operator_job >>>>> 目标主机：{host_obj.name} 开始巡检 <<<<<")
+        host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_STARTED
+        host_job_status_obj.start_time = time.time()  # 开始计时
+        # 每台主机一个子令牌，到达主机截止时间只结束本主机，线程/协程随即去巡检下一台主机
+        host_cancel_token = self.cancel_token.create_child(timeout=self.inspection_template.host_deadline)
+        host_job_status_obj.publish()
+        if host_obj.login_protocol != LOGIN_PROTOCOL_SSH:
+            return host_obj, host_job_status_obj, None, host_cancel_token
+        cred = self.global_info.get_credential_by_oid(host_obj.login_credential_oid)
+        if cred is None:
+            print("LaunchInspectionJob.prepare_operator_job: Credential is None, Could not find correct credential")
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED  # 无可用凭据，就退出巡检线程了，宣告失败
+            host_job_status_obj.find_credential_status = FIND_CREDENTIAL_STATUS_FAILED
+            host_job_status_obj.end_time = time.time()  # 结束计时
+            host_job_status_obj.publish()
+        return host_obj, host_job_status_obj, cred, host_cancel_token
+
+    def operator_job_thread(self, host_index):
+        """
+        正式执行主机巡检任务，一台主机一个线程，本函数只处理一台主机，本函数调用self.create_ssh_operator_invoke_shell去执行命令
+        :param host_index:
+        :return:
+        """
+        if self.concurrency_controller is None:
+            concurrency_slot = contextlib.nullcontext()  # 并发数即线程池的线程数
+        else:
+            concurrency_slot = self.concurrency_controller.slot(self.cancel_token)  # 线程池按并发数上限创建，由控制器限制同时巡检的主机数
+        with concurrency_slot:
+            host_obj, host_job_status_obj, cred, host_cancel_token = self.prepare_operator_job(host_index)
+            if host_obj is None:
+                return
+            if host_obj.login_protocol == LOGIN_PROTOCOL_SSH:
+                if cred is None:
+                    return
+                # ★★开始正式执行巡检命令，输出信息保存到文件及数据库★★ 阻塞型函数，要等待它完成
+                login_result = self.create_ssh_operator_invoke_shell(host_obj, host_job_status_obj, cred, host_cancel_token)
+                if self.process_login_result_of_host(host_index, host_obj, login_result):
+                    host_job_status_obj.publish()
+                    return  # 已安排稍后重试，本次不结束计时
+            elif host_obj.login_protocol == LOGIN_PROTOCOL_TELNET:
+                print("LaunchInspectionJob.operator_job_thread: 使用telnet协议远程目标主机")
+            else:
+                pass
+            # 完成情况由相应登录协议处理函数去判断，比如ssh由self.create_ssh_operator_invoke_shell去判断此主机的巡检情况
+            host_job_status_obj.end_time = time.time()  # 结束计时
+            host_job_status_obj.publish()
+            print(f"LaunchInspectionJob.operator_job_thread: >>>>> 目标主机：{host_obj.name} 巡检完成 <<<<<")
+
+    async def async_create_ssh_operator_invoke_shell(self, loop, blocking_executor, host_obj, host_job_status_obj, cred,
+                                                     host_cancel_token):
+        """
+        create_ssh_operator_invoke_shell()的协程版本，状态变化与其完全相同
+        """
+        inspection_code_block_obj_list = self.get_inspection_code_block_obj_list(host_job_status_obj)
+        ssh_operator = self.create_ssh_operator(host_obj, host_job_status_obj, cred, host_cancel_token)
+        if self.is_host_circuit_open(host_obj) and not await ssh_operator.async_probe_tcp_port(loop):
+            await loop.run_in_executor(blocking_executor, self.fail_host_of_open_circuit, ssh_operator, host_obj, host_job_status_obj)
+            return LOGIN_RESULT_UNKNOWN
+        ret = await ssh_operator.async_create_invoke_shell(loop, blocking_executor,
+                                                           open_shell=self.is_invoke_shell_needed(inspection_code_block_obj_list))
+        self.report_login_result(ssh_operator)
+        if ret != COF_STATUS_SUCCEED:
+            await loop.run_in_executor(blocking_executor, self.close_ssh_operator, ssh_operator)  # 可能已打开了shell通道，关闭并归还连接
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            print("LaunchInspectionJob.async_create_ssh_operator_invoke_shell: 目标主机",
+                  f"{host_obj.name} 巡检失败，远程方式: ssh <<<<<<<<<<<<<<<<<<")
+            return ssh_operator.login_result
+        inspection_code_block_index = 0
+        for inspection_code_block_obj in inspection_code_block_obj_list:
+            if ssh_operator.check_cancelled():
+                break
+            if ssh_operator.is_host_aborted:
+                ssh_operator.skip_code_lines(sum(len(obj.code_list) for obj in inspection_code_block_obj_list[inspection_code_block_index:]))
+                break
+            host_job_status_obj.current_exec_code_block = inspection_code_block_index
+            if inspection_code_block_obj.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:
+                # exec_command方式读取各通道的阻塞操作交给线程池，并发执行的通道由run_exec_command()自己的线程池处理
+                await loop.run_in_executor(blocking_executor, ssh_operator.run_exec_command, inspection_code_block_obj)
+            elif inspection_code_block_obj.code_exec_method == CODE_EXEC_METHOD_INVOKE_SHELL_PIPELINE:
+                # 流水线执行方式大部分时间在等待结束标记，交给线程池，不另写协程版本
+                await loop.run_in_executor(blocking_executor, ssh_operator.run_invoke_shell_pipeline, inspection_code_block_obj)
+            elif inspection_code_block_obj.code_exec_method == CODE_EXEC_METHOD_SCRIPT:
+                # 脚本执行方式只有一个exec通道（及上传脚本的sftp），同样交给线程池
+                await loop.run_in_executor(blocking_executor, ssh_operator.run_script, inspection_code_block_obj)
+            else:
+                await ssh_operator.async_run_invoke_shell(loop, inspection_code_block_obj)
+            self.judge_completion_of_code_block(ssh_operator, host_job_status_obj, inspection_code_block_obj)
+            inspection_code_block_index += 1
+        # 关闭连接及保存输出（文件、数据库）都是阻塞操作，交给线程池处理
+        await loop.run_in_executor(blocking_executor, self.close_and_save_ssh_operator_output, ssh_operator, host_obj,
+                                   host_job_status_obj)
+        return ssh_operator.login_result
+
+    async def async_operator_job(self, loop, semaphore, blocking_executor, host_index):
+        """
+        operator_job_thread()的协程版本，一台主机一个协程，同时巡检的主机数由semaphore限制（即<InspectionTemplate>.forks），
+        开启了自适应并发数时由并发控制器限制
+        """
+        if self.concurrency_controller is None:
+            concurrency_slot = semaphore
+        else:
+            concurrency_slot = self.concurrency_controller.async_slot(loop, self.cancel_token)
+        async with concurrency_slot:
+            host_obj, host_job_status_obj, cred, host_cancel_token = self.prepare_operator_job(host_index)
+            if host_obj is None:
+                return
+            if host_obj.login_protocol == LOGIN_PROTOCOL_SSH:
+                if cred is None:
+                    return
+                try:
+                    login_result = await self.async_create_ssh_operator_invoke_shell(loop, blocking_executor, host_obj,
+                                                                                     host_job_status_obj, cred, host_cancel_token)
+                except Exception as err:
+                    print(f"LaunchInspectionJob.async_operator_job: {err}")
+                    host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                    login_result = LOGIN_RESULT_UNKNOWN
+                if self.process_login_result_of_host(host_index, host_obj, login_result):
+                    host_job_status_obj.publish()
+                    return
+            elif host_obj.login_protocol == LOGIN_PROTOCOL_TELNET:
+                print("LaunchInspectionJob.async_operator_job: 使用telnet协议远程目标主机")
+            else:
+                pass
+            host_job_status_obj.end_time = time.time()  # 结束计时
+            host_job_status_obj.publish()
+            print(f"LaunchInspectionJob.async_operator_job: >>>>> 目标主机：{host_obj.name} 巡检完成 <<<<<")
+
+    async def async_run_all_host(self, loop):
+        semaphore = asyncio.Semaphore(self.inspection_template.forks)
+        blocking_executor = ThreadPoolExecutor(max_workers=min(self.get_max_forks(), ASYNCIO_JOB_BLOCKING_WORKERS))
+        try:
+            host_index_list = self.host_schedule_index_list  # 按巡检顺序创建协程，也按此顺序获取semaphore
+            while len(host_index_list) != 0:  # 登录失败待重试的主机在本轮所有主机完成后再巡检
+                await asyncio.gather(*[self.async_operator_job(loop, semaphore, blocking_executor, host_index)
+                                       for host_index in host_index_list])
+                host_index_list = await self.async_wait_for_login_retry()
+        finally:
+            blocking_executor.shutdown(wait=True)
+
+    def run_all_host_by_thread_pool(self):
+        # 创建线程池，线程数量由<InspectionTemplate>.forks决定，开启了自适应并发数时按并发数上限创建
+        thread_pool = ThreadPool(processes=self.get_max_forks())
+        # ★★线程池调用巡检作业函数★★ chunksize=1，每个线程巡检完一台主机（或到达截止时间）就去取下一台，
+        # 不像map()那样预先把主机分块分给各线程，一台慢主机不会拖住同一块里的其他主机
+        host_index_list = self.host_schedule_index_list
+        while len(host_index_list) != 0:  # 登录失败待重试的主机在本轮所有主机完成后再巡检，不耽误正常主机
+            for _ in thread_pool.imap_unordered(self.operator_job_thread, host_index_list, chunksize=1):
+                pass
+            host_index_list = self.wait_for_login_retry()
+        thread_pool.close()
+        thread_pool.join()  # 会等待所有线程完成: self.operator_job_thread()
+
+    def get_host_schedule_index_list(self):
+        """
+        主机开始巡检的顺序，按历史用时从长到短排序时，作业总用时接近最慢主机的用时，不会因慢主机排在最后而拖长
+        """
+        if self.inspection_template.host_schedule_order != HOST_SCHEDULE_ORDER_LONGEST_FIRST:
+            return list(range(len(self.unduplicated_host_oid_list)))
+        host_schedule_index_list = self.global_info.host_duration_stats.get_schedule_index_list(
+            self.unduplicated_host_oid_list, self.inspection_template.new_host_schedule_slot)
+        print("LaunchInspectionJob.get_host_schedule_index_list: 按历史巡检用时从长到短巡检主机，有历史用时的主机数",
+              f"{self.global_info.host_duration_stats.get_known_host_num(self.unduplicated_host_oid_list)}/{len(host_schedule_index_list)}")
+        return host_schedule_index_list
+
+    def get_shard_num(self):
+        """
+        多进程分片模式下的工作进程数，不超过cpu核数、巡检并发数及主机数
+        """
+        return max(1, min(os.cpu_count() or 1, self.inspection_template.forks, len(self.unduplicated_host_oid_list)))
+
+    def run_all_host_by_process_shards(self):
+        """
+        多进程分片巡检引擎，主机按巡检顺序交错分到多个工作进程（第i个进程巡检巡检顺序中的第 i, i+N, i+2N... 台主机，
+        按历史用时从长到短排序时，各进程分到的慢主机数量相近），每个进程用线程池巡检，
+        巡检并发数平均分给各进程；ssh加解密、vt100解析、输出压缩都在工作进程里完成，不再争用主进程的GIL，
+        工作进程只把主机状态、压缩后的输出行、可否连接 以元组发回主进程，作业记录、输出、熔断记录都只由主进程写入数据库
+        """
+        shard_num = self.get_shard_num()
+        shard_forks = -(-self.inspection_template.forks // shard_num)  # 向上取整
+        job_deadline = self.cancel_token.deadline if self.cancel_token.deadline is not None else 0.0
+        # spawn方式启动，各平台行为一致，工作进程不继承主进程的线程（数据库写线程、paramiko收包线程等）
+        mp_context = multiprocessing.get_context("spawn")
+        # 巡检模板及巡检代码块（已按update_code_on_launch更新过）直接传给工作进程，工作进程不再从数据库重新加载
+        inspection_code_block_obj_list = [self.global_info.get_inspection_code_block_by_oid(inspection_code_block_oid)
+                                          for inspection_code_block_oid in self.inspection_template.inspection_code_block_oid_list]
+        inspection_code_block_obj_list = [inspection_code_block_obj for inspection_code_block_obj in inspection_code_block_obj_list
+                                          if inspection_code_block_obj is not None]
+        result_queue = mp_context.Queue()
+        cancel_event = mp_context.Event()
+        process_list = []
+        shard_host_index_list_list = []  # 各工作进程分到的主机，元素为host_index列表
+        for shard_index in range(shard_num):
+            host_index_list = self.host_schedule_index_list[shard_index::shard_num]
+            shard_host_index_list_list.append(host_index_list)
+            host_oid_list = [self.unduplicated_host_oid_list[host_index] for host_index in host_index_list]
+            process = mp_context.Process(target=cofable_inspection_job_shard_main,
+                                         args=(self.global_info.sqlite3_dbfile_name, self.oid, self.inspection_template,
+                                               inspection_code_block_obj_list, host_oid_list, host_index_list, shard_forks, job_deadline, result_queue,
+                                               cancel_event, shard_index),
+                                         daemon=True)
+            process.start()
+            process_list.append(process)
+        print(f"LaunchInspectionJob.run_all_host_by_process_shards: 已启动{shard_num}个工作进程，每个进程巡检并发数为{shard_forks}")
+        finished_shard_index_set = set()
+        try:
+            while len(finished_shard_index_set) < shard_num:
+                if self.cancel_token.is_cancelled() and not cancel_event.is_set():
+                    cancel_event.set()  # 用户停止作业或超过截止时间，通知所有工作进程
+                try:
+                    shard_msg = result_queue.get(timeout=PROCESS_SHARD_POLL_INTERVAL)
+                except queue.Empty:
+                    for shard_index, process in enumerate(process_list):
+                        if shard_index not in finished_shard_index_set and not process.is_alive():
+                            print(f"LaunchInspectionJob.run_all_host_by_process_shards: 工作进程{shard_index}异常退出，",
+                                  f"exitcode: {process.exitcode}")
+                            finished_shard_index_set.add(shard_index)
+                            self.fail_unfinished_host_of_shard(shard_host_index_list_list[shard_index])
+                    continue
+                msg_type, msg_arg1, msg_arg2 = shard_msg
+                if msg_type == SHARD_MSG_HOST_JOB_STATUS:
+                    host_job_status_obj = self.unduplicated_host_job_status_obj_list[msg_arg1]
+                    host_job_status_obj.set_status_tuple(msg_arg2)
+                    host_job_status_obj.publish()
+                elif msg_type == SHARD_MSG_OUTPUT_ROWS:
+                    self.global_info.sqlite_storage.execute_write(
+                        lambda sqlite_cursor, output_row_list=msg_arg1, interactive_output_row_list=msg_arg2:
+                        SSHOperatorOutputSqliteSink.write_output_rows_to_sqlite(sqlite_cursor, output_row_list,
+                                                                                interactive_output_row_list),
+                        wait=False)
+                elif msg_type == SHARD_MSG_HOST_REACHABLE:
+                    self.global_info.host_circuit_breaker.record_result(msg_arg1, msg_arg2)
+                elif msg_type == SHARD_MSG_SHARD_FINISHED:
+                    finished_shard_index_set.add(msg_arg1)
+                    self.fail_unfinished_host_of_shard(shard_host_index_list_list[msg_arg1])
+        finally:
+            if len(finished_shard_index_set) < shard_num and not cancel_event.is_set():
+                cancel_event.set()
+            for process in process_list:
+                process.join(timeout=PROCESS_SHARD_JOIN_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+
+    def fail_unfinished_host_of_shard(self, host_index_list):
+        """
+        工作进程结束后，它还未结束计时的主机（工作进程出错或异常退出）判为失败
+        """
+        for host_index in host_index_list:
+            host_job_status_obj = self.unduplicated_host_job_status_obj_list[host_index]
+            if host_job_status_obj.end_time != 0.0:
+                continue
+            host_job_status_obj.job_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            if host_job_status_obj.start_time == 0.0:
+                host_job_status_obj.start_time = time.time()
+            host_job_status_obj.end_time = time.time()
+            host_job_status_obj.publish()
+
+    def get_max_forks(self):
+        """
+        本次作业最多同时巡检几台主机，开启了自适应并发数时为并发数可增长到的上限，不超过主机数
+        """
+        if self.inspection_template.adaptive_forks == COF_YES:
+            max_forks = min(self.inspection_template.forks * ADAPTIVE_FORKS_MAX_MULTIPLE, MAX_JOB_FORKS)
+            return max(1, min(max_forks, len(self.unduplicated_host_oid_list)))
+        return self.inspection_template.forks
+
+    def run_all_host_by_asyncio(self):
+        """
+        asyncio巡检引擎，一台主机一个协程，tcp连接、命令下发、提示符判断都在本线程的事件循环里完成，
+        注意：paramiko每个已建立的ssh连接仍有一个自己的收包线程，所以同时存在的线程数约为 forks + ASYNCIO_JOB_BLOCKING_WORKERS，
+        而不是主机总数；windows下SelectorEventLoop基于select()，同时监听的通道数有限（约500个），forks不宜设置过大
+        """
+        loop = asyncio.SelectorEventLoop()  # 需要loop.add_reader()监听paramiko通道，windows下默认的ProactorEventLoop不支持
+        try:
+            loop.run_until_complete(self.async_run_all_host(loop))
+        finally:
+            loop.close()
+
+    def get_output_file_name(self, host, output_file_name_style):
+        """
+        按巡检模板设置的文件名风格，生成主机巡检日志的文件名，按日期分目录的风格会先创建目录
+        :param host:
+        :param output_file_name_style:
+        :return:
+        """
+        localtime = time.localtime(time.time())
+        timestamp_date_list = [str(localtime.tm_year), self.fmt_time(localtime.tm_mon), self.fmt_time(localtime.tm_mday)]
+        timestamp_time_list = [str(localtime.tm_hour), str(localtime.tm_min), str(localtime.tm_sec)]
+        timestamp_date = "-".join(timestamp_date_list)  # 年月日，例：2024-01-25
+        timestamp_time = ".".join(timestamp_time_list)  # 时分秒，例：8.50.01
         if output_file_name_style == OUTPUT_FILE_NAME_STYLE_HOSTNAME:
             file_name = host.name + '.log'
         elif output_file_name_style == OUTPUT_FILE_NAME_STYLE_HOSTNAME_DATE:
@@ -1463,23 +2641,7 @@ class LaunchInspectionJob:
             file_name = os.path.join(timestamp_date, file_namex)
         else:
             file_name = host.name + '.log'
-        # 一台主机的 所有巡检代码块 里的所有巡检命令输出信息都保存在一个文件里
-        with open(file_name, 'a', encoding='utf8') as file_obj:  # 追加，不存在则新建
-            for ssh_operator_output_obj in ssh_operator_output_obj_list:
-                if ssh_operator_output_obj.code_exec_method == CODE_EXEC_METHOD_INVOKE_SHELL:
-                    # invoke_shell输出信息为vt100数据，每次write到文件前先解析一下
-                    # 解析后的普通字符串，已将'\r\n'替换为了'\n'    block_str = block_bytes.decode("utf8").replace("\r\n", "\n")
-                    plain_text = Vt100ToPlaintext(vt100_data_bytes=ssh_operator_output_obj.invoke_shell_output_bytes).parse()
-                    file_obj.write(plain_text)
-                    if len(ssh_operator_output_obj.interactive_output_bytes_list) != 0:
-                        for interactive_output_bytes in ssh_operator_output_obj.interactive_output_bytes_list:
-                            plain_text2 = Vt100ToPlaintext(vt100_data_bytes=interactive_output_bytes).parse()
-                            file_obj.write(plain_text2)
-                if ssh_operator_output_obj.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:
-                    for exec_command_stderr_line in ssh_operator_output_obj.exec_command_stderr_line_list:
-                        file_obj.write(exec_command_stderr_line)
-                    for exec_command_stdout_line in ssh_operator_output_obj.exec_command_stdout_line_list:
-                        file_obj.write(exec_command_stdout_line)
+        return file_name
 
     @staticmethod
     def fmt_time(t):
@@ -1493,102 +2655,6 @@ class LaunchInspectionJob:
         else:
             return str(t)
 
-    def save_ssh_operator_invoke_shell_output_to_sqlite(self, ssh_operator_output_obj_list, host_obj):
-        """
-        主机的所有巡检命令输出信息都保存到数据库里
-        """
-        self.global_info.lock_sqlite3_db.acquire()  # 获取操作数据库的全局锁
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★★★查询是否有名为'tb_inspection_job_invoke_shell_output'的表★★★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_invoke_shell_output"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_inspection_job_invoke_shell_output  ( job_oid varchar(36),",
-                        "host_oid varchar(36),",
-                        "inspection_code_oid varchar(36),",
-                        "project_oid varchar(36),",
-                        "code_index int,",
-                        "code_exec_method int,",
-                        "invoke_shell_output_bytes_b64 varchar(8192),",
-                        "invoke_shell_output_last_line_str_b64 varchar(8192) )"]
-            sqlite_cursor.execute(" ".join(sql_list))
-        # ★★★查询是否有名为'tb_inspection_job_invoke_shell_interactive_output'的表★★★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_invoke_shell_interactive_output"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_inspection_job_invoke_shell_interactive_output  ( job_oid varchar(36),",
-                        "host_oid varchar(36),",
-                        "inspection_code_oid varchar(36),",
-                        "project_oid varchar(36),",
-                        "code_index int,",
-                        "code_exec_interactive_output_index int,",
-                        "interactive_output_bytes_b64 varchar(8192) )"]
-            sqlite_cursor.execute(" ".join(sql_list))
-        # ★★★开始插入数据，一条命令的输出为一行记录（job_oid为LaunchInspectionJob的oid，也同InspectionJobRecord的oid）★★★
-        for code_output in ssh_operator_output_obj_list:
-            sql_list = ["select * from tb_inspection_job_invoke_shell_output where",
-                        f"job_oid='{self.oid}' and host_oid='{host_obj.oid}'",
-                        f"and inspection_code_oid='{code_output.inspection_code_block_oid}'",
-                        f"and code_index='{code_output.code_index}' "]
-            sqlite_cursor.execute(" ".join(sql_list))
-            if len(sqlite_cursor.fetchall()) == 0:  # 若未查询到有此项记录，则创建此项记录
-                invoke_shell_output_bytes_b64 = base64.b64encode(code_output.invoke_shell_output_bytes).decode('utf8')
-                invoke_shell_output_last_line_str_b64 = base64.b64encode(
-                    code_output.invoke_shell_output_last_line_str.encode('utf8')).decode('utf8')
-                sql_list = ["insert into tb_inspection_job_invoke_shell_output (job_oid,",
-                            "host_oid,",
-                            "inspection_code_oid,",
-                            "project_oid,",
-                            "code_index,",
-                            "code_exec_method,",
-                            "invoke_shell_output_bytes_b64,",
-                            "invoke_shell_output_last_line_str_b64 )  values ",
-                            f"( '{self.oid}',",
-                            f"'{host_obj.oid}',",
-                            f"'{code_output.inspection_code_block_oid}',",
-                            f"'{host_obj.project_oid}',",
-                            f"{code_output.code_index},",
-                            f"{code_output.code_exec_method},",
-                            f"'{invoke_shell_output_bytes_b64}',",
-                            f"'{invoke_shell_output_last_line_str_b64}'",
-                            " )"]
-                sqlite_cursor.execute(" ".join(sql_list))
-                self.save_interactive_output_bytes_list(sqlite_cursor, host_obj, code_output)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
-        self.global_info.lock_sqlite3_db.release()  # 释放操作数据库的全局锁
-
-    def save_interactive_output_bytes_list(self, sqlite_cursor, host_obj, code_output):
-        # 开始插入数据，一条记录为SSHOperatorOutput.interactive_output_bytes_list的一个元素
-        index = 0
-        for interactive_output_bytes in code_output.interactive_output_bytes_list:
-            interactive_output_bytes_b64 = base64.b64encode(interactive_output_bytes).decode("utf8")
-            sql_list = ["insert into tb_inspection_job_invoke_shell_interactive_output (job_oid,",
-                        "host_oid,",
-                        "inspection_code_oid,",
-                        "project_oid,",
-                        "code_index,",
-                        "code_exec_interactive_output_index,",
-                        "interactive_output_bytes_b64 )  values ",
-                        f"( '{self.oid}',",
-                        f"'{host_obj.oid}',",
-                        f"'{code_output.inspection_code_block_oid}',",
-                        f"'{host_obj.project_oid}',",
-                        f"{code_output.code_index},",
-                        f"{index},",
-                        f"'{interactive_output_bytes_b64}'",
-                        " )"]
-            sqlite_cursor.execute(" ".join(sql_list))
-            index += 1
-
     def judge_completion_of_job(self):
         completed_host_num = 0
         for host_status_obj in self.unduplicated_host_job_status_obj_list:
@@ -1602,23 +2668,10 @@ class LaunchInspectionJob:
             self.job_state = INSPECTION_JOB_EXEC_STATE_FAILED
 
     def save_to_sqlite(self, start_time, end_time):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_inspection_job  ( job_oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "job_name varchar(256),",
-                        "inspection_code_oid varchar(36),",
-                        "project_oid varchar(36),",
-                        "start_time int,",
-                        "end_time int,",
-                        "job_state int )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(
+            lambda sqlite_cursor: self.write_to_sqlite(sqlite_cursor, start_time, end_time))
+
+    def write_to_sqlite(self, sqlite_cursor, start_time, end_time):
         # 开始插入数据，一条命令的输出为一行记录
         sql_list = ["select * from tb_inspection_job where",
                     f"job_oid='{self.oid}'"]
@@ -1639,9 +2692,26 @@ class LaunchInspectionJob:
                         f"{end_time},",
                         f"{self.job_state} )"]
             sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+
+    def create_code_condition_matcher(self):
+        """
+        巡检作业开始时，所有巡检代码块命令的执行条件正则只编译一次，所有主机共用
+        """
+        code_condition_matcher = CodeConditionMatcher()
+        for inspection_code_block_oid in self.inspection_template.inspection_code_block_oid_list:
+            inspection_code_block_obj = self.global_info.get_inspection_code_block_by_oid(inspection_code_block_oid)
+            if inspection_code_block_obj is not None:
+                code_condition_matcher.add_inspection_code_block(inspection_code_block_obj)
+        return code_condition_matcher
+
+    def update_inspection_code_from_source(self):
+        """
+        巡检模板设置了运行前更新code时，代码来源为本地文件或git仓库的巡检代码块，在开始巡检前重新读取命令，读取失败时仍使用上次的命令
+        """
+        for inspection_code_block_oid in self.inspection_template.inspection_code_block_oid_list:
+            inspection_code_block_obj = self.global_info.get_inspection_code_block_by_oid(inspection_code_block_oid)
+            if inspection_code_block_obj is not None and inspection_code_block_obj.code_source != CODE_SOURCE_LOCAL:
+                inspection_code_block_obj.update_code_from_source()
 
     def start_job(self):
         print("LaunchInspectionJob.start_job: 开始巡检任务 ##########################################")
@@ -1650,178 +2720,399 @@ class LaunchInspectionJob:
             print("LaunchInspectionJob.start_job: 巡检模板对象为空，结束本次任务")
             self.job_state = INSPECTION_JOB_EXEC_STATE_FAILED
             return
+        # 作业开始前已被停止时（如daemon正在退出）不再拉取代码来源，巡检也会立即结束
+        if self.inspection_template.update_code_on_launch == COF_YES and not self.cancel_token.is_cancelled():
+            self.update_inspection_code_from_source()
+        self.code_condition_matcher = self.create_code_condition_matcher()
         self.start_time = time.time()
+        if self.inspection_template.job_deadline > 0:
+            self.cancel_token.deadline = self.start_time + self.inspection_template.job_deadline
         self.get_unduplicated_host_oid_from_inspection_template()  # ★主机去重，去重后生成主机列表及对应的主机状态信息对象列表
+        self.event_bus = InspectionJobEventBus(host_num=len(self.unduplicated_host_job_status_obj_list))
+        for host_index, host_job_status_obj in enumerate(self.unduplicated_host_job_status_obj_list):
+            host_job_status_obj.event_bus = self.event_bus
+            host_job_status_obj.host_index = host_index
+        self.host_schedule_index_list = self.get_host_schedule_index_list()
+        # 多进程分片模式下，由各工作进程自己的并发控制器调整并发数
+        if self.inspection_template.adaptive_forks == COF_YES and self.inspection_template.job_exec_mode != JOB_EXEC_MODE_PROCESS_SHARDS:
+            self.concurrency_controller = AdaptiveConcurrencyController(initial_limit=self.inspection_template.forks,
+                                                                        max_limit=self.get_max_forks())
         job_record_obj = InspectionJobRecord(name=self.name, description=self.description, oid=self.oid,
                                              create_timestamp=self.create_timestamp, project_oid=self.project_oid,
                                              inspection_template_oid=self.inspection_template_oid, job_state=self.job_state,
                                              unduplicated_host_job_status_obj_list=self.unduplicated_host_job_status_obj_list,
                                              start_time=self.start_time, end_time=self.end_time, global_info=self.global_info)
+        self.job_record_obj = job_record_obj
         self.global_info.inspection_job_record_obj_list.insert(0, job_record_obj)
+        self.global_info.running_inspection_job_dict[self.oid] = self
         # print("巡检模板名称：", self.inspection_template.name)
-        thread_pool = ThreadPool(processes=self.inspection_template.forks)  # 创建线程池，线程数量由<InspectionTemplate>.forks决定
-        thread_pool.map(self.operator_job_thread, range(len(self.unduplicated_host_oid_list)))  # ★★线程池调用巡检作业函数★★
-        thread_pool.close()
-        thread_pool.join()  # 会等待所有线程完成: self.operator_job_thread()
-        self.end_time = time.time()
-        print("LaunchInspectionJob.start_job: 巡检任务完成 ##########################################")
-        print(f"LaunchInspectionJob.start_job: 巡检并发数为{self.inspection_template.forks}")
-        print("LaunchInspectionJob.start_job: 用时 {:<6.4f} 秒".format(self.end_time - self.start_time))
-        # 将作业信息保存到数据库，从数据库读取出来时，不可重构为一个<LaunchInspectionJob>对象，只可重构为<InspectionJobRecord>对象
-        self.judge_completion_of_job()  # 先判断作业完成情况
-        job_record_obj.end_time = self.end_time
-        job_record_obj.job_state = self.job_state
-        job_record_obj.unduplicated_host_job_status_obj_list = self.unduplicated_host_job_status_obj_list
-        job_record_obj.save()  # 保存巡检作业情况到数据库，这里不是保存每台主机的巡检命令巡出，而是每台主机的巡检完成情况
+        self.output_writer = SSHOperatorOutputWriter()
+        try:
+            try:
+                if self.inspection_template.job_exec_mode == JOB_EXEC_MODE_ASYNCIO:
+                    self.run_all_host_by_asyncio()  # ★★asyncio协程调用巡检作业函数，阻塞到所有主机巡检完成★★
+                elif self.inspection_template.job_exec_mode == JOB_EXEC_MODE_PROCESS_SHARDS:
+                    self.run_all_host_by_process_shards()  # ★★多个工作进程分片巡检，阻塞到所有工作进程结束★★
+                else:
+                    self.run_all_host_by_thread_pool()  # ★★线程池调用巡检作业函数，阻塞到所有主机巡检完成★★
+            finally:
+                self.output_writer.close()  # 等待所有主机的输出都已交给数据库写线程
+                self.global_info.running_inspection_job_dict.pop(self.oid, None)
+                self.event_bus.finish()
+            self.end_time = time.time()
+            print("LaunchInspectionJob.start_job: 巡检任务完成 ##########################################")
+            if self.concurrency_controller is None:
+                print(f"LaunchInspectionJob.start_job: 巡检并发数为{self.inspection_template.forks}")
+            else:
+                print(f"LaunchInspectionJob.start_job: 自适应巡检并发数，最终为{self.concurrency_controller.get_limit()}，",
+                      f"变化过程(秒:并发数)为 {self.concurrency_controller.get_history_str()}")
+            print("LaunchInspectionJob.start_job: 用时 {:<6.4f} 秒".format(self.end_time - self.start_time))
+            # 将作业信息保存到数据库，从数据库读取出来时，不可重构为一个<LaunchInspectionJob>对象，只可重构为<InspectionJobRecord>对象
+            self.judge_completion_of_job()  # 先判断作业完成情况
+            self.global_info.host_duration_stats.record_job(self.unduplicated_host_job_status_obj_list)  # 巡检完成的主机更新其平均用时
+            job_record_obj.end_time = self.end_time
+            job_record_obj.job_state = self.job_state
+            job_record_obj.unduplicated_host_job_status_obj_list = self.unduplicated_host_job_status_obj_list
+            if self.concurrency_controller is not None:
+                job_record_obj.concurrency_history = self.concurrency_controller.get_history_str()
+            job_record_obj.save()  # 保存巡检作业情况到数据库，这里不是保存每台主机的巡检命令巡出，而是每台主机的巡检完成情况
+        finally:
+            # 作业出错时也放入，无界面运行（daemon）停止时等待的作业记录一定会到达
+            if self.global_info.finished_inspection_job_record_queue is not None:
+                self.global_info.finished_inspection_job_record_queue.put(job_record_obj)
+
+
+class LaunchInspectionJobShard(LaunchInspectionJob):
+    """
+    多进程分片模式下，工作进程里执行的巡检作业分片，只巡检分到本分片的主机，
+    主机状态、命令输出、可否连接都放入结果队列发回主进程，本进程不写数据库，也不保存作业记录
+    """
 
+    def __init__(self, oid=None, inspection_template=None, global_info=None, shard_index=0, result_queue=None):
+        super().__init__(oid=oid, inspection_template=inspection_template, global_info=global_info)
+        self.shard_index = shard_index
+        self.result_queue = result_queue  # <multiprocessing.Queue> 发回主进程的消息
 
-class Vt100ToPlaintext:
-    def __init__(self, vt100_data_bytes=b''):
-        self.vt100_data_bytes = vt100_data_bytes
-        self.plain_text_block_list = []
+    def create_output_sqlite_sink(self, host_obj):
+        return SSHOperatorOutputShardSink(result_queue=self.result_queue, job_oid=self.oid, host_obj=host_obj)
 
-    def parse(self):
-        vt100_data_bytes_split_list = self.vt100_data_bytes.split(b'\033')
-        vt100_data_bytes_split_list_new = [x for x in vt100_data_bytes_split_list if x]  # 新列表不含空元素
-        if len(vt100_data_bytes_split_list_new) == 0:
-            print(f"Vt100ToPlaintext.parse: 本次接收到的信息拆分后列表为空")
-            return ""
-            # ★★★★★★ 对一次recv接收后的信息拆分后的每个属性块进行解析，普通输出模式 ★★★★★★
-        for block_bytes in vt100_data_bytes_split_list_new:
-            block_str = block_bytes.decode("utf8").replace("\r\n", "\n")
-            # ★匹配 [m 或 [0m  -->清除所有属性
-            match_pattern = r'^\[0{,1}m'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                # 在self.terminal_text里输出解析后的内容
-                new_block_str = block_str[ret.end():]
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                if len(new_block_str) > 0:
-                    self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [01m 到 [08m  [01;34m  [01;34;42m   -->字体风格
-            match_pattern = r'^\[([0-9]{1,2};){,3}[0-9]{1,2}m'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                new_block_str = block_str[ret.end():]
-                # output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1]
-                self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [C  [8C  -->[数字C  向右移动vt100_cursor（text_cursor光标在本轮for循环结束后，一次recv处理完成后，再显示）
-            match_pattern = r'^\[[0-9]*C'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                new_block_str = block_str[ret.end():]
-                # output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1].replace("\0", "")
-                # 有时匹配了控制序列后，在其末尾还会有回退符，这里得再匹配一次
-                self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [K  -->从当前vt100_cursor光标位置向右清除到本行行尾所有内容
-            match_pattern = r'^\[K'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                # 有时匹配了控制序列后，在其末尾还会有回退符，这里得再匹配一次
-                new_block_str = block_str[ret.end():]
-                self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [H  -->vt100_cursor光标回到屏幕开头，复杂清屏，一般vt100光标回到开头后，插入的内容会覆盖原界面的内容，未覆盖到的内容还得继续展示
-            match_pattern = r'^\[H'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                continue
-            # ★匹配 [42D  -->vt100_cursor光标左移42格，一般vt100光标回到当前行开头后，插入的内容会覆盖同行相应位置的内容，
-            # 未覆盖的地方不动它，不折行，不产生新行
-            match_pattern = r'^\[[0-9]*D'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # 匹配到之后，可能 block_bytes[ret.end():] 是新的内容，要覆盖同一行相应长度的字符
-                # need to copy_current_page_move_cursor_to_head_and_cover_content
-                new_block_str = block_str[ret.end():]
-                # output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1]
-                # print("TerminalFrontend.process_received_bytes_on_normal_mode ★匹配 [数字D -->光标左移n格，复杂清屏",
-                #       block_str.encode("utf8"))
-                self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [J  -->清空屏幕，一般和[H一起出现
-            match_pattern = r'^\[J'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: ★单独匹配到了 {match_pattern}")
-                continue
-            # ★匹配  b'\x08'  -->回退符，向左移动光标
-            match_pattern = b'\x08'
-            ret = re.search(match_pattern, block_bytes)
-            if ret is not None:
-                continue
-            # ★匹配  b'\x07'  -->响铃
-            match_pattern = b'\x07'
-            ret = re.search(match_pattern, block_bytes)
-            if ret is not None:
-                continue
-            # ★匹配  b'\x0d'  --> '\r'
-            match_pattern = '^\\r'
-            new_block_str = block_str.replace("\r\n", "\n")
-            ret = re.search(match_pattern, new_block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: ★单独匹配到了 {match_pattern}")
-                self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [6;26H  -->光标移动到指定行列，普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
-            match_pattern = r'^\[\d{1,};\d{1,}H'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 没有其他内容了，要覆盖的内容在接下来的几轮循环
-                # 如果有内容，那就输出呗
-                new_block_str = block_str[ret.end():]
-                if len(new_block_str) > 0:
-                    self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [?25h  [?2004h  -->  显示光标；普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
-            match_pattern = r'^\[\?\d{1,}h'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 有其他内容
-                new_block_str = block_str[ret.end():]
-                if len(new_block_str) > 0:
-                    self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★匹配 [?25l  [?2004l  -->  隐藏光标；普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
-            match_pattern = r'^\[\?\d{1,}l'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 之后有个\r（光标移到行首）
-                new_block_str = block_str[ret.end():]
-                if len(new_block_str) > 0:
-                    match_pattern = '^\\r'
-                    ret = re.search(match_pattern, new_block_str)
-                    if ret is not None:
-                        new_block_str2 = new_block_str[1:]
-                        self.plain_text_block_list.append(new_block_str2)
-                    else:
-                        self.plain_text_block_list.append(new_block_str)
-                continue
-            # ★★最后，未匹配到任何属性（非控制序列，非特殊字符如\x08\x07这些）则视为普通文本，使用默认颜色方案
-            # print("TerminalFrontend.process_received_bytes_on_normal_mode: 最后未匹配到任何属性，视为普通文本，使用默认颜色方案")
-            self.plain_text_block_list.append(block_str)
-        return "".join(self.plain_text_block_list)
+    def record_host_reachable(self, host_obj, is_reachable):
+        self.result_queue.put((SHARD_MSG_HOST_REACHABLE, host_obj.oid, is_reachable))
 
+    def watch_cancel_event(self, cancel_event):
+        """
+        主进程设置了cancel_event（用户停止作业）时停止本分片，
+        定时查询而不用cancel_event.wait()：进程退出时仍在wait()的线程会使主进程之后的set()一直阻塞
+        """
+        while not cancel_event.is_set():
+            time.sleep(PROCESS_SHARD_POLL_INTERVAL)
+        self.cancel()
 
-class InspectionJobRecord:
+    def run_shard(self, host_oid_list, host_index_list, job_deadline):
+        """
+        host_index_list 为各主机在主进程作业主机列表中的序号，发回主机状态时使用
+        """
+        self.start_time = time.time()
+        if job_deadline > 0:
+            self.cancel_token.deadline = job_deadline
+        self.event_bus = InspectionJobShardEventBus(result_queue=self.result_queue)
+        self.code_condition_matcher = self.create_code_condition_matcher()
+        for host_oid, host_index in zip(host_oid_list, host_index_list):
+            host_job_status_obj = HostJobStatus(host_oid=host_oid)
+            host_job_status_obj.event_bus = self.event_bus
+            host_job_status_obj.host_index = host_index
+            self.unduplicated_host_oid_list.append(host_oid)
+            self.unduplicated_host_job_status_obj_list.append(host_job_status_obj)
+        self.host_schedule_index_list = list(range(len(host_oid_list)))  # 主进程已按巡检顺序分配，不再排序
+        if self.inspection_template.adaptive_forks == COF_YES:
+            self.concurrency_controller = AdaptiveConcurrencyController(initial_limit=self.inspection_template.forks,
+                                                                        max_limit=self.get_max_forks())
+        self.output_writer = SSHOperatorOutputWriter()
+        try:
+            self.run_all_host_by_thread_pool()
+        finally:
+            self.output_writer.close()  # 等待所有主机的输出都已放入结果队列
+        self.end_time = time.time()
+        print(f"LaunchInspectionJobShard.run_shard: 分片{self.shard_index}巡检完成，主机数 {len(host_oid_list)}，",
+              "用时 {:<6.4f} 秒".format(self.end_time - self.start_time))
+
+
+class Vt100Tokenizer:
     """
-    巡检任务记录，当前的巡检作业及历史的巡检作业情况记录，具有历史性，由<LaunchInspectionJob>对象去创建或者由GlobalInfo从数据库导入生成
+    vt100数据拆分器，用一个预编译的正则对整段bytes只扫描一遍，按顺序拆分出 普通文本/CSI/OSC/其他ESC序列/单个控制字符，
+    正则的每个分组对应一种token类型（token_type_table），不再按ESC拆分后对每块逐个尝试十几个正则；
+    巡检日志转普通文本（Vt100ToPlaintext）与终端普通模式（TerminalFrontend）共用
     """
 
-    def __init__(self, name='default', description='default', oid=None, create_timestamp=None, project_oid='',
+    token_pattern = re.compile(rb'([^\x00-\x1f\x7f]+)'  # 1 普通文本，含utf8多字节字符
+                               rb'|\x1b\[([\x30-\x3f]*[\x20-\x2f]*)([\x40-\x7e])'  # 2,3 CSI 参数及中间字符，结束字符
+                               rb'|\x1b\]([^\x07\x1b]*)(?:\x07|\x1b\\)'  # 4 OSC，以BEL或ESC\结束
+                               rb'|\x1b([\x20-\x2f]*[\x30-\x7e])'  # 5 其他ESC序列
+                               rb'|([\x00-\x1f\x7f])')  # 6 单个控制字符
+    token_type_table = (None, VT100_TOKEN_TEXT, None, VT100_TOKEN_CSI, VT100_TOKEN_OSC, VT100_TOKEN_ESC, VT100_TOKEN_CTRL)
+
+    @classmethod
+    def iter_tokens(cls, data_bytes):
+        """
+        依次返回 (token_type, token_value<str>, csi_final_char<str>)，
+        CSI的token_value为参数部分（如 01;34  ?2004），csi_final_char为结束字符（如 m），其他类型的csi_final_char为''
+        """
+        token_type_table = cls.token_type_table
+        for match in cls.token_pattern.finditer(data_bytes):
+            group_index = match.lastindex
+            token_type = token_type_table[group_index]
+            if token_type == VT100_TOKEN_TEXT:
+                yield VT100_TOKEN_TEXT, match.group(1).decode('utf8', errors='replace'), ''
+            elif token_type == VT100_TOKEN_CTRL:
+                yield VT100_TOKEN_CTRL, match.group(6).decode('latin1'), ''
+            elif token_type == VT100_TOKEN_CSI:
+                yield VT100_TOKEN_CSI, match.group(2).decode('latin1'), match.group(3).decode('latin1')
+            else:
+                yield token_type, match.group(group_index).decode('utf8', errors='replace'), ''
+
+    @staticmethod
+    def get_csi_num_param(csi_params, default=1):
+        """
+        获取CSI序列的第一个数字参数，如 [8C 的8，无参数或参数为0时返回default（光标移动类序列默认移动1格）
+        """
+        num_str = csi_params.split(';', 1)[0]
+        if num_str.isdigit() and int(num_str) != 0:
+            return int(num_str)
+        return default
+
+
+class Vt100StreamDecoder:
+    """
+    分段读取的vt100数据流的增量解码器，recv每次返回的数据可能在utf8多字节字符（如中文）或控制序列（如 [01;34m）中间断开，
+    feed()只返回到最后一个完整字符/完整控制序列为止的数据，末尾不完整的部分暂存，与下一段数据拼接后再返回，
+    下游（<Vt100Tokenizer>、解码为str）拿到的都是完整的token，不会解码失败，也不会把半个控制序列当作普通文本输出；
+    一个通道（一个终端会话或一段命令输出）对应一个解码器对象
+    """
+
+    # 数据末尾不完整的控制序列：CSI还没有结束字符、OSC还没有BEL或ESC\、单独的ESC（或ESC加中间字符）
+    incomplete_sequence_pattern = re.compile(rb'\x1b(?:\[[\x30-\x3f]*[\x20-\x2f]*|\][^\x07\x1b]*\x1b?|[\x20-\x2f]*)\Z')
+
+    def __init__(self, pending_max_len=VT100_STREAM_PENDING_MAX_LEN):
+        self.pending_max_len = pending_max_len
+        self.pending_bytes = b''  # 上一段数据末尾不完整的部分
+
+    @staticmethod
+    def get_incomplete_utf8_len(data_bytes):
+        """
+        数据末尾不完整的utf8多字节字符的字节数，没有则为0
+        """
+        for back_len in range(1, min(4, len(data_bytes) + 1)):
+            byte = data_bytes[-back_len]
+            if byte & 0xC0 == 0x80:  # 后续字节，继续向前找首字节
+                continue
+            if byte >= 0xF0:
+                char_len = 4
+            elif byte >= 0xE0:
+                char_len = 3
+            elif byte >= 0xC0:
+                char_len = 2
+            else:
+                char_len = 1
+            return back_len if char_len > back_len else 0
+        return 0
+
+    @staticmethod
+    def skip_leading_continuation_bytes(data_bytes):
+        """
+        从中间截取的数据，去掉开头残缺字符的后续字节（最多3个），用于只取输出末尾一段的场景
+        """
+        start_index = 0
+        while start_index < min(3, len(data_bytes)) and data_bytes[start_index] & 0xC0 == 0x80:
+            start_index += 1
+        return data_bytes[start_index:]
+
+    def feed(self, data_bytes):
+        """
+        输入一段新数据，返回可以交给下游的完整数据<bytes>（可能为b''）
+        """
+        if self.pending_bytes:
+            data_bytes = self.pending_bytes + data_bytes
+            self.pending_bytes = b''
+        search_start = max(0, len(data_bytes) - self.pending_max_len)
+        ret = self.incomplete_sequence_pattern.search(data_bytes, search_start)
+        if ret is not None:
+            incomplete_len = len(data_bytes) - ret.start()
+        else:
+            incomplete_len = self.get_incomplete_utf8_len(data_bytes)
+        if incomplete_len == 0:
+            return data_bytes
+        self.pending_bytes = data_bytes[-incomplete_len:]
+        return data_bytes[:-incomplete_len]
+
+    def feed_tokens(self, data_bytes):
+        """
+        输入一段新数据，依次返回其中完整的token，见Vt100Tokenizer.iter_tokens()
+        """
+        return Vt100Tokenizer.iter_tokens(self.feed(data_bytes))
+
+    def flush(self):
+        """
+        数据流结束（通道关闭）时调用，返回暂存的剩余数据
+        """
+        pending_bytes, self.pending_bytes = self.pending_bytes, b''
+        return pending_bytes
+
+
+class Vt100ToPlaintext:
+    """
+    巡检命令输出（vt100数据）转为普通文本，用于保存日志文件及显示巡检日志：
+    先用一个正则一次性去掉不影响普通文本的序列（字体风格[..m、[?2004h等模式设置、[H [J、OSC窗口标题等），再按行处理，
+    不含控制字符的行（绝大多数）直接解码，其余的行由<Vt100Tokenizer>拆分后按token类型查表处理，模拟光标位置：
+    \r回到行首，\b及[nD左移，[nC右移，[K清除到行尾，光标不在行尾时后输出的字符覆盖原有字符，宽字符（中文等）占两列
+    """
+
+    # 不影响普通文本的序列，以及NUL、响铃、SI
+    noop_sequence_pattern = re.compile(rb'\x1b\[[\x30-\x3f]*[\x20-\x2f]*[mhlHJ]'
+                                       rb'|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)'
+                                       rb'|\x1b[\x20-\x2f]*[\x30-\x5a\x5c\x5e-\x7e]'
+                                       rb'|[\x00\x07\x0f]')
+    special_char_pattern = re.compile(rb'[\x00-\x1f\x7f]')
+
+    def __init__(self, vt100_data_bytes=b''):
+        self.vt100_data_bytes = vt100_data_bytes
+        self.plain_text_line_list = []  # 已换行的行
+        self.cell_list = []  # 当前行，一列一个元素，宽字符占两列，其第二列为''
+        self.cursor = 0  # 光标在当前行的列号
+        self.csi_handler_table = {'C': self.csi_cursor_forward,
+                                  'D': self.csi_cursor_backward,
+                                  'G': self.csi_cursor_column,
+                                  'K': self.csi_erase_in_line,
+                                  'P': self.csi_delete_chars,
+                                  '@': self.csi_insert_blanks,
+                                  'X': self.csi_erase_chars}
+        self.ctrl_handler_table = {'\r': self.ctrl_carriage_return,
+                                   '\x08': self.ctrl_backspace,
+                                   '\t': self.ctrl_tab}
+
+    def parse(self):
+        data_bytes = self.noop_sequence_pattern.sub(b'', self.vt100_data_bytes).replace(b'\r\n', b'\n')
+        search_special_char = self.special_char_pattern.search
+        plain_text_line_list = self.plain_text_line_list
+        for line_bytes in data_bytes.split(b'\n'):
+            line_bytes = line_bytes.rstrip(b'\r')  # 行尾的\r（如 \r\r\n）不影响本行内容
+            if search_special_char(line_bytes) is None:
+                plain_text_line_list.append(line_bytes.decode('utf8', errors='replace'))
+            else:
+                plain_text_line_list.append(self.parse_line(line_bytes))
+        return "\n".join(plain_text_line_list)
+
+    def parse_line(self, line_bytes):
+        """
+        处理一行（不含\n）中的光标移动及覆盖，返回该行最终显示的文本
+        """
+        self.cell_list = []
+        self.cursor = 0
+        csi_handler_table = self.csi_handler_table
+        ctrl_handler_table = self.ctrl_handler_table
+        for token_type, token_value, csi_final_char in Vt100Tokenizer.iter_tokens(line_bytes):
+            if token_type == VT100_TOKEN_TEXT:
+                self.put_text(token_value)
+            elif token_type == VT100_TOKEN_CTRL:
+                handler = ctrl_handler_table.get(token_value)
+                if handler is not None:  # 其他控制字符直接忽略
+                    handler()
+            elif token_type == VT100_TOKEN_CSI:
+                handler = csi_handler_table.get(csi_final_char)
+                if handler is not None and not token_value.startswith('?'):  # 字体风格[..m、[?25h等模式设置不影响普通文本
+                    handler(token_value)
+            # OSC（如设置窗口标题）及其他ESC序列不产生普通文本
+        return "".join(self.cell_list)
+
+    def put_text(self, text):
+        cell_list = self.cell_list
+        if text.isascii():  # 最常见的情况：都是单宽度字符，整段追加或覆盖
+            cursor = self.cursor
+            end = cursor + len(text)
+            if cursor > len(cell_list):
+                cell_list.extend(' ' * (cursor - len(cell_list)))
+            elif cursor < len(cell_list) and cell_list[cursor] == '' and cursor > 0:
+                cell_list[cursor - 1] = ' '  # 覆盖了宽字符的后一半，前一半变为空格
+            if end < len(cell_list) and cell_list[end] == '':
+                cell_list[end] = ' '  # 覆盖了宽字符的前一半，后一半变为空格
+            cell_list[cursor:end] = text
+            self.cursor = end
+            return
+        for char in text:
+            if unicodedata.east_asian_width(char) in ('W', 'F'):
+                self.put_cell(char)
+                self.put_cell('')
+            elif unicodedata.combining(char) and self.cursor > 0:
+                cell_list[self.cursor - 1] += char  # 组合字符附加到前一个字符上，不占列
+            else:
+                self.put_cell(char)
+
+    def put_cell(self, char):
+        cell_list = self.cell_list
+        cursor = self.cursor
+        if cursor >= len(cell_list):
+            cell_list.extend(' ' * (cursor - len(cell_list)))
+            cell_list.append(char)
+        else:
+            # 覆盖宽字符的一半时，另一半变为空格
+            if cell_list[cursor] == '' and cursor > 0 and char != '':
+                cell_list[cursor - 1] = ' '
+            if cursor + 1 < len(cell_list) and cell_list[cursor + 1] == '' and cell_list[cursor] != '':
+                cell_list[cursor + 1] = ' '
+            cell_list[cursor] = char
+        self.cursor = cursor + 1
+
+    def ctrl_carriage_return(self):
+        self.cursor = 0
+
+    def ctrl_backspace(self):
+        if self.cursor > 0:
+            self.cursor -= 1
+
+    def ctrl_tab(self):
+        next_tab_stop = (self.cursor // 8 + 1) * 8
+        if self.cursor >= len(self.cell_list):
+            self.cell_list.extend(' ' * (next_tab_stop - self.cursor))
+        self.cursor = next_tab_stop
+
+    def csi_cursor_forward(self, csi_params):
+        self.cursor += Vt100Tokenizer.get_csi_num_param(csi_params)
+
+    def csi_cursor_backward(self, csi_params):
+        self.cursor = max(0, self.cursor - Vt100Tokenizer.get_csi_num_param(csi_params))
+
+    def csi_cursor_column(self, csi_params):
+        self.cursor = Vt100Tokenizer.get_csi_num_param(csi_params) - 1
+
+    def csi_erase_in_line(self, csi_params):
+        mode = csi_params.split(';', 1)[0]
+        if mode in ('', '0'):  # 清除光标到行尾
+            del self.cell_list[self.cursor:]
+        elif mode == '1':  # 清除行首到光标
+            for index in range(min(self.cursor + 1, len(self.cell_list))):
+                self.cell_list[index] = ' '
+        elif mode == '2':  # 清除整行
+            self.cell_list = []
+
+    def csi_delete_chars(self, csi_params):
+        del self.cell_list[self.cursor:self.cursor + Vt100Tokenizer.get_csi_num_param(csi_params)]
+
+    def csi_insert_blanks(self, csi_params):
+        if self.cursor < len(self.cell_list):
+            self.cell_list[self.cursor:self.cursor] = [' '] * Vt100Tokenizer.get_csi_num_param(csi_params)
+
+    def csi_erase_chars(self, csi_params):
+        for index in range(self.cursor, min(self.cursor + Vt100Tokenizer.get_csi_num_param(csi_params), len(self.cell_list))):
+            self.cell_list[index] = ' '
+
+
+class InspectionJobRecord:
+    """
+    巡检任务记录，当前的巡检作业及历史的巡检作业情况记录，具有历史性，由<LaunchInspectionJob>对象去创建或者由GlobalInfo从数据库导入生成
+    """
+
+    def __init__(self, name='default', description='default', oid=None, create_timestamp=None, project_oid='',
                  inspection_template_oid='', job_state=INSPECTION_JOB_EXEC_STATE_UNKNOWN, unduplicated_host_job_status_obj_list=None,
-                 global_info=None, start_time=0.0, end_time=0.0):
+                 global_info=None, start_time=0.0, end_time=0.0, concurrency_history=''):
         if oid is None:
             self.oid = uuid.uuid4().__str__()  # <str> 同<LaunchInspectionJob>对象的属性
         else:
@@ -1842,26 +3133,41 @@ class InspectionJobRecord:
         self.global_info = global_info  # 同<LaunchInspectionJob>对象的属性
         self.start_time = start_time  # <float> 同<LaunchInspectionJob>对象的属性
         self.end_time = end_time  # <float> 同<LaunchInspectionJob>对象的属性
+        self.concurrency_history = concurrency_history  # <str> 自适应并发数的变化过程，格式为 秒数:并发数,秒数:并发数，未开启时为空
+        # ★从数据库加载作业记录时只加载作业信息，主机作业状态列表在查看作业详情时才加载，见GlobalInfo.load_inspection_job_record_host_job_status()
+        self.is_host_job_status_loaded = True  # <bool> unduplicated_host_job_status_obj_list是否已是完整的
+
+    def get_summary_dict(self):
+        """
+        作业摘要，无界面运行时转为json输出，供脚本或监控系统读取
+        """
+        status_name_list = ["unknown", "started", "completed", "part_completed", "failed"]
+        inspection_template_obj = self.global_info.get_inspection_template_by_oid(self.inspection_template_oid)
+        status_count_dict = {status_name: 0 for status_name in status_name_list}
+        host_summary_list = []
+        for host_job_status_obj in self.unduplicated_host_job_status_obj_list:
+            host_obj = self.global_info.get_host_by_oid(host_job_status_obj.host_oid)
+            status_count_dict[status_name_list[host_job_status_obj.job_status]] += 1
+            host_summary_list.append({"host": "Unknown!" if host_obj is None else host_obj.name,
+                                      "address": "" if host_obj is None else host_obj.address,
+                                      "status": status_name_list[host_job_status_obj.job_status],
+                                      "exec_timeout": host_job_status_obj.exec_timeout == COF_YES,
+                                      "progress": f"{host_job_status_obj.current_exec_code_num}/{host_job_status_obj.sum_of_code_lines}",
+                                      "time_usage": round(max(host_job_status_obj.end_time - host_job_status_obj.start_time, 0.0), 3)})
+        return {"job_oid": self.oid,
+                "job_name": self.name,
+                "template": "" if inspection_template_obj is None else inspection_template_obj.name,
+                "job_state": status_name_list[self.job_state],
+                "start_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.start_time)),
+                "time_usage": round(max(self.end_time - self.start_time, 0.0), 3),
+                "host_num": len(self.unduplicated_host_job_status_obj_list),
+                "host_status_count": status_count_dict,
+                "hosts": host_summary_list}
 
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_record'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_record"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_inspection_job_record  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "inspection_template_oid varchar(36),",
-                        "job_state int,",
-                        "start_time double,",
-                        "end_time double )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_inspection_job_record where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -1873,7 +3179,8 @@ class InspectionJobRecord:
                         "inspection_template_oid,",
                         "job_state,",
                         "start_time,",
-                        "end_time ) values",
+                        "end_time,",
+                        "concurrency_history ) values",
                         f"('{self.oid}',",
                         f"'{self.name}',",
                         f"'{self.description}',",
@@ -1881,32 +3188,15 @@ class InspectionJobRecord:
                         f"'{self.inspection_template_oid}',",
                         f"{self.job_state},",
                         f"{self.start_time},",
-                        f"{self.end_time} )"]
+                        f"{self.end_time},",
+                        f"'{self.concurrency_history}' )"]
             sqlite_cursor.execute(" ".join(sql_list))
         else:  # ★★ 若查询到有此项记录，则不用更新此项记录 ★★
             pass
-        # ★查询是否有名为'tb_inspection_job_record_host_job_status_obj_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_record_host_job_status_obj_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql_list = ["create table tb_inspection_job_record_host_job_status_obj_list",
-                        "(job_record_oid varchar(36),",
-                        "host_oid varchar(36),",
-                        "job_status int,",
-                        "find_credential_status int,",
-                        "exec_timeout int,",
-                        "start_time double,",
-                        "end_time double,",
-                        "sum_of_code_block int,",
-                        "current_exec_code_block int,",
-                        "sum_of_code_lines int,",
-                        "current_exec_code_num int",
-                        " );"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        if not self.is_host_job_status_loaded:  # 主机作业状态还未从数据库加载，不能用空列表覆盖数据库里的记录
+            return
         # 开始插入数据
-        sql = f"delete from tb_inspection_job_record_host_job_status_obj_list where host_oid='{self.oid}'"
+        sql = f"delete from tb_inspection_job_record_host_job_status_obj_list where job_record_oid='{self.oid}'"
         sqlite_cursor.execute(sql)  # ★先清空所有，再重新插入（既可用于新建，又可用于更新）
         for host_job_status_obj in self.unduplicated_host_job_status_obj_list:
             sql_list = [f"insert into tb_inspection_job_record_host_job_status_obj_list (job_record_oid,",
@@ -1934,9 +3224,6 @@ class InspectionJobRecord:
                         f"{host_job_status_obj.current_exec_code_num}",
                         ")"]
             sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
 
 
 class OneLineCode:
@@ -1946,7 +3233,9 @@ class OneLineCode:
 
     def __init__(self, code_index=0, code_content='', code_post_wait_time=CODE_POST_WAIT_TIME_DEFAULT,
                  need_interactive=COF_NO, interactive_question_keyword='', interactive_answer='',
-                 interactive_process_method=INTERACTIVE_PROCESS_METHOD_ONETIME, description=''):
+                 interactive_process_method=INTERACTIVE_PROCESS_METHOD_ONETIME, description='', label='',
+                 condition_type=CODE_CONDITION_NONE, condition_pattern='', condition_action=CODE_CONDITION_ACTION_SKIP_REST,
+                 condition_goto_label=''):
         self.code_index = code_index  # <int>
         self.code_content = code_content  # <str>
         self.code_post_wait_time = code_post_wait_time  # <float>
@@ -1955,6 +3244,112 @@ class OneLineCode:
         self.interactive_answer = interactive_answer  # <str>
         self.interactive_process_method = interactive_process_method  # <int>
         self.description = description  # <str>
+        self.label = label  # <str> 标签，同一巡检代码块里其他命令的执行条件可跳转到此命令
+        self.condition_type = condition_type  # <int> 执行条件 CODE_CONDITION_*，本行命令执行完成后判断
+        self.condition_pattern = condition_pattern  # <str> 执行条件为输出匹配/不匹配时的正则
+        self.condition_action = condition_action  # <int> 满足执行条件时的动作 CODE_CONDITION_ACTION_*
+        self.condition_goto_label = condition_goto_label  # <str> 动作为CODE_CONDITION_ACTION_GOTO_LABEL时跳转到的标签
+
+    def has_condition(self):
+        return self.condition_type != CODE_CONDITION_NONE
+
+
+class CodeConditionMatcher:
+    """
+    命令执行条件判断，巡检作业开始时创建（每个作业一个，所有主机共用），所有巡检代码块命令的条件正则及跳转目标只在这里计算一次，
+    每行有执行条件的命令执行完成后，由SSHOperator.get_next_cmd_index()调用get_next_cmd_index()得到下一条要执行的命令
+    ★条件正则只匹配命令本身的输出：invoke_shell方式去掉开头的命令行回显及末尾的shell提示符，exec_command/脚本执行方式为stdout及stderr
+    """
+
+    def __init__(self, inspection_code_block_obj_list=None):
+        self.pattern_dict = {}  # key为(inspection_code_block_oid, cmd_index)，value为编译好的条件正则<re.Pattern>
+        self.goto_index_dict = {}  # key为(inspection_code_block_oid, cmd_index)，value为跳转到的命令序号
+        for inspection_code_block_obj in inspection_code_block_obj_list or []:
+            self.add_inspection_code_block(inspection_code_block_obj)
+
+    def add_inspection_code_block(self, inspection_code_block_obj):
+        code_list = inspection_code_block_obj.code_list
+        for cmd_index, one_line_code in enumerate(code_list):
+            key = (inspection_code_block_obj.oid, cmd_index)
+            if one_line_code.condition_type in (CODE_CONDITION_OUTPUT_MATCH, CODE_CONDITION_OUTPUT_NOT_MATCH):
+                try:
+                    self.pattern_dict[key] = re.compile(one_line_code.condition_pattern, re.I | re.M)
+                except re.error as err:
+                    print(f"CodeConditionMatcher.add_inspection_code_block: 巡检代码块 {inspection_code_block_obj.name}",
+                          f"命令{cmd_index} 的条件正则有误，不判断此条件 {err}")
+            if one_line_code.has_condition() and one_line_code.condition_action == CODE_CONDITION_ACTION_GOTO_LABEL:
+                for goto_index in range(cmd_index + 1, len(code_list)):  # 只能向后跳，不会死循环
+                    if code_list[goto_index].label == one_line_code.condition_goto_label:
+                        self.goto_index_dict[key] = goto_index
+                        break
+                else:
+                    print(f"CodeConditionMatcher.add_inspection_code_block: 巡检代码块 {inspection_code_block_obj.name}",
+                          f"命令{cmd_index} 之后没有标签 {one_line_code.condition_goto_label} ，满足条件时跳过剩余命令")
+
+    def is_condition_met(self, inspection_code_block_obj, cmd_index, one_line_code, ssh_opt_output_obj, shell_prompt_str=''):
+        if one_line_code.condition_type in (CODE_CONDITION_EXIT_STATUS_NONZERO, CODE_CONDITION_EXIT_STATUS_ZERO):
+            if ssh_opt_output_obj.exec_command_exit_status is None:  # invoke_shell方式或超时未获取到退出码
+                return False
+            is_nonzero = ssh_opt_output_obj.exec_command_exit_status != 0
+            return is_nonzero == (one_line_code.condition_type == CODE_CONDITION_EXIT_STATUS_NONZERO)
+        pattern = self.pattern_dict.get((inspection_code_block_obj.oid, cmd_index))
+        if pattern is None:
+            return False
+        if ssh_opt_output_obj.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:
+            output_str = "".join(ssh_opt_output_obj.exec_command_stdout_line_list + ssh_opt_output_obj.exec_command_stderr_line_list)
+        else:
+            output_str = self.get_invoke_shell_output_text(ssh_opt_output_obj, shell_prompt_str)
+        is_matched = pattern.search(output_str) is not None
+        return is_matched == (one_line_code.condition_type == CODE_CONDITION_OUTPUT_MATCH)
+
+    @staticmethod
+    def get_invoke_shell_output_text(ssh_opt_output_obj, shell_prompt_str):
+        """
+        invoke_shell方式的输出去掉开头的命令行回显（命令较长时终端会折行回显为多行）及末尾的shell提示符，只留命令本身的输出，
+        条件正则才不会匹配到命令里的内容，如 show version | include Cisco 的输出不匹配Cisco时条件才成立
+        """
+        line_list = ssh_opt_output_obj.get_plain_text().split('\n')
+        code_compact_str = "".join((ssh_opt_output_obj.code_content or '').split())  # 去掉所有空白字符后比较，折行处的空格不影响
+        if code_compact_str != '':
+            echo_compact_str = ''
+            for line_index, line in enumerate(line_list):
+                echo_compact_str += "".join(line.split())
+                if line_index == 0 and echo_compact_str.endswith(code_compact_str):  # 回显的命令行前面可能还有shell提示符
+                    echo_compact_str = code_compact_str
+                if echo_compact_str == code_compact_str:
+                    line_list = line_list[line_index + 1:]
+                    break
+                if echo_compact_str == '' or not code_compact_str.startswith(echo_compact_str):
+                    break  # 不是命令行回显（如shell已关闭回显），不去掉
+        while len(line_list) != 0 and line_list[-1].strip() == '':
+            line_list.pop()
+        # 学习到的shell提示符里可能有控制序列（如bash的\x1b[?2004h），转为普通文本后再比较
+        prompt_str = Vt100ToPlaintext(vt100_data_bytes=shell_prompt_str.encode('utf8')).parse().strip()
+        if prompt_str != '' and len(line_list) != 0 and line_list[-1].strip() == prompt_str:
+            line_list.pop()
+        return '\n'.join(line_list)
+
+    def get_next_cmd_index(self, inspection_code_block_obj, cmd_index, ssh_opt_output_obj, shell_prompt_str=''):
+        """
+        返回 (next_cmd_index, is_host_aborted)，next_cmd_index为len(code_list)时表示本巡检代码块已没有要执行的命令，
+        shell_prompt_str为当前的shell提示符，判断invoke_shell方式的输出时去掉它
+        """
+        code_list = inspection_code_block_obj.code_list
+        one_line_code = code_list[cmd_index]
+        if not one_line_code.has_condition() or ssh_opt_output_obj is None or ssh_opt_output_obj.code_index != cmd_index \
+                or not self.is_condition_met(inspection_code_block_obj, cmd_index, one_line_code, ssh_opt_output_obj,
+                                             shell_prompt_str):
+            return cmd_index + 1, False
+        if one_line_code.condition_action == CODE_CONDITION_ACTION_ABORT_HOST:
+            print(f"CodeConditionMatcher.get_next_cmd_index: 巡检代码块 {inspection_code_block_obj.name} 命令{cmd_index}",
+                  "满足执行条件，终止本主机巡检")
+            return len(code_list), True
+        next_cmd_index = len(code_list)
+        if one_line_code.condition_action == CODE_CONDITION_ACTION_GOTO_LABEL:
+            next_cmd_index = self.goto_index_dict.get((inspection_code_block_obj.oid, cmd_index), len(code_list))
+        print(f"CodeConditionMatcher.get_next_cmd_index: 巡检代码块 {inspection_code_block_obj.name} 命令{cmd_index}",
+              f"满足执行条件，跳到命令{next_cmd_index}（共{len(code_list)}条）")
+        return next_cmd_index, False
 
 
 class SSHOperatorOutput:
@@ -1965,7 +3360,7 @@ class SSHOperatorOutput:
     def __init__(self, code_index=0, code_content=None, code_exec_method=CODE_EXEC_METHOD_INVOKE_SHELL,
                  invoke_shell_output_bytes=None, invoke_shell_output_last_line_str=None, is_empty_output=False,
                  interactive_output_bytes_list=None, exec_command_stdout_line_list=None,
-                 exec_command_stderr_line_list=None, inspection_code_block_oid=""):
+                 exec_command_stderr_line_list=None, inspection_code_block_oid="", exec_command_exit_status=None):
         self.code_index = code_index  # <int> 命令序号
         self.code_content = code_content  # <str> 命令内容，一行
         self.code_exec_method = code_exec_method  # <int> 默认是CODE_EXEC_METHOD_INVOKE_SHELL
@@ -1991,171 +3386,3196 @@ class SSHOperatorOutput:
             self.exec_command_stderr_line_list = exec_command_stderr_line_list  # <list> 元素为 str_line <str>
         self.is_empty_output = is_empty_output
         self.inspection_code_block_oid = inspection_code_block_oid
+        self.exec_command_exit_status = exec_command_exit_status  # <int> exec_command方式的退出码，未获取到（如超时）为None
 
+    def get_plain_text(self):
+        """
+        转为显示及保存到文件用的普通文本，invoke_shell输出为vt100数据，需要先解析；
+        exec_command方式没有shell回显，先输出一行命令内容，再依次输出stdout、stderr，退出码不为0时最后注明退出码
+        """
+        if self.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:
+            text_list = []
+            if self.code_content:
+                text_list.append(f"$ {self.code_content}\n")
+            text_list.extend(self.exec_command_stdout_line_list)
+            text_list.extend(self.exec_command_stderr_line_list)
+            if len(text_list) != 0 and not text_list[-1].endswith("\n"):
+                text_list.append("\n")
+            if self.exec_command_exit_status is None:
+                text_list.append("[exit status: unknown]\n")
+            elif self.exec_command_exit_status != 0:
+                text_list.append(f"[exit status: {self.exec_command_exit_status}]\n")
+            return "".join(text_list)
+        text_list = [Vt100ToPlaintext(vt100_data_bytes=self.invoke_shell_output_bytes).parse()]
+        for interactive_output_bytes in self.interactive_output_bytes_list:
+            text_list.append(Vt100ToPlaintext(vt100_data_bytes=interactive_output_bytes).parse())
+        return "".join(text_list)
+
+
+class SSHOperatorOutputSink:
+    """
+    巡检命令输出接收端的基类，<SSHOperator>每执行完一条命令就把<SSHOperatorOutput>交给<SSHOperatorOutputPipeline>，
+    由它依次调用各接收端的write_output()，子类按需实现write_output()/flush()/flush_if_due()/close()
+    """
 
-class SSHOperator:
+    def write_output(self, ssh_operator_output_obj):
+        pass
+
+    def flush(self):
+        pass
+
+    def flush_if_due(self):
+        """
+        输出写入线程定时调用，有暂存超时的输出时写出，长时间执行的命令期间没有新输出时也不会一直暂存
+        """
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class SSHOperatorOutputPlaintextSink(SSHOperatorOutputSink):
     """
-    一个<SSHOperator>对象负责一台主机的ssh会话建议与关闭，目前只支持invoke_shell交互式shell，
-    每次调用 run_invoke_shell()函数去操作一个<InspectionCodeBlock>巡检代码块的所有命令
+    把每条命令的输出转为普通文本（见SSHOperatorOutput.get_plain_text()），交给write_func(text)，如sys.stdout.write
     """
 
-    def __init__(self, hostname='', username='', password='', private_key='', port=22,
-                 timeout=30, auth_method=AUTH_METHOD_SSH_PASS, host_job_status_obj=None):
-        self.oid = uuid.uuid4().__str__()  # <str>
-        self.hostname = hostname
-        self.username = username
-        self.password = password
-        self.private_key = private_key
-        self.port = port
-        self.timeout = timeout  # 单位:秒
-        self.auth_method = auth_method
-        # self.command_list = command_list  # ★★元素为 <OneLineCode> 对象★★
-        self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN  # run_invoke_shell() 执行完成情况，每次执行前要先置为 UNKNOWN
-        self.output_list = []  # 元素类型为 <SSHOperatorOutput>，一条执行命令<OneLineCode>只产生一个output对象
-        self.host_job_status_obj = host_job_status_obj  # <HostJobStatus>
-        self.ssh_client = None
-        self.ssh_shell = None
+    def __init__(self, write_func=None):
+        self.write_func = write_func
 
-    def create_invoke_shell(self):
+    def write_output(self, ssh_operator_output_obj):
+        self.write_func(ssh_operator_output_obj.get_plain_text())
+
+
+class SSHOperatorOutputFileSink(SSHOperatorOutputPlaintextSink):
+    """
+    普通文本追加写入主机的巡检日志文件，收到第一条输出时才打开文件，每条输出写入后即flush
+    """
+
+    def __init__(self, file_name=''):
+        super().__init__(write_func=self.write_to_file)
+        self.file_name = file_name
+        self.file_obj = None
+
+    def write_to_file(self, plain_text):
+        if self.file_obj is None:
+            self.file_obj = open(self.file_name, 'a', encoding='utf8')  # 追加，不存在则新建
+        self.file_obj.write(plain_text)
+        self.file_obj.flush()
+
+    def close(self):
+        if self.file_obj is not None:
+            self.file_obj.close()
+            self.file_obj = None
+
+
+class SSHOperatorOutputSqliteSink(SSHOperatorOutputSink):
+    """
+    命令输出压缩后暂存为数据库行数据，暂存的字节数超过buffer_budget或暂存超过OUTPUT_SINK_FLUSH_INTERVAL秒，
+    就交给数据库写线程写入（不等待写入完成），内存里只保留压缩后的一小段输出
+    """
+
+    def __init__(self, sqlite_storage=None, job_oid='', host_obj=None, buffer_budget=OUTPUT_SINK_HOST_BUFFER_BUDGET):
+        self.sqlite_storage = sqlite_storage
+        self.job_oid = job_oid  # LaunchInspectionJob的oid，也同InspectionJobRecord的oid
+        self.host_obj = host_obj
+        self.buffer_budget = buffer_budget
+        self.output_row_list = []
+        self.interactive_output_row_list = []  # 一行为SSHOperatorOutput.interactive_output_bytes_list的一个元素
+        self.buffered_bytes = 0
+        self.last_flush_time = time.time()
+
+    def write_output(self, ssh_operator_output_obj):
+        self.add_output_row(ssh_operator_output_obj)
+        if self.buffered_bytes >= self.buffer_budget or time.time() - self.last_flush_time >= OUTPUT_SINK_FLUSH_INTERVAL:
+            self.flush()
+
+    def add_output_row(self, code_output):
+        # ★★★一条命令的输出为一行记录，输出内容压缩后以BLOB保存，output_format记录压缩格式★★★
+        output_format, invoke_shell_output_blob = cofable_compress_output_bytes(code_output.invoke_shell_output_bytes)
+        if code_output.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:  # exec_command方式的stdout保存在invoke_shell_output_blob
+            _, exec_command_stderr_blob = cofable_compress_output_bytes("".join(code_output.exec_command_stderr_line_list).encode('utf8'))
+            self.buffered_bytes += len(exec_command_stderr_blob)
+        else:
+            exec_command_stderr_blob = None
+        self.output_row_list.append((self.job_oid, self.host_obj.oid, code_output.inspection_code_block_oid, self.host_obj.project_oid,
+                                     code_output.code_index, code_output.code_exec_method,
+                                     output_format, invoke_shell_output_blob, code_output.invoke_shell_output_last_line_str,
+                                     exec_command_stderr_blob, code_output.exec_command_exit_status))
+        self.buffered_bytes += len(invoke_shell_output_blob)
+        for index, interactive_output_bytes in enumerate(code_output.interactive_output_bytes_list):
+            output_format, interactive_output_blob = cofable_compress_output_bytes(interactive_output_bytes)
+            self.interactive_output_row_list.append((self.job_oid, self.host_obj.oid, code_output.inspection_code_block_oid,
+                                                     self.host_obj.project_oid, code_output.code_index, index,
+                                                     output_format, interactive_output_blob))
+            self.buffered_bytes += len(interactive_output_blob)
+
+    def flush_if_due(self):
+        if len(self.output_row_list) != 0 and time.time() - self.last_flush_time >= OUTPUT_SINK_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        self.last_flush_time = time.time()
+        if len(self.output_row_list) == 0:
+            return
+        output_row_list, self.output_row_list = self.output_row_list, []
+        interactive_output_row_list, self.interactive_output_row_list = self.interactive_output_row_list, []
+        self.buffered_bytes = 0
+        self.submit_output_rows(output_row_list, interactive_output_row_list)
+
+    def submit_output_rows(self, output_row_list, interactive_output_row_list):
+        # 交给数据库写线程在其事务里写入，巡检线程不用等待写入完成
+        self.sqlite_storage.execute_write(
+            lambda sqlite_cursor: self.write_output_rows_to_sqlite(sqlite_cursor, output_row_list, interactive_output_row_list),
+            wait=False)
+
+    @staticmethod
+    def write_output_rows_to_sqlite(sqlite_cursor, output_row_list, interactive_output_row_list):
+        # 用executemany绑定参数一次性插入，已存在的记录由唯一索引判断并忽略
+        sql_list = ["insert or ignore into tb_inspection_job_invoke_shell_output (job_oid,",
+                    "host_oid,",
+                    "inspection_code_oid,",
+                    "project_oid,",
+                    "code_index,",
+                    "code_exec_method,",
+                    "output_format,",
+                    "invoke_shell_output_blob,",
+                    "invoke_shell_output_last_line_str,",
+                    "exec_command_stderr_blob,",
+                    "exec_command_exit_status )  values ",
+                    "( ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )"]
+        sqlite_cursor.executemany(" ".join(sql_list), output_row_list)
+        sql_list = ["insert or ignore into tb_inspection_job_invoke_shell_interactive_output (job_oid,",
+                    "host_oid,",
+                    "inspection_code_oid,",
+                    "project_oid,",
+                    "code_index,",
+                    "code_exec_interactive_output_index,",
+                    "output_format,",
+                    "interactive_output_blob )  values ",
+                    "( ?, ?, ?, ?, ?, ?, ?, ? )"]
+        sqlite_cursor.executemany(" ".join(sql_list), interactive_output_row_list)
+
+
+class SSHOperatorOutputShardSink(SSHOperatorOutputSqliteSink):
+    """
+    多进程分片模式下工作进程里的输出接收器，输出同样在本进程压缩为数据库行数据，
+    flush时不写数据库，而是放入结果队列发回主进程，由主进程的数据库写线程写入
+    """
+
+    def __init__(self, result_queue=None, job_oid='', host_obj=None, buffer_budget=OUTPUT_SINK_HOST_BUFFER_BUDGET):
+        super().__init__(sqlite_storage=None, job_oid=job_oid, host_obj=host_obj, buffer_budget=buffer_budget)
+        self.result_queue = result_queue  # <multiprocessing.Queue>
+
+    def submit_output_rows(self, output_row_list, interactive_output_row_list):
+        self.result_queue.put((SHARD_MSG_OUTPUT_ROWS, output_row_list, interactive_output_row_list))
+
+
+class SSHOperatorOutputPipeline:
+    """
+    一台主机的巡检命令输出接收管道，<SSHOperator>每执行完一条命令（含交互输出）就调用push()，
+    输出依次交给各接收端<SSHOperatorOutputSink>（文件、数据库、普通文本等）后即丢弃，内存占用不随命令数增长；
+    有output_writer<SSHOperatorOutputWriter>时，push()/flush()/close()只是放入写入线程的队列，
+    压缩、写文件都在写入线程里完成，不占用巡检线程及asyncio事件循环线程；
+    队列已满时，block为True的push()等待，asyncio事件循环线程里用block=False放入，再由协程await async_wait_writable()
+    """
+
+    def __init__(self, sink_list=None, output_writer=None):
+        if sink_list is None:
+            self.sink_list = []
+        else:
+            self.sink_list = sink_list
+        self.output_num = 0  # 已接收的输出条数
+        self.output_writer = output_writer
+        self.writer_index = -1  # 由output_writer的哪个写入线程处理，同一管道的操作都在同一线程里按顺序执行
+        if self.output_writer is not None:
+            self.writer_index = self.output_writer.add_pipeline(self)
+
+    def push(self, ssh_operator_output_obj, block=True):
+        self.output_num += 1
+        if self.output_writer is None:
+            self.write_to_sinks(ssh_operator_output_obj)
+        else:
+            self.output_writer.submit(self.writer_index, lambda: self.write_to_sinks(ssh_operator_output_obj), block=block)
+
+    async def async_wait_writable(self, loop):
         """
-        建立连接，创建交互式shell
+        协程等待写入线程的队列有空位，不阻塞事件循环线程
         """
-        # ★★创建ssh连接★★
-        self.ssh_client = paramiko.client.SSHClient()
-        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 允许连接host_key不在know_hosts文件里的主机
-        try:
-            if self.auth_method == AUTH_METHOD_SSH_PASS:
-                print("SSHOperator.create_invoke_shell : 使用ssh_password密码登录")
-                self.ssh_client.connect(hostname=self.hostname, port=self.port, username=self.username,
-                                        password=self.password, timeout=self.timeout)
-            elif self.auth_method == AUTH_METHOD_SSH_KEY:
-                prikey_string_io = io.StringIO(self.private_key)
-                pri_key = paramiko.RSAKey.from_private_key(prikey_string_io)
-                print("SSHOperator.create_invoke_shell : 使用ssh_priKey密钥登录")
-                self.ssh_client.connect(hostname=self.hostname, port=self.port, username=self.username,
-                                        pkey=pri_key, timeout=self.timeout)
-            else:
+        if self.output_writer is not None:
+            await self.output_writer.async_wait_writable(loop, self.writer_index)
+
+    def write_to_sinks(self, ssh_operator_output_obj):
+        for sink in self.sink_list:
+            try:
+                sink.write_output(ssh_operator_output_obj)
+            except Exception as err:  # 某个接收端出错（如磁盘已满），不影响其他接收端及命令继续执行
+                print(f"SSHOperatorOutputPipeline.write_to_sinks: {sink.__class__.__name__} {err}")
+
+    def flush(self):
+        if self.output_writer is None:
+            self.flush_sinks()
+        else:
+            self.output_writer.submit(self.writer_index, self.flush_sinks)
+
+    def flush_sinks(self):
+        for sink in self.sink_list:
+            try:
+                sink.flush()
+            except Exception as err:
+                print(f"SSHOperatorOutputPipeline.flush_sinks: {sink.__class__.__name__} {err}")
+
+    def flush_sinks_if_due(self):
+        for sink in self.sink_list:
+            try:
+                sink.flush_if_due()
+            except Exception as err:
+                print(f"SSHOperatorOutputPipeline.flush_sinks_if_due: {sink.__class__.__name__} {err}")
+
+    def close(self):
+        if self.output_writer is None:
+            self.close_sinks()
+        else:
+            self.output_writer.remove_pipeline(self)
+
+    def close_sinks(self):
+        for sink in self.sink_list:
+            try:
+                sink.close()
+            except Exception as err:
+                print(f"SSHOperatorOutputPipeline.close_sinks: {sink.__class__.__name__} {err}")
+
+
+class SSHOperatorOutputWriter:
+    """
+    巡检作业的输出写入线程，一个作业一个，各主机输出接收管道<SSHOperatorOutputPipeline>的操作都放入队列，由写入线程调用各接收端，
+    每个管道固定由其中一个线程处理（轮流分配），同一管道的输出按顺序写入，接收端不用加锁；
+    每隔OUTPUT_SINK_FLUSH_INTERVAL秒检查本线程的各管道，把暂存超时的输出写出（flush_sinks_if_due()）；
+    每个写入线程待处理的任务数达到OUTPUT_WRITER_QUEUE_SIZE时，巡检线程的submit()等待，
+    asyncio事件循环线程里不等待（block=False，最多超出同时巡检的主机数），由协程await async_wait_writable()等待，不卡住事件循环；
+    作业结束时调用close()，等待队列里的输出都处理完成
+    """
+
+    def __init__(self, thread_num=OUTPUT_WRITER_THREAD_NUM, queue_size=OUTPUT_WRITER_QUEUE_SIZE):
+        self.task_queue_list = [queue.Queue() for _ in range(thread_num)]
+        self.pipeline_set_list = [set() for _ in range(thread_num)]  # 各写入线程负责的管道，只在对应写入线程里读写
+        self.queue_size = queue_size
+        self.condition = threading.Condition()  # 以下待处理任务数及等待的协程都在此条件变量的锁内修改
+        self.pending_num_list = [0] * thread_num  # 各写入线程已放入、还未处理完的任务数
+        self.async_waiter_list_list = [[] for _ in range(thread_num)]  # 等待各写入线程有空位的协程的<asyncio.Future>
+        self.next_index = 0
+        self.lock = threading.Lock()
+        self.thread_list = []
+        for index in range(thread_num):
+            thread = threading.Thread(target=self.run_writer, args=(index,), daemon=True)
+            thread.start()
+            self.thread_list.append(thread)
+
+    def add_pipeline(self, pipeline):
+        """
+        把管道分配给一个写入线程，返回写入线程序号
+        """
+        with self.lock:
+            index = self.next_index
+            self.next_index = (index + 1) % len(self.thread_list)
+        self.submit(index, lambda: self.pipeline_set_list[index].add(pipeline), block=False)  # 可能在事件循环线程里创建管道
+        return index
+
+    def remove_pipeline(self, pipeline):
+        """
+        关闭管道：在其写入线程里写出暂存的输出并关闭各接收端，之后不再定时检查此管道
+        """
+        index = pipeline.writer_index
+
+        def close_pipeline():
+            self.pipeline_set_list[index].discard(pipeline)
+            pipeline.close_sinks()
+
+        self.submit(index, close_pipeline)
+
+    def submit(self, index, task, block=True):
+        with self.condition:
+            while block and self.pending_num_list[index] >= self.queue_size:
+                self.condition.wait()
+            self.pending_num_list[index] += 1
+        self.task_queue_list[index].put(task)
+
+    async def async_wait_writable(self, loop, index):
+        while True:
+            with self.condition:
+                if self.pending_num_list[index] < self.queue_size:
+                    return
+                future = loop.create_future()
+                self.async_waiter_list_list[index].append(future)
+            await future
+
+    def finish_task(self, index):
+        """
+        写入线程处理完一个任务后调用，唤醒等待空位的巡检线程及协程
+        """
+        with self.condition:
+            self.pending_num_list[index] -= 1
+            self.condition.notify_all()
+            async_waiter_list, self.async_waiter_list_list[index] = self.async_waiter_list_list[index], []
+        for future in async_waiter_list:
+            try:
+                future.get_loop().call_soon_threadsafe(self.set_future_done, future)
+            except RuntimeError:  # 事件循环已关闭
                 pass
-        except paramiko.AuthenticationException as err:
-            print(f"SSHOperator.create_invoke_shell : Authentication Error: {err}")
-            return COF_STATUS_FAILED
-        except Exception as err:
-            print(f"SSHOperator.create_invoke_shell: {err}")
-            return COF_STATUS_FAILED
-        # ★★连接后，创建invoke_shell交互式shell★★
-        self.ssh_shell = self.ssh_client.invoke_shell(width=SHELL_TERMINAL_WIDTH, height=SHELL_TERMINAL_HEIGHT)  # 创建一个交互式shell
-        time.sleep(CODE_POST_WAIT_TIME_DEFAULT)  # 远程连接后，首先等待一会，可能会有信息输出
+
+    @staticmethod
+    def set_future_done(future):
+        if not future.done():
+            future.set_result(None)
+
+    def run_writer(self, index):
+        task_queue = self.task_queue_list[index]
+        pipeline_set = self.pipeline_set_list[index]
+        last_check_time = time.time()
+        while True:
+            try:
+                task = task_queue.get(timeout=OUTPUT_SINK_FLUSH_INTERVAL)
+            except queue.Empty:
+                pass  # 队列空闲，只检查暂存超时的输出
+            else:
+                if task is None:  # close()放入的结束标记，之前的任务都已处理完
+                    break
+                try:
+                    task()
+                except Exception as err:
+                    print(f"SSHOperatorOutputWriter.run_writer: {err}")
+                self.finish_task(index)
+            if time.time() - last_check_time >= OUTPUT_SINK_FLUSH_INTERVAL:
+                last_check_time = time.time()
+                for pipeline in list(pipeline_set):
+                    pipeline.flush_sinks_if_due()
+        for pipeline in list(pipeline_set):  # 未关闭的管道（如作业异常结束），写出剩余的输出并关闭
+            pipeline.close_sinks()
+        pipeline_set.clear()
+
+    def close(self):
+        """
+        等待各写入线程处理完队列里的所有输出后结束  ★阻塞型函数
+        """
+        for task_queue in self.task_queue_list:
+            task_queue.put(None)
+        for thread in self.thread_list:
+            thread.join()
+
+
+class CancelToken:
+    """
+    巡检作业的协作式取消令牌，一个巡检作业一个，作业内每台主机一个子令牌（parent为作业的令牌），
+    巡检线程/协程在登录、发送每条命令、每次读取通道（线程方式最长CHANNEL_RECV_POLL_INTERVAL秒）时检查，
+    协程方式读取通道时不定时检查，而是等待到截止时间，并用add_cancel_callback()在用户停止作业时被立即唤醒，
+    用户停止作业（cancel()）或超过截止时间（deadline）后，正在执行的主机会在下一个检查点结束，空出的线程立即去巡检下一台主机，
+    不再用cofable_stop_thread()向线程注入异常（阻塞在recv里的线程注入异常也无法立即结束，且会跳过关闭连接等清理工作）
+    """
+
+    def __init__(self, deadline=None, deadline_reason=CANCEL_REASON_JOB_DEADLINE, parent=None):
+        self.deadline = deadline  # <float> 截止时间戳，None为不限制
+        self.deadline_reason = deadline_reason  # <int> 超过截止时间时的取消原因 CANCEL_REASON_*
+        self.parent = parent  # <CancelToken> 父令牌被取消时，本令牌也视为已取消
+        self.cancel_reason = CANCEL_REASON_NONE
+        self.cancel_event = threading.Event()
+        self.cancel_callback_list = []  # cancel()时调用的回调函数，可能在其他线程（如界面线程）里调用
+        self.cancel_callback_lock = threading.Lock()
+
+    def create_child(self, timeout=0, deadline_reason=CANCEL_REASON_HOST_DEADLINE):
+        """
+        创建子令牌，timeout秒后到期，为0则只跟随本令牌
+        """
+        deadline = time.time() + timeout if timeout > 0 else None
+        return CancelToken(deadline=deadline, deadline_reason=deadline_reason, parent=self)
+
+    def cancel(self, reason=CANCEL_REASON_USER):
+        with self.cancel_callback_lock:
+            if self.cancel_event.is_set():
+                return
+            self.cancel_reason = reason
+            self.cancel_event.set()
+            cancel_callback_list = list(self.cancel_callback_list)
+        for cancel_callback in cancel_callback_list:
+            cancel_callback()
+
+    def add_cancel_callback(self, cancel_callback):
+        """
+        本令牌或任一级父令牌被cancel()时调用cancel_callback()（超过截止时间不会调用，由调用方自己等待到get_time_left()），
+        已被取消时不调用，调用方自己先检查is_cancelled()
+        """
+        cancel_token = self
+        while cancel_token is not None:
+            with cancel_token.cancel_callback_lock:
+                cancel_token.cancel_callback_list.append(cancel_callback)
+            cancel_token = cancel_token.parent
+
+    def remove_cancel_callback(self, cancel_callback):
+        cancel_token = self
+        while cancel_token is not None:
+            with cancel_token.cancel_callback_lock:
+                if cancel_callback in cancel_token.cancel_callback_list:
+                    cancel_token.cancel_callback_list.remove(cancel_callback)
+            cancel_token = cancel_token.parent
+
+    def is_cancelled(self):
+        if self.cancel_event.is_set():
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.cancel(self.deadline_reason)
+            return True
+        if self.parent is not None and self.parent.is_cancelled():
+            self.cancel(self.parent.cancel_reason)
+            return True
+        return False
+
+    def is_deadline_exceeded(self):
+        """
+        是否因超过主机或作业的截止时间而取消（用户停止作业不算超时）
+        """
+        return self.is_cancelled() and self.cancel_reason in (CANCEL_REASON_HOST_DEADLINE, CANCEL_REASON_JOB_DEADLINE)
+
+    def get_time_left(self, timeout):
+        """
+        返回 timeout 与距离截止时间（含各级父令牌）剩余秒数的较小者，不小于0，用于限制登录、读取等操作的等待时间
+        """
+        cancel_token = self
+        current_time = time.time()
+        while cancel_token is not None:
+            if cancel_token.deadline is not None:
+                timeout = min(timeout, cancel_token.deadline - current_time)
+            cancel_token = cancel_token.parent
+        return max(0.0, timeout)
+
+
+class AdaptiveConcurrencyController:
+    """
+    巡检作业的自适应并发控制（AIMD），巡检模板的adaptive_forks为COF_YES时，一个巡检作业一个，以forks为初始并发数：
+    ★每台主机登录成功且登录耗时正常时，并发数加 1/当前并发数（每完成约一轮主机并发数加1，加性增）
+    ★登录认证失败、登录超时、或登录耗时超过基准耗时的ADAPTIVE_FORKS_LATENCY_FACTOR倍时，并发数乘以ADAPTIVE_FORKS_DECREASE_FACTOR（乘性减），
+      在上一次减小之前就已开始登录的主机再报告拥塞时不重复减小（一轮拥塞只减一次）
+    ★连接被拒绝、主机不可达等与并发数无关的失败，不调整并发数
+    线程池模式用slot()，asyncio模式用async_slot()，asyncio模式下所有方法都只在事件循环线程里调用
+    """
+
+    def __init__(self, initial_limit=DEFAULT_JOB_FORKS, max_limit=MAX_JOB_FORKS, min_limit=1):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))  # <float> 当前并发数，取整后使用
+        self.running_num = 0  # <int> 已取得名额（正在巡检）的主机数
+        self.condition = threading.Condition()
+        self.async_waiter_deque = collections.deque()  # asyncio模式下等待名额的协程的<asyncio.Future>
+        self.base_login_latency = None  # <float> 基准登录耗时，已观测到的最小登录耗时，秒
+        self.last_decrease_time = 0.0  # <float> 上一次减小并发数的时间戳
+        self.start_time = time.time()
+        self.history = [(0.0, int(self.limit))]  # <list> 元素为 (距作业开始的秒数<float>, 并发数<int>)
+
+    def get_limit(self):
+        return int(self.limit)
+
+    def try_acquire(self, cancel_token=None):
+        """
+        有空闲名额时取得名额并返回True，作业已停止时不再限制（让剩余主机尽快被标记为失败）
+        """
+        with self.condition:
+            if self.running_num < int(self.limit) or (cancel_token is not None and cancel_token.is_cancelled()):
+                self.running_num += 1
+                return True
+            return False
+
+    def acquire(self, cancel_token=None):
+        with self.condition:
+            while not self.try_acquire(cancel_token):
+                self.condition.wait(ADAPTIVE_FORKS_WAIT_INTERVAL)
+
+    async def async_acquire(self, loop, cancel_token=None):
+        while not self.try_acquire(cancel_token):
+            waiter = loop.create_future()
+            self.async_waiter_deque.append(waiter)
+            await waiter
+
+    def release(self):
+        with self.condition:
+            self.running_num -= 1
+            self.notify_waiters()
+
+    def notify_waiters(self):
+        """
+        唤醒等待名额的线程或协程，调用者需已持有self.condition
+        """
+        self.condition.notify_all()
+        free_num = int(self.limit) - self.running_num
+        while free_num > 0 and len(self.async_waiter_deque) != 0:
+            waiter = self.async_waiter_deque.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_num -= 1
+
+    @contextlib.contextmanager
+    def slot(self, cancel_token=None):
+        self.acquire(cancel_token)
         try:
-            login_recv = self.ssh_shell.recv(65535)  # 获取登录后的输出信息，此时未执行任何命令
-        except Exception as err:
-            print(f"SSHOperator.create_invoke_shell: {err}")
-            self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
-            return COF_STATUS_FAILED
-        # 创建命令输出对象<SSHOperatorOutput>，一条命令对应一个<SSHOperatorOutput>对象
-        invoke_shell_output_str_list = login_recv.decode('utf8').split('\r\n')
-        invoke_shell_output_str = '\n'.join(invoke_shell_output_str_list)  # 这与前面一行共同作用是去除'\r'
-        # invoke_shell_output_str = recv.decode('utf8').replace('\r', '')  # 登录后的输出信息，换行符为\r\n，这里去除一个\r，只留\n
-        output_login = SSHOperatorOutput(code_index=-1, code_exec_method=CODE_EXEC_METHOD_INVOKE_SHELL,
-                                         invoke_shell_output_bytes=login_recv)
-        self.output_list.append(output_login)  # 刚登录后的输出信息保存到output_list里
-        print("SSHOperator.create_invoke_shell : 登录后输出内容如下 #################\n", invoke_shell_output_str)
-        return COF_STATUS_SUCCEED
+            yield
+        finally:
+            self.release()
 
-    def close_invoke_shell(self):
+    @contextlib.asynccontextmanager
+    async def async_slot(self, loop, cancel_token=None):
+        await self.async_acquire(loop, cancel_token)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def report_login(self, login_start_time, login_result, login_time_usage=None):
+        """
+        一台主机登录完成（成功或失败）后调用，login_time_usage为None时（复用了连接池中的连接）不参与登录耗时判断
+        """
+        with self.condition:
+            if login_result in (LOGIN_RESULT_AUTH_FAILED, LOGIN_RESULT_TIMEOUT):
+                is_congested = True
+            elif login_result == LOGIN_RESULT_SUCCEED:
+                is_congested = False
+                if login_time_usage is not None:
+                    if self.base_login_latency is None or login_time_usage < self.base_login_latency:
+                        self.base_login_latency = login_time_usage
+                    elif login_time_usage > self.base_login_latency * ADAPTIVE_FORKS_LATENCY_FACTOR \
+                            and login_time_usage - self.base_login_latency > ADAPTIVE_FORKS_LATENCY_MIN_EXCESS:
+                        is_congested = True
+            else:
+                return
+            old_limit = int(self.limit)
+            if not is_congested:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            elif login_start_time >= self.last_decrease_time:
+                self.limit = max(float(self.min_limit), self.limit * ADAPTIVE_FORKS_DECREASE_FACTOR)
+                self.last_decrease_time = time.time()
+            if int(self.limit) != old_limit:
+                print(f"AdaptiveConcurrencyController.report_login: 巡检并发数 {old_limit} -> {int(self.limit)}")
+                self.add_history(int(self.limit))
+                self.notify_waiters()
+
+    def add_history(self, limit):
+        self.history.append((round(time.time() - self.start_time, 1), limit))
+        if len(self.history) > ADAPTIVE_FORKS_HISTORY_MAX_LEN:
+            del self.history[1:-1:2]  # 保留第一个及最后一个变化点
+
+    def get_history_str(self):
+        """
+        并发数变化记录转为字符串保存到作业记录，格式为 秒数:并发数,秒数:并发数,...
+        """
+        return ",".join([f"{time_offset}:{limit}" for time_offset, limit in self.history])
+
+
+class ShellOutputCollector:
+    """
+    收集invoke_shell通道的一段输出，并判断这段输出是否已结束（出现shell提示符、结束标记、空闲超时、总时长超时），
+    只负责判断，不负责读取通道，线程方式的SSHOperator.recv_until_prompt()与协程方式的SSHOperator.async_recv_until_prompt()共用
+    """
+
+    def __init__(self, shell_prompt_str='', idle_timeout=CODE_EXEC_IDLE_TIMEOUT_DEFAULT, hard_timeout=CODE_EXEC_HARD_TIMEOUT_DEFAULT,
+                 sentinel_pattern=None, first_data_timeout=None, cancel_token=None):
+        self.shell_prompt_str = shell_prompt_str  # <str> 已学习到的shell提示符，为空则只能依靠空闲超时判断
+        self.cancel_token = cancel_token  # <CancelToken> 作业被取消或超过截止时间时，不再等待输出
+        self.idle_timeout = idle_timeout  # <float> 收到数据后通道空闲（无新输出）超过此时长，即认为输出已结束，秒
+        self.hard_timeout = hard_timeout  # <float> 总时长超时，秒
+        self.sentinel_pattern = sentinel_pattern  # <re.Pattern> 输出最后一行匹配到此结束标记，即认为输出已结束
+        if first_data_timeout is None:
+            self.first_data_timeout = idle_timeout  # <float> 收到首个数据前最长等待时间，秒
+        else:
+            self.first_data_timeout = first_data_timeout
+        self.output_bytes_list = []
+        self.tail_bytes = b''  # 只对输出末尾的一小段内容判断提示符，避免大量输出时每次都解码全部内容
+        self.stream_decoder = Vt100StreamDecoder()  # 末尾不完整的字符/控制序列等下一段数据到达后再判断
+        self.tail_bytes_max_len = max(len(shell_prompt_str.encode('utf8')) * 2, 1024)
+        self.start_time = time.time()
+        self.last_recv_time = None
+
+    @staticmethod
+    def get_last_line_of_output(output_bytes):
+        """
+        获取输出信息的最后一行（不带换行符），也就是终端上光标所在行显示的内容，
+        行内若有'\r'，则只保留最后一个'\r'之后的内容（'\r'之前的内容在终端上已被覆盖），输出末尾的空白字符也会被去除
+        """
+        output_str = output_bytes[-CHANNEL_RECV_BUFFER_SIZE:].decode('utf8', errors='replace')
+        last_line = output_str.rsplit('\n', 1)[-1]
+        return last_line.rsplit('\r', 1)[-1].rstrip()
+
+    def feed(self, recv_bytes):
+        """
+        收到一段输出后调用，返回结束原因 RECV_END_REASON_*，输出未结束则返回None
+        """
+        if len(recv_bytes) == 0:  # 读到空bytes，说明通道已被关闭
+            return RECV_END_REASON_CLOSED
+        self.output_bytes_list.append(recv_bytes)
+        self.last_recv_time = time.time()
+        complete_bytes = self.stream_decoder.feed(recv_bytes)
+        if len(complete_bytes) == 0:  # 只收到了半个字符或半个控制序列，等下一段数据
+            return None
+        self.tail_bytes = Vt100StreamDecoder.skip_leading_continuation_bytes((self.tail_bytes + complete_bytes)[-self.tail_bytes_max_len:])
+        last_line = self.get_last_line_of_output(self.tail_bytes)
+        if self.shell_prompt_str != '' and last_line == self.shell_prompt_str:
+            return RECV_END_REASON_PROMPT
+        if self.sentinel_pattern is not None and self.sentinel_pattern.search(last_line) is not None:
+            return RECV_END_REASON_SENTINEL
+        return None
+
+    def check_timeout(self):
+        """
+        未收到新输出时调用，返回结束原因 RECV_END_REASON_CANCELLED、RECV_END_REASON_IDLE 或 RECV_END_REASON_HARD_TIMEOUT，未超时则返回None
+        """
+        if self.cancel_token is not None and self.cancel_token.is_cancelled():
+            return RECV_END_REASON_CANCELLED
+        current_time = time.time()
+        if self.last_recv_time is None:
+            if current_time - self.start_time >= self.first_data_timeout:
+                return RECV_END_REASON_IDLE
+        elif current_time - self.last_recv_time >= self.idle_timeout:
+            return RECV_END_REASON_IDLE
+        if current_time - self.start_time >= self.hard_timeout:
+            return RECV_END_REASON_HARD_TIMEOUT
+        return None
+
+    def get_time_to_next_timeout(self):
+        """
+        距离最近一个超时（首个数据超时或空闲超时、总时长超时、取消令牌的截止时间）还有多少秒，协程方式读取通道时只等待到此时
+        """
+        current_time = time.time()
+        if self.last_recv_time is None:
+            time_left = self.start_time + self.first_data_timeout - current_time
+        else:
+            time_left = self.last_recv_time + self.idle_timeout - current_time
+        time_left = min(time_left, self.start_time + self.hard_timeout - current_time)
+        if self.cancel_token is not None:
+            time_left = self.cancel_token.get_time_left(time_left)
+        return max(0.0, time_left)
+
+    def get_output_bytes(self):
+        return b''.join(self.output_bytes_list)
+
+
+class ShellPipelineDemuxer:
+    """
+    流水线执行方式（CODE_EXEC_METHOD_INVOKE_SHELL_PIPELINE）的输出拆分器，每条命令后发送一条结束标记命令：
+    echo COF_MARK_""<token>_<命令序号>_$? ，命令行里有一对引号，shell执行后输出的标记行里没有，
+    所以只有执行后输出的标记行才会被匹配到，上一个标记行之后到此标记行之前的内容即为这条命令的输出，$?为命令的退出码
+    ★脚本执行方式（CODE_EXEC_METHOD_SCRIPT）的脚本里也插入同样的标记命令，也用它拆分输出，输出里没有命令行及shell提示符
+    ★流水线执行时已用stty -echo关闭了终端回显（否则命令执行期间到达的后续命令会被终端回显在这条命令的输出里），
+      拆分出的输出前面补上命令行，与逐条执行时的输出一样为：命令行 + 命令输出 + shell提示符
+    """
+
+    def __init__(self, shell_prompt_str='', code_list=None, token=None, is_code_line_added=True):
+        if token is None:
+            self.token = uuid.uuid4().hex[:12]  # 每个拆分器不同，命令输出里不会恰好出现
+        else:
+            self.token = token  # 脚本执行方式取自脚本内容，上传到目标主机的脚本里已写入了结束标记
+        self.shell_prompt_bytes = shell_prompt_str.encode('utf8')
+        self.code_list = code_list  # <list> 元素为<OneLineCode>，即<InspectionCodeBlock>.code_list
+        self.is_code_line_added = is_code_line_added  # <bool> 拆分出的输出前面是否补上命令行
+        self.marker_pattern = re.compile(re.escape((CODE_PIPELINE_MARKER_PREFIX + self.token).encode('utf8')) + rb'_(\d+)_([^\r\n]*)\r?\n')
+        self.pending_bytes = b''  # 还未匹配到结束标记的输出
+
+    def get_marker_command(self, cmd_index):
+        return f'echo {CODE_PIPELINE_MARKER_PREFIX}""{self.token}_{cmd_index}_$?'
+
+    def feed(self, recv_bytes):
+        """
+        收到一段输出后调用，返回已结束的命令列表，元素为 (cmd_index, exit_status<int或None>, output_bytes)
+        """
+        search_start = max(0, len(self.pending_bytes) - 256)  # 标记行（不超过256字节）可能被分在前后两段输出里
+        self.pending_bytes += recv_bytes
+        finished_code_list = []
+        while True:
+            match = self.marker_pattern.search(self.pending_bytes, search_start)
+            if match is None:
+                return finished_code_list
+            cmd_index = int(match.group(1))
+            exit_status_bytes = match.group(2).strip()
+            exit_status = int(exit_status_bytes) if exit_status_bytes.isdigit() else None
+            finished_code_list.append((cmd_index, exit_status, self.strip_output(cmd_index, self.pending_bytes[:match.start()])))
+            self.pending_bytes = self.pending_bytes[match.end():]
+            search_start = 0
+
+    def strip_output(self, cmd_index, output_bytes):
+        """
+        去掉开头的shell提示符（属于上一条命令），若shell仍回显了结束标记命令则去掉，命令行未被回显时在前面补上
+        """
+        echo_index = output_bytes.rfind(self.get_marker_command(cmd_index).encode('utf8'))
+        if echo_index >= 0:
+            output_bytes = output_bytes[:echo_index]
+        if self.shell_prompt_bytes != b'' and output_bytes.startswith(self.shell_prompt_bytes):
+            output_bytes = output_bytes[len(self.shell_prompt_bytes):]
+            if output_bytes.startswith(b' '):  # 提示符学习时去掉了末尾的空格
+                output_bytes = output_bytes[1:]
+        if not self.is_code_line_added:
+            return output_bytes
+        code_line_bytes = self.code_list[cmd_index].code_content.strip().encode('utf8')
+        if not output_bytes.startswith(code_line_bytes):
+            output_bytes = code_line_bytes + b'\r\n' + output_bytes
+        return output_bytes
+
+    def get_pending_bytes(self):
+        return self.pending_bytes
+
+
+class SSHTransportPoolEntry:
+    """
+    <SSHTransportPool>池中的一个已认证的ssh连接，可同时在其上打开多个通道（invoke_shell/exec_command/sftp）
+    """
+
+    def __init__(self, pool_key=None, ssh_client=None):
+        self.pool_key = pool_key  # <tuple> 见SSHTransportPool.make_pool_key()
+        self.ssh_client = ssh_client  # <paramiko.client.SSHClient>
+        self.channel_num = 0  # <int> 正在使用此连接的通道数
+        self.channel_limit = SSH_TRANSPORT_MAX_CHANNELS  # <int> 对端限制了通道数时（开通道失败），会调小此值
+        self.last_used_time = time.time()  # <float> 最近一次取用或归还的时间
+        self.is_pooled = False  # <bool> 是否在池中，池满时新建的连接不放入池中，通道都关闭后即关闭连接
+        self.is_reused = False  # <bool> 本次是否为复用池中已有的连接
+
+    def is_active(self):
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active() and transport.is_authenticated()
+
+
+class SSHTransportPool:
+    """
+    ssh连接池，全局只有一个，为<GlobalInfo>.ssh_transport_pool
+    ★已认证的ssh连接（paramiko Transport）按(地址, 端口, 用户名, 认证方式, 密码/密钥的sha256指纹)复用，
+      巡检作业的每个巡检代码块、多次巡检作业、凭据检测、终端会话都只在已有连接上新开通道，不再重复tcp握手、密钥交换及认证
+    ★一个连接上最多同时开SSH_TRANSPORT_MAX_CHANNELS个通道；空闲超过SSH_TRANSPORT_IDLE_TTL秒的连接由后台线程关闭；
+      空闲较久的连接复用前先做健康检查，不可用的连接直接丢弃
+    """
+
+    def __init__(self, max_size=SSH_TRANSPORT_POOL_MAX_SIZE, idle_ttl=SSH_TRANSPORT_IDLE_TTL):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.lock = threading.Lock()
+        self.entry_list_dict = {}  # <dict> key为pool_key，value为<SSHTransportPoolEntry>的<list>
+        self.entry_num = 0  # 池中的连接总数
+        self.cleanup_thread = None
+        self.is_closed = False
+
+    @staticmethod
+    def make_pool_key(hostname, port, username, auth_method, password='', private_key=''):
+        if auth_method == AUTH_METHOD_SSH_KEY:
+            secret = private_key
+        else:
+            secret = password
+        fingerprint = hashlib.sha256(secret.encode('utf8')).hexdigest()  # 池中只保存指纹，不保存密码或密钥明文
+        return hostname, int(port), username, auth_method, fingerprint
+
+    @staticmethod
+    def connect_ssh_client(hostname, port, username, auth_method, password='', private_key='', timeout=LOGIN_AUTH_TIMEOUT, sock=None):
+        """
+        新建一个ssh连接并认证，认证失败等情况会抛出paramiko的异常，由调用者处理
+        """
+        ssh_client = paramiko.client.SSHClient()
+        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 允许连接host_key不在know_hosts文件里的主机
+        try:
+            if auth_method == AUTH_METHOD_SSH_KEY:
+                prikey_string_io = io.StringIO(private_key)
+                pri_key = paramiko.RSAKey.from_private_key(prikey_string_io)
+                print("SSHTransportPool.connect_ssh_client : 使用ssh_priKey密钥登录")
+                ssh_client.connect(hostname=hostname, port=port, username=username, pkey=pri_key, timeout=timeout, sock=sock)
+            else:
+                print("SSHTransportPool.connect_ssh_client : 使用ssh_password密码登录")
+                ssh_client.connect(hostname=hostname, port=port, username=username, password=password, timeout=timeout, sock=sock)
+        except Exception:
+            ssh_client.close()
+            raise
+        return ssh_client
+
+    def has_available_transport(self, pool_key):
+        with self.lock:
+            for entry in self.entry_list_dict.get(pool_key, ()):
+                if entry.channel_num < entry.channel_limit:
+                    return True
+            return False
+
+    def checkout_existing_entry(self, pool_key):
+        dead_entry_list = []
+        found_entry = None
+        with self.lock:
+            for entry in self.entry_list_dict.get(pool_key, ()):
+                if entry.channel_num >= entry.channel_limit:
+                    continue
+                if not entry.is_active():
+                    dead_entry_list.append(entry)
+                    continue
+                if time.time() - entry.last_used_time > SSH_TRANSPORT_HEALTH_CHECK_IDLE:
+                    try:
+                        entry.ssh_client.get_transport().send_ignore()  # 健康检查，连接已断开时会抛出异常
+                    except Exception as err:
+                        print(f"SSHTransportPool.checkout_existing_entry: 连接 {pool_key[0]}:{pool_key[1]} 已不可用 {err}")
+                        dead_entry_list.append(entry)
+                        continue
+                found_entry = entry
+                break
+            for entry in dead_entry_list:
+                self.remove_entry(entry)
+            if found_entry is not None:
+                found_entry.channel_num += 1
+                found_entry.last_used_time = time.time()
+                found_entry.is_reused = True
+        for entry in dead_entry_list:
+            entry.ssh_client.close()
+        return found_entry
+
+    def acquire(self, hostname, port, username, auth_method, password='', private_key='', timeout=LOGIN_AUTH_TIMEOUT,
+                sock=None, reuse=True):
+        """
+        取用一个已认证的ssh连接，池中有可用的就复用，没有则新建（阻塞型函数），用完后必须调用release()归还
+        :param sock: 新建连接时使用的已建立好的tcp连接（asyncio引擎使用），复用了已有连接时调用者需自行关闭它
+        :param reuse: 为False时不复用池中已有的连接，总是新建
+        :return: <SSHTransportPoolEntry>
+        """
+        pool_key = self.make_pool_key(hostname, port, username, auth_method, password, private_key)
+        if reuse:
+            entry = self.checkout_existing_entry(pool_key)
+            if entry is not None:
+                print(f"SSHTransportPool.acquire: 复用已有的ssh连接 {hostname}:{port} {username}")
+                return entry
+        ssh_client = self.connect_ssh_client(hostname, port, username, auth_method, password=password,
+                                             private_key=private_key, timeout=timeout, sock=sock)
+        entry = SSHTransportPoolEntry(pool_key=pool_key, ssh_client=ssh_client)
+        entry.channel_num = 1
+        idle_entry_list = []
+        with self.lock:
+            if not self.is_closed:
+                if self.entry_num >= self.max_size:
+                    idle_entry_list = self.remove_least_recently_used_idle_entry()  # 池满时关闭最久未使用的空闲连接，腾出位置
+                if self.entry_num < self.max_size:
+                    self.entry_list_dict.setdefault(pool_key, []).append(entry)
+                    self.entry_num += 1
+                    entry.is_pooled = True
+            self.start_cleanup_thread()
+        for idle_entry in idle_entry_list:
+            idle_entry.ssh_client.close()
+        return entry
+
+    def release(self, entry, is_broken=False):
+        """
+        归还连接，通道已关闭（或打开通道失败）后调用
+        :param is_broken: 为True时表示连接已不可用，直接关闭，不再复用
+        """
+        with self.lock:
+            entry.channel_num -= 1
+            entry.last_used_time = time.time()
+            if is_broken or self.is_closed or not entry.is_active():
+                self.remove_entry(entry)
+                need_close = True
+            else:
+                need_close = not entry.is_pooled and entry.channel_num <= 0
+        if need_close:
+            entry.ssh_client.close()
+
+    def open_channel(self, open_channel_func, hostname, port, username, auth_method, password='', private_key='',
+                     timeout=LOGIN_AUTH_TIMEOUT, sock=None):
+        """
+        取用一个ssh连接并在其上打开通道，open_channel_func(ssh_client)返回打开的通道，如ssh_client.invoke_shell()
+        ★复用的连接上打开通道失败时（对端限制了通道数，或连接刚刚断开），换一个新连接重试一次
+        :return: (<SSHTransportPoolEntry>, 通道)
+        """
+        entry = self.acquire(hostname, port, username, auth_method, password=password, private_key=private_key,
+                             timeout=timeout, sock=sock)
+        try:
+            return entry, open_channel_func(entry.ssh_client)
+        except Exception as err:
+            if not entry.is_reused:
+                self.release(entry, is_broken=True)
+                raise
+            print(f"SSHTransportPool.open_channel: 在已有连接上打开通道失败，新建连接重试 {err}")
+            with self.lock:
+                entry.channel_limit = max(1, entry.channel_num - 1)
+        self.release(entry)
+        entry = self.acquire(hostname, port, username, auth_method, password=password, private_key=private_key,
+                             timeout=timeout, reuse=False)
+        try:
+            return entry, open_channel_func(entry.ssh_client)
+        except Exception:
+            self.release(entry, is_broken=True)
+            raise
+
+    def remove_entry(self, entry):  # 需在持有self.lock时调用
+        if not entry.is_pooled:
+            return
+        entry_list = self.entry_list_dict.get(entry.pool_key)
+        if entry_list is not None and entry in entry_list:
+            entry_list.remove(entry)
+            if len(entry_list) == 0:
+                del self.entry_list_dict[entry.pool_key]
+        entry.is_pooled = False
+        self.entry_num -= 1
+
+    def remove_idle_entries(self, idle_ttl):  # 需在持有self.lock时调用，返回已移出池的连接，由调用者在锁外关闭
+        removed_entry_list = []
+        now = time.time()
+        for entry_list in list(self.entry_list_dict.values()):
+            for entry in list(entry_list):
+                if entry.channel_num <= 0 and (now - entry.last_used_time >= idle_ttl or not entry.is_active()):
+                    self.remove_entry(entry)
+                    removed_entry_list.append(entry)
+        return removed_entry_list
+
+    def remove_least_recently_used_idle_entry(self):  # 需在持有self.lock时调用，返回已移出池的连接
+        lru_entry = None
+        for entry_list in self.entry_list_dict.values():
+            for entry in entry_list:
+                if entry.channel_num <= 0 and (lru_entry is None or entry.last_used_time < lru_entry.last_used_time):
+                    lru_entry = entry
+        if lru_entry is None:
+            return []
+        self.remove_entry(lru_entry)
+        return [lru_entry]
+
+    def start_cleanup_thread(self):  # 需在持有self.lock时调用
+        if self.cleanup_thread is None or not self.cleanup_thread.is_alive():
+            self.cleanup_thread = threading.Thread(target=self.cleanup_thread_loop, daemon=True)
+            self.cleanup_thread.start()
+
+    def cleanup_thread_loop(self):
+        while True:
+            time.sleep(SSH_TRANSPORT_POOL_CLEANUP_INTERVAL)
+            with self.lock:
+                if self.is_closed:
+                    return
+                removed_entry_list = self.remove_idle_entries(self.idle_ttl)
+                if self.entry_num == 0:
+                    self.cleanup_thread = None  # 池已空，结束清理线程，下次新建连接时再启动
+            for entry in removed_entry_list:
+                print(f"SSHTransportPool.cleanup_thread_loop: 关闭空闲的ssh连接 {entry.pool_key[0]}:{entry.pool_key[1]}")
+                entry.ssh_client.close()
+            if self.cleanup_thread is None:
+                return
+
+    def close_all(self):
+        with self.lock:
+            self.is_closed = True
+            entry_list_all = []
+            for entry_list in self.entry_list_dict.values():
+                entry_list_all.extend(entry_list)
+            self.entry_list_dict = {}
+            self.entry_num = 0
+        for entry in entry_list_all:
+            entry.is_pooled = False
+            entry.ssh_client.close()
+
+
+class SSHOperator:
+    """
+    一个<SSHOperator>对象负责一台主机的ssh会话建议与关闭，
+    每次调用 run_invoke_shell()函数在invoke_shell交互式shell里操作一个<InspectionCodeBlock>巡检代码块的所有命令，
+    或调用 run_invoke_shell_pipeline()函数在invoke_shell里流水线执行（连续发送多条命令，按结束标记拆分输出），
+    或调用 run_exec_command()函数以exec_command方式执行（每行命令单独开一个通道，可并发），
+    async_开头的函数为对应的协程版本，供asyncio巡检引擎（JOB_EXEC_MODE_ASYNCIO）使用
+    """
+
+    def __init__(self, hostname='', username='', password='', private_key='', port=22,
+                 timeout=30, auth_method=AUTH_METHOD_SSH_PASS, host_job_status_obj=None, ssh_transport_pool=None,
+                 output_pipeline=None, cancel_token=None, code_exec_timeout=CODE_EXEC_HARD_TIMEOUT_DEFAULT,
+                 code_condition_matcher=None):
+        self.oid = uuid.uuid4().__str__()  # <str>
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.private_key = private_key
+        self.port = port
+        self.timeout = timeout  # 单位:秒
+        self.auth_method = auth_method
+        # self.command_list = command_list  # ★★元素为 <OneLineCode> 对象★★
+        self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN  # run_invoke_shell() 执行完成情况，每次执行前要先置为 UNKNOWN
+        self.output_list = []  # 元素类型为 <SSHOperatorOutput>，一条执行命令<OneLineCode>只产生一个output对象，有output_pipeline时不保留
+        self.output_pipeline = output_pipeline  # <SSHOperatorOutputPipeline> 每条命令执行完即交给它保存，为None时保存在output_list里
+        self.host_job_status_obj = host_job_status_obj  # <HostJobStatus>
+        self.ssh_client = None
+        self.ssh_shell = None
+        self.ssh_transport_pool = ssh_transport_pool  # <SSHTransportPool> 为None时不复用连接，每次都新建ssh连接
+        self.ssh_transport_pool_entry = None  # <SSHTransportPoolEntry> 从连接池取用的连接，关闭shell时归还
+        self.shell_prompt_str = ''  # <str> 登录后学习到的shell提示符，用于判断命令输出是否结束，为空则只能依靠空闲超时判断
+        self.is_posix_shell = None  # <bool> 目标主机的shell是否支持流水线执行（echo、$?、stty），首次流水线执行前探测，None为还未探测
+        self.exec_command_lock = threading.Lock()  # exec_command方式并发执行命令时，保护主机作业状态的计数
+        self.cancel_token = cancel_token  # <CancelToken> 巡检作业中每台主机一个，为None时不可取消
+        self.code_exec_timeout = code_exec_timeout  # <float> 单条命令最长等待时间，秒
+        self.login_result = LOGIN_RESULT_UNKNOWN  # <int> 登录结果 LOGIN_RESULT_*，供自适应并发控制使用
+        self.login_start_time = 0.0  # <float> 开始登录（含tcp连接）的时间戳
+        self.login_time_usage = None  # <float> 登录耗时，秒，复用了连接池中的连接时为None
+        self.code_condition_matcher = code_condition_matcher  # <CodeConditionMatcher> 为None时不判断命令执行条件，按顺序执行
+        self.last_output_obj = None  # <SSHOperatorOutput> 最近一条交给emit_output()的命令输出，判断其执行条件时使用
+        self.is_host_aborted = False  # <bool> 满足了终止本主机巡检的执行条件，剩余的巡检代码块不再执行
+
+    def check_cancelled(self):
+        """
+        作业已被取消或已超过主机/作业截止时间时返回True，超过截止时间的主机标记为超时
+        """
+        if self.cancel_token is None or not self.cancel_token.is_cancelled():
+            return False
+        if self.cancel_token.is_deadline_exceeded() and self.host_job_status_obj is not None:
+            self.host_job_status_obj.exec_timeout = COF_YES
+        return True
+
+    def get_time_left(self, timeout):
+        """
+        等待时间不超过截止时间
+        """
+        if self.cancel_token is None:
+            return timeout
+        return self.cancel_token.get_time_left(timeout)
+
+    def emit_output(self, ssh_opt_output_obj):
+        """
+        一条命令（含交互输出）执行完成后调用，有output_pipeline时交给它保存，否则保存到output_list里
+        """
+        self.last_output_obj = ssh_opt_output_obj
+        if self.output_pipeline is None:
+            self.output_list.append(ssh_opt_output_obj)
+        else:
+            # asyncio事件循环线程里不等待写入线程的队列空位（会卡住所有主机的协程），由协程发送下一条命令前await async_wait_output_writable()
+            self.output_pipeline.push(ssh_opt_output_obj, block=not self.is_in_event_loop_thread())
+
+    @staticmethod
+    def is_in_event_loop_thread():
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return True
+
+    async def async_wait_output_writable(self, loop):
+        if self.output_pipeline is not None:
+            await self.output_pipeline.async_wait_writable(loop)
+
+    def get_next_cmd_index(self, cmd_index, inspection_code_block_obj):
+        """
+        一行命令执行完成（输出已交给emit_output()）后调用，按其执行条件返回下一条要执行的命令序号，跳过的命令也计入执行进度；
+        满足终止本主机巡检的条件时，标记is_host_aborted，返回len(code_list)
+        """
+        if self.code_condition_matcher is None or not inspection_code_block_obj.code_list[cmd_index].has_condition():
+            return cmd_index + 1
+        next_cmd_index, is_host_aborted = self.code_condition_matcher.get_next_cmd_index(inspection_code_block_obj, cmd_index,
+                                                                                         self.last_output_obj, self.shell_prompt_str)
+        if is_host_aborted:
+            self.is_host_aborted = True
+        if next_cmd_index > cmd_index + 1:
+            self.skip_code_lines(next_cmd_index - cmd_index - 1)
+        return next_cmd_index
+
+    def skip_code_lines(self, code_num):
+        """
+        因执行条件跳过的命令计入执行进度，主机巡检完成时进度仍为100%
+        """
+        with self.exec_command_lock:
+            self.host_job_status_obj.current_exec_code_num += code_num
+        self.host_job_status_obj.publish()
+
+    def set_login_result(self, login_result):
+        """
+        记录登录结果及耗时，复用了连接池中已认证的连接时没有真正登录，不计登录耗时
+        """
+        self.login_result = login_result
+        if self.ssh_transport_pool_entry is not None and self.ssh_transport_pool_entry.is_reused:
+            self.login_time_usage = None
+        else:
+            self.login_time_usage = time.time() - self.login_start_time
+
+    @staticmethod
+    def get_login_result_of_error(err):
+        if isinstance(err, paramiko.AuthenticationException):
+            return LOGIN_RESULT_AUTH_FAILED
+        if isinstance(err, (socket.timeout, asyncio.TimeoutError)):
+            return LOGIN_RESULT_TIMEOUT
+        if isinstance(err, paramiko.SSHException) and "banner" in str(err).lower():
+            return LOGIN_RESULT_TIMEOUT  # 对端过载时，常见读取ssh协议banner超时
+        return LOGIN_RESULT_FAILED
+
+    def login(self, sock=None):
+        """
+        只建立ssh连接并认证，不创建shell，巡检代码块都是exec_command方式时使用，之后命令都在此连接上单独开通道执行
+        """
+        if sock is None:  # asyncio引擎在建立tcp连接前已开始计时
+            self.login_start_time = time.time()
+        try:
+            if self.ssh_transport_pool is None:
+                self.ssh_client = SSHTransportPool.connect_ssh_client(self.hostname, self.port, self.username, self.auth_method,
+                                                                      password=self.password, private_key=self.private_key,
+                                                                      timeout=self.get_time_left(self.timeout), sock=sock)
+            else:
+                self.ssh_transport_pool_entry = self.ssh_transport_pool.acquire(self.hostname, self.port, self.username,
+                                                                                self.auth_method, password=self.password,
+                                                                                private_key=self.private_key,
+                                                                                timeout=self.get_time_left(self.timeout), sock=sock)
+                self.ssh_client = self.ssh_transport_pool_entry.ssh_client
+                if self.ssh_transport_pool_entry.is_reused and sock is not None:
+                    sock.close()  # 复用了池中已有的连接，预先建立的tcp连接用不上了
+        except paramiko.AuthenticationException as err:
+            print(f"SSHOperator.login : Authentication Error: {err}")
+            self.set_login_result(LOGIN_RESULT_AUTH_FAILED)
+            return COF_STATUS_FAILED
+        except Exception as err:
+            print(f"SSHOperator.login: {err}")
+            self.set_login_result(self.get_login_result_of_error(err))
+            return COF_STATUS_FAILED
+        self.set_login_result(LOGIN_RESULT_SUCCEED)
+        return COF_STATUS_SUCCEED
+
+    def login_and_open_shell(self, sock=None):
+        """
+        建立ssh连接并认证，之后创建invoke_shell交互式shell，sock为已建立好的tcp连接（asyncio引擎使用），为None则由paramiko自行建立
+        ★有连接池时，优先复用池中已认证的连接，只新开一个shell通道
+        """
+        if sock is None:
+            self.login_start_time = time.time()
+        try:
+            if self.ssh_transport_pool is None:
+                # ★★创建ssh连接★★
+                self.ssh_client = SSHTransportPool.connect_ssh_client(self.hostname, self.port, self.username, self.auth_method,
+                                                                      password=self.password, private_key=self.private_key,
+                                                                      timeout=self.get_time_left(self.timeout), sock=sock)
+                # ★★连接后，创建invoke_shell交互式shell★★
+                self.ssh_shell = self.ssh_client.invoke_shell(width=SHELL_TERMINAL_WIDTH, height=SHELL_TERMINAL_HEIGHT)
+            else:
+                self.ssh_transport_pool_entry, self.ssh_shell = self.ssh_transport_pool.open_channel(
+                    lambda ssh_client: ssh_client.invoke_shell(width=SHELL_TERMINAL_WIDTH, height=SHELL_TERMINAL_HEIGHT),
+                    self.hostname, self.port, self.username, self.auth_method, password=self.password,
+                    private_key=self.private_key, timeout=self.get_time_left(self.timeout), sock=sock)
+                self.ssh_client = self.ssh_transport_pool_entry.ssh_client
+                if self.ssh_transport_pool_entry.is_reused and sock is not None:
+                    sock.close()  # 复用了池中已有的连接，预先建立的tcp连接用不上了
+        except paramiko.AuthenticationException as err:
+            print(f"SSHOperator.login_and_open_shell : Authentication Error: {err}")
+            self.set_login_result(LOGIN_RESULT_AUTH_FAILED)
+            return COF_STATUS_FAILED
+        except Exception as err:
+            print(f"SSHOperator.login_and_open_shell: {err}")
+            self.set_login_result(self.get_login_result_of_error(err))
+            if self.ssh_client is not None and self.ssh_transport_pool is None:
+                self.ssh_client.close()
+            return COF_STATUS_FAILED
+        self.set_login_result(LOGIN_RESULT_SUCCEED)
+        return COF_STATUS_SUCCEED
+
+    def create_invoke_shell(self):
+        """
+        建立连接，创建交互式shell
+        """
+        if self.login_and_open_shell() != COF_STATUS_SUCCEED:
+            return COF_STATUS_FAILED
+        # 远程连接后，可能会有欢迎信息输出，持续读取到通道空闲为止，最后一行一般为shell提示符
+        try:
+            login_recv, end_reason = self.recv_until_prompt(idle_timeout=LOGIN_OUTPUT_IDLE_TIMEOUT,
+                                                            hard_timeout=self.timeout, first_data_timeout=self.timeout)
+        except Exception as err:
+            print(f"SSHOperator.create_invoke_shell: {err}")
+            self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            return COF_STATUS_FAILED
+        return self.process_login_output(login_recv, end_reason)
+
+    def process_login_output(self, login_recv, end_reason):
+        """
+        保存登录后的输出信息，并学习shell提示符
+        """
+        if end_reason == RECV_END_REASON_CLOSED:
+            print("SSHOperator.process_login_output: 登录后shell通道已被远端关闭")
+            self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            return COF_STATUS_FAILED
+        # 创建命令输出对象<SSHOperatorOutput>，一条命令对应一个<SSHOperatorOutput>对象
+        invoke_shell_output_str_list = login_recv.decode('utf8', errors='replace').split('\r\n')
+        invoke_shell_output_str = '\n'.join(invoke_shell_output_str_list)  # 这与前面一行共同作用是去除'\r'
+        # invoke_shell_output_str = recv.decode('utf8').replace('\r', '')  # 登录后的输出信息，换行符为\r\n，这里去除一个\r，只留\n
+        output_login = SSHOperatorOutput(code_index=-1, code_exec_method=CODE_EXEC_METHOD_INVOKE_SHELL,
+                                         invoke_shell_output_bytes=login_recv)
+        self.emit_output(output_login)  # 刚登录后的输出信息也要保存
+        print("SSHOperator.process_login_output : 登录后输出内容如下 #################\n", invoke_shell_output_str)
+        # ★登录后输出的最后一行作为shell提示符，之后每条命令的输出以此提示符结尾，即认为命令已执行完成
+        self.shell_prompt_str = ShellOutputCollector.get_last_line_of_output(login_recv)
+        print(f"SSHOperator.process_login_output : 学习到的shell提示符为: {self.shell_prompt_str.encode('utf8')}")
+        return COF_STATUS_SUCCEED
+
+    def close_invoke_shell(self):
+        """
+        关闭shell通道，连接来自连接池时归还给连接池（连接保持，供之后的巡检复用），否则关闭ssh连接，可重复调用
+        """
+        if self.ssh_shell is not None:
+            self.ssh_shell.close()
+            self.ssh_shell = None
+        entry, self.ssh_transport_pool_entry = self.ssh_transport_pool_entry, None
+        if entry is not None:
+            self.ssh_transport_pool.release(entry)
+        elif self.ssh_client is not None:
+            # ★★关闭ssh连接★★
+            self.ssh_client.close()
+        self.ssh_client = None
+
+    def recv_until_prompt(self, idle_timeout=CODE_EXEC_IDLE_TIMEOUT_DEFAULT, hard_timeout=None,
+                          sentinel_pattern=None, first_data_timeout=None):
+        """
+        持续读取invoke_shell通道的输出，直到满足以下任一条件才返回，不再是固定等待后只recv一次：
+        1.输出的最后一行为已学习到的shell提示符self.shell_prompt_str
+        2.输出的最后一行匹配到sentinel_pattern（<re.Pattern>，如交互提问关键词）
+        3.收到数据后通道空闲（无新输出）超过idle_timeout秒，收到首个数据前最长等待first_data_timeout秒（None则同idle_timeout）
+        4.总用时超过hard_timeout秒（None则为self.code_exec_timeout）
+        5.通道已被远端关闭
+        6.巡检作业已被取消，或已超过主机/作业的截止时间
+        :return: (output_bytes<bytes>, end_reason<int> RECV_END_REASON_*)
+        """
+        collector = self.create_output_collector(idle_timeout, hard_timeout, sentinel_pattern, first_data_timeout)
+        self.ssh_shell.settimeout(CHANNEL_RECV_POLL_INTERVAL)
+        while True:
+            try:
+                recv_bytes = self.ssh_shell.recv(CHANNEL_RECV_BUFFER_SIZE)  # 有数据到达即返回，无数据时最多阻塞CHANNEL_RECV_POLL_INTERVAL秒
+            except socket.timeout:
+                recv_bytes = None
+            if recv_bytes is not None:
+                end_reason = collector.feed(recv_bytes)
+                if end_reason is not None:
+                    return collector.get_output_bytes(), end_reason
+            end_reason = collector.check_timeout()
+            if end_reason is not None:
+                return collector.get_output_bytes(), end_reason
+
+    def create_output_collector(self, idle_timeout, hard_timeout, sentinel_pattern, first_data_timeout):
+        if hard_timeout is None:
+            hard_timeout = self.code_exec_timeout
+        return ShellOutputCollector(shell_prompt_str=self.shell_prompt_str, idle_timeout=idle_timeout, hard_timeout=hard_timeout,
+                                    sentinel_pattern=sentinel_pattern, first_data_timeout=first_data_timeout,
+                                    cancel_token=self.cancel_token)
+
+    def get_code_idle_timeout(self, one_line_code):
+        """
+        已学习到shell提示符时，命令输出以提示符结尾即可结束读取，空闲超时只是兜底，可以设置得长一些；
+        未学习到shell提示符时，只能依靠空闲超时判断命令输出是否结束，使用命令自身的code_post_wait_time
+        """
+        if self.shell_prompt_str != '':
+            return max(one_line_code.code_post_wait_time, CODE_EXEC_IDLE_TIMEOUT_DEFAULT)
+        else:
+            return one_line_code.code_post_wait_time
+
+    def send_one_line_code(self, one_line_code):
+        """
+        发送一行巡检命令，返回判断此命令输出是否结束时要用的结束标记<re.Pattern>（需要交互的命令为交互提问关键词，否则为None）
+        """
+        self.ssh_shell.send(one_line_code.code_content.strip().encode('utf8'))  # 发送巡检命令，一行命令（会过滤命令前后的空白字符）
+        self.ssh_shell.send("\n".encode('utf8'))  # 命令strip()后，不带\n换行，需要额外发送一个换行符
+        if one_line_code.need_interactive:  # 需要交互的命令，输出最后一行可能是交互提问，而不是shell提示符
+            return re.compile(one_line_code.interactive_question_keyword, re.I)
+        else:
+            return None
+
+    def process_one_line_code_output(self, cmd_index, one_line_code, inspection_code_block_obj, cmd_recv, end_reason):
+        """
+        创建一行巡检命令的输出对象，并根据结束原因处理超时及shell提示符变更，交互处理完成后由调用者调用emit_output()保存，
+        返回 (ssh_opt_output_obj<SSHOperatorOutput>, output_last_line<str>)，通道已被关闭时ssh_opt_output_obj为None（输出已保存）
+        """
+        invoke_shell_output_str_list = cmd_recv.decode('utf8', errors='replace').split('\r\n')
+        invoke_shell_output_str = '\n'.join(invoke_shell_output_str_list)  # 这与前面一行共同作用是去除'\r'
+        output_str_lines = invoke_shell_output_str.split('\n')
+        output_last_line_index = len(output_str_lines) - 1
+        output_last_line = output_str_lines[output_last_line_index]  # 命令输出最后一行（shell提示符，不带换行符的）
+        ssh_opt_output_obj = SSHOperatorOutput(code_index=cmd_index, code_exec_method=CODE_EXEC_METHOD_INVOKE_SHELL,
+                                               code_content=one_line_code.code_content, invoke_shell_output_bytes=cmd_recv,
+                                               invoke_shell_output_last_line_str=output_last_line,
+                                               inspection_code_block_oid=inspection_code_block_obj.oid)
+        print(f"SSHOperator.process_one_line_code_output : $$ 命令{cmd_index} $$ 输出结果如下 ##############\n", invoke_shell_output_str)
+        # 有的shell提示符末尾有个空格，当然了，也有的shell提示符末尾没有空格
+        print("SSHOperator.process_one_line_code_output : 命令输出最后一行（可能是shell提示符，无换行符）为: ",
+              f"{output_last_line.encode('utf8')}")
+        if end_reason == RECV_END_REASON_CLOSED:
+            print("SSHOperator.process_one_line_code_output : shell通道已被远端关闭")
+            self.emit_output(ssh_opt_output_obj)
+            return None, output_last_line
+        if end_reason == RECV_END_REASON_CANCELLED:
+            self.check_cancelled()  # 超过截止时间的标记为超时
+            print(f"SSHOperator.process_one_line_code_output : 命令{cmd_index} 巡检作业已被取消或已超过截止时间，不再执行剩余命令")
+            self.emit_output(ssh_opt_output_obj)  # 已收到的部分输出也要保存
+            return None, output_last_line
+        if end_reason == RECV_END_REASON_HARD_TIMEOUT:
+            print(f"SSHOperator.process_one_line_code_output : 命令{cmd_index} 等待输出超时")
+            self.host_job_status_obj.exec_timeout = COF_YES
+        if end_reason == RECV_END_REASON_IDLE and not one_line_code.need_interactive:
+            # 命令执行后shell提示符可能会变化（如cd切换目录、网络设备进入系统视图），以空闲结束时重新学习shell提示符
+            new_prompt_str = ShellOutputCollector.get_last_line_of_output(cmd_recv)
+            if new_prompt_str != '' and new_prompt_str != self.shell_prompt_str:
+                print(f"SSHOperator.process_one_line_code_output : shell提示符变更为:  {new_prompt_str.encode('utf8')}")
+                self.shell_prompt_str = new_prompt_str
+        return ssh_opt_output_obj, output_last_line
+
+    def run_invoke_shell(self, inspection_code_block_obj):
+        """
+        使用invoke_shell交互式shell执行命令
+        """
+        self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN
+        if inspection_code_block_obj.code_list is None:
+            print("SSHOperator.run_invoke_shell : (inspection_code_block_obj.code_list) is None")
+            return None
+        # ★★开始执行正式命令★★
+        self.run_status = INSPECTION_JOB_EXEC_STATE_STARTED
+        code_list = inspection_code_block_obj.code_list
+        cmd_index = 0
+        while cmd_index < len(code_list):
+            one_line_code = code_list[cmd_index]
+            if not isinstance(one_line_code, OneLineCode):
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+            if not self.run_one_line_code(cmd_index, one_line_code, inspection_code_block_obj):
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+            cmd_index = self.get_next_cmd_index(cmd_index, inspection_code_block_obj)
+        self.run_status = INSPECTION_JOB_EXEC_STATE_COMPLETED
+
+    def run_one_line_code(self, cmd_index, one_line_code, inspection_code_block_obj):
+        """
+        在invoke_shell里执行一行命令并等待其输出结束（含交互应答），返回是否可继续执行下一行命令
+        """
+        if self.check_cancelled():  # 每条命令发送前检查，作业已被取消或已超过截止时间则不再发送
+            return False
+        try:
+            sentinel_pattern = self.send_one_line_code(one_line_code)
+            # 发送完命令后，持续读取系统回复，直到出现shell提示符（或交互提问、或超时）
+            cmd_recv, end_reason = self.recv_until_prompt(idle_timeout=self.get_code_idle_timeout(one_line_code),
+                                                          sentinel_pattern=sentinel_pattern)
+        except Exception as err:
+            print(f"SSHOperator.run_one_line_code: {err}")
+            return False
+        ssh_opt_output_obj, output_last_line = self.process_one_line_code_output(cmd_index, one_line_code, inspection_code_block_obj,
+                                                                                 cmd_recv, end_reason)
+        if ssh_opt_output_obj is None:
+            return False
+        if one_line_code.need_interactive:  # 命令如果需要处理交互情况，则判断交互提问关键词
+            self.process_code_interactive(one_line_code, output_last_line, ssh_opt_output_obj)
+        self.emit_output(ssh_opt_output_obj)
+        self.host_job_status_obj.current_exec_code_num += 1
+        self.host_job_status_obj.publish()
+        return True
+
+    def run_invoke_shell_pipeline(self, inspection_code_block_obj):
+        """
+        使用invoke_shell交互式shell流水线执行命令，连续的非交互命令由run_pipelined_code_list()一次发送一个窗口，
+        需要交互的命令（need_interactive）仍由run_one_line_code()逐条执行；
+        有执行条件的命令之后的命令，要等它执行完成、判断了执行条件后才发送；
+        目标主机不是POSIX shell（如网络设备）时，改为run_invoke_shell()逐条执行
+        """
+        self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN
+        code_list = inspection_code_block_obj.code_list
+        if code_list is None:
+            print("SSHOperator.run_invoke_shell_pipeline : (inspection_code_block_obj.code_list) is None")
+            return None
+        try:
+            is_posix_shell = self.check_posix_shell()
+        except Exception as err:
+            print(f"SSHOperator.run_invoke_shell_pipeline: {err}")
+            self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            return None
+        if not is_posix_shell:
+            print("SSHOperator.run_invoke_shell_pipeline : 目标主机的shell不支持流水线执行（非sh/bash等POSIX shell），改为逐条执行")
+            return self.run_invoke_shell(inspection_code_block_obj)
+        self.run_status = INSPECTION_JOB_EXEC_STATE_STARTED
+        cmd_index = 0
+        while cmd_index < len(code_list):
+            if not isinstance(code_list[cmd_index], OneLineCode):
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+            if code_list[cmd_index].need_interactive:
+                is_succeed = self.run_one_line_code(cmd_index, code_list[cmd_index], inspection_code_block_obj)
+                end_index = cmd_index + 1
+            else:
+                end_index = cmd_index + 1
+                while end_index < len(code_list) and isinstance(code_list[end_index], OneLineCode) \
+                        and not code_list[end_index].need_interactive and not code_list[end_index - 1].has_condition():
+                    end_index += 1
+                try:
+                    is_succeed = self.run_pipelined_code_list(cmd_index, end_index, inspection_code_block_obj)
+                except Exception as err:
+                    print(f"SSHOperator.run_invoke_shell_pipeline: {err}")
+                    is_succeed = False
+            if not is_succeed:
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+            cmd_index = self.get_next_cmd_index(end_index - 1, inspection_code_block_obj)
+        self.run_status = INSPECTION_JOB_EXEC_STATE_COMPLETED
+
+    def check_posix_shell(self):
+        """
+        流水线执行依赖POSIX shell的echo、$?及stty，首次流水线执行前发送一条结束标记命令探测，结果缓存到self.is_posix_shell；
+        网络设备等非POSIX shell会回复命令错误及shell提示符，很快就能判断出来，不会每个窗口都等待code_exec_timeout秒
+        """
+        if self.is_posix_shell is None:
+            demuxer = ShellPipelineDemuxer(shell_prompt_str=self.shell_prompt_str, is_code_line_added=False)
+            self.ssh_shell.send((demuxer.get_marker_command(0) + "\n").encode('utf8'))
+            recv_bytes, _ = self.recv_until_prompt(idle_timeout=LOGIN_OUTPUT_IDLE_TIMEOUT, hard_timeout=CODE_PIPELINE_PROBE_TIMEOUT)
+            finished_code_list = demuxer.feed(recv_bytes)
+            self.is_posix_shell = len(finished_code_list) != 0 and finished_code_list[0][1] is not None
+            print(f"SSHOperator.check_posix_shell : 目标主机的shell是否支持流水线执行: {self.is_posix_shell}")
+        return self.is_posix_shell
+
+    def run_pipelined_code_list(self, start_index, end_index, inspection_code_block_obj):
+        """
+        流水线执行code_list[start_index:end_index]（都是非交互命令），已发送但还未结束的命令不超过CODE_PIPELINE_WINDOW_SIZE条，
+        每收到一个结束标记就补发后面的命令；单条命令从上一条结束起超过code_exec_timeout秒未结束，则不再执行剩余命令，
+        返回是否可继续执行下一行命令；无论是否正常结束，都会恢复终端回显，未正常结束时先让shell回到提示符
+        """
+        self.run_shell_setting_command("stty -echo")
+        end_reason = RECV_END_REASON_ERROR
+        try:
+            end_reason = self.recv_pipelined_code_list(start_index, end_index, inspection_code_block_obj)
+        finally:
+            self.restore_shell_after_pipeline(end_reason)
+        return end_reason is None
+
+    def restore_shell_after_pipeline(self, end_reason):
+        """
+        流水线执行结束后恢复终端回显（stty echo）；未正常结束（end_reason不为None，命令超时、作业取消或出错）时，
+        shell里可能还有正在执行的命令，及已发送还未执行的命令和结束标记，先发送Ctrl-C中断命令并清空终端输入缓冲区，
+        再读取到shell提示符为止，丢弃这些输出，之后的巡检代码块不会在同一个shell里收到它们；通道已关闭时不用处理
+        """
+        if end_reason == RECV_END_REASON_CLOSED or self.ssh_shell is None:
+            return
+        try:
+            if end_reason is not None:
+                self.ssh_shell.send(b'\x03')
+                self.recv_until_prompt(idle_timeout=LOGIN_OUTPUT_IDLE_TIMEOUT, hard_timeout=CODE_PIPELINE_RESYNC_TIMEOUT)
+            self.run_shell_setting_command("stty echo")
+        except Exception as err:
+            print(f"SSHOperator.restore_shell_after_pipeline: {err}")
+
+    def recv_pipelined_code_list(self, start_index, end_index, inspection_code_block_obj):
+        """
+        run_pipelined_code_list()的发送及读取部分，所有命令都正常结束时返回None，否则返回结束原因 RECV_END_REASON_*
+        """
+        code_list = inspection_code_block_obj.code_list
+        demuxer = ShellPipelineDemuxer(shell_prompt_str=self.shell_prompt_str, code_list=code_list)
+        send_bytes_dict = {}  # 已发送还未结束的命令，key为cmd_index，value为发送的字节数
+        next_send_index = start_index
+        next_recv_index = start_index
+        last_finish_time = time.time()
+        self.ssh_shell.settimeout(CHANNEL_RECV_POLL_INTERVAL)
+        while next_recv_index < end_index:
+            send_bytes = b''
+            while next_send_index < end_index and len(send_bytes_dict) < CODE_PIPELINE_WINDOW_SIZE:
+                code_bytes = "\n".join([code_list[next_send_index].code_content.strip(),
+                                        demuxer.get_marker_command(next_send_index), ""]).encode('utf8')
+                if len(send_bytes_dict) != 0 and sum(send_bytes_dict.values()) + len(code_bytes) > CODE_PIPELINE_WINDOW_MAX_BYTES:
+                    break
+                send_bytes_dict[next_send_index] = len(code_bytes)
+                send_bytes += code_bytes
+                next_send_index += 1
+            if send_bytes != b'':
+                self.ssh_shell.sendall(send_bytes)
+            try:
+                recv_bytes = self.ssh_shell.recv(CHANNEL_RECV_BUFFER_SIZE)
+            except socket.timeout:
+                recv_bytes = None
+            if recv_bytes is not None and len(recv_bytes) != 0:
+                for cmd_index, exit_status, cmd_recv in demuxer.feed(recv_bytes):
+                    ssh_opt_output_obj, _ = self.process_one_line_code_output(cmd_index, code_list[cmd_index], inspection_code_block_obj,
+                                                                              cmd_recv, RECV_END_REASON_SENTINEL)
+                    ssh_opt_output_obj.exec_command_exit_status = exit_status
+                    self.emit_output(ssh_opt_output_obj)
+                    self.host_job_status_obj.current_exec_code_num += 1
+                    self.host_job_status_obj.publish()
+                    send_bytes_dict.pop(cmd_index, None)
+                    next_recv_index = cmd_index + 1
+                    last_finish_time = time.time()
+            if recv_bytes is not None and len(recv_bytes) == 0:
+                end_reason = RECV_END_REASON_CLOSED
+            elif next_recv_index >= end_index:
+                continue
+            elif self.check_cancelled():
+                end_reason = RECV_END_REASON_CANCELLED
+            elif time.time() - last_finish_time >= self.code_exec_timeout:
+                end_reason = RECV_END_REASON_HARD_TIMEOUT
+            else:
+                continue
+            # 通道关闭、作业取消、命令超时，已收到的部分输出算作正在执行的命令的输出，剩余命令不再执行
+            ssh_opt_output_obj, _ = self.process_one_line_code_output(next_recv_index, code_list[next_recv_index],
+                                                                      inspection_code_block_obj,
+                                                                      demuxer.strip_output(next_recv_index, demuxer.get_pending_bytes()),
+                                                                      end_reason)
+            if ssh_opt_output_obj is not None:
+                self.emit_output(ssh_opt_output_obj)
+            return end_reason
+        # 最后一个结束标记之后是shell提示符，读取完，不要留给之后的命令；执行的命令可能改变了shell提示符（如cd切换目录），重新学习
+        remaining_bytes = demuxer.get_pending_bytes()
+        if self.shell_prompt_str == '' or ShellOutputCollector.get_last_line_of_output(remaining_bytes) != self.shell_prompt_str:
+            recv_bytes, _ = self.recv_until_prompt(idle_timeout=LOGIN_OUTPUT_IDLE_TIMEOUT)
+            remaining_bytes += recv_bytes
+        new_prompt_str = ShellOutputCollector.get_last_line_of_output(remaining_bytes)
+        if new_prompt_str != '' and new_prompt_str != self.shell_prompt_str:
+            print(f"SSHOperator.recv_pipelined_code_list : shell提示符变更为:  {new_prompt_str.encode('utf8')}")
+            self.shell_prompt_str = new_prompt_str
+        return None
+
+    def run_shell_setting_command(self, setting_command):
+        """
+        逐条执行一条设置终端的命令（如stty -echo），输出不保存
+        """
+        self.ssh_shell.send((setting_command + "\n").encode('utf8'))
+        self.recv_until_prompt(idle_timeout=LOGIN_OUTPUT_IDLE_TIMEOUT)
+
+    def process_code_interactive(self, code, output_last_line, ssh_opt_output_obj, second_time=False, interactive_times=0):
+        """
+        处理命令的交互式应答，有时执行某些命令执后，系统会提示输入[Y/N]?，要求回复
+        """
+        ret = re.search(code.interactive_question_keyword, output_last_line, re.I)  # 对命令输出的最后一行进行关键词匹配，不区分大小写
+        if ret is not None:  # 如果匹配上需要交互的提问字符串
+            print(f"SSHOperator.process_code_interactive : 匹配到交互关键字 {ret} ，执行交互回答:")
+            self.ssh_shell.send(code.interactive_answer.encode('utf8'))  # 发送交互回答内容，这里不会额外发送\n换行，也不过滤空白字符
+            try:
+                # 发送完交互回答后，持续读取系统回复，直到出现shell提示符或再次出现交互提问
+                recv, end_reason = self.recv_until_prompt(idle_timeout=self.get_code_idle_timeout(code),
+                                                          sentinel_pattern=re.compile(code.interactive_question_keyword, re.I))
+            except Exception as e:
+                print(e)
+                return
+            # interactive_output_str_list = recv.decode('utf8').split('\r\n')
+            # interactive_output_str = '\n'.join(interactive_output_str_list)  # 这与前面一行共同作用是去除'\r'
+            interactive_output_str = recv.decode('utf8', errors='replace').replace('\r', '')
+            print(interactive_output_str)
+            ssh_opt_output_obj.interactive_output_bytes_list.append(recv)
+            if end_reason in (RECV_END_REASON_CLOSED, RECV_END_REASON_CANCELLED):
+                return
+            if end_reason == RECV_END_REASON_HARD_TIMEOUT:
+                self.host_job_status_obj.exec_timeout = COF_YES
+                return
+            if second_time is True:
+                print("SSHOperator.process_code_interactive : 上面输出为twice的★★★★★")
+                return
+            if interactive_times > MAX_INTERACTIVE_COUNT:
+                return
+            interactive_times += 1
+            interactive_output_str_lines = interactive_output_str.split('\n')
+            interactive_output_last_line_index = len(interactive_output_str_lines) - 1
+            if code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_LOOP and len(interactive_output_str_lines) != 0:
+                self.process_code_interactive(code, interactive_output_str_lines[interactive_output_last_line_index],
+                                              ssh_opt_output_obj, second_time=False, interactive_times=interactive_times)
+            if code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_TWICE and len(interactive_output_str_lines) != 0:
+                self.process_code_interactive(code, interactive_output_str_lines[interactive_output_last_line_index],
+                                              ssh_opt_output_obj, second_time=True, interactive_times=interactive_times)
+        else:
+            # 如果没有匹配上需要交互的提问判断字符串，就结束交互
+            return
+
+    def run_exec_command(self, inspection_code_block_obj):
+        """
+        使用exec_command方式执行命令，每行命令在已登录的ssh连接上单独开一个通道，没有shell提示符判断，也不用等待空闲超时，
+        通道关闭即命令执行结束；同时执行inspection_code_block_obj.exec_command_concurrency行命令，输出仍按命令顺序保存
+        ★每行命令都是独立的进程，cd、export等对后续命令无效，依赖前面命令执行结果的巡检代码块应使用invoke_shell方式
+        ★有执行条件的命令之后的命令，要等它执行完成、判断了执行条件后才执行，一次只并发执行到下一条有执行条件的命令为止
+        """
+        self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN
+        if inspection_code_block_obj.code_list is None:
+            print("SSHOperator.run_exec_command : (inspection_code_block_obj.code_list) is None")
+            return None
+        for one_line_code in inspection_code_block_obj.code_list:
+            if not isinstance(one_line_code, OneLineCode):
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+        self.run_status = INSPECTION_JOB_EXEC_STATE_STARTED
+        code_list = inspection_code_block_obj.code_list
+        code_num = len(code_list)
+        concurrency = max(1, min(inspection_code_block_obj.exec_command_concurrency, EXEC_COMMAND_CONCURRENCY_MAX, code_num))
+        is_failed = False
+        cmd_index = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while cmd_index < code_num and not is_failed:
+                end_index = cmd_index + 1
+                while end_index < code_num and not code_list[end_index - 1].has_condition():
+                    end_index += 1
+                future_list = [executor.submit(self.exec_one_line_code, index, code_list[index], inspection_code_block_obj)
+                               for index in range(cmd_index, end_index)]
+                for future in future_list:  # 按命令顺序保存，前面的命令执行完即可保存，不用等待整个巡检代码块
+                    ssh_opt_output_obj = future.result()
+                    if ssh_opt_output_obj is None:
+                        is_failed = True
+                    else:
+                        self.emit_output(ssh_opt_output_obj)
+                if not is_failed:
+                    cmd_index = self.get_next_cmd_index(end_index - 1, inspection_code_block_obj)
+        if is_failed:
+            self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+        else:
+            self.run_status = INSPECTION_JOB_EXEC_STATE_COMPLETED
+
+    def exec_one_line_code(self, cmd_index, one_line_code, inspection_code_block_obj):
+        """
+        开一个exec通道执行一行命令，分别读取stdout、stderr及退出码，由run_exec_command()的线程池并发调用，
+        返回<SSHOperatorOutput>，打开通道失败（连接已断开等）时返回None
+        ★需要交互的命令：stdout最后一行匹配到交互提问关键词时，向stdin发送交互回答，次数按interactive_process_method限制；
+          不需要交互的命令：立即关闭stdin，读取stdin的命令不会一直等待输入
+        """
+        if self.check_cancelled():  # 排队中的命令，作业已被取消或已超过截止时间则不再执行
+            return None
+        try:
+            channel = self.ssh_client.get_transport().open_session(timeout=self.timeout)
+        except Exception as err:
+            print(f"SSHOperator.exec_one_line_code: 命令{cmd_index} 打开exec通道失败 {err}")
+            return None
+        stdout_bytes_list = []
+        stderr_bytes_list = []
+        exit_status = None
+        try:
+            channel.settimeout(CHANNEL_RECV_POLL_INTERVAL)
+            channel.exec_command(one_line_code.code_content.strip())
+            if one_line_code.need_interactive:
+                interactive_pattern = re.compile(one_line_code.interactive_question_keyword, re.I)
+                if one_line_code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_LOOP:
+                    interactive_times_left = MAX_INTERACTIVE_COUNT + 1
+                elif one_line_code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_TWICE:
+                    interactive_times_left = 2
+                else:
+                    interactive_times_left = 1
+            else:
+                interactive_pattern = None
+                interactive_times_left = 0
+                channel.shutdown_write()
+            tail_bytes = b''  # 只对上次交互回答之后的输出末尾判断交互提问
+            deadline = time.time() + self.code_exec_timeout
+            while True:
+                try:
+                    recv_bytes = channel.recv(CHANNEL_RECV_BUFFER_SIZE)  # 有数据到达即返回，无数据时最多阻塞CHANNEL_RECV_POLL_INTERVAL秒
+                except socket.timeout:
+                    recv_bytes = None
+                while channel.recv_stderr_ready():
+                    stderr_bytes_list.append(channel.recv_stderr(CHANNEL_RECV_BUFFER_SIZE))
+                if recv_bytes == b'':  # 读到空bytes，说明命令已结束，通道已被远端关闭
+                    break
+                if recv_bytes is not None:
+                    stdout_bytes_list.append(recv_bytes)
+                    if interactive_times_left > 0:
+                        tail_bytes = (tail_bytes + recv_bytes)[-CHANNEL_RECV_BUFFER_SIZE:]
+                        if interactive_pattern.search(ShellOutputCollector.get_last_line_of_output(tail_bytes)) is not None:
+                            print(f"SSHOperator.exec_one_line_code : 命令{cmd_index} 匹配到交互关键字，执行交互回答")
+                            channel.send(one_line_code.interactive_answer.encode('utf8'))
+                            tail_bytes = b''
+                            interactive_times_left -= 1
+                            if interactive_times_left == 0:
+                                channel.shutdown_write()
+                if time.time() >= deadline:
+                    print(f"SSHOperator.exec_one_line_code : 命令{cmd_index} 等待输出超时")
+                    self.host_job_status_obj.exec_timeout = COF_YES
+                    break
+                if self.check_cancelled():
+                    print(f"SSHOperator.exec_one_line_code : 命令{cmd_index} 巡检作业已被取消或已超过截止时间")
+                    break
+            # 退出码一般在通道关闭前就已收到，这里最多再等待一个CHANNEL_RECV_POLL_INTERVAL
+            if channel.exit_status_ready() or channel.status_event.wait(CHANNEL_RECV_POLL_INTERVAL):
+                exit_status = channel.recv_exit_status()
+            while channel.recv_stderr_ready():
+                stderr_bytes_list.append(channel.recv_stderr(CHANNEL_RECV_BUFFER_SIZE))
+        except Exception as err:
+            print(f"SSHOperator.exec_one_line_code: 命令{cmd_index} {err}")
+            return None
+        finally:
+            channel.close()
+        stdout_bytes = b''.join(stdout_bytes_list)
+        stdout_str = stdout_bytes.decode('utf8', errors='replace')
+        stderr_str = b''.join(stderr_bytes_list).decode('utf8', errors='replace')
+        ssh_opt_output_obj = SSHOperatorOutput(code_index=cmd_index, code_exec_method=CODE_EXEC_METHOD_EXEC_COMMAND,
+                                               code_content=one_line_code.code_content, invoke_shell_output_bytes=stdout_bytes,
+                                               exec_command_stdout_line_list=stdout_str.splitlines(keepends=True),
+                                               exec_command_stderr_line_list=stderr_str.splitlines(keepends=True),
+                                               is_empty_output=(stdout_bytes == b'' and stderr_str == ''),
+                                               inspection_code_block_oid=inspection_code_block_obj.oid,
+                                               exec_command_exit_status=exit_status)
+        print(f"SSHOperator.exec_one_line_code : $$ 命令{cmd_index} $$ 退出码: {exit_status} 输出结果如下 ##############\n",
+              stdout_str, stderr_str)
+        with self.exec_command_lock:
+            self.host_job_status_obj.current_exec_code_num += 1
+            self.host_job_status_obj.publish()
+        return ssh_opt_output_obj
+
+    def run_script(self, inspection_code_block_obj):
+        """
+        使用脚本执行方式执行命令，整个巡检代码块生成一个脚本（见InspectionCodeBlock.build_script()），只开一个exec通道执行一次，
+        按每条命令后的结束标记拆分回各条命令的输出及退出码；脚本以内容的哈希命名，缓存在目标主机的 ~/SCRIPT_REMOTE_DIR 目录里，
+        目标主机上还没有此脚本（首次执行或命令已修改）时才用sftp上传后再执行，脚本不变时每台主机只需一个往返
+        ★所有命令在同一个shell进程里执行，cd、export等对后续命令有效；stdin已关闭，不支持交互命令（need_interactive不起作用）
+        ★满足执行条件需跳过后面的命令时关闭通道，跳转到后面的命令时从该命令重新执行脚本（新的shell进程，之前的cd、变量等不再有效）
+        """
+        self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN
+        code_list = inspection_code_block_obj.code_list
+        if code_list is None:
+            print("SSHOperator.run_script : (inspection_code_block_obj.code_list) is None")
+            return None
+        for one_line_code in code_list:
+            if not isinstance(one_line_code, OneLineCode):
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+        self.run_status = INSPECTION_JOB_EXEC_STATE_STARTED
+        if len(code_list) == 0:
+            self.run_status = INSPECTION_JOB_EXEC_STATE_COMPLETED
+            return
+        script_token, script_bytes, interpreter = inspection_code_block_obj.build_script()
+        remote_path = f"{SCRIPT_REMOTE_DIR}/cofable_{inspection_code_block_obj.oid}_{script_token}.sh"
+        start_index = 0
+        is_uploaded = False
+        while start_index < len(code_list):
+            exec_command_str = " ".join([f"if [ -f {remote_path} ]; then {SCRIPT_START_INDEX_ENV}={start_index} {interpreter} {remote_path};",
+                                         f"else echo {SCRIPT_NOT_FOUND_MARKER}; fi"])
+            try:
+                is_script_found, next_cmd_index = self.exec_script(exec_command_str, script_token, inspection_code_block_obj, start_index)
+                if not is_script_found and not is_uploaded:
+                    print(f"SSHOperator.run_script : 目标主机上还没有脚本 {remote_path} ，上传后再执行")
+                    self.upload_script(remote_path, script_bytes, inspection_code_block_obj)
+                    is_uploaded = True
+                    continue
+            except Exception as err:
+                print(f"SSHOperator.run_script: {err}")
+                next_cmd_index = None
+            if next_cmd_index is None:
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+            start_index = next_cmd_index
+        self.run_status = INSPECTION_JOB_EXEC_STATE_COMPLETED
+
+    def exec_script(self, exec_command_str, script_token, inspection_code_block_obj, start_index):
+        """
+        开一个exec通道从第start_index条命令开始执行已上传的脚本，边读取边按结束标记拆分出每条命令的输出并保存，
+        单条命令从上一条结束起超过code_exec_timeout秒未结束则不再等待，返回 (is_script_found, next_cmd_index)，
+        next_cmd_index为下一条要执行的命令（执行条件跳转时脚本已停止，需从它重新执行脚本），通道关闭、作业取消或命令超时时为None
+        """
+        code_list = inspection_code_block_obj.code_list
+        demuxer = ShellPipelineDemuxer(code_list=code_list, token=script_token, is_code_line_added=False)
+        stderr_bytes_list = []  # 脚本里已把stderr合并到stdout，这里只有脚本开始执行前的报错（如解释器不存在）
+        next_recv_index = start_index
+        next_cmd_index = start_index
+        last_finish_time = time.time()
+        end_reason = None
+        channel = self.ssh_client.get_transport().open_session(timeout=self.timeout)
+        try:
+            channel.settimeout(CHANNEL_RECV_POLL_INTERVAL)
+            channel.exec_command(exec_command_str)
+            channel.shutdown_write()
+            while next_recv_index < len(code_list):
+                try:
+                    recv_bytes = channel.recv(CHANNEL_RECV_BUFFER_SIZE)
+                except socket.timeout:
+                    recv_bytes = None
+                while channel.recv_stderr_ready():
+                    stderr_bytes_list.append(channel.recv_stderr(CHANNEL_RECV_BUFFER_SIZE))
+                if recv_bytes == b'':
+                    end_reason = RECV_END_REASON_CLOSED
+                    break
+                if recv_bytes is not None:
+                    for cmd_index, exit_status, cmd_recv in demuxer.feed(recv_bytes):
+                        self.emit_output(self.create_script_output(cmd_index, code_list[cmd_index], inspection_code_block_obj,
+                                                                   cmd_recv, exit_status))
+                        self.host_job_status_obj.current_exec_code_num += 1
+                        self.host_job_status_obj.publish()
+                        next_recv_index = cmd_index + 1
+                        next_cmd_index = self.get_next_cmd_index(cmd_index, inspection_code_block_obj)
+                        last_finish_time = time.time()
+                        if next_cmd_index != next_recv_index:  # 满足执行条件跳过了后面的命令，脚本里已执行的后续命令输出不保存
+                            break
+                if next_recv_index >= len(code_list) or next_cmd_index != next_recv_index:
+                    break
+                if self.check_cancelled():
+                    end_reason = RECV_END_REASON_CANCELLED
+                    break
+                if time.time() - last_finish_time >= self.code_exec_timeout:
+                    end_reason = RECV_END_REASON_HARD_TIMEOUT
+                    break
+        finally:
+            channel.close()
+        if end_reason is None:
+            return True, next_cmd_index
+        remaining_bytes = demuxer.get_pending_bytes() + b''.join(stderr_bytes_list)
+        if next_recv_index == start_index and end_reason == RECV_END_REASON_CLOSED \
+                and remaining_bytes.strip() == SCRIPT_NOT_FOUND_MARKER.encode('utf8'):
+            return False, None
+        if end_reason == RECV_END_REASON_HARD_TIMEOUT:
+            print(f"SSHOperator.exec_script : 命令{next_recv_index} 等待输出超时")
+            self.host_job_status_obj.exec_timeout = COF_YES
+        # 通道关闭、作业取消、命令超时，已收到的部分输出算作正在执行的命令的输出，剩余命令不再执行
+        self.emit_output(self.create_script_output(next_recv_index, code_list[next_recv_index], inspection_code_block_obj,
+                                                   remaining_bytes, None))
+        return True, None
+
+    def create_script_output(self, cmd_index, one_line_code, inspection_code_block_obj, output_bytes, exit_status):
+        """
+        脚本执行方式拆分出的一条命令的输出，与exec_command方式的输出一样保存（没有命令行及shell提示符，stderr已合并到stdout）
+        """
+        output_str = output_bytes.decode('utf8', errors='replace')
+        print(f"SSHOperator.exec_script : $$ 命令{cmd_index} $$ 退出码: {exit_status} 输出结果如下 ##############\n", output_str)
+        return SSHOperatorOutput(code_index=cmd_index, code_exec_method=CODE_EXEC_METHOD_EXEC_COMMAND,
+                                 code_content=one_line_code.code_content, invoke_shell_output_bytes=output_bytes,
+                                 exec_command_stdout_line_list=output_str.splitlines(keepends=True),
+                                 exec_command_stderr_line_list=[],
+                                 is_empty_output=(output_bytes == b''),
+                                 inspection_code_block_oid=inspection_code_block_obj.oid,
+                                 exec_command_exit_status=exit_status)
+
+    def upload_script(self, remote_path, script_bytes, inspection_code_block_obj):
+        """
+        用sftp把脚本上传到目标主机，先写临时文件再改名，同时执行此脚本的其他作业不会读到写了一半的脚本；
+        并删除此巡检代码块之前上传的旧版本脚本（不含本次的remote_path，可能正被同时执行此脚本的其他作业使用），
+        每个巡检代码块在一台目标主机上只保留一个脚本
+        """
+        sftp = self.ssh_client.open_sftp()
+        try:
+            try:
+                sftp.mkdir(SCRIPT_REMOTE_DIR, mode=0o700)
+            except IOError:
+                pass  # 目录已存在
+            old_script_prefix = f"cofable_{inspection_code_block_obj.oid}_"
+            script_file_name = remote_path.rsplit("/", 1)[-1]
+            for file_name in sftp.listdir(SCRIPT_REMOTE_DIR):
+                if file_name.startswith(old_script_prefix) and not file_name.endswith(".tmp") and file_name != script_file_name:
+                    try:
+                        sftp.remove(f"{SCRIPT_REMOTE_DIR}/{file_name}")
+                    except IOError:
+                        pass
+            tmp_path = f"{remote_path}.{uuid.uuid4().hex[:8]}.tmp"
+            sftp.putfo(io.BytesIO(script_bytes), tmp_path)
+            try:
+                sftp.posix_rename(tmp_path, remote_path)
+            except IOError:  # sftp服务端不支持posix-rename扩展
+                sftp.rename(tmp_path, remote_path)
+        finally:
+            sftp.close()
+
+    async def async_open_tcp_connection(self, loop):
+        """
+        以非阻塞方式建立到目标主机ssh端口的tcp连接，目标主机不可达时只占用一个协程，不占用线程，返回已连接的<socket>
+        """
+        addr_info_list = await loop.getaddrinfo(self.hostname, self.port, type=socket.SOCK_STREAM)
+        last_err = OSError(f"SSHOperator.async_open_tcp_connection: 无法解析地址 {self.hostname}")
+        for family, sock_type, proto, _, sock_addr in addr_info_list:
+            sock = socket.socket(family, sock_type, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, sock_addr)
+            except OSError as err:
+                sock.close()
+                last_err = err
+                continue
+            sock.setblocking(True)  # 交给paramiko使用前，恢复为阻塞模式
+            return sock
+        raise last_err
+
+    def probe_tcp_port(self, timeout=CIRCUIT_BREAKER_PROBE_TIMEOUT):
+        """
+        探测目标主机的ssh端口能否建立tcp连接，熔断中的主机登录前使用，不做ssh握手及认证
+        """
+        try:
+            sock = socket.create_connection((self.hostname, self.port), timeout=timeout)
+        except OSError as err:
+            print(f"SSHOperator.probe_tcp_port: {self.hostname}:{self.port} 探测失败 {err}")
+            return False
+        sock.close()
+        return True
+
+    async def async_probe_tcp_port(self, loop, timeout=CIRCUIT_BREAKER_PROBE_TIMEOUT):
+        try:
+            sock = await asyncio.wait_for(self.async_open_tcp_connection(loop), timeout=timeout)
+        except (OSError, asyncio.TimeoutError) as err:
+            print(f"SSHOperator.async_probe_tcp_port: {self.hostname}:{self.port} 探测失败 {err}")
+            return False
+        sock.close()
+        return True
+
+    async def async_create_invoke_shell(self, loop, blocking_executor, open_shell=True):
+        """
+        create_invoke_shell()的协程版本，tcp连接及登录输出的读取在协程里完成，ssh密钥交换及认证交给blocking_executor线程池完成，
+        open_shell为False时只登录（同login()），巡检代码块都是exec_command方式时使用
+        """
+        sock = None
+        self.login_start_time = time.time()
+        if self.ssh_transport_pool is None or not self.ssh_transport_pool.has_available_transport(
+                SSHTransportPool.make_pool_key(self.hostname, self.port, self.username, self.auth_method,
+                                               self.password, self.private_key)):
+            try:
+                sock = await asyncio.wait_for(self.async_open_tcp_connection(loop), timeout=self.get_time_left(self.timeout))
+            except (OSError, asyncio.TimeoutError) as err:
+                print(f"SSHOperator.async_create_invoke_shell: 连接 {self.hostname}:{self.port} 失败 {err}")
+                self.set_login_result(self.get_login_result_of_error(err))
+                return COF_STATUS_FAILED
+        if open_shell:
+            ret = await loop.run_in_executor(blocking_executor, self.login_and_open_shell, sock)
+        else:
+            ret = await loop.run_in_executor(blocking_executor, self.login, sock)
+        if ret != COF_STATUS_SUCCEED:
+            if sock is not None:
+                sock.close()
+            return COF_STATUS_FAILED
+        if not open_shell:
+            return COF_STATUS_SUCCEED
+        try:
+            login_recv, end_reason = await self.async_recv_until_prompt(loop, idle_timeout=LOGIN_OUTPUT_IDLE_TIMEOUT,
+                                                                        hard_timeout=self.timeout, first_data_timeout=self.timeout)
+        except Exception as err:
+            print(f"SSHOperator.async_create_invoke_shell: {err}")
+            self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+            return COF_STATUS_FAILED
+        return self.process_login_output(login_recv, end_reason)
+
+    async def async_recv_until_prompt(self, loop, idle_timeout=CODE_EXEC_IDLE_TIMEOUT_DEFAULT, hard_timeout=None,
+                                      sentinel_pattern=None, first_data_timeout=None):
         """
-        关闭sh连接
+        recv_until_prompt()的协程版本，通过loop.add_reader()监听paramiko通道的fileno()，不阻塞线程，也不定时轮询：
+        只在有数据到达、到了收集器的下一个超时时间（空闲/总时长/截止时间）、或用户停止作业时被唤醒
         """
-        # ★★关闭ssh连接★★
-        self.ssh_shell.close()
-        self.ssh_client.close()
+        collector = self.create_output_collector(idle_timeout, hard_timeout, sentinel_pattern, first_data_timeout)
+        data_ready_event = asyncio.Event()
+        shell_fileno = self.ssh_shell.fileno()  # paramiko在通道有数据可读或通道关闭时，会使此fileno变为可读
+        loop.add_reader(shell_fileno, data_ready_event.set)
 
-    def run_invoke_shell(self, inspection_code_block_obj):
+        def wake_up_on_cancel():  # 可能在界面线程里被调用
+            try:
+                loop.call_soon_threadsafe(data_ready_event.set)
+            except RuntimeError:  # 事件循环已关闭
+                pass
+
+        if self.cancel_token is not None:
+            self.cancel_token.add_cancel_callback(wake_up_on_cancel)
+        try:
+            while True:
+                while self.ssh_shell.recv_ready():
+                    end_reason = collector.feed(self.ssh_shell.recv(CHANNEL_RECV_BUFFER_SIZE))
+                    if end_reason is not None:
+                        return collector.get_output_bytes(), end_reason
+                if self.ssh_shell.closed or self.ssh_shell.eof_received:
+                    return collector.get_output_bytes(), RECV_END_REASON_CLOSED
+                end_reason = collector.check_timeout()
+                if end_reason is not None:
+                    return collector.get_output_bytes(), end_reason
+                data_ready_event.clear()
+                if self.ssh_shell.recv_ready():
+                    continue
+                try:
+                    await asyncio.wait_for(data_ready_event.wait(), timeout=collector.get_time_to_next_timeout())
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            loop.remove_reader(shell_fileno)
+            if self.cancel_token is not None:
+                self.cancel_token.remove_cancel_callback(wake_up_on_cancel)
+
+    async def async_run_invoke_shell(self, loop, inspection_code_block_obj):
         """
-        使用invoke_shell交互式shell执行命令
+        run_invoke_shell()的协程版本，执行一个<InspectionCodeBlock>巡检代码块的所有命令
         """
         self.run_status = INSPECTION_JOB_EXEC_STATE_UNKNOWN
         if inspection_code_block_obj.code_list is None:
-            print("SSHOperator.run_invoke_shell : (inspection_code_block_obj.code_list) is None")
+            print("SSHOperator.async_run_invoke_shell : (inspection_code_block_obj.code_list) is None")
             return None
         # ★★开始执行正式命令★★
         self.run_status = INSPECTION_JOB_EXEC_STATE_STARTED
+        code_list = inspection_code_block_obj.code_list
         cmd_index = 0
-        for one_line_code in inspection_code_block_obj.code_list:
+        while cmd_index < len(code_list):
+            one_line_code = code_list[cmd_index]
             if not isinstance(one_line_code, OneLineCode):
                 self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
                 return
-            self.ssh_shell.send(one_line_code.code_content.strip().encode('utf8'))  # 发送巡检命令，一行命令（会过滤命令前后的空白字符）
-            self.ssh_shell.send("\n".encode('utf8'))  # 命令strip()后，不带\n换行，需要额外发送一个换行符
-            time.sleep(one_line_code.code_post_wait_time)  # 发送完命令后，要等待系统回复★★★
+            await self.async_wait_output_writable(loop)  # 输出写入线程跟不上时，先等待（含登录后的输出）再发送下一条命令
+            if self.check_cancelled():  # 每条命令发送前检查，作业已被取消或已超过截止时间则不再发送
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
             try:
-                cmd_recv = self.ssh_shell.recv(65535)
+                sentinel_pattern = self.send_one_line_code(one_line_code)
+                cmd_recv, end_reason = await self.async_recv_until_prompt(loop,
+                                                                          idle_timeout=self.get_code_idle_timeout(one_line_code),
+                                                                          sentinel_pattern=sentinel_pattern)
             except Exception as err:
-                print(f"SSHOperator.run_invoke_shell: {err}")
+                print(f"SSHOperator.async_run_invoke_shell: {err}")
+                self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
+                return
+            ssh_opt_output_obj, output_last_line = self.process_one_line_code_output(cmd_index, one_line_code, inspection_code_block_obj,
+                                                                                     cmd_recv, end_reason)
+            if ssh_opt_output_obj is None:
                 self.run_status = INSPECTION_JOB_EXEC_STATE_FAILED
                 return
-            invoke_shell_output_str_list = cmd_recv.decode('utf8').split('\r\n')
-            invoke_shell_output_str = '\n'.join(invoke_shell_output_str_list)  # 这与前面一行共同作用是去除'\r'
-            output_str_lines = invoke_shell_output_str.split('\n')
-            output_last_line_index = len(output_str_lines) - 1
-            output_last_line = output_str_lines[output_last_line_index]  # 命令输出最后一行（shell提示符，不带换行符的）
-            ssh_opt_output_obj = SSHOperatorOutput(code_index=cmd_index, code_exec_method=CODE_EXEC_METHOD_INVOKE_SHELL,
-                                                   code_content=one_line_code.code_content, invoke_shell_output_bytes=cmd_recv,
-                                                   invoke_shell_output_last_line_str=output_last_line,
-                                                   inspection_code_block_oid=inspection_code_block_obj.oid)
-            self.output_list.append(ssh_opt_output_obj)  # 命令输出结果保存到output_list里
-            print(f"SSHOperator.run_invoke_shell : $$ 命令{cmd_index} $$ 输出结果如下 ##############\n", invoke_shell_output_str)
-            # 有的shell提示符末尾有个空格，当然了，也有的shell提示符末尾没有空格
-            print(f"SSHOperator.run_invoke_shell : 命令输出最后一行（可能是shell提示符，无换行符）为:  {output_last_line.encode('utf8')}")
             if one_line_code.need_interactive:  # 命令如果需要处理交互情况，则判断交互提问关键词
-                self.process_code_interactive(one_line_code, output_last_line, ssh_opt_output_obj)
+                await self.async_process_code_interactive(loop, one_line_code, output_last_line, ssh_opt_output_obj)
+            self.emit_output(ssh_opt_output_obj)
             self.host_job_status_obj.current_exec_code_num += 1
-            cmd_index += 1
+            self.host_job_status_obj.publish()
+            cmd_index = self.get_next_cmd_index(cmd_index, inspection_code_block_obj)
         self.run_status = INSPECTION_JOB_EXEC_STATE_COMPLETED
 
-    def process_code_interactive(self, code, output_last_line, ssh_opt_output_obj, second_time=False, interactive_times=0):
+    async def async_process_code_interactive(self, loop, code, output_last_line, ssh_opt_output_obj):
         """
-        处理命令的交互式应答，有时执行某些命令执后，系统会提示输入[Y/N]?，要求回复
+        process_code_interactive()的协程版本，交互次数及结束条件与其相同，只是改为了循环实现
         """
-        ret = re.search(code.interactive_question_keyword, output_last_line, re.I)  # 对命令输出的最后一行进行关键词匹配，不区分大小写
-        if ret is not None:  # 如果匹配上需要交互的提问字符串
-            print(f"SSHOperator.process_code_interactive : 匹配到交互关键字 {ret} ，执行交互回答:")
+        second_time = False
+        interactive_times = 0
+        while re.search(code.interactive_question_keyword, output_last_line, re.I) is not None:
+            print("SSHOperator.async_process_code_interactive : 匹配到交互关键字，执行交互回答:")
             self.ssh_shell.send(code.interactive_answer.encode('utf8'))  # 发送交互回答内容，这里不会额外发送\n换行，也不过滤空白字符
-            time.sleep(code.code_post_wait_time)  # 发送完命令后，要等待系统回复
             try:
-                recv = self.ssh_shell.recv(65535)
+                recv, end_reason = await self.async_recv_until_prompt(loop, idle_timeout=self.get_code_idle_timeout(code),
+                                                                      sentinel_pattern=re.compile(code.interactive_question_keyword,
+                                                                                                  re.I))
             except Exception as e:
                 print(e)
                 return
-            # interactive_output_str_list = recv.decode('utf8').split('\r\n')
-            # interactive_output_str = '\n'.join(interactive_output_str_list)  # 这与前面一行共同作用是去除'\r'
-            interactive_output_str = recv.decode('utf8').replace('\r', '')
-            print(interactive_output_str)
             ssh_opt_output_obj.interactive_output_bytes_list.append(recv)
-            if second_time is True:
-                print("SSHOperator.process_code_interactive : 上面输出为twice的★★★★★")
+            if end_reason in (RECV_END_REASON_CLOSED, RECV_END_REASON_CANCELLED):
                 return
-            if interactive_times > MAX_INTERACTIVE_COUNT:
+            if end_reason == RECV_END_REASON_HARD_TIMEOUT:
+                self.host_job_status_obj.exec_timeout = COF_YES
+                return
+            if second_time is True or interactive_times > MAX_INTERACTIVE_COUNT:
                 return
             interactive_times += 1
-            interactive_output_str_lines = interactive_output_str.split('\n')
-            interactive_output_last_line_index = len(interactive_output_str_lines) - 1
-            if code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_LOOP and len(interactive_output_str_lines) != 0:
-                self.process_code_interactive(code, interactive_output_str_lines[interactive_output_last_line_index],
-                                              ssh_opt_output_obj, second_time=False, interactive_times=interactive_times)
-            if code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_TWICE and len(interactive_output_str_lines) != 0:
-                self.process_code_interactive(code, interactive_output_str_lines[interactive_output_last_line_index],
-                                              ssh_opt_output_obj, second_time=True, interactive_times=interactive_times)
-        else:
-            # 如果没有匹配上需要交互的提问判断字符串，就结束交互
+            output_last_line = recv.decode('utf8', errors='replace').replace('\r', '').split('\n')[-1]
+            if code.interactive_process_method == INTERACTIVE_PROCESS_METHOD_TWICE:
+                second_time = True
+            elif code.interactive_process_method != INTERACTIVE_PROCESS_METHOD_LOOP:
+                return
+
+
+class SqliteWriteTask:
+    """
+    放入<SqliteStorage>写队列的一个写操作，write_func(sqlite_cursor)由写线程调用
+    """
+
+    def __init__(self, write_func):
+        self.write_func = write_func
+        self.result = None  # write_func的返回值
+        self.error = None  # write_func执行失败时的异常，此时本写操作的所有修改已回滚，不影响同一事务里的其他写操作
+        self.done_event = threading.Event()
+
+
+class SqliteStorage:
+    """
+    本地sqlite3数据库存储层，全局只有一个，为<GlobalInfo>.sqlite_storage，所有资源的保存/加载/删除都经过它
+    ★读：长期保持若干个只读连接（连接池），读操作借用一个连接的游标，用完归还，不再每次查询都新建连接
+    ★写：只有一个专用的写线程持有写连接，其他线程把写操作放入队列，写线程把队列里已排队的多个写操作合并在一个事务里提交，
+      每个写操作单独一个SAVEPOINT，某个写操作出错只回滚它自己
+    ★数据库使用WAL日志模式，读不阻塞写，写也不阻塞读；建表语句只在open()时执行一次
+    ★read_only为True时（多进程分片模式的工作进程）以只读方式打开，不建表不升级，也不启动写线程，写操作都被放弃
+    """
+
+    def __init__(self, sqlite3_dbfile_name, read_connection_pool_size=SQLITE_READ_CONNECTION_POOL_SIZE, read_only=False):
+        self.sqlite3_dbfile_name = sqlite3_dbfile_name
+        self.read_connection_pool_size = read_connection_pool_size
+        self.read_only = read_only
+        self.read_connection_queue = queue.Queue()  # 元素为空闲的只读连接<sqlite3.Connection>
+        self.write_task_queue = queue.Queue()  # 元素为<SqliteWriteTask>，为None时表示结束写线程
+        self.write_thread = None
+        self.is_opened = False
+
+    def create_connection(self):
+        if self.read_only:
+            sqlite_uri = pathlib.Path(os.path.abspath(self.sqlite3_dbfile_name)).as_uri() + "?mode=ro"
+            return sqlite3.connect(sqlite_uri, uri=True, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        sqlite_conn.execute("PRAGMA synchronous=NORMAL")  # WAL模式下NORMAL已可保证数据库不损坏，只在断电时可能丢失最后的事务
+        return sqlite_conn
+
+    def open(self):
+        """
+        打开数据库文件（不存在则新建），切换为WAL模式，建表，创建只读连接池，启动写线程；只读方式时只创建只读连接池
+        """
+        if self.read_only:
+            for _ in range(self.read_connection_pool_size):
+                self.read_connection_queue.put(self.create_connection())
+            self.is_opened = True
+            return
+        write_conn = self.create_connection()
+        write_conn.isolation_level = None  # 事务由写线程自己控制（begin/savepoint/commit）
+        write_conn.execute("PRAGMA journal_mode=WAL")
+        sqlite_cursor = write_conn.cursor()
+        self.init_schema(sqlite_cursor)
+        sqlite_cursor.close()
+        for _ in range(self.read_connection_pool_size):
+            self.read_connection_queue.put(self.create_connection())
+        self.write_thread = threading.Thread(target=self.write_thread_loop, args=(write_conn,), daemon=True)
+        self.write_thread.start()
+        self.is_opened = True
+
+    def close(self):
+        """
+        等待队列里已排队的写操作全部完成后，结束写线程，并关闭所有连接
+        """
+        if not self.is_opened:
+            return
+        self.is_opened = False
+        if self.write_thread is not None:
+            self.write_task_queue.put(None)
+            self.write_thread.join()
+        while not self.read_connection_queue.empty():
+            self.read_connection_queue.get_nowait().close()
+
+    @staticmethod
+    def init_schema(sqlite_cursor):
+        """
+        ★程序启动时检查数据库结构版本（PRAGMA user_version），依次执行还未执行过的升级步骤，每个版本一个事务，
+        新建的数据库从版本0开始升级，旧版本程序创建的数据库（user_version为0）同样从头升级，建表语句都是 if not exists
+        """
+        sqlite_cursor.execute("PRAGMA user_version")
+        current_schema_version = sqlite_cursor.fetchone()[0]
+        if current_schema_version > SQLITE_SCHEMA_VERSION:
+            print(f"SqliteStorage.init_schema: 数据库结构版本{current_schema_version}高于本程序支持的版本{SQLITE_SCHEMA_VERSION}")
+            return
+        schema_migration_list = [(1, SqliteStorage.migrate_schema_to_v1),
+                                 (2, SqliteStorage.migrate_schema_to_v2),
+                                 (3, SqliteStorage.migrate_schema_to_v3),
+                                 (4, SqliteStorage.migrate_schema_to_v4),
+                                 (5, SqliteStorage.migrate_schema_to_v5),
+                                 (6, SqliteStorage.migrate_schema_to_v6),
+                                 (7, SqliteStorage.migrate_schema_to_v7),
+                                 (8, SqliteStorage.migrate_schema_to_v8),
+                                 (9, SqliteStorage.migrate_schema_to_v9),
+                                 (10, SqliteStorage.migrate_schema_to_v10)]
+        for schema_version, migrate_func in schema_migration_list:
+            if schema_version <= current_schema_version:
+                continue
+            print(f"SqliteStorage.init_schema: 数据库结构升级到版本{schema_version}")
+            sqlite_cursor.execute("begin immediate")
+            try:
+                migrate_func(sqlite_cursor)
+                sqlite_cursor.execute(f"PRAGMA user_version={schema_version}")
+                sqlite_cursor.execute("commit")
+            except sqlite3.Error:
+                sqlite_cursor.execute("rollback")
+                raise
+
+    @staticmethod
+    def migrate_schema_to_v1(sqlite_cursor):
+        """
+        版本1：建表（已存在则跳过），给旧版本程序创建的表添加新增的列，巡检命令输出表添加唯一索引
+        """
+        create_table_sql_list = [
+            " ".join(["create table if not exists tb_project (oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "create_timestamp double,",
+                      "last_modify_timestamp double )"]),
+            " ".join(["create table if not exists tb_credential  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "create_timestamp double,",
+                      "cred_type int,",
+                      "username varchar(128),",
+                      "password varchar(256),",
+                      "private_key_b64 varchar(8192),",
+                      "privilege_escalation_method int,",
+                      "privilege_escalation_username varchar(128),",
+                      "privilege_escalation_password varchar(256),",
+                      "auth_url varchar(2048),",
+                      "ssl_verify int,",
+                      "last_modify_timestamp double )"]),
+            " ".join(["create table if not exists tb_host  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "create_timestamp double,",
+                      "address varchar(256),",
+                      "port int,",
+                      "last_modify_timestamp double,",
+                      "login_protocol int,",
+                      "first_auth_method int,",
+                      "login_credential_oid varchar(36),",
+                      "custome_tag_config_scheme_oid varchar(36) )"]),
+            " ".join(["create table if not exists tb_host_group  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "create_timestamp double,",
+                      "last_modify_timestamp double )"]),
+            " ".join(["create table if not exists tb_host_group_include_host_list  ( host_group_oid varchar(36),",
+                      "host_index int,",
+                      "host_oid varchar(36) )"]),
+            " ".join(["create table if not exists tb_host_group_include_host_group_list  ( host_group_oid varchar(36),",
+                      "group_index int,",
+                      "group_oid varchar(36) )"]),
+            " ".join(["create table if not exists tb_inspection_code_block  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "create_timestamp double,",
+                      "code_source int,",
+                      "last_modify_timestamp double )"]),
+            " ".join(["create table if not exists tb_inspection_code_block_include_code_list",
+                      "( inspection_code_block_oid varchar(36),",
+                      "code_index int,",
+                      "code_content varchar(2048),",
+                      "code_post_wait_time double,",
+                      "need_interactive int,",
+                      "interactive_question_keyword varchar(512),",
+                      "interactive_answer varchar(512),",
+                      "interactive_process_method int,",
+                      "description varchar(2048) )"]),
+            " ".join(["create table if not exists tb_inspection_template  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "create_timestamp double,",
+                      "execution_method int,",
+                      "execution_at_time double,",
+                      "execution_after_time,",
+                      "execution_crond_time varchar(128),",
+                      "last_modify_timestamp double,",
+                      "update_code_on_launch int,",
+                      "forks int,",
+                      "save_output_to_file int,",
+                      "output_file_name_style int,",
+                      "job_exec_mode int default 0 )"]),
+            " ".join(["create table if not exists tb_inspection_template_include_host_list",
+                      "( inspection_template_oid varchar(36),",
+                      "host_index int,",
+                      "host_oid varchar(36) )"]),
+            " ".join(["create table if not exists tb_inspection_template_include_group_list",
+                      "( inspection_template_oid varchar(36),",
+                      "group_index int,",
+                      "group_oid varchar(36) )"]),
+            " ".join(["create table if not exists tb_inspection_template_include_inspection_code_block_list",
+                      "( inspection_template_oid varchar(36),",
+                      "inspection_code_block_index int,",
+                      "inspection_code_block_oid varchar(36) )"]),
+            " ".join(["create table if not exists tb_inspection_job  ( job_oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "job_name varchar(256),",
+                      "inspection_code_oid varchar(36),",
+                      "project_oid varchar(36),",
+                      "start_time int,",
+                      "end_time int,",
+                      "job_state int )"]),
+            " ".join(["create table if not exists tb_inspection_job_invoke_shell_output  ( job_oid varchar(36),",
+                      "host_oid varchar(36),",
+                      "inspection_code_oid varchar(36),",
+                      "project_oid varchar(36),",
+                      "code_index int,",
+                      "code_exec_method int,",
+                      "invoke_shell_output_bytes_b64 varchar(8192),",
+                      "invoke_shell_output_last_line_str_b64 varchar(8192),",
+                      "output_format int default 0,",
+                      "invoke_shell_output_blob blob,",
+                      "invoke_shell_output_last_line_str varchar(8192) )"]),
+            " ".join(["create table if not exists tb_inspection_job_invoke_shell_interactive_output  ( job_oid varchar(36),",
+                      "host_oid varchar(36),",
+                      "inspection_code_oid varchar(36),",
+                      "project_oid varchar(36),",
+                      "code_index int,",
+                      "code_exec_interactive_output_index int,",
+                      "interactive_output_bytes_b64 varchar(8192),",
+                      "output_format int default 0,",
+                      "interactive_output_blob blob )"]),
+            " ".join(["create table if not exists tb_inspection_job_record  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "inspection_template_oid varchar(36),",
+                      "job_state int,",
+                      "start_time double,",
+                      "end_time double )"]),
+            " ".join(["create table if not exists tb_inspection_job_record_host_job_status_obj_list",
+                      "( job_record_oid varchar(36),",
+                      "host_oid varchar(36),",
+                      "job_status int,",
+                      "find_credential_status int,",
+                      "exec_timeout int,",
+                      "start_time double,",
+                      "end_time double,",
+                      "sum_of_code_block int,",
+                      "current_exec_code_block int,",
+                      "sum_of_code_lines int,",
+                      "current_exec_code_num int )"]),
+            " ".join(["create table if not exists tb_custome_tag_config_scheme  ( oid varchar(36) NOT NULL PRIMARY KEY,",
+                      "name varchar(128),",
+                      "description varchar(256),",
+                      "project_oid varchar(36),",
+                      "create_timestamp double,",
+                      "last_modify_timestamp double )"]),
+            " ".join(["create table if not exists tb_custome_tag_config_scheme_include_match_object  ( scheme_oid varchar(36),",
+                      "match_pattern_lines varchar(4096),",
+                      "foreground varchar(32),",
+                      "backgroun varchar(32),",
+                      "underline int,",
+                      "underlinefg varchar(32),",
+                      "overstrike int,",
+                      "overstrikefg varchar(32),",
+                      "bold int,",
+                      "italic int )"]),
+        ]
+        for sql in create_table_sql_list:
+            sqlite_cursor.execute(sql)
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "job_exec_mode", "int default 0")
+        # 巡检命令输出改为压缩的BLOB保存，旧记录的output_format为0（base64），读取时按output_format区分
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_output", "output_format", "int default 0")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_output", "invoke_shell_output_blob", "blob")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_output",
+                                                  "invoke_shell_output_last_line_str", "varchar(8192)")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_interactive_output",
+                                                  "output_format", "int default 0")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_interactive_output",
+                                                  "interactive_output_blob", "blob")
+        # 巡检命令输出按唯一索引去重，批量插入时用 insert or ignore 代替逐条先查询再插入
+        cofable_sqlite3_create_unique_index_if_not_existed(sqlite_cursor, "uq_inspection_job_invoke_shell_output",
+                                                           "tb_inspection_job_invoke_shell_output",
+                                                           ["job_oid", "host_oid", "inspection_code_oid", "code_index"])
+        cofable_sqlite3_create_unique_index_if_not_existed(sqlite_cursor, "uq_inspection_job_invoke_shell_interactive_output",
+                                                           "tb_inspection_job_invoke_shell_interactive_output",
+                                                           ["job_oid", "host_oid", "inspection_code_oid", "code_index",
+                                                            "code_exec_interactive_output_index"])
+
+    @staticmethod
+    def migrate_schema_to_v2(sqlite_cursor):
+        """
+        版本2：给没有主键的子表重建表加上复合主键，按父对象oid的查询都走主键索引，不再全表扫描
+        ★旧版本程序保存主机组/巡检模板的成员时，host_index/group_index都是0，重建时按插入顺序重新编号
+        ★两个巡检命令输出表（数据量最大）已在版本1有同样列组成的唯一索引，rowid表的复合主键在sqlite里也是以唯一索引实现，
+          所以不再重建这两个表，避免启动时复制数GB的数据
+        """
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_host_group_include_host_list",
+            " ".join(["create table tb_host_group_include_host_list  ( host_group_oid varchar(36) NOT NULL,",
+                      "host_index int NOT NULL,",
+                      "host_oid varchar(36),",
+                      "PRIMARY KEY (host_group_oid, host_index) )"]),
+            ["host_group_oid", "host_index", "host_oid"],
+            ["host_group_oid", "row_number() over (partition by host_group_oid order by rowid) - 1", "host_oid"])
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_host_group_include_host_group_list",
+            " ".join(["create table tb_host_group_include_host_group_list  ( host_group_oid varchar(36) NOT NULL,",
+                      "group_index int NOT NULL,",
+                      "group_oid varchar(36),",
+                      "PRIMARY KEY (host_group_oid, group_index) )"]),
+            ["host_group_oid", "group_index", "group_oid"],
+            ["host_group_oid", "row_number() over (partition by host_group_oid order by rowid) - 1", "group_oid"])
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_inspection_code_block_include_code_list",
+            " ".join(["create table tb_inspection_code_block_include_code_list",
+                      "( inspection_code_block_oid varchar(36) NOT NULL,",
+                      "code_index int NOT NULL,",
+                      "code_content varchar(2048),",
+                      "code_post_wait_time double,",
+                      "need_interactive int,",
+                      "interactive_question_keyword varchar(512),",
+                      "interactive_answer varchar(512),",
+                      "interactive_process_method int,",
+                      "description varchar(2048),",
+                      "PRIMARY KEY (inspection_code_block_oid, code_index) )"]),
+            ["inspection_code_block_oid", "code_index", "code_content", "code_post_wait_time", "need_interactive",
+             "interactive_question_keyword", "interactive_answer", "interactive_process_method", "description"])
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_inspection_template_include_host_list",
+            " ".join(["create table tb_inspection_template_include_host_list",
+                      "( inspection_template_oid varchar(36) NOT NULL,",
+                      "host_index int NOT NULL,",
+                      "host_oid varchar(36),",
+                      "PRIMARY KEY (inspection_template_oid, host_index) )"]),
+            ["inspection_template_oid", "host_index", "host_oid"],
+            ["inspection_template_oid", "row_number() over (partition by inspection_template_oid order by rowid) - 1", "host_oid"])
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_inspection_template_include_group_list",
+            " ".join(["create table tb_inspection_template_include_group_list",
+                      "( inspection_template_oid varchar(36) NOT NULL,",
+                      "group_index int NOT NULL,",
+                      "group_oid varchar(36),",
+                      "PRIMARY KEY (inspection_template_oid, group_index) )"]),
+            ["inspection_template_oid", "group_index", "group_oid"],
+            ["inspection_template_oid", "row_number() over (partition by inspection_template_oid order by rowid) - 1", "group_oid"])
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_inspection_template_include_inspection_code_block_list",
+            " ".join(["create table tb_inspection_template_include_inspection_code_block_list",
+                      "( inspection_template_oid varchar(36) NOT NULL,",
+                      "inspection_code_block_index int NOT NULL,",
+                      "inspection_code_block_oid varchar(36),",
+                      "PRIMARY KEY (inspection_template_oid, inspection_code_block_index) )"]),
+            ["inspection_template_oid", "inspection_code_block_index", "inspection_code_block_oid"],
+            ["inspection_template_oid", "row_number() over (partition by inspection_template_oid order by rowid) - 1",
+             "inspection_code_block_oid"])
+        # 一个作业里每台主机只有一条状态记录，若有重复则保留最后保存的那条
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_inspection_job_record_host_job_status_obj_list",
+            " ".join(["create table tb_inspection_job_record_host_job_status_obj_list",
+                      "( job_record_oid varchar(36) NOT NULL,",
+                      "host_oid varchar(36) NOT NULL,",
+                      "job_status int,",
+                      "find_credential_status int,",
+                      "exec_timeout int,",
+                      "start_time double,",
+                      "end_time double,",
+                      "sum_of_code_block int,",
+                      "current_exec_code_block int,",
+                      "sum_of_code_lines int,",
+                      "current_exec_code_num int,",
+                      "PRIMARY KEY (job_record_oid, host_oid) )"]),
+            ["job_record_oid", "host_oid", "job_status", "find_credential_status", "exec_timeout", "start_time", "end_time",
+             "sum_of_code_block", "current_exec_code_block", "sum_of_code_lines", "current_exec_code_num"],
+            where_sql="where rowid in (select max(rowid) from tb_inspection_job_record_host_job_status_obj_list__old"
+                      " group by job_record_oid, host_oid)")
+        # 着色方案的匹配对象原来没有序号，新增match_index列作为主键的一部分，按插入顺序编号
+        cofable_sqlite3_rebuild_table(
+            sqlite_cursor, "tb_custome_tag_config_scheme_include_match_object",
+            " ".join(["create table tb_custome_tag_config_scheme_include_match_object  ( scheme_oid varchar(36) NOT NULL,",
+                      "match_pattern_lines varchar(4096),",
+                      "foreground varchar(32),",
+                      "backgroun varchar(32),",
+                      "underline int,",
+                      "underlinefg varchar(32),",
+                      "overstrike int,",
+                      "overstrikefg varchar(32),",
+                      "bold int,",
+                      "italic int,",
+                      "match_index int NOT NULL,",
+                      "PRIMARY KEY (scheme_oid, match_index) )"]),
+            ["scheme_oid", "match_pattern_lines", "foreground", "backgroun", "underline", "underlinefg", "overstrike",
+             "overstrikefg", "bold", "italic", "match_index"],
+            ["scheme_oid", "match_pattern_lines", "foreground", "backgroun", "underline", "underlinefg", "overstrike",
+             "overstrikefg", "bold", "italic", "row_number() over (partition by scheme_oid order by rowid) - 1"])
+        # 作业记录列表按开始时间排序/分页
+        sqlite_cursor.execute("create index if not exists idx_inspection_job_record_start_time on tb_inspection_job_record (start_time)")
+
+    @staticmethod
+    def migrate_schema_to_v3(sqlite_cursor):
+        """
+        版本3：巡检代码块新增执行方式及exec并发数，命令输出表新增exec_command方式的stderr及退出码
+        ★stderr与stdout（invoke_shell_output_blob）使用同一压缩格式，共用output_format列
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block", "code_exec_method", "int default 0")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block", "exec_command_concurrency",
+                                                  f"int default {EXEC_COMMAND_CONCURRENCY_DEFAULT}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_output", "exec_command_stderr_blob", "blob")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_invoke_shell_output", "exec_command_exit_status", "int")
+
+    @staticmethod
+    def migrate_schema_to_v4(sqlite_cursor):
+        """
+        版本4：巡检模板新增 单条命令超时、单台主机截止时间、整个作业截止时间
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "code_exec_timeout",
+                                                  f"double default {CODE_EXEC_HARD_TIMEOUT_DEFAULT}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "host_deadline",
+                                                  f"double default {HOST_DEADLINE_DEFAULT}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "job_deadline",
+                                                  f"double default {JOB_DEADLINE_DEFAULT}")
+
+    @staticmethod
+    def migrate_schema_to_v5(sqlite_cursor):
+        """
+        版本5：巡检模板新增 自适应并发数开关，巡检作业记录新增 并发数变化过程
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "adaptive_forks", "int default 0")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_job_record", "concurrency_history", "text default ''")
+
+    @staticmethod
+    def migrate_schema_to_v6(sqlite_cursor):
+        """
+        版本6：巡检模板新增 登录重试次数、重试间隔、熔断阈值，新建主机熔断记录表
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "login_retry_times",
+                                                  f"int default {LOGIN_RETRY_TIMES_DEFAULT}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "login_retry_interval",
+                                                  f"double default {LOGIN_RETRY_INTERVAL_DEFAULT}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "circuit_breaker_threshold",
+                                                  f"int default {CIRCUIT_BREAKER_THRESHOLD_DEFAULT}")
+        sqlite_cursor.execute(" ".join(["create table if not exists tb_host_circuit_breaker ( host_oid varchar(36) NOT NULL PRIMARY KEY,",
+                                        "consecutive_failure_num int,",
+                                        "last_failure_time double )"]))
+
+    @staticmethod
+    def migrate_schema_to_v7(sqlite_cursor):
+        """
+        版本7：巡检模板新增 定时触发时上一次作业还未结束的处理方式
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "schedule_overlap_policy",
+                                                  f"int default {SCHEDULE_OVERLAP_POLICY_SKIP}")
+
+    @staticmethod
+    def migrate_schema_to_v8(sqlite_cursor):
+        """
+        版本8：巡检代码块新增 代码来源文件路径、代码来源git仓库地址
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block", "code_source_path",
+                                                  "varchar(1024) default ''")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block", "code_source_git_url",
+                                                  "varchar(1024) default ''")
+
+    @staticmethod
+    def migrate_schema_to_v9(sqlite_cursor):
+        """
+        版本9：巡检代码的每行命令新增 标签、执行条件及满足条件时的动作
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block_include_code_list", "label",
+                                                  "varchar(128) default ''")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block_include_code_list", "condition_type",
+                                                  f"int default {CODE_CONDITION_NONE}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block_include_code_list", "condition_pattern",
+                                                  "varchar(512) default ''")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block_include_code_list", "condition_action",
+                                                  f"int default {CODE_CONDITION_ACTION_SKIP_REST}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_code_block_include_code_list", "condition_goto_label",
+                                                  "varchar(128) default ''")
+
+    @staticmethod
+    def migrate_schema_to_v10(sqlite_cursor):
+        """
+        版本10：巡检模板新增 主机巡检顺序、没有历史用时的主机的位置，新建主机巡检用时统计表，以已有作业记录里的主机用时初始化
+        """
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "host_schedule_order",
+                                                  f"int default {HOST_SCHEDULE_ORDER_LONGEST_FIRST}")
+        cofable_sqlite3_add_column_if_not_existed(sqlite_cursor, "tb_inspection_template", "new_host_schedule_slot",
+                                                  f"int default {NEW_HOST_SCHEDULE_SLOT_FIRST}")
+        sqlite_cursor.execute(" ".join(["create table if not exists tb_host_duration_stats ( host_oid varchar(36) NOT NULL PRIMARY KEY,",
+                                        "ewma_duration double,",
+                                        "sample_num int,",
+                                        "last_update_time double )"]))
+        sqlite_cursor.execute(" ".join(["select host_oid, end_time - start_time from tb_inspection_job_record_host_job_status_obj_list",
+                                        "where job_status=? and start_time>0 and end_time>start_time order by start_time"]),
+                              (INSPECTION_JOB_EXEC_STATE_COMPLETED,))
+        duration_dict = {}
+        for host_oid, duration in sqlite_cursor.fetchall():
+            duration_dict[host_oid] = HostDurationStats.update_ewma(duration_dict.get(host_oid), duration)
+        HostDurationStats.write_to_sqlite(sqlite_cursor, [(host_oid, ewma_duration, sample_num)
+                                                          for host_oid, (ewma_duration, sample_num) in duration_dict.items()])
+
+    @contextlib.contextmanager
+    def read_cursor(self):
+        """
+        借用一个只读连接的游标，with语句结束后归还连接，用法:
+            with global_info.sqlite_storage.read_cursor() as sqlite_cursor:
+                sqlite_cursor.execute(sql)
+        """
+        try:
+            sqlite_conn = self.read_connection_queue.get_nowait()
+        except queue.Empty:
+            sqlite_conn = self.create_connection()  # 池中连接都被借出时（多个线程同时查询），临时新建一个连接，用完即关闭
+        sqlite_cursor = sqlite_conn.cursor()
+        try:
+            yield sqlite_cursor
+        finally:
+            sqlite_cursor.close()
+            if self.is_opened and self.read_connection_queue.qsize() < self.read_connection_pool_size:
+                self.read_connection_queue.put(sqlite_conn)
+            else:
+                sqlite_conn.close()
+
+    def execute_write(self, write_func, wait=True):
+        """
+        把写操作放入写队列，由写线程在事务里调用 write_func(sqlite_cursor)，不要在write_func里commit
+        :param write_func: 参数为写连接的游标<sqlite3.Cursor>
+        :param wait: 为True时等待写入完成并返回write_func的返回值，write_func抛出的异常也会在这里重新抛出；
+                     为False时放入队列后立即返回（如巡检线程保存命令输出），出错只打印信息
+        """
+        if not self.is_opened:
+            print("SqliteStorage.execute_write: 数据库未打开或已关闭，放弃本次写操作")
+            return None
+        if self.read_only:
+            print("SqliteStorage.execute_write: 数据库以只读方式打开，放弃本次写操作")
+            return None
+        task = SqliteWriteTask(write_func)
+        self.write_task_queue.put(task)
+        if not wait:
+            return None
+        task.done_event.wait()
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def execute_write_sql_list(self, sql_list, wait=True):
+        """
+        在同一事务里依次执行sql_list里的每条sql语句
+        """
+
+        def write_func(sqlite_cursor):
+            for sql in sql_list:
+                sqlite_cursor.execute(sql)
+
+        return self.execute_write(write_func, wait=wait)
+
+    def migrate_inspection_output_to_blob(self):
+        """
+        ★一次性迁移：把旧版本程序以base64文本保存的巡检命令输出转换为压缩的BLOB，分批转换，每批一个事务
+        转换完成后需调用 vacuum() 才能回收数据库文件空间
+        :return: (转换的命令输出行数, 转换的交互输出行数)
+        """
+
+        def convert_output_batch(sqlite_cursor):
+            sql_list = ["select rowid, invoke_shell_output_bytes_b64, invoke_shell_output_last_line_str_b64",
+                        "from tb_inspection_job_invoke_shell_output where output_format=? limit ?"]
+            sqlite_cursor.execute(" ".join(sql_list), (OUTPUT_STORAGE_FORMAT_BASE64, OUTPUT_STORAGE_MIGRATE_BATCH_SIZE))
+            row_list = []
+            for rowid, output_bytes_b64, last_line_str_b64 in sqlite_cursor.fetchall():
+                output_format, output_blob = cofable_compress_output_bytes(base64.b64decode(output_bytes_b64 or ''))
+                last_line_str = base64.b64decode(last_line_str_b64 or '').decode("utf8", errors="replace")
+                row_list.append((output_format, output_blob, last_line_str, rowid))
+            sql_list = ["update tb_inspection_job_invoke_shell_output set output_format=?, invoke_shell_output_blob=?,",
+                        "invoke_shell_output_last_line_str=?, invoke_shell_output_bytes_b64=NULL,",
+                        "invoke_shell_output_last_line_str_b64=NULL where rowid=?"]
+            sqlite_cursor.executemany(" ".join(sql_list), row_list)
+            return len(row_list)
+
+        def convert_interactive_output_batch(sqlite_cursor):
+            sql_list = ["select rowid, interactive_output_bytes_b64",
+                        "from tb_inspection_job_invoke_shell_interactive_output where output_format=? limit ?"]
+            sqlite_cursor.execute(" ".join(sql_list), (OUTPUT_STORAGE_FORMAT_BASE64, OUTPUT_STORAGE_MIGRATE_BATCH_SIZE))
+            row_list = []
+            for rowid, output_bytes_b64 in sqlite_cursor.fetchall():
+                output_format, output_blob = cofable_compress_output_bytes(base64.b64decode(output_bytes_b64 or ''))
+                row_list.append((output_format, output_blob, rowid))
+            sql_list = ["update tb_inspection_job_invoke_shell_interactive_output set output_format=?, interactive_output_blob=?,",
+                        "interactive_output_bytes_b64=NULL where rowid=?"]
+            sqlite_cursor.executemany(" ".join(sql_list), row_list)
+            return len(row_list)
+
+        converted_output_num = 0
+        converted_interactive_output_num = 0
+        while True:
+            batch_num = self.execute_write(convert_output_batch)
+            if batch_num == 0:
+                break
+            converted_output_num += batch_num
+            print(f"SqliteStorage.migrate_inspection_output_to_blob: 已转换命令输出 {converted_output_num} 行")
+        while True:
+            batch_num = self.execute_write(convert_interactive_output_batch)
+            if batch_num == 0:
+                break
+            converted_interactive_output_num += batch_num
+            print(f"SqliteStorage.migrate_inspection_output_to_blob: 已转换交互输出 {converted_interactive_output_num} 行")
+        return converted_output_num, converted_interactive_output_num
+
+    def vacuum(self):
+        """
+        重建数据库文件，回收已删除/已缩小的数据占用的空间，不能在事务里执行，所以不经过写线程，调用前需先close()
+        """
+        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name, timeout=SQLITE_BUSY_TIMEOUT)
+        sqlite_conn.isolation_level = None
+        sqlite_conn.execute("VACUUM")
+        sqlite_conn.close()
+
+    def write_thread_loop(self, write_conn):
+        is_stopping = False
+        while not is_stopping:
+            task = self.write_task_queue.get()
+            if task is None:
+                break
+            # ★把队列里已经排队的写操作一起取出，合并到同一个事务里提交
+            task_list = [task]
+            while len(task_list) < SQLITE_WRITE_BATCH_MAX_TASKS:
+                try:
+                    task = self.write_task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if task is None:
+                    is_stopping = True
+                    break
+                task_list.append(task)
+            self.run_write_task_list(write_conn, task_list)
+        write_conn.close()
+
+    @staticmethod
+    def run_write_task_list(write_conn, task_list):
+        sqlite_cursor = write_conn.cursor()
+        try:
+            sqlite_cursor.execute("begin immediate")
+            for task in task_list:
+                sqlite_cursor.execute("savepoint write_task")
+                try:
+                    task.result = task.write_func(sqlite_cursor)
+                    sqlite_cursor.execute("release write_task")
+                except Exception as err:
+                    print("SqliteStorage.run_write_task_list: 写操作失败，已回滚此写操作", err)
+                    task.error = err
+                    sqlite_cursor.execute("rollback to write_task")
+                    sqlite_cursor.execute("release write_task")
+            sqlite_cursor.execute("commit")
+        except sqlite3.Error as err:
+            print("SqliteStorage.run_write_task_list: 事务提交失败", err)
+            if write_conn.in_transaction:
+                write_conn.rollback()
+            for task in task_list:
+                if task.error is None:
+                    task.error = err
+        finally:
+            sqlite_cursor.close()
+            for task in task_list:
+                task.done_event.set()
+
+
+class ResourceObjList(list):
+    """
+    资源对象列表，<GlobalInfo>的各个xxx_obj_list都是此类型，用法同list
+    ★在list的基础上维护 oid索引、name索引、(project_oid, name)索引，按oid/名称查找资源对象为O(1)，不再遍历整个列表
+    ★通过append/insert/remove/pop等方法增删元素时自动维护索引；资源对象修改名称或所属项目后需调用reindex_obj(obj)
+    ★同一个资源对象不应在列表中出现多次
+    """
+
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self.lock = threading.RLock()  # 增删元素及重建索引时加锁，巡检作业线程也会修改列表（如插入作业记录）
+        self.oid_index_dict = {}  # <dict> key为oid，value为资源对象，oid重复时为列表里靠前的那个对象
+        self.name_index_dict = {}  # <dict> key为name，value为同名资源对象的<list>
+        self.project_name_index_dict = {}  # <dict> key为(project_oid, name)，value为资源对象的<list>
+        self.indexed_key_dict = {}  # <dict> key为id(obj)，value为建立索引时的(oid, name, project_oid)，用于删除旧索引
+        self.position_dict = None  # <dict> key为oid，value为对象在列表中的下标，有插入/删除/排序时置为None，用到时再重建
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        with self.lock:
+            self.oid_index_dict = {}
+            self.name_index_dict = {}
+            self.project_name_index_dict = {}
+            self.indexed_key_dict = {}
+            self.position_dict = None
+            for obj in self:
+                self.add_index(obj)
+
+    def add_index(self, obj):
+        oid = getattr(obj, "oid", None)
+        name = getattr(obj, "name", None)
+        project_oid = getattr(obj, "project_oid", "")
+        self.indexed_key_dict[id(obj)] = (oid, name, project_oid)
+        self.oid_index_dict.setdefault(oid, obj)
+        self.name_index_dict.setdefault(name, []).append(obj)
+        self.project_name_index_dict.setdefault((project_oid, name), []).append(obj)
+
+    def remove_index(self, obj):
+        indexed_key = self.indexed_key_dict.pop(id(obj), None)
+        if indexed_key is None:
             return
+        oid, name, project_oid = indexed_key
+        if self.oid_index_dict.get(oid) is obj:
+            del self.oid_index_dict[oid]
+            for other_obj in self:  # 极少出现oid重复的情况，此时让列表里剩下的同oid对象接替索引
+                if other_obj is not obj and getattr(other_obj, "oid", None) == oid:
+                    self.oid_index_dict[oid] = other_obj
+                    break
+        for index_dict, key in ((self.name_index_dict, name), (self.project_name_index_dict, (project_oid, name))):
+            obj_list = index_dict.get(key)
+            if obj_list is None:
+                continue
+            for i, indexed_obj in enumerate(obj_list):
+                if indexed_obj is obj:
+                    del obj_list[i]
+                    break
+            if len(obj_list) == 0:
+                del index_dict[key]
+
+    def reindex_obj(self, obj):
+        """
+        资源对象的oid/name/project_oid修改后，调用此函数刷新它的索引，对象不在此列表中时什么也不做
+        """
+        with self.lock:
+            if id(obj) not in self.indexed_key_dict:
+                return
+            self.remove_index(obj)
+            self.add_index(obj)
+            self.position_dict = None
+
+    def append(self, obj):
+        with self.lock:
+            super().append(obj)
+            self.add_index(obj)
+            if self.position_dict is not None:
+                self.position_dict.setdefault(getattr(obj, "oid", None), len(self) - 1)
+
+    def insert(self, index, obj):
+        with self.lock:
+            super().insert(index, obj)
+            self.add_index(obj)
+            self.position_dict = None
+
+    def extend(self, iterable):
+        with self.lock:
+            for obj in iterable:
+                self.append(obj)
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def remove(self, obj):
+        with self.lock:
+            super().remove(obj)
+            self.remove_index(obj)
+            self.position_dict = None
+
+    def pop(self, index=-1):
+        with self.lock:
+            obj = super().pop(index)
+            self.remove_index(obj)
+            self.position_dict = None
+            return obj
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.rebuild_index()
+
+    def __setitem__(self, index, value):
+        with self.lock:
+            super().__setitem__(index, value)
+            self.rebuild_index()
+
+    def __delitem__(self, index):
+        with self.lock:
+            super().__delitem__(index)
+            self.rebuild_index()
+
+    def reverse(self):
+        with self.lock:
+            super().reverse()
+            self.position_dict = None
+
+    def sort(self, *args, **kwargs):
+        with self.lock:
+            super().sort(*args, **kwargs)
+            self.position_dict = None
+
+    def get_obj_by_oid(self, oid):
+        return self.oid_index_dict.get(oid)
+
+    def get_obj_by_name(self, name):
+        obj_list = self.name_index_dict.get(name)
+        if not obj_list:
+            return None
+        return obj_list[0]
+
+    def get_obj_by_project_and_name(self, project_oid, name):
+        obj_list = self.project_name_index_dict.get((project_oid, name))
+        if not obj_list:
+            return None
+        return obj_list[0]
+
+    def is_name_existed(self, name, except_obj=None):
+        for obj in self.name_index_dict.get(name, ()):
+            if obj is not except_obj:
+                return True
+        return False
+
+    def get_index_of_list_by_oid(self, oid):
+        with self.lock:
+            if self.position_dict is None:
+                self.position_dict = {}
+                for index, obj in enumerate(self):
+                    self.position_dict.setdefault(getattr(obj, "oid", None), index)
+            return self.position_dict.get(oid)
+
+
+class ResourceObjListAttribute:
+    """
+    <GlobalInfo>的xxx_obj_list属性描述符，给属性赋值普通list时（如从数据库重新加载资源）自动转换为<ResourceObjList>，保证索引始终可用
+    """
+
+    def __set_name__(self, owner, name):
+        self.attr_name = "_" + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.__dict__[self.attr_name]
+
+    def __set__(self, instance, value):
+        if not isinstance(value, ResourceObjList):
+            value = ResourceObjList(value)
+        instance.__dict__[self.attr_name] = value
+
+
+class HostGroupResolver:
+    """
+    主机组展开器，全局只有一个，为<GlobalInfo>.host_group_resolver
+    ★计算并缓存每个主机组的传递闭包（组内主机 + 所有下级主机组里的主机，已去重，顺序同逐层展开的顺序），
+      下级主机组的闭包被上级复用，展开一个巡检模板的所有主机为线性复杂度
+    ★用迭代深度优先遍历，不再递归；编辑主机组时用 is_host_group_cycle() 检测是否会形成环（A含B，B又含A），
+      旧数据里已存在的环按强连通分量整体计算，环上每个组的闭包都是完整的
+    ★主机组修改/删除时只让它自己及引用了它的上级主机组的缓存失效，见 invalidate_host_group()
+    """
+
+    def __init__(self, global_info=None):
+        self.global_info = global_info
+        self.lock = threading.RLock()  # 巡检作业线程展开主机组时，界面线程可能正在修改主机组
+        self.closure_cache_dict = {}  # <dict> key为host_group_oid，value为该组展开后的所有host_oid <tuple>
+        self.parent_oid_set_dict = {}  # <dict> key为host_group_oid，value为计算闭包时引用了它的上级host_group_oid <set>
+
+    def invalidate_all(self):
+        with self.lock:
+            self.closure_cache_dict = {}
+            self.parent_oid_set_dict = {}
+
+    def invalidate_host_group(self, host_group_oid):
+        """
+        主机组修改或删除后调用，让它自己及所有已缓存的上级主机组的闭包失效，其他主机组的缓存不受影响
+        ★已缓存的上级主机组在计算闭包时一定经过了它，所以沿parent_oid_set_dict向上即可找全
+        """
+        with self.lock:
+            pending_oid_list = [host_group_oid]
+            while len(pending_oid_list) > 0:
+                group_oid = pending_oid_list.pop()
+                self.closure_cache_dict.pop(group_oid, None)
+                pending_oid_list.extend(self.parent_oid_set_dict.pop(group_oid, ()))
+
+    def get_host_oid_list_of_group(self, host_group_oid):
+        """
+        获取主机组展开后的所有主机oid（已去重），主机组不存在时返回空元组
+        :param host_group_oid:
+        :return: <tuple>
+        """
+        with self.lock:
+            closure = self.closure_cache_dict.get(host_group_oid)
+            if closure is not None:
+                return closure
+            if self.global_info.get_host_group_by_oid(host_group_oid) is None:
+                print(f"HostGroupResolver.get_host_oid_list_of_group: 未找到主机组 {host_group_oid}")
+                return ()
+            self.compute_closure(host_group_oid)
+            return self.closure_cache_dict.get(host_group_oid, ())
+
+    def compute_closure(self, root_host_group_oid):
+        # 迭代的Tarjan强连通分量算法：一个强连通分量（无环时即单个组）的所有下级分量都算完后才算它自己，已缓存的直接复用；
+        # 旧数据里可能已存在环，环上的组互相包含，展开后的主机相同，整个分量一起计算并缓存，不会缓存不完整的闭包
+        stack = [(root_host_group_oid, 0)]  # 元素为(host_group_oid, 下一个要访问的下级组的下标)
+        visit_index_dict = {root_host_group_oid: 0}  # 组的访问序号
+        low_link_dict = {root_host_group_oid: 0}  # 组能回到的、仍在分量栈里的最小访问序号
+        component_stack = [root_host_group_oid]
+        on_component_stack_oid_set = {root_host_group_oid}
+        while len(stack) > 0:
+            group_oid, child_index = stack[-1]
+            host_group = self.global_info.get_host_group_by_oid(group_oid)
+            child_oid_list = host_group.host_group_oid_list
+            if child_index < len(child_oid_list):
+                stack[-1] = (group_oid, child_index + 1)
+                child_oid = child_oid_list[child_index]
+                self.parent_oid_set_dict.setdefault(child_oid, set()).add(group_oid)
+                if child_oid in self.closure_cache_dict:
+                    continue
+                if child_oid in on_component_stack_oid_set:  # 指向还未算完的分量，即存在环
+                    low_link_dict[group_oid] = min(low_link_dict[group_oid], visit_index_dict[child_oid])
+                    continue
+                if self.global_info.get_host_group_by_oid(child_oid) is None:
+                    print(f"HostGroupResolver.compute_closure: 主机组 {host_group.name} 的下级主机组 {child_oid} 不存在，已跳过")
+                    continue
+                visit_index_dict[child_oid] = low_link_dict[child_oid] = len(visit_index_dict)
+                component_stack.append(child_oid)
+                on_component_stack_oid_set.add(child_oid)
+                stack.append((child_oid, 0))
+                continue
+            stack.pop()
+            if len(stack) > 0:
+                parent_oid = stack[-1][0]
+                low_link_dict[parent_oid] = min(low_link_dict[parent_oid], low_link_dict[group_oid])
+            if low_link_dict[group_oid] != visit_index_dict[group_oid]:
+                continue  # 不是分量的根，等根出栈时整个分量一起计算
+            component_oid_list = []
+            while True:
+                member_oid = component_stack.pop()
+                on_component_stack_oid_set.discard(member_oid)
+                component_oid_list.append(member_oid)
+                if member_oid == group_oid:
+                    break
+            self.cache_component_closure(component_oid_list)
+
+    def cache_component_closure(self, component_oid_list):
+        """
+        计算并缓存一个强连通分量里每个组的闭包，分量外的下级组都已缓存；
+        每个组按自己的逐层展开顺序排列主机（先组内主机，再依次展开各下级组），分量内已展开过的组不再重复展开
+        """
+        component_oid_set = set(component_oid_list)
+        is_cycle = len(component_oid_list) > 1 or component_oid_list[0] in \
+            self.global_info.get_host_group_by_oid(component_oid_list[0]).host_group_oid_list
+        if is_cycle:
+            group_name_list = [self.global_info.get_host_group_by_oid(group_oid).name for group_oid in component_oid_list]
+            print(f"HostGroupResolver.cache_component_closure: 主机组存在循环包含，环上的组展开后的主机相同: {', '.join(group_name_list)}")
+        for component_root_oid in component_oid_list:
+            closure = []
+            seen_host_oid_set = set()
+
+            def add_host_oid_list(host_oid_list):
+                for host_oid in host_oid_list:
+                    if host_oid not in seen_host_oid_set:
+                        seen_host_oid_set.add(host_oid)
+                        closure.append(host_oid)
+
+            add_host_oid_list(self.global_info.get_host_group_by_oid(component_root_oid).host_oid_list)
+            stack = [(component_root_oid, 0)]
+            expanded_oid_set = {component_root_oid}
+            while len(stack) > 0:
+                group_oid, child_index = stack[-1]
+                child_oid_list = self.global_info.get_host_group_by_oid(group_oid).host_group_oid_list
+                if child_index >= len(child_oid_list):
+                    stack.pop()
+                    continue
+                stack[-1] = (group_oid, child_index + 1)
+                child_oid = child_oid_list[child_index]
+                if child_oid in component_oid_set:
+                    if child_oid not in expanded_oid_set:
+                        expanded_oid_set.add(child_oid)
+                        add_host_oid_list(self.global_info.get_host_group_by_oid(child_oid).host_oid_list)
+                        stack.append((child_oid, 0))
+                else:
+                    add_host_oid_list(self.closure_cache_dict.get(child_oid, ()))
+            self.closure_cache_dict[component_root_oid] = tuple(closure)
+
+    def is_host_group_cycle(self, host_group_oid, child_host_group_oid_list):
+        """
+        编辑主机组时调用，判断主机组host_group_oid若包含child_host_group_oid_list这些下级组，是否会形成循环包含
+        :return: <bool>
+        """
+        with self.lock:
+            pending_oid_list = list(child_host_group_oid_list)
+            visited_oid_set = set()
+            while len(pending_oid_list) > 0:
+                group_oid = pending_oid_list.pop()
+                if group_oid == host_group_oid:
+                    return True
+                if group_oid in visited_oid_set:
+                    continue
+                visited_oid_set.add(group_oid)
+                host_group = self.global_info.get_host_group_by_oid(group_oid)
+                if host_group is not None:
+                    pending_oid_list.extend(host_group.host_group_oid_list)
+            return False
+
+
+class HostCircuitBreaker:
+    """
+    主机熔断记录，全局只有一个，为<GlobalInfo>.host_circuit_breaker，保存在数据库tb_host_circuit_breaker表里
+    ★每次巡检作业结束一台主机时记录：无法连接（登录超时、连接失败，已用完重试次数）则连续失败次数加1，能连上（含认证失败）则清零
+    ★连续失败次数达到巡检模板的circuit_breaker_threshold后，之后的作业先用CIRCUIT_BREAKER_PROBE_TIMEOUT秒的tcp连接探测ssh端口，
+      探测不通则直接判为失败，不再每次都占用一个并发名额等待LOGIN_AUTH_TIMEOUT秒；探测通了才正常登录，登录成功即恢复
+    """
+
+    def __init__(self, global_info=None):
+        self.global_info = global_info
+        self.lock = threading.Lock()
+        self.failure_num_dict = {}  # <dict> key为host_oid，value为连续失败的作业次数 <int>，没有记录的为0
+
+    def load(self):
+        with self.global_info.sqlite_storage.read_cursor() as sqlite_cursor:
+            sqlite_cursor.execute("select host_oid, consecutive_failure_num from tb_host_circuit_breaker")
+            search_result = sqlite_cursor.fetchall()
+        with self.lock:
+            self.failure_num_dict = {host_oid: failure_num for host_oid, failure_num in search_result}
+
+    def is_open(self, host_oid, threshold):
+        """
+        主机是否处于熔断状态，threshold<=0时不熔断
+        """
+        if threshold <= 0:
+            return False
+        with self.lock:
+            return self.failure_num_dict.get(host_oid, 0) >= threshold
+
+    def record_result(self, host_oid, is_reachable):
+        with self.lock:
+            old_failure_num = self.failure_num_dict.get(host_oid, 0)
+            if is_reachable:
+                if old_failure_num == 0:
+                    return  # 无变化，不用写数据库
+                self.failure_num_dict.pop(host_oid, None)
+                failure_num = 0
+            else:
+                failure_num = old_failure_num + 1
+                self.failure_num_dict[host_oid] = failure_num
+        self.global_info.sqlite_storage.execute_write(
+            lambda sqlite_cursor: self.write_to_sqlite(sqlite_cursor, host_oid, failure_num))
+
+    @staticmethod
+    def write_to_sqlite(sqlite_cursor, host_oid, failure_num):
+        if failure_num == 0:
+            sqlite_cursor.execute("delete from tb_host_circuit_breaker where host_oid=?", (host_oid,))
+        else:
+            sqlite_cursor.execute("insert or replace into tb_host_circuit_breaker (host_oid, consecutive_failure_num, last_failure_time)"
+                                  " values (?, ?, ?)", (host_oid, failure_num, time.time()))
+
+    def delete_host(self, host_oid):
+        with self.lock:
+            if self.failure_num_dict.pop(host_oid, None) is None:
+                return
+        self.global_info.sqlite_storage.execute_write(lambda sqlite_cursor: self.write_to_sqlite(sqlite_cursor, host_oid, 0))
+
+
+class HostDurationStats:
+    """
+    主机巡检用时统计，全局只有一个，为<GlobalInfo>.host_duration_stats，保存在数据库tb_host_duration_stats表里
+    ★每次巡检作业结束后，巡检完成的主机以本次用时更新其指数加权平均用时（权重HOST_DURATION_EWMA_ALPHA），失败、超时的主机不更新
+    ★巡检模板按历史用时从长到短排序（HOST_SCHEDULE_ORDER_LONGEST_FIRST）时，作业按平均用时从长到短把主机交给线程池/协程/工作进程，
+      慢主机先开始巡检，作业总用时不再因最后才开始的慢主机而拖长
+    """
+
+    def __init__(self, global_info=None):
+        self.global_info = global_info
+        self.lock = threading.Lock()
+        self.duration_dict = {}  # <dict> key为host_oid，value为 (平均用时<float>秒, 已统计的作业次数<int>)，没有记录的为新主机
+
+    def load(self):
+        with self.global_info.sqlite_storage.read_cursor() as sqlite_cursor:
+            sqlite_cursor.execute("select host_oid, ewma_duration, sample_num from tb_host_duration_stats")
+            search_result = sqlite_cursor.fetchall()
+        with self.lock:
+            self.duration_dict = {host_oid: (ewma_duration, sample_num) for host_oid, ewma_duration, sample_num in search_result}
+
+    @staticmethod
+    def update_ewma(old_value_tuple, duration):
+        """
+        old_value_tuple 为 (平均用时, 已统计的作业次数)，新主机为None，返回加上本次用时后的 (平均用时, 已统计的作业次数)
+        """
+        if old_value_tuple is None:
+            return duration, 1
+        ewma_duration, sample_num = old_value_tuple
+        return HOST_DURATION_EWMA_ALPHA * duration + (1 - HOST_DURATION_EWMA_ALPHA) * ewma_duration, sample_num + 1
+
+    def get_known_host_num(self, host_oid_list):
+        with self.lock:
+            return sum(1 for host_oid in host_oid_list if host_oid in self.duration_dict)
+
+    def get_schedule_index_list(self, host_oid_list, new_host_schedule_slot):
+        """
+        返回按平均用时从长到短排序的主机序号（host_oid_list的下标），用时相同的主机保持原顺序
+        """
+        with self.lock:
+            duration_list = [self.duration_dict[host_oid][0] if host_oid in self.duration_dict else None for host_oid in host_oid_list]
+        known_duration_list = sorted(duration for duration in duration_list if duration is not None)
+        if new_host_schedule_slot == NEW_HOST_SCHEDULE_SLOT_LAST:
+            new_host_duration = -1.0
+        elif new_host_schedule_slot == NEW_HOST_SCHEDULE_SLOT_MEDIAN and len(known_duration_list) != 0:
+            new_host_duration = known_duration_list[len(known_duration_list) // 2]
+        else:
+            new_host_duration = float("inf")
+        return sorted(range(len(host_oid_list)),
+                      key=lambda host_index: -(new_host_duration if duration_list[host_index] is None else duration_list[host_index]))
+
+    def record_job(self, host_job_status_obj_list):
+        """
+        巡检作业结束后调用，只统计巡检完成的主机，登录失败、超时、被停止的主机用时不代表其正常巡检用时
+        """
+        value_row_list = []
+        with self.lock:
+            for host_job_status_obj in host_job_status_obj_list:
+                if host_job_status_obj.job_status != INSPECTION_JOB_EXEC_STATE_COMPLETED or host_job_status_obj.start_time <= 0 \
+                        or host_job_status_obj.end_time <= host_job_status_obj.start_time:
+                    continue
+                value_tuple = self.update_ewma(self.duration_dict.get(host_job_status_obj.host_oid),
+                                               host_job_status_obj.end_time - host_job_status_obj.start_time)
+                self.duration_dict[host_job_status_obj.host_oid] = value_tuple
+                value_row_list.append((host_job_status_obj.host_oid, value_tuple[0], value_tuple[1]))
+        if len(value_row_list) != 0:
+            self.global_info.sqlite_storage.execute_write(lambda sqlite_cursor: self.write_to_sqlite(sqlite_cursor, value_row_list))
+
+    @staticmethod
+    def write_to_sqlite(sqlite_cursor, value_row_list):
+        """
+        value_row_list 元素为 (host_oid, 平均用时, 已统计的作业次数)
+        """
+        update_time = time.time()
+        sqlite_cursor.executemany("insert or replace into tb_host_duration_stats (host_oid, ewma_duration, sample_num, last_update_time)"
+                                  " values (?, ?, ?, ?)",
+                                  [(host_oid, ewma_duration, sample_num, update_time)
+                                   for host_oid, ewma_duration, sample_num in value_row_list])
+
+    def delete_host(self, host_oid):
+        with self.lock:
+            if self.duration_dict.pop(host_oid, None) is None:
+                return
+        self.global_info.sqlite_storage.execute_write(
+            lambda sqlite_cursor: sqlite_cursor.execute("delete from tb_host_duration_stats where host_oid=?", (host_oid,)))
 
 
 class GlobalInfo:
     """
     全局变量类，用于存储所有资源类的实例信息，从数据库导入数据变为内存中的类对象，以及新建的类对象追加到某个list列表中
     """
-
-    def __init__(self, sqlite3_dbfile_name="cofable_default.db", builtin_font_file_path=''):
+    project_obj_list = ResourceObjListAttribute()
+    credential_obj_list = ResourceObjListAttribute()
+    host_obj_list = ResourceObjListAttribute()
+    host_group_obj_list = ResourceObjListAttribute()
+    inspection_code_block_obj_list = ResourceObjListAttribute()
+    inspection_template_obj_list = ResourceObjListAttribute()
+    inspection_job_record_obj_list = ResourceObjListAttribute()
+    launch_template_trigger_obj_list = ResourceObjListAttribute()
+    custome_tag_config_scheme_obj_list = ResourceObjListAttribute()
+
+    def __init__(self, sqlite3_dbfile_name="cofable_default.db", builtin_font_file_path='', read_only_storage=False):
         self.sqlite3_dbfile_name = sqlite3_dbfile_name  # 若未指定数据库文件名称，则默认为"cofable_default.db"
         self.project_obj_list = []
         self.credential_obj_list = []
@@ -2166,8 +6586,19 @@ class GlobalInfo:
         self.inspection_job_record_obj_list = []
         self.launch_template_trigger_obj_list = []
         self.custome_tag_config_scheme_obj_list = []
+        self.inspection_job_record_page_cursor = None  # 已加载的最旧一条作业记录的(start_time, rowid)，加载下一页时从它之后开始
+        self.is_all_inspection_job_record_loaded = False  # 数据库里的作业记录是否已全部加载
+        self.running_inspection_job_dict = {}  # 正在执行的巡检作业 {job_oid: <LaunchInspectionJob>}，用于在作业详情界面停止作业
+        self.finished_inspection_job_record_queue = None  # <queue.SimpleQueue> 无界面运行（daemon）时创建，作业结束后放入其作业记录
         self.current_project_obj = None  # 需要在项目界面将某个项目设置为当前项目，才会赋值
-        self.lock_sqlite3_db = threading.Lock()  # 操作本地sqlite3数据库文件的锁，同一时间段内只能有一个线程操作此数据库
+        self.host_group_resolver = HostGroupResolver(global_info=self)  # 主机组展开器，缓存每个主机组展开后的所有主机
+        self.ssh_transport_pool = SSHTransportPool()  # ssh连接池，巡检作业、凭据检测、终端会话都从这里取用已认证的ssh连接
+        self.host_circuit_breaker = HostCircuitBreaker(global_info=self)  # 主机熔断记录，连续多次作业无法连接的主机先探测再登录
+        self.host_duration_stats = HostDurationStats(global_info=self)  # 主机巡检用时统计，作业按历史用时从长到短巡检主机
+        self.template_scheduler = TemplateScheduler(global_info=self)  # 巡检模板调度器，所有巡检模板的定时执行共用一个调度线程
+        # 本地数据库存储层，所有资源的读写都经过它，read_only_storage为True时只读打开（多进程分片模式的工作进程）
+        self.sqlite_storage = SqliteStorage(self.sqlite3_dbfile_name, read_only=read_only_storage)
+        self.sqlite_storage.open()  # 打开数据库文件，建表只在这里执行一次
         self.builtin_font_file_path = builtin_font_file_path
         self.main_window = None  # 程序的主窗口，全局只有一个主窗口对象
         self.division_terminal_window = None  # 主机的terminal终端子窗口
@@ -2280,6 +6711,9 @@ class GlobalInfo:
 
     def set_sqlite3_dbfile_name(self, file_name):
         self.sqlite3_dbfile_name = file_name
+        self.sqlite_storage.close()  # 先等待旧数据库文件排队中的写操作全部完成，再切换到新的数据库文件
+        self.sqlite_storage = SqliteStorage(self.sqlite3_dbfile_name)
+        self.sqlite_storage.open()
 
     def show_ip_calculator_tool_window(self):
         # 如果还未创建IpCalculator对象，则先创建
@@ -2312,13 +6746,7 @@ class GlobalInfo:
             for host_session_record_obj in self.division_terminal_window.host_session_record_obj_list:
                 cofable_stop_thread_silently(host_session_record_obj.recv_vt100_output_data_thread)
                 cofable_stop_thread_silently(host_session_record_obj.send_user_input_data_thread)
-                if host_session_record_obj.terminal_backend_obj.ssh_invoke_shell is not None:
-                    try:
-                        host_session_record_obj.terminal_backend_obj.ssh_invoke_shell.close()  # 如果已经关闭了，则再次关闭会抛出EOFError异常
-                    except EOFError as err:
-                        print(err)
-                if host_session_record_obj.terminal_backend_obj.ssh_client is not None:
-                    host_session_record_obj.terminal_backend_obj.ssh_client.close()
+                host_session_record_obj.terminal_backend_obj.release_ssh_connection()  # 关闭shell通道，ssh连接归还给连接池
                 cofable_stop_thread_silently(host_session_record_obj.terminal_backend_run_thread)
                 cofable_stop_thread_silently(host_session_record_obj.set_custom_color_tag_config_thread)
                 cofable_stop_thread_silently(host_session_record_obj.parse_received_vt100_data_thread)
@@ -2326,7 +6754,7 @@ class GlobalInfo:
             time.sleep(0.1)
             self.division_terminal_window.pop_window.quit()
 
-    def load_all_data_from_sqlite3(self):  # 初始化global_info，从数据库加载所有数据到实例
+    def load_all_data_from_sqlite3(self, start_template_trigger=True):  # 初始化global_info，从数据库加载所有数据到实例
         if self.sqlite3_dbfile_name is None:
             print("undefined sqlite3_dbfile_name")
             return
@@ -2338,24 +6766,33 @@ class GlobalInfo:
             self.credential_obj_list = self.load_credential_from_dbfile()
             self.host_obj_list = self.load_host_from_dbfile()
             self.host_group_obj_list = self.load_host_group_from_dbfile()
+            self.host_group_resolver.invalidate_all()
+            self.host_circuit_breaker.load()
+            self.host_duration_stats.load()
             self.inspection_code_block_obj_list = self.load_inspection_code_block_from_dbfile()
             self.inspection_template_obj_list = self.load_inspection_template_from_dbfile()
-            self.inspection_job_record_obj_list = self.load_inspection_job_record_from_dbfile()
-            self.inspection_job_record_obj_list.reverse()  # 逆序，按时间从新到旧
+            self.inspection_job_record_obj_list = []
+            self.inspection_job_record_page_cursor = None
+            self.is_all_inspection_job_record_loaded = False
+            self.load_more_inspection_job_record()  # 作业记录只加载最新的一页，按时间从新到旧，其余的在作业列表界面点“加载更多”再加载
             self.create_builtin_custome_tag_config_scheme()  # 创★★建内置的shell着色方案★★
             self.custome_tag_config_scheme_obj_list = self.load_custome_tag_config_scheme()  # 加载所有着色方案，含刚刚创建的内置方案
-            # 加载完成所有资源后，创建定时作业监听器
-            self.launch_template_trigger()
+            # 加载完成所有资源后，创建定时作业监听器，只执行指定巡检模板时（run-template）不需要
+            if start_template_trigger:
+                self.launch_template_trigger()
 
     def launch_template_trigger(self):
         for inspection_template in self.inspection_template_obj_list:
             if inspection_template.execution_method != EXECUTION_METHOD_NONE:
-                cron_trigger1 = LaunchTemplateTrigger(inspection_template_obj=inspection_template,
-                                                      global_info=self)
-                inspection_template.launch_template_trigger_oid = cron_trigger1.oid  # 将触发器id添加到巡检模板对象上
-                self.launch_template_trigger_obj_list.append(cron_trigger1)
-                # 开始执行监视任务，达到触发条件就执行相应巡检模板（由LaunchTemplateTrigger.start_crontab_job()方法触发）
-                cron_trigger1.start_crond_job()
+                self.create_launch_template_trigger(inspection_template)
+
+    def create_launch_template_trigger(self, inspection_template):
+        cron_trigger1 = LaunchTemplateTrigger(inspection_template_obj=inspection_template,
+                                              global_info=self)
+        inspection_template.launch_template_trigger_oid = cron_trigger1.oid  # 将触发器id添加到巡检模板对象上
+        self.launch_template_trigger_obj_list.append(cron_trigger1)
+        # 开始执行监视任务，达到触发条件就执行相应巡检模板（由巡检模板调度器TemplateScheduler触发）
+        cron_trigger1.start_crond_job()
 
     def create_builtin_custome_tag_config_scheme(self):
         self.create_builtin_custome_tag_config_scheme_linux()
@@ -2595,68 +7032,44 @@ class GlobalInfo:
         从sqlite3数据库文件，查找所有project，并输出project对象列表，output <list[Project]>
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_project'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_project"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_project"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            obj = Project(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
-                          create_timestamp=obj_info_tuple[3], last_modify_timestamp=obj_info_tuple[4], global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_project"
+            sqlite_cursor.execute(sql)
+            search_result = sqlite_cursor.fetchall()
+            obj_list = []
+            for obj_info_tuple in search_result:
+                obj = Project(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
+                              create_timestamp=obj_info_tuple[3], last_modify_timestamp=obj_info_tuple[4], global_info=self)
+                obj_list.append(obj)
         return obj_list
 
     def load_credential_from_dbfile(self):
         """
         从sqlite3数据库文件，查找所有credential，并输出credential对象列表，output <list>
         :return:
-        """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_credential'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_credential"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_credential"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            # print('tuple: ', obj_info_tuple)
-            obj = Credential(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
-                             project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
-                             cred_type=obj_info_tuple[5],
-                             username=obj_info_tuple[6],
-                             password=obj_info_tuple[7],
-                             private_key=base64.b64decode(obj_info_tuple[8]).decode('utf8'),
-                             privilege_escalation_method=obj_info_tuple[9],
-                             privilege_escalation_username=obj_info_tuple[10],
-                             privilege_escalation_password=obj_info_tuple[11],
-                             auth_url=obj_info_tuple[12],
-                             ssl_verify=obj_info_tuple[13],
-                             last_modify_timestamp=obj_info_tuple[14], global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        """
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_credential"
+            sqlite_cursor.execute(sql)
+            search_result = sqlite_cursor.fetchall()
+            obj_list = []
+            for obj_info_tuple in search_result:
+                # print('tuple: ', obj_info_tuple)
+                obj = Credential(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
+                                 project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
+                                 cred_type=obj_info_tuple[5],
+                                 username=obj_info_tuple[6],
+                                 password=obj_info_tuple[7],
+                                 private_key=base64.b64decode(obj_info_tuple[8]).decode('utf8'),
+                                 privilege_escalation_method=obj_info_tuple[9],
+                                 privilege_escalation_username=obj_info_tuple[10],
+                                 privilege_escalation_password=obj_info_tuple[11],
+                                 auth_url=obj_info_tuple[12],
+                                 ssl_verify=obj_info_tuple[13],
+                                 last_modify_timestamp=obj_info_tuple[14], global_info=self)
+                obj_list.append(obj)
         return obj_list
 
     def load_host_from_dbfile(self):
@@ -2664,340 +7077,231 @@ class GlobalInfo:
         从sqlite3数据库文件，查找所有host，并输出host对象列表，output <list>
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_host"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            # print('tuple: ', obj_info_tuple)
-            obj = Host(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
-                       project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
-                       address=obj_info_tuple[5],
-                       port=int(obj_info_tuple[6]),
-                       last_modify_timestamp=float(obj_info_tuple[7]),
-                       login_protocol=int(obj_info_tuple[8]),
-                       first_auth_method=int(obj_info_tuple[9]),
-                       login_credential_oid=obj_info_tuple[10],
-                       custome_tag_config_scheme_oid=obj_info_tuple[11],
-                       global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_host"
+            sqlite_cursor.execute(sql)
+            search_result = sqlite_cursor.fetchall()
+            obj_list = []
+            for obj_info_tuple in search_result:
+                # print('tuple: ', obj_info_tuple)
+                obj = Host(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
+                           project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
+                           address=obj_info_tuple[5],
+                           port=int(obj_info_tuple[6]),
+                           last_modify_timestamp=float(obj_info_tuple[7]),
+                           login_protocol=int(obj_info_tuple[8]),
+                           first_auth_method=int(obj_info_tuple[9]),
+                           login_credential_oid=obj_info_tuple[10],
+                           custome_tag_config_scheme_oid=obj_info_tuple[11],
+                           global_info=self)
+                obj_list.append(obj)
         # self.load_host_include_credential_from_dbfile(obj_list)  # 这个废弃了
         return obj_list
 
     def load_host_include_credential_from_dbfile(self, host_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host_include_credential_oid_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host_include_credential_oid_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for host in host_list:
-            sql = f"select * from tb_host_include_credential_oid_list where host_oid='{host.oid}'"
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # ★查询是否有名为'tb_host_include_credential_oid_list'的表★
+            sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host_include_credential_oid_list"'
             sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                # print('tuple: ', obj_info_tuple)
-                host.credential_oid_list.append(obj_info_tuple[1])
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+            result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
+            print("exist tables: ", result)
+            # 若未查询到有此表，则返回None
+            if len(result) == 0:
+                return []
+            # 读取数据
+            for host in host_list:
+                sql = f"select * from tb_host_include_credential_oid_list where host_oid='{host.oid}'"
+                sqlite_cursor.execute(sql)
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    host.credential_oid_list.append(obj_info_tuple[1])
 
     def load_host_group_from_dbfile(self):
         """
         从sqlite3数据库文件，查找所有host_group，并输出host_group对象列表，output <list>
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host_group'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host_group"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_host_group"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            # print('tuple: ', obj_info_tuple)
-            obj = HostGroup(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
-                            project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
-                            last_modify_timestamp=obj_info_tuple[5], global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_host_group"
+            sqlite_cursor.execute(sql)
+            search_result = sqlite_cursor.fetchall()
+            obj_list = []
+            for obj_info_tuple in search_result:
+                # print('tuple: ', obj_info_tuple)
+                obj = HostGroup(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
+                                project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
+                                last_modify_timestamp=obj_info_tuple[5], global_info=self)
+                obj_list.append(obj)
         self.load_host_group_include_host_from_dbfile(obj_list)
         self.load_host_group_include_host_group_from_dbfile(obj_list)
         return obj_list
 
     def load_host_group_include_host_from_dbfile(self, host_group_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host_group_include_host_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host_group_include_host_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for host_group in host_group_list:
-            sql = f"select * from tb_host_group_include_host_list where host_group_oid='{host_group.oid}'"
-            sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                # print('tuple: ', obj_info_tuple)
-                host_group.host_oid_list.append(obj_info_tuple[2])
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for host_group in host_group_list:
+                sql = "select * from tb_host_group_include_host_list where host_group_oid=? order by host_index"
+                sqlite_cursor.execute(sql, (host_group.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    host_group.host_oid_list.append(obj_info_tuple[2])
 
     def load_host_group_include_host_group_from_dbfile(self, host_group_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host_group_include_host_group_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host_group_include_host_group_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for host_group in host_group_list:
-            sql = f"select * from tb_host_group_include_host_group_list where host_group_oid='{host_group.oid}'"
-            sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                # print('tuple: ', obj_info_tuple)
-                host_group.host_group_oid_list.append(obj_info_tuple[2])
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for host_group in host_group_list:
+                sql = "select * from tb_host_group_include_host_group_list where host_group_oid=? order by group_index"
+                sqlite_cursor.execute(sql, (host_group.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    host_group.host_group_oid_list.append(obj_info_tuple[2])
 
     def load_inspection_code_block_from_dbfile(self):
         """
         从sqlite3数据库文件，查找所有inspection_code，并输出inspection_code对象列表，output <list>
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_code'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_code_block"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_inspection_code_block"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            # print('tuple: ', obj_info_tuple)
-            obj = InspectionCodeBlock(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
-                                      project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
-                                      code_source=obj_info_tuple[5],
-                                      last_modify_timestamp=obj_info_tuple[6], global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
-        self.load_inspection_code_list_from_dbfile(obj_list)
-        return obj_list
-
-    def load_inspection_code_list_from_dbfile(self, inspection_code_block_obj_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_code_block_include_code_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_code_block_include_code_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for inspection_code_block_obj in inspection_code_block_obj_list:
-            sql = f"select * from tb_inspection_code_block_include_code_list where \
-            inspection_code_block_oid='{inspection_code_block_obj.oid}'"
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_inspection_code_block"
             sqlite_cursor.execute(sql)
             search_result = sqlite_cursor.fetchall()
+            obj_list = []
             for obj_info_tuple in search_result:
                 # print('tuple: ', obj_info_tuple)
-                code = OneLineCode(code_index=obj_info_tuple[1], code_content=obj_info_tuple[2],
-                                   code_post_wait_time=obj_info_tuple[3], need_interactive=obj_info_tuple[4],
-                                   interactive_question_keyword=obj_info_tuple[5],
-                                   interactive_answer=obj_info_tuple[6],
-                                   interactive_process_method=obj_info_tuple[7],
-                                   description=obj_info_tuple[8])
-                inspection_code_block_obj.code_list.append(code)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+                obj = InspectionCodeBlock(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
+                                          project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
+                                          code_source=obj_info_tuple[5],
+                                          last_modify_timestamp=obj_info_tuple[6], global_info=self,
+                                          code_exec_method=obj_info_tuple[7], exec_command_concurrency=obj_info_tuple[8],
+                                          code_source_path=obj_info_tuple[9], code_source_git_url=obj_info_tuple[10])
+                obj_list.append(obj)
+        self.load_inspection_code_list_from_dbfile(obj_list)
+        return obj_list
+
+    def load_inspection_code_list_from_dbfile(self, inspection_code_block_obj_list):
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for inspection_code_block_obj in inspection_code_block_obj_list:
+                sql = "select * from tb_inspection_code_block_include_code_list where inspection_code_block_oid=? order by code_index"
+                sqlite_cursor.execute(sql, (inspection_code_block_obj.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    code = OneLineCode(code_index=obj_info_tuple[1], code_content=obj_info_tuple[2],
+                                       code_post_wait_time=obj_info_tuple[3], need_interactive=obj_info_tuple[4],
+                                       interactive_question_keyword=obj_info_tuple[5],
+                                       interactive_answer=obj_info_tuple[6],
+                                       interactive_process_method=obj_info_tuple[7],
+                                       description=obj_info_tuple[8], label=obj_info_tuple[9],
+                                       condition_type=obj_info_tuple[10], condition_pattern=obj_info_tuple[11],
+                                       condition_action=obj_info_tuple[12], condition_goto_label=obj_info_tuple[13])
+                    inspection_code_block_obj.code_list.append(code)
 
     def load_inspection_template_from_dbfile(self):
         """
         从sqlite3数据库文件，查找所有inspection_template，并输出inspection_template对象列表，output <list>
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_template'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_template"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_inspection_template"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            # print('tuple: ', obj_info_tuple)
-            obj = InspectionTemplate(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
-                                     project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
-                                     execution_method=obj_info_tuple[5],
-                                     execution_at_time=obj_info_tuple[6],
-                                     execution_after_time=obj_info_tuple[7],
-                                     execution_crond_time=obj_info_tuple[8],
-                                     last_modify_timestamp=obj_info_tuple[9],
-                                     update_code_on_launch=obj_info_tuple[10],
-                                     forks=obj_info_tuple[11],
-                                     save_output_to_file=obj_info_tuple[12],
-                                     output_file_name_style=obj_info_tuple[13],
-                                     global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_inspection_template"
+            sqlite_cursor.execute(sql)
+            search_result = sqlite_cursor.fetchall()
+            obj_list = []
+            for obj_info_tuple in search_result:
+                # print('tuple: ', obj_info_tuple)
+                obj = InspectionTemplate(oid=obj_info_tuple[0], name=obj_info_tuple[1], description=obj_info_tuple[2],
+                                         project_oid=obj_info_tuple[3], create_timestamp=obj_info_tuple[4],
+                                         execution_method=obj_info_tuple[5],
+                                         execution_at_time=obj_info_tuple[6],
+                                         execution_after_time=obj_info_tuple[7],
+                                         execution_crond_time=obj_info_tuple[8],
+                                         last_modify_timestamp=obj_info_tuple[9],
+                                         update_code_on_launch=obj_info_tuple[10],
+                                         forks=obj_info_tuple[11],
+                                         save_output_to_file=obj_info_tuple[12],
+                                         output_file_name_style=obj_info_tuple[13],
+                                         job_exec_mode=obj_info_tuple[14],
+                                         code_exec_timeout=obj_info_tuple[15],
+                                         host_deadline=obj_info_tuple[16],
+                                         job_deadline=obj_info_tuple[17],
+                                         adaptive_forks=obj_info_tuple[18],
+                                         login_retry_times=obj_info_tuple[19],
+                                         login_retry_interval=obj_info_tuple[20],
+                                         circuit_breaker_threshold=obj_info_tuple[21],
+                                         schedule_overlap_policy=obj_info_tuple[22],
+                                         host_schedule_order=obj_info_tuple[23],
+                                         new_host_schedule_slot=obj_info_tuple[24],
+                                         global_info=self)
+                obj_list.append(obj)
         self.load_inspection_template_include_host_from_dbfile(obj_list)
         self.load_inspection_template_include_host_group_from_dbfile(obj_list)
         self.load_inspection_template_include_inspection_code_block_from_dbfile(obj_list)
         return obj_list
 
     def load_inspection_template_include_host_from_dbfile(self, inspection_template_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_template_include_host_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_template_include_host_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for inspection_template in inspection_template_list:
-            sql = f"select * from tb_inspection_template_include_host_list where \
-                    inspection_template_oid='{inspection_template.oid}'"
-            sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                # print('tuple: ', obj_info_tuple)
-                inspection_template.host_oid_list.append(obj_info_tuple[2])
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for inspection_template in inspection_template_list:
+                sql = "select * from tb_inspection_template_include_host_list where inspection_template_oid=? order by host_index"
+                sqlite_cursor.execute(sql, (inspection_template.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    inspection_template.host_oid_list.append(obj_info_tuple[2])
 
     def load_inspection_template_include_host_group_from_dbfile(self, inspection_template_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_template_include_group_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_template_include_group_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for inspection_template in inspection_template_list:
-            sql = f"select * from tb_inspection_template_include_group_list where \
-                    inspection_template_oid='{inspection_template.oid}'"
-            sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                # print('tuple: ', obj_info_tuple)
-                inspection_template.host_group_oid_list.append(obj_info_tuple[2])
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for inspection_template in inspection_template_list:
+                sql = "select * from tb_inspection_template_include_group_list where inspection_template_oid=? order by group_index"
+                sqlite_cursor.execute(sql, (inspection_template.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    inspection_template.host_group_oid_list.append(obj_info_tuple[2])
 
     def load_inspection_template_include_inspection_code_block_from_dbfile(self, inspection_template_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_template_include_inspection_code_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" \
-                    and tbl_name="tb_inspection_template_include_inspection_code_block_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for inspection_template in inspection_template_list:
-            sql = f"select * from tb_inspection_template_include_inspection_code_block_list where \
-            inspection_template_oid='{inspection_template.oid}'"
-            sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                inspection_template.inspection_code_block_oid_list.append(obj_info_tuple[2])
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
-
-    def load_inspection_job_record_from_dbfile(self):
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for inspection_template in inspection_template_list:
+                sql_list = ["select * from tb_inspection_template_include_inspection_code_block_list",
+                            "where inspection_template_oid=? order by inspection_code_block_index"]
+                sqlite_cursor.execute(" ".join(sql_list), (inspection_template.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    inspection_template.inspection_code_block_oid_list.append(obj_info_tuple[2])
+
+    def load_inspection_job_record_from_dbfile(self, before_cursor=None, limit=INSPECTION_JOB_RECORD_PAGE_SIZE):
         """
-        从sqlite3数据库文件，查找所有inspection_job_record，并输出InspectionJobRecord对象列表，output <list>
-        :return:
+        从sqlite3数据库文件，按开始时间从新到旧查找一页inspection_job_record，output <list>
+        ★只加载作业信息，不加载主机作业状态，查看作业详情时再调用 load_inspection_job_record_host_job_status() 加载
+        :param before_cursor: <tuple> (start_time, rowid)，只查找比它旧的作业记录，为None时从最新的开始
+        :param limit: <int> 最多查找多少条，为None时查找全部
+        :return: (<list>InspectionJobRecord对象列表, <tuple>最后一条记录的(start_time, rowid)，未找到时为None)
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_record'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_job_record"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_inspection_job_record"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
+        sql_list = ["select oid, name, description, project_oid, inspection_template_oid, job_state, start_time, end_time, rowid,",
+                    "concurrency_history from tb_inspection_job_record"]
+        param_list = []
+        if before_cursor is not None:
+            sql_list.append("where (start_time, rowid) < (?, ?)")
+            param_list.extend(before_cursor)
+        sql_list.append("order by start_time desc, rowid desc")
+        if limit is not None:
+            sql_list.append("limit ?")
+            param_list.append(limit)
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sqlite_cursor.execute(" ".join(sql_list), param_list)
+            search_result = sqlite_cursor.fetchall()
         obj_list = []
+        last_cursor = None
         for obj_info_tuple in search_result:
             # print('tuple: ', obj_info_tuple)
             obj = InspectionJobRecord(oid=obj_info_tuple[0],
@@ -3008,279 +7312,231 @@ class GlobalInfo:
                                       job_state=int(obj_info_tuple[5]),
                                       start_time=float(obj_info_tuple[6]),
                                       end_time=float(obj_info_tuple[7]),
+                                      concurrency_history=obj_info_tuple[9],
                                       global_info=self)
+            obj.is_host_job_status_loaded = False
             obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
-        self.load_inspection_job_record_host_job_status_from_dbfile(obj_list)
-        return obj_list
+            last_cursor = (obj_info_tuple[6], obj_info_tuple[8])
+        return obj_list, last_cursor
+
+    def load_more_inspection_job_record(self):
+        """
+        从数据库再加载一页更旧的作业记录，追加到inspection_job_record_obj_list末尾，返回本次加载的数量
+        :return:
+        """
+        if self.is_all_inspection_job_record_loaded:
+            return 0
+        obj_list, last_cursor = self.load_inspection_job_record_from_dbfile(before_cursor=self.inspection_job_record_page_cursor)
+        if len(obj_list) < INSPECTION_JOB_RECORD_PAGE_SIZE:
+            self.is_all_inspection_job_record_loaded = True
+        if last_cursor is not None:
+            self.inspection_job_record_page_cursor = last_cursor
+        load_num = 0
+        for obj in obj_list:
+            if self.inspection_job_record_obj_list.get_obj_by_oid(obj.oid) is not None:
+                continue  # 本次运行期间新建的作业，已在列表里了
+            self.inspection_job_record_obj_list.append(obj)
+            load_num += 1
+        return load_num
+
+    def get_inspection_job_record_total_num(self):
+        """
+        作业记录总数 = 已加载到内存的数量 + 数据库里还未加载的（比分页游标更旧的）数量
+        :return:
+        """
+        loaded_num = len(self.inspection_job_record_obj_list)
+        if self.is_all_inspection_job_record_loaded or self.inspection_job_record_page_cursor is None:
+            return loaded_num
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            sqlite_cursor.execute("select count(*) from tb_inspection_job_record where (start_time, rowid) < (?, ?)",
+                                  self.inspection_job_record_page_cursor)
+            return loaded_num + sqlite_cursor.fetchone()[0]
+
+    def load_inspection_job_record_host_job_status(self, inspection_job_record_obj):
+        """
+        查看作业详情时调用，作业记录的主机作业状态还未加载时才从数据库加载
+        :param inspection_job_record_obj:
+        :return:
+        """
+        if inspection_job_record_obj.is_host_job_status_loaded:
+            return
+        self.load_inspection_job_record_host_job_status_from_dbfile([inspection_job_record_obj])
 
     def load_inspection_job_record_host_job_status_from_dbfile(self, inspection_job_record_obj_list):
         """
-        从sqlite3数据库文件，xxx
+        从sqlite3数据库文件，加载作业记录的主机作业状态列表<HostJobStatus>
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_record_host_job_status_obj_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_record_host_job_status_obj_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for job_record_obj in inspection_job_record_obj_list:
-            sql = f'select * from tb_inspection_job_record_host_job_status_obj_list where "job_record_oid"="{job_record_obj.oid}"'
-            sqlite_cursor.execute(sql)
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                # print('tuple: ', obj_info_tuple)
-                obj = HostJobStatus(host_oid=obj_info_tuple[1],
-                                    job_status=int(obj_info_tuple[2]),
-                                    find_credential_status=int(obj_info_tuple[3]),
-                                    exec_timeout=int(obj_info_tuple[4]),
-                                    start_time=float(obj_info_tuple[5]),
-                                    end_time=float(obj_info_tuple[6]),
-                                    sum_of_code_block=int(obj_info_tuple[7]),
-                                    current_exec_code_block=int(obj_info_tuple[8]),
-                                    sum_of_code_lines=int(obj_info_tuple[9]),
-                                    current_exec_code_num=int(obj_info_tuple[9]))
-                job_record_obj.unduplicated_host_job_status_obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for job_record_obj in inspection_job_record_obj_list:
+                sql = "select * from tb_inspection_job_record_host_job_status_obj_list where job_record_oid=? order by rowid"
+                sqlite_cursor.execute(sql, (job_record_obj.oid,))
+                search_result = sqlite_cursor.fetchall()
+                host_job_status_obj_list = []
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    obj = HostJobStatus(host_oid=obj_info_tuple[1],
+                                        job_status=int(obj_info_tuple[2]),
+                                        find_credential_status=int(obj_info_tuple[3]),
+                                        exec_timeout=int(obj_info_tuple[4]),
+                                        start_time=float(obj_info_tuple[5]),
+                                        end_time=float(obj_info_tuple[6]),
+                                        sum_of_code_block=int(obj_info_tuple[7]),
+                                        current_exec_code_block=int(obj_info_tuple[8]),
+                                        sum_of_code_lines=int(obj_info_tuple[9]),
+                                        current_exec_code_num=int(obj_info_tuple[10]))
+                    host_job_status_obj_list.append(obj)
+                job_record_obj.unduplicated_host_job_status_obj_list = host_job_status_obj_list
+                job_record_obj.is_host_job_status_loaded = True
 
     def load_inspection_job_log_for_host(self, inspection_job_record_oid, host_oid, inspection_code_block_oid):
         """
         从sqlite3数据库文件，查询某台主机的巡检作业日志，输出为<SSHOperatorOutput>对象列表
         :return:
         """
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_invoke_shell_output'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_invoke_shell_output"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        ssh_operator_output_obj_list = []
-        sql_list = ['select * from tb_inspection_job_invoke_shell_output where',
-                    f'"job_oid"="{inspection_job_record_oid}"',
-                    f'and "host_oid"="{host_oid}"',
-                    f'and "inspection_code_oid"="{inspection_code_block_oid}"']
-        sqlite_cursor.execute(" ".join(sql_list))
-        search_result = sqlite_cursor.fetchall()
-        for obj_info_tuple in search_result:
-            obj = SSHOperatorOutput(code_index=obj_info_tuple[4],
-                                    code_content='',
-                                    code_exec_method=int(obj_info_tuple[5]),
-                                    invoke_shell_output_bytes=base64.b64decode(obj_info_tuple[6]),
-                                    invoke_shell_output_last_line_str=base64.b64decode(obj_info_tuple[7]).decode("utf8"),
-                                    )
-            ssh_operator_output_obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            ssh_operator_output_obj_list = []
+            sql_list = ['select code_index, code_exec_method, output_format,',
+                        'invoke_shell_output_bytes_b64, invoke_shell_output_last_line_str_b64,',
+                        'invoke_shell_output_blob, invoke_shell_output_last_line_str,',
+                        'exec_command_stderr_blob, exec_command_exit_status',
+                        'from tb_inspection_job_invoke_shell_output',
+                        'where job_oid=? and host_oid=? and inspection_code_oid=? order by code_index']
+            sqlite_cursor.execute(" ".join(sql_list), (inspection_job_record_oid, host_oid, inspection_code_block_oid))
+            search_result = sqlite_cursor.fetchall()
+            inspection_code_block_obj = self.get_inspection_code_block_by_oid(inspection_code_block_oid)
+            for obj_info_tuple in search_result:
+                output_format = obj_info_tuple[2]
+                if output_format == OUTPUT_STORAGE_FORMAT_BASE64:  # 旧版本程序保存的记录
+                    invoke_shell_output_bytes = base64.b64decode(obj_info_tuple[3])
+                    invoke_shell_output_last_line_str = base64.b64decode(obj_info_tuple[4]).decode("utf8")
+                else:
+                    invoke_shell_output_bytes = cofable_decompress_output_bytes(output_format, obj_info_tuple[5])
+                    invoke_shell_output_last_line_str = obj_info_tuple[6]
+                obj = SSHOperatorOutput(code_index=obj_info_tuple[0],
+                                        code_content='',
+                                        code_exec_method=int(obj_info_tuple[1]),
+                                        invoke_shell_output_bytes=invoke_shell_output_bytes,
+                                        invoke_shell_output_last_line_str=invoke_shell_output_last_line_str,
+                                        exec_command_exit_status=obj_info_tuple[8],
+                                        )
+                if obj.code_exec_method == CODE_EXEC_METHOD_EXEC_COMMAND:
+                    # exec_command方式的输出没有命令回显，命令内容从巡检代码块里取（巡检代码块可能已被修改或删除）
+                    if inspection_code_block_obj is not None and 0 <= obj.code_index < len(inspection_code_block_obj.code_list):
+                        obj.code_content = inspection_code_block_obj.code_list[obj.code_index].code_content
+                    obj.exec_command_stdout_line_list = invoke_shell_output_bytes.decode('utf8', errors='replace').splitlines(
+                        keepends=True)
+                    if obj_info_tuple[7] is not None:
+                        obj.exec_command_stderr_line_list = cofable_decompress_output_bytes(
+                            output_format, obj_info_tuple[7]).decode('utf8', errors='replace').splitlines(keepends=True)
+                ssh_operator_output_obj_list.append(obj)
         self.load_inspection_job_interactive_output_for_host(ssh_operator_output_obj_list, inspection_job_record_oid, host_oid,
                                                              inspection_code_block_oid)
         return ssh_operator_output_obj_list
 
     def load_inspection_job_interactive_output_for_host(self, ssh_operator_output_obj_list, inspection_job_record_oid, host_oid,
                                                         inspection_code_block_oid):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_invoke_shell_interactive_output'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_invoke_shell_interactive_output"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for output_obj in ssh_operator_output_obj_list:
-            output_obj.interactive_output_bytes_list = []
-            sql_list = ['select * from tb_inspection_job_invoke_shell_interactive_output where',
-                        f'"job_oid"="{inspection_job_record_oid}"',
-                        f'and "host_oid"="{host_oid}"',
-                        f'and "inspection_code_oid"="{inspection_code_block_oid}"',
-                        f'and "code_index"="{output_obj.code_index}"']
-            sqlite_cursor.execute(" ".join(sql_list))
-            search_result = sqlite_cursor.fetchall()
-            for obj_info_tuple in search_result:
-                interactive_output_bytes = base64.b64decode(obj_info_tuple[6])
-                output_obj.interactive_output_bytes_list.append(interactive_output_bytes)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for output_obj in ssh_operator_output_obj_list:
+                output_obj.interactive_output_bytes_list = []
+                sql_list = ['select output_format, interactive_output_bytes_b64, interactive_output_blob',
+                            'from tb_inspection_job_invoke_shell_interactive_output',
+                            'where job_oid=? and host_oid=? and inspection_code_oid=? and code_index=?',
+                            'order by code_exec_interactive_output_index']
+                sqlite_cursor.execute(" ".join(sql_list),
+                                      (inspection_job_record_oid, host_oid, inspection_code_block_oid, output_obj.code_index))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    if obj_info_tuple[0] == OUTPUT_STORAGE_FORMAT_BASE64:  # 旧版本程序保存的记录
+                        interactive_output_bytes = base64.b64decode(obj_info_tuple[1])
+                    else:
+                        interactive_output_bytes = cofable_decompress_output_bytes(obj_info_tuple[0], obj_info_tuple[2])
+                    output_obj.interactive_output_bytes_list.append(interactive_output_bytes)
 
     def load_custome_tag_config_scheme(self):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_record'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_custome_tag_config_scheme"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        sql = f"select * from tb_custome_tag_config_scheme"
-        sqlite_cursor.execute(sql)
-        search_result = sqlite_cursor.fetchall()
-        obj_list = []
-        for obj_info_tuple in search_result:
-            # print('tuple: ', obj_info_tuple)
-            obj = CustomTagConfigScheme(oid=obj_info_tuple[0],
-                                        name=obj_info_tuple[1],
-                                        description=obj_info_tuple[2],
-                                        project_oid=obj_info_tuple[3],
-                                        create_timestamp=obj_info_tuple[4],
-                                        last_modify_timestamp=obj_info_tuple[5],
-                                        global_info=self)
-            obj_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
-        self.load_custome_tag_config_scheme_include_match_object(obj_list)
-        return obj_list
-
-    def load_custome_tag_config_scheme_include_match_object(self, obj_list):
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_record_host_job_status_obj_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_custome_tag_config_scheme_include_match_object"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则返回None
-        if len(result) == 0:
-            return []
-        # 读取数据
-        for scheme_obj in obj_list:
-            sql = f'select * from tb_custome_tag_config_scheme_include_match_object where "scheme_oid"="{scheme_obj.oid}"'
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            sql = f"select * from tb_custome_tag_config_scheme"
             sqlite_cursor.execute(sql)
             search_result = sqlite_cursor.fetchall()
+            obj_list = []
             for obj_info_tuple in search_result:
                 # print('tuple: ', obj_info_tuple)
-                obj = CustomMatchObject(match_pattern_lines=base64.b64decode(obj_info_tuple[1]).decode("utf8"),
-                                        foreground=obj_info_tuple[2],
-                                        backgroun=obj_info_tuple[3],
-                                        underline=obj_info_tuple[4],
-                                        underlinefg=obj_info_tuple[5],
-                                        overstrike=obj_info_tuple[6],
-                                        overstrikefg=obj_info_tuple[7],
-                                        bold=obj_info_tuple[8],
-                                        italic=obj_info_tuple[9])
-                scheme_obj.custom_match_object_list.append(obj)
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
+                obj = CustomTagConfigScheme(oid=obj_info_tuple[0],
+                                            name=obj_info_tuple[1],
+                                            description=obj_info_tuple[2],
+                                            project_oid=obj_info_tuple[3],
+                                            create_timestamp=obj_info_tuple[4],
+                                            last_modify_timestamp=obj_info_tuple[5],
+                                            global_info=self)
+                obj_list.append(obj)
+        self.load_custome_tag_config_scheme_include_match_object(obj_list)
+        return obj_list
+
+    def load_custome_tag_config_scheme_include_match_object(self, obj_list):
+        with self.sqlite_storage.read_cursor() as sqlite_cursor:
+            # 读取数据
+            for scheme_obj in obj_list:
+                sql = "select * from tb_custome_tag_config_scheme_include_match_object where scheme_oid=? order by match_index"
+                sqlite_cursor.execute(sql, (scheme_obj.oid,))
+                search_result = sqlite_cursor.fetchall()
+                for obj_info_tuple in search_result:
+                    # print('tuple: ', obj_info_tuple)
+                    obj = CustomMatchObject(match_pattern_lines=base64.b64decode(obj_info_tuple[1]).decode("utf8"),
+                                            foreground=obj_info_tuple[2],
+                                            backgroun=obj_info_tuple[3],
+                                            underline=obj_info_tuple[4],
+                                            underlinefg=obj_info_tuple[5],
+                                            overstrike=obj_info_tuple[6],
+                                            overstrikefg=obj_info_tuple[7],
+                                            bold=obj_info_tuple[8],
+                                            italic=obj_info_tuple[9])
+                    scheme_obj.custom_match_object_list.append(obj)
 
     def is_project_name_existed(self, project_name):  # 判断项目名称是否已存在项目obj_list里
-        for project in self.project_obj_list:
-            if project_name == project.name:
-                return True
-        return False
+        return self.project_obj_list.is_name_existed(project_name)
 
     def is_project_name_existed_except_self(self, project_name, except_obj):  # 判断名称是否已存在obj_list里
-        for project in self.project_obj_list:
-            if project == except_obj:
-                continue
-            if project_name == project.name:
-                return True
-        return False
+        return self.project_obj_list.is_name_existed(project_name, except_obj=except_obj)
 
     def is_credential_name_existed(self, credential_name):  # 判断名称是否已存在obj_list里
-        for credential in self.credential_obj_list:
-            if credential_name == credential.name:
-                return True
-        return False
+        return self.credential_obj_list.is_name_existed(credential_name)
 
     def is_credential_name_existed_except_self(self, credential_name, except_obj):  # 判断名称是否已存在obj_list里
-        for credential in self.credential_obj_list:
-            if credential == except_obj:
-                continue
-            if credential_name == credential.name:
-                return True
-        return False
+        return self.credential_obj_list.is_name_existed(credential_name, except_obj=except_obj)
 
     def is_host_name_existed(self, host_name):  # 判断名称是否已存在obj_list里
-        for host in self.host_obj_list:
-            if host_name == host.name:
-                return True
-        return False
+        return self.host_obj_list.is_name_existed(host_name)
 
     def is_host_name_existed_except_self(self, host_name, except_obj):  # 判断名称是否已存在obj_list里
-        for host in self.host_obj_list:
-            if host == except_obj:
-                continue
-            if host_name == host.name:
-                return True
-        return False
+        return self.host_obj_list.is_name_existed(host_name, except_obj=except_obj)
 
     def is_host_group_name_existed(self, host_group_name):  # 判断名称是否已存在obj_list里
-        for host_group in self.host_group_obj_list:
-            if host_group_name == host_group.name:
-                return True
-        return False
+        return self.host_group_obj_list.is_name_existed(host_group_name)
 
     def is_host_group_name_existed_except_self(self, host_group_name, except_obj):  # 判断名称是否已存在obj_list里
-        for host_group in self.host_group_obj_list:
-            if host_group == except_obj:
-                continue
-            if host_group_name == host_group.name:
-                return True
-        return False
+        return self.host_group_obj_list.is_name_existed(host_group_name, except_obj=except_obj)
 
     def is_inspection_code_block_name_existed(self, inspect_code_name):  # 判断名称是否已存在obj_list里
-        for inspection_code in self.inspection_code_block_obj_list:
-            if inspect_code_name == inspection_code.name:
-                return True
-        return False
+        return self.inspection_code_block_obj_list.is_name_existed(inspect_code_name)
 
     def is_inspection_code_block_name_existed_except_self(self, inspection_code_block_name, except_obj):  # 判断名称是否已存在obj_list里
-        for inspection_code_block in self.inspection_code_block_obj_list:
-            if inspection_code_block == except_obj:
-                continue
-            if inspection_code_block_name == inspection_code_block.name:
-                return True
-        return False
+        return self.inspection_code_block_obj_list.is_name_existed(inspection_code_block_name, except_obj=except_obj)
 
     def is_inspection_template_name_existed(self, inspect_template_name):  # 判断名称是否已存在obj_list里
-        for inspection_template in self.inspection_template_obj_list:
-            if inspect_template_name == inspection_template.name:
-                return True
-        return False
+        return self.inspection_template_obj_list.is_name_existed(inspect_template_name)
 
     def is_inspection_template_name_existed_except_self(self, inspection_template_name, except_obj):  # 判断名称是否已存在obj_list里
-        for inspection_template in self.inspection_template_obj_list:
-            if inspection_template == except_obj:
-                continue
-            if inspection_template_name == inspection_template.name:
-                return True
-        return False
+        return self.inspection_template_obj_list.is_name_existed(inspection_template_name, except_obj=except_obj)
 
     def is_custome_tag_config_scheme_name_existed(self, scheme_name):  # 判断custome_tag_config_scheme名称是否已存在
-        for scheme in self.custome_tag_config_scheme_obj_list:
-            if scheme_name == scheme.name:
-                return True
-        return False
+        return self.custome_tag_config_scheme_obj_list.is_name_existed(scheme_name)
 
     def is_custome_tag_config_scheme_name_existed_except_self(self, scheme_name, except_obj):  # 判断custome_tag_config_scheme名称是否已存在
-        for scheme in self.custome_tag_config_scheme_obj_list:
-            if scheme == except_obj:
-                continue
-            if scheme_name == scheme.name:
-                return True
-        return False
+        return self.custome_tag_config_scheme_obj_list.is_name_existed(scheme_name, except_obj=except_obj)
 
     def get_project_by_oid(self, oid):
         """
@@ -3288,105 +7544,51 @@ class GlobalInfo:
         :param oid:
         :return:
         """
-        for project in self.project_obj_list:
-            if project.oid == oid:
-                return project
-        return None
+        return self.project_obj_list.get_obj_by_oid(oid)
 
     def get_project_by_name(self, name):
         """
-        根据项目oid/uuid<str>查找项目对象，找到时返回<Project>对象
+        根据项目名称<str>查找项目对象，找到时返回<Project>对象
         :param name:
         :return:
         """
-        for project in self.project_obj_list:
-            if project.name == name:
-                return project
-        return None
+        return self.project_obj_list.get_obj_by_name(name)
 
     def get_credential_by_oid(self, oid):
-        for credential in self.credential_obj_list:
-            if credential.oid == oid:
-                return credential
-        return None
+        return self.credential_obj_list.get_obj_by_oid(oid)
 
     def get_credential_by_name(self, name):
-        for credential in self.credential_obj_list:
-            if credential.name == name:
-                return credential
-        return None
+        return self.credential_obj_list.get_obj_by_name(name)
 
     def get_host_by_oid(self, oid):
-        for host in self.host_obj_list:
-            if host.oid == oid:
-                return host
-        return None
+        return self.host_obj_list.get_obj_by_oid(oid)
 
     def get_host_group_by_oid(self, oid):
-        for host_group in self.host_group_obj_list:
-            if host_group.oid == oid:
-                return host_group
-        return None
+        return self.host_group_obj_list.get_obj_by_oid(oid)
 
     def get_inspection_code_block_by_oid(self, oid):
-        for inspection_code_block in self.inspection_code_block_obj_list:
-            if inspection_code_block.oid == oid:
-                return inspection_code_block
-        return None
+        return self.inspection_code_block_obj_list.get_obj_by_oid(oid)
 
     def get_inspection_template_by_oid(self, oid):
-        for inspection_template in self.inspection_template_obj_list:
-            if inspection_template.oid == oid:
-                return inspection_template
-        return None
+        return self.inspection_template_obj_list.get_obj_by_oid(oid)
 
     def get_project_obj_index_of_list_by_oid(self, oid):
-        index = 0
-        for obj in self.project_obj_list:
-            if obj.oid == oid:
-                return index
-            index += 1
-        return None
+        return self.project_obj_list.get_index_of_list_by_oid(oid)
 
     def get_credential_obj_index_of_list_by_oid(self, oid):
-        index = 0
-        for obj in self.credential_obj_list:
-            if obj.oid == oid:
-                return index
-            index += 1
-        return None
+        return self.credential_obj_list.get_index_of_list_by_oid(oid)
 
     def get_host_obj_index_of_list_by_oid(self, oid):
-        index = 0
-        for obj in self.host_obj_list:
-            if obj.oid == oid:
-                return index
-            index += 1
-        return None
+        return self.host_obj_list.get_index_of_list_by_oid(oid)
 
     def get_host_group_obj_index_of_list_by_oid(self, oid):
-        index = 0
-        for obj in self.host_group_obj_list:
-            if obj.oid == oid:
-                return index
-            index += 1
-        return None
+        return self.host_group_obj_list.get_index_of_list_by_oid(oid)
 
     def get_inspection_code_block_obj_index_of_list_by_oid(self, oid):
-        index = 0
-        for obj in self.inspection_code_block_obj_list:
-            if obj.oid == oid:
-                return index
-            index += 1
-        return None
+        return self.inspection_code_block_obj_list.get_index_of_list_by_oid(oid)
 
     def get_inspection_template_obj_index_of_list_by_oid(self, oid):
-        index = 0
-        for obj in self.inspection_template_obj_list:
-            if obj.oid == oid:
-                return index
-            index += 1
-        return None
+        return self.inspection_template_obj_list.get_index_of_list_by_oid(oid)
 
     def get_inspection_job_record_obj_by_inspection_template_oid(self, oid):
         index = 0
@@ -3398,18 +7600,10 @@ class GlobalInfo:
         return existed_inspection_job_obj_list
 
     def get_launch_template_trigger_obj_by_oid(self, oid):
-        index = 0
-        for obj in self.launch_template_trigger_obj_list:
-            if obj.oid == oid:
-                return obj
-            index += 1
-        return None
+        return self.launch_template_trigger_obj_list.get_obj_by_oid(oid)
 
     def get_custome_tag_config_scheme_by_oid(self, oid):
-        for scheme in self.custome_tag_config_scheme_obj_list:
-            if scheme.oid == oid:
-                return scheme
-        return None
+        return self.custome_tag_config_scheme_obj_list.get_obj_by_oid(oid)
 
     def delete_project_obj_by_oid(self, oid):
         """
@@ -3418,22 +7612,12 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_project'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_project"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_project where oid='{oid}'"
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_project where oid='{oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
-        for project in self.project_obj_list:
-            if project.oid == oid:
-                self.project_obj_list.remove(project)
+        project = self.project_obj_list.get_obj_by_oid(oid)
+        if project is not None:
+            self.project_obj_list.remove(project)
 
     def delete_project_obj(self, obj):
         """
@@ -3442,19 +7626,8 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_project'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_project"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        # print("exist tables: ", result)
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_project where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_project where oid='{obj.oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
         self.project_obj_list.remove(obj)
 
@@ -3465,18 +7638,8 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_credential'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_credential"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_credential where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_credential where oid='{obj.oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
         self.credential_obj_list.remove(obj)
 
@@ -3487,26 +7650,10 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_host where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_host_include_credential_oid_list'的表★ 已废弃
-        # sql = 'SELECT * FROM sqlite_master WHERE \
-        #             "type"="table" and "tbl_name"="tb_host_include_credential_oid_list"'
-        # sqlite_cursor.execute(sql)
-        # result = sqlite_cursor.fetchall()
-        # if len(result) != 0:  # 若查询到有此表，才删除相应数据
-        #     sql = f"delete from tb_host_include_credential_oid_list where host_oid='{obj.oid}'"
-        #     sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_host where oid='{obj.oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
+        self.host_circuit_breaker.delete_host(obj.oid)
+        self.host_duration_stats.delete_host(obj.oid)
         # ★最后再从内存obj_list删除
         self.host_obj_list.remove(obj)
 
@@ -3515,38 +7662,15 @@ class GlobalInfo:
         直接删除 host_group 对象
         :param obj:
         :return:
-        """
-        # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host_group'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_host_group"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_host_group where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_host_group_include_host_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_host_group_include_host_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        print("exist tables: ", result)
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_host_group_include_host_list where host_group_oid='{obj.oid}' "
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_host_group_include_host_group_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_host_group_include_host_group_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        print("exist tables: ", result)
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_host_group_include_host_group_list where host_group_oid='{obj.oid}' "
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        """
+        # ★先从数据库删除
+        sql_list = [f"delete from tb_host_group where oid='{obj.oid}'",
+                    f"delete from tb_host_group_include_host_list where host_group_oid='{obj.oid}' ",
+                    f"delete from tb_host_group_include_host_group_list where host_group_oid='{obj.oid}' "]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
         self.host_group_obj_list.remove(obj)
+        self.host_group_resolver.invalidate_host_group(obj.oid)
 
     def delete_inspection_code_block_obj(self, obj):
         """
@@ -3555,25 +7679,9 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_code_block'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_code_block"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_code_block where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_code_block_include_code_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_code_block_include_code_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_code_block_include_code_list where inspection_code_block_oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_inspection_code_block where oid='{obj.oid}'",
+                    f"delete from tb_inspection_code_block_include_code_list where inspection_code_block_oid='{obj.oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
         self.inspection_code_block_obj_list.remove(obj)
 
@@ -3584,39 +7692,12 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_template'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_template"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_template where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_template_include_host_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_template_include_host_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_template_include_host_list where inspection_template_oid='{obj.oid}' "
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_template_include_group_list'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_template_include_group_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_template_include_group_list where inspection_template_oid='{obj.oid}' "
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_template_include_inspection_code_block_list'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_template_include_inspection_code_block_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_template_include_inspection_code_block_list where inspection_template_oid='{obj.oid}' "
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_inspection_template where oid='{obj.oid}'",
+                    f"delete from tb_inspection_template_include_host_list where inspection_template_oid='{obj.oid}' ",
+                    f"delete from tb_inspection_template_include_group_list where inspection_template_oid='{obj.oid}' ",
+                    f"delete from tb_inspection_template_include_inspection_code_block_list where inspection_template_oid='{obj.oid}' "]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
+        self.template_scheduler.remove_template(obj.oid)  # 不再定时执行
         # ★最后再从内存obj_list删除
         self.inspection_template_obj_list.remove(obj)
 
@@ -3627,39 +7708,11 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_inspection_job_record'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_job_record"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_job_record where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_job_record_host_job_status_obj_list'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_inspection_job_record_host_job_status_obj_list"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_job_record_host_job_status_obj_list where job_record_oid='{obj.oid}' "
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_job_invoke_shell_output'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_job_invoke_shell_output"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_job_invoke_shell_output where job_oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_inspection_job_invoke_shell_interactive_output'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_inspection_job_invoke_shell_interactive_output"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_inspection_job_invoke_shell_interactive_output where job_oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_inspection_job_record where oid='{obj.oid}'",
+                    f"delete from tb_inspection_job_record_host_job_status_obj_list where job_record_oid='{obj.oid}' ",
+                    f"delete from tb_inspection_job_invoke_shell_output where job_oid='{obj.oid}'",
+                    f"delete from tb_inspection_job_invoke_shell_interactive_output where job_oid='{obj.oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
         self.inspection_job_record_obj_list.remove(obj)
 
@@ -3670,26 +7723,9 @@ class GlobalInfo:
         :return:
         """
         # ★先从数据库删除
-        sqlite_conn = sqlite3.connect(self.sqlite3_dbfile_name)  # 连接数据库文件，若文件不存在则新建
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_custome_tag_config_scheme'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE type="table" and tbl_name="tb_custome_tag_config_scheme"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_custome_tag_config_scheme where oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        # ★查询是否有名为'tb_custome_tag_config_scheme_include_match_object'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE \
-                    "type"="table" and "tbl_name"="tb_custome_tag_config_scheme_include_match_object"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()
-        if len(result) != 0:  # 若查询到有此表，才删除相应数据
-            sql = f"delete from tb_custome_tag_config_scheme_include_match_object where scheme_oid='{obj.oid}'"
-            sqlite_cursor.execute(sql)
-        sqlite_cursor.close()
-        sqlite_conn.commit()
-        sqlite_conn.close()
+        sql_list = [f"delete from tb_custome_tag_config_scheme where oid='{obj.oid}'",
+                    f"delete from tb_custome_tag_config_scheme_include_match_object where scheme_oid='{obj.oid}'"]
+        self.sqlite_storage.execute_write_sql_list(sql_list)
         # ★最后再从内存obj_list删除
         self.custome_tag_config_scheme_obj_list.remove(obj)
 
@@ -4767,7 +8803,7 @@ class MainWindow:
         label_inspect_template_count = tkinter.Label(self.nav_frame_r, text=label_inspect_template_count_str)
         label_inspect_template_count.grid(row=6, column=0)
         label_inspect_job_count_str = "巡检作业数量".ljust(self.view_width - 4, " ") + ": " \
-                                      + str(len(self.global_info.inspection_job_record_obj_list))
+                                      + str(self.global_info.get_inspection_job_record_total_num())
         label_inspect_job_count = tkinter.Label(self.nav_frame_r, text=label_inspect_job_count_str)
         label_inspect_job_count.grid(row=7, column=0)
 
@@ -5176,6 +9212,8 @@ class MainWindow:
     def on_closing_main_window(self):
         self.global_info.exit_division_terminal_window()
         print("MainWindow: 退出了主程序")
+        self.global_info.sqlite_storage.close()  # 等待排队中的数据库写操作全部完成
+        self.global_info.ssh_transport_pool.close_all()  # 关闭连接池中所有的ssh连接
         # self.window_obj.destroy()
         self.window_obj.quit()
 
@@ -5668,16 +9706,63 @@ class CreateResourceInFrame:
         self.resource_info_dict["combobox_project"] = ttk.Combobox(self.top_frame_widget_dict["frame"], values=project_obj_name_list,
                                                                    state="readonly")
         self.resource_info_dict["combobox_project"].grid(row=3, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_exec_method
+        label_inspection_code_block_code_exec_method = tkinter.Label(self.top_frame_widget_dict["frame"], text="执行方式")
+        label_inspection_code_block_code_exec_method.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_exec_method.grid(row=4, column=0, padx=self.padx, pady=self.pady)
+        code_exec_method_name_list = ["INVOKE_SHELL", "EXEC_COMMAND", "INVOKE_SHELL_PIPELINE", "SCRIPT"]
+        self.resource_info_dict["combobox_code_exec_method"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                            values=code_exec_method_name_list,
+                                                                            state="readonly")
+        self.resource_info_dict["combobox_code_exec_method"].grid(row=4, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-exec_command_concurrency
+        label_inspection_code_block_exec_command_concurrency = tkinter.Label(self.top_frame_widget_dict["frame"], text="exec并发数")
+        label_inspection_code_block_exec_command_concurrency.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_exec_command_concurrency.grid(row=5, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_exec_command_concurrency"] = tkinter.StringVar()
+        spinbox_inspection_code_block_exec_command_concurrency = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1,
+                                                                                 to=EXEC_COMMAND_CONCURRENCY_MAX, increment=1,
+                                                                                 textvariable=self.resource_info_dict[
+                                                                                     "sv_exec_command_concurrency"])
+        self.resource_info_dict["sv_exec_command_concurrency"].set(EXEC_COMMAND_CONCURRENCY_DEFAULT)
+        spinbox_inspection_code_block_exec_command_concurrency.grid(row=5, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_source
+        label_inspection_code_block_code_source = tkinter.Label(self.top_frame_widget_dict["frame"], text="代码来源")
+        label_inspection_code_block_code_source.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_source.grid(row=6, column=0, padx=self.padx, pady=self.pady)
+        code_source_name_list = ["LOCAL", "FILE", "GIT"]
+        self.resource_info_dict["combobox_code_source"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                       values=code_source_name_list,
+                                                                       state="readonly")
+        self.resource_info_dict["combobox_code_source"].grid(row=6, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_source_path
+        label_inspection_code_block_code_source_path = tkinter.Label(self.top_frame_widget_dict["frame"], text="代码来源文件")
+        label_inspection_code_block_code_source_path.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_source_path.grid(row=7, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_code_source_path"] = tkinter.StringVar()
+        entry_inspection_code_block_code_source_path = tkinter.Entry(self.top_frame_widget_dict["frame"],
+                                                                     textvariable=self.resource_info_dict["sv_code_source_path"])
+        entry_inspection_code_block_code_source_path.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        entry_inspection_code_block_code_source_path.grid(row=7, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_source_git_url
+        label_inspection_code_block_code_source_git_url = tkinter.Label(self.top_frame_widget_dict["frame"], text="git仓库地址")
+        label_inspection_code_block_code_source_git_url.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_source_git_url.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_code_source_git_url"] = tkinter.StringVar()
+        entry_inspection_code_block_code_source_git_url = tkinter.Entry(self.top_frame_widget_dict["frame"],
+                                                                        textvariable=self.resource_info_dict["sv_code_source_git_url"])
+        entry_inspection_code_block_code_source_git_url.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        entry_inspection_code_block_code_source_git_url.grid(row=8, column=1, padx=self.padx, pady=self.pady)
         # ★★★添加巡检代码内容并在treeview里显示★★★
         self.resource_info_dict["one_line_code_obj_list"] = []
         label_inspection_code_block_code_content = tkinter.Label(self.top_frame_widget_dict["frame"], text="巡检代码内容★")
         label_inspection_code_block_code_content.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
-        label_inspection_code_block_code_content.grid(row=4, column=0, padx=self.padx, pady=self.pady)
+        label_inspection_code_block_code_content.grid(row=9, column=0, padx=self.padx, pady=self.pady)
         button_add_code_list = tkinter.Button(self.top_frame_widget_dict["frame"], text="添加",
                                               command=lambda: self.create_inspection_code_block__click_button_add_code_list(
                                                   treeview_code_content))  # 添加代码
         button_add_code_list.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
-        button_add_code_list.grid(row=4, column=1, padx=self.padx, pady=self.pady)
+        button_add_code_list.grid(row=9, column=1, padx=self.padx, pady=self.pady)
         treeview_code_content = ttk.Treeview(self.top_frame_widget_dict["frame"], cursor="arrow", height=7,
                                              columns=("index", "code_content", "need_interactive"), show="headings")
         # 设置每一个列的宽度和对齐的方式
@@ -5688,7 +9773,7 @@ class CreateResourceInFrame:
         treeview_code_content.heading("index", text="index", anchor="w")
         treeview_code_content.heading("code_content", text="code_content", anchor="w")
         treeview_code_content.heading("need_interactive", text="需要交互", anchor="w")
-        treeview_code_content.grid(row=5, column=0, columnspan=2, padx=self.padx, pady=self.pady)
+        treeview_code_content.grid(row=10, column=0, columnspan=2, padx=self.padx, pady=self.pady)
         # 单击每行命令后，可单独设置每行命令的高级属性
         treeview_code_content.bind("<<TreeviewSelect>>", lambda event: self.create_inspection_code_block__edit_treeview_code_content_item(
             event, treeview_code_content))
@@ -5763,7 +9848,7 @@ class CreateResourceInFrame:
         screen_width = self.global_info.main_window.window_obj.winfo_screenwidth()
         screen_height = self.global_info.main_window.window_obj.winfo_screenheight()
         width = 420
-        height = 300
+        height = 460
         win_pos = f"{width}x{height}+{screen_width // 2 - width // 2}+{screen_height // 2 - height // 2}"
         pop_window.geometry(win_pos)  # 设置子窗口大小及位置，居中
         self.global_info.main_window.window_obj.attributes("-disabled", 1)  # 使主窗口关闭响应，无法点击它
@@ -5832,15 +9917,52 @@ class CreateResourceInFrame:
         entry_description = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_description"])
         entry_description.insert(0, str(one_line_code_obj.description))  # 显示初始值，可编辑
         entry_description.grid(row=7, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-label
+        label_label = tkinter.Label(pop_window, text="标签")
+        label_label.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+        one_line_code_info_dict["sv_label"] = tkinter.StringVar()
+        entry_label = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_label"])
+        entry_label.insert(0, str(one_line_code_obj.label))  # 显示初始值，可编辑
+        entry_label.grid(row=8, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_type
+        label_condition_type = tkinter.Label(pop_window, text="执行条件")
+        label_condition_type.grid(row=9, column=0, padx=self.padx, pady=self.pady)
+        condition_type_name_list = ["NONE", "OUTPUT_MATCH", "OUTPUT_NOT_MATCH", "EXIT_STATUS_NONZERO", "EXIT_STATUS_ZERO"]
+        one_line_code_info_dict["combobox_condition_type"] = ttk.Combobox(pop_window, values=condition_type_name_list,
+                                                                          state="readonly")
+        one_line_code_info_dict["combobox_condition_type"].current(one_line_code_obj.condition_type)
+        one_line_code_info_dict["combobox_condition_type"].grid(row=9, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_pattern
+        label_condition_pattern = tkinter.Label(pop_window, text="条件正则")
+        label_condition_pattern.grid(row=10, column=0, padx=self.padx, pady=self.pady)
+        one_line_code_info_dict["sv_condition_pattern"] = tkinter.StringVar()
+        entry_condition_pattern = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_condition_pattern"])
+        entry_condition_pattern.insert(0, str(one_line_code_obj.condition_pattern))  # 显示初始值，可编辑
+        entry_condition_pattern.grid(row=10, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_action
+        label_condition_action = tkinter.Label(pop_window, text="满足条件时")
+        label_condition_action.grid(row=11, column=0, padx=self.padx, pady=self.pady)
+        condition_action_name_list = ["SKIP_REST", "GOTO_LABEL", "ABORT_HOST"]
+        one_line_code_info_dict["combobox_condition_action"] = ttk.Combobox(pop_window, values=condition_action_name_list,
+                                                                            state="readonly")
+        one_line_code_info_dict["combobox_condition_action"].current(one_line_code_obj.condition_action)
+        one_line_code_info_dict["combobox_condition_action"].grid(row=11, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_goto_label
+        label_condition_goto_label = tkinter.Label(pop_window, text="跳转到标签")
+        label_condition_goto_label.grid(row=12, column=0, padx=self.padx, pady=self.pady)
+        one_line_code_info_dict["sv_condition_goto_label"] = tkinter.StringVar()
+        entry_condition_goto_label = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_condition_goto_label"])
+        entry_condition_goto_label.insert(0, str(one_line_code_obj.condition_goto_label))  # 显示初始值，可编辑
+        entry_condition_goto_label.grid(row=12, column=1, padx=self.padx, pady=self.pady)
         # 添加按钮
         ok_button = tkinter.Button(pop_window, text="确定",
                                    command=lambda: self.create_inspection_code_block__edit_treeview_code_content_item_save(
                                        one_line_code_info_dict, one_line_code_obj, pop_window, treeview_code_content))
-        ok_button.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+        ok_button.grid(row=13, column=0, padx=self.padx, pady=self.pady)
         cancel_button = tkinter.Button(pop_window, text="取消",
                                        command=lambda: self.create_inspection_code_block__edit_treeview_code_content_item_cancel(
                                            pop_window))
-        cancel_button.grid(row=8, column=1, padx=self.padx, pady=self.pady)
+        cancel_button.grid(row=13, column=1, padx=self.padx, pady=self.pady)
 
     def create_inspection_code_block__edit_treeview_code_content_item_cancel(self, pop_window):
         pop_window.destroy()  # 关闭子窗口
@@ -5849,6 +9971,11 @@ class CreateResourceInFrame:
 
     def create_inspection_code_block__edit_treeview_code_content_item_save(self, one_line_code_info_dict, one_line_code_obj, pop_window,
                                                                            treeview_code_content):
+        try:
+            re.compile(one_line_code_info_dict["sv_condition_pattern"].get())
+        except re.error as err:
+            messagebox.showinfo("设置巡检代码-Error", f"条件正则有误: {err}")
+            return
         one_line_code_obj.code_content = one_line_code_info_dict["sv_code_content"].get()
         one_line_code_obj.code_post_wait_time = float(one_line_code_info_dict["sv_code_post_wait_time"].get())
         if one_line_code_info_dict["combobox_need_interactive"].current() == -1:
@@ -5862,6 +9989,17 @@ class CreateResourceInFrame:
         else:
             one_line_code_obj.interactive_process_method = one_line_code_info_dict["combobox_interactive_process_method"].current()
         one_line_code_obj.description = one_line_code_info_dict["sv_description"].get()
+        one_line_code_obj.label = one_line_code_info_dict["sv_label"].get().strip()
+        if one_line_code_info_dict["combobox_condition_type"].current() == -1:
+            one_line_code_obj.condition_type = CODE_CONDITION_NONE
+        else:
+            one_line_code_obj.condition_type = one_line_code_info_dict["combobox_condition_type"].current()
+        one_line_code_obj.condition_pattern = one_line_code_info_dict["sv_condition_pattern"].get()
+        if one_line_code_info_dict["combobox_condition_action"].current() == -1:
+            one_line_code_obj.condition_action = CODE_CONDITION_ACTION_SKIP_REST
+        else:
+            one_line_code_obj.condition_action = one_line_code_info_dict["combobox_condition_action"].current()
+        one_line_code_obj.condition_goto_label = one_line_code_info_dict["sv_condition_goto_label"].get().strip()
         pop_window.destroy()  # 关闭子窗口
         self.global_info.main_window.window_obj.attributes("-disabled", 0)  # 使主窗口响应
         self.global_info.main_window.window_obj.focus_force()  # 使主窗口获得焦点
@@ -5944,7 +10082,7 @@ class CreateResourceInFrame:
         label_inspection_template_forks.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
         label_inspection_template_forks.grid(row=7, column=0, padx=self.padx, pady=self.pady)
         self.resource_info_dict["sv_forks"] = tkinter.StringVar()
-        spinbox_inspection_template_forks = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1, to=256, increment=1,
+        spinbox_inspection_template_forks = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1, to=MAX_JOB_FORKS, increment=1,
                                                             textvariable=self.resource_info_dict["sv_forks"])
         spinbox_inspection_template_forks.grid(row=7, column=1, padx=self.padx, pady=self.pady)
         # ★inspection_template-save_output_to_file
@@ -6017,6 +10155,136 @@ class CreateResourceInFrame:
         self.resource_info_dict["listbox_inspection_code_block"].pack(side="left")
         list_scrollbar.config(command=self.resource_info_dict["listbox_inspection_code_block"].yview)
         frame.grid(row=12, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-job_exec_mode
+        label_inspection_template_job_exec_mode = tkinter.Label(self.top_frame_widget_dict["frame"], text="执行引擎")
+        label_inspection_template_job_exec_mode.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_job_exec_mode.grid(row=13, column=0, padx=self.padx, pady=self.pady)
+        job_exec_mode_name_list = ["THREAD_POOL", "ASYNCIO", "PROCESS_SHARDS"]
+        self.resource_info_dict["combobox_job_exec_mode"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                         values=job_exec_mode_name_list,
+                                                                         state="readonly")
+        self.resource_info_dict["combobox_job_exec_mode"].grid(row=13, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-code_exec_timeout
+        label_inspection_template_code_exec_timeout = tkinter.Label(self.top_frame_widget_dict["frame"], text="单条命令超时(秒)")
+        label_inspection_template_code_exec_timeout.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_code_exec_timeout.grid(row=14, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_code_exec_timeout"] = tkinter.StringVar()
+        spinbox_inspection_template_code_exec_timeout = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1,
+                                                                        to=JOB_TIMEOUT_SETTING_MAX, increment=10,
+                                                                        textvariable=self.resource_info_dict["sv_code_exec_timeout"])
+        self.resource_info_dict["sv_code_exec_timeout"].set(int(CODE_EXEC_HARD_TIMEOUT_DEFAULT))
+        spinbox_inspection_template_code_exec_timeout.grid(row=14, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-host_deadline
+        label_inspection_template_host_deadline = tkinter.Label(self.top_frame_widget_dict["frame"], text="单台主机截止时间(秒,0不限)")
+        label_inspection_template_host_deadline.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_host_deadline.grid(row=15, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_host_deadline"] = tkinter.StringVar()
+        spinbox_inspection_template_host_deadline = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                    to=JOB_TIMEOUT_SETTING_MAX, increment=60,
+                                                                    textvariable=self.resource_info_dict["sv_host_deadline"])
+        self.resource_info_dict["sv_host_deadline"].set(int(HOST_DEADLINE_DEFAULT))
+        spinbox_inspection_template_host_deadline.grid(row=15, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-job_deadline
+        label_inspection_template_job_deadline = tkinter.Label(self.top_frame_widget_dict["frame"], text="整个作业截止时间(秒,0不限)")
+        label_inspection_template_job_deadline.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_job_deadline.grid(row=16, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_job_deadline"] = tkinter.StringVar()
+        spinbox_inspection_template_job_deadline = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                   to=JOB_TIMEOUT_SETTING_MAX, increment=60,
+                                                                   textvariable=self.resource_info_dict["sv_job_deadline"])
+        self.resource_info_dict["sv_job_deadline"].set(int(JOB_DEADLINE_DEFAULT))
+        spinbox_inspection_template_job_deadline.grid(row=16, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-adaptive_forks
+        label_inspection_template_adaptive_forks = tkinter.Label(self.top_frame_widget_dict["frame"], text="自适应并发数")
+        label_inspection_template_adaptive_forks.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_adaptive_forks.grid(row=17, column=0, padx=self.padx, pady=self.pady)
+        adaptive_forks_name_list = ["No", "Yes"]
+        self.resource_info_dict["combobox_adaptive_forks"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                          values=adaptive_forks_name_list,
+                                                                          state="readonly")
+        self.resource_info_dict["combobox_adaptive_forks"].grid(row=17, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-login_retry_times
+        label_inspection_template_login_retry_times = tkinter.Label(self.top_frame_widget_dict["frame"], text="登录失败重试次数")
+        label_inspection_template_login_retry_times.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_login_retry_times.grid(row=18, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_login_retry_times"] = tkinter.StringVar()
+        spinbox_inspection_template_login_retry_times = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                        to=LOGIN_RETRY_TIMES_MAX, increment=1,
+                                                                        textvariable=self.resource_info_dict["sv_login_retry_times"])
+        self.resource_info_dict["sv_login_retry_times"].set(LOGIN_RETRY_TIMES_DEFAULT)
+        spinbox_inspection_template_login_retry_times.grid(row=18, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-login_retry_interval
+        label_inspection_template_login_retry_interval = tkinter.Label(self.top_frame_widget_dict["frame"], text="首次重试等待(秒,指数退避)")
+        label_inspection_template_login_retry_interval.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_login_retry_interval.grid(row=19, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_login_retry_interval"] = tkinter.StringVar()
+        spinbox_inspection_template_login_retry_interval = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1,
+                                                                           to=LOGIN_RETRY_BACKOFF_MAX, increment=5,
+                                                                           textvariable=self.resource_info_dict["sv_login_retry_interval"])
+        self.resource_info_dict["sv_login_retry_interval"].set(int(LOGIN_RETRY_INTERVAL_DEFAULT))
+        spinbox_inspection_template_login_retry_interval.grid(row=19, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-circuit_breaker_threshold
+        label_inspection_template_circuit_breaker_threshold = tkinter.Label(self.top_frame_widget_dict["frame"],
+                                                                            text="连续几次无法连接后熔断(0不熔断)")
+        label_inspection_template_circuit_breaker_threshold.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_circuit_breaker_threshold.grid(row=20, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_circuit_breaker_threshold"] = tkinter.StringVar()
+        spinbox_inspection_template_circuit_breaker_threshold = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                                to=CIRCUIT_BREAKER_THRESHOLD_MAX, increment=1,
+                                                                                textvariable=self.resource_info_dict[
+                                                                                    "sv_circuit_breaker_threshold"])
+        self.resource_info_dict["sv_circuit_breaker_threshold"].set(CIRCUIT_BREAKER_THRESHOLD_DEFAULT)
+        spinbox_inspection_template_circuit_breaker_threshold.grid(row=20, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-execution_crond_time 周期执行时使用，cron表达式
+        label_inspection_template_execution_crond_time = tkinter.Label(self.top_frame_widget_dict["frame"],
+                                                                       text="周期执行cron(分 时 日 月 星期)")
+        label_inspection_template_execution_crond_time.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_execution_crond_time.grid(row=21, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_execution_crond_time"] = tkinter.StringVar()
+        entry_inspection_template_execution_crond_time = tkinter.Entry(self.top_frame_widget_dict["frame"],
+                                                                       textvariable=self.resource_info_dict["sv_execution_crond_time"])
+        entry_inspection_template_execution_crond_time.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        entry_inspection_template_execution_crond_time.grid(row=21, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-execution_after_time After方式使用
+        label_inspection_template_execution_after_time = tkinter.Label(self.top_frame_widget_dict["frame"], text="After间隔(秒)")
+        label_inspection_template_execution_after_time.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_execution_after_time.grid(row=22, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_execution_after_time"] = tkinter.StringVar()
+        spinbox_inspection_template_execution_after_time = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                           to=86400 * 30, increment=60,
+                                                                           textvariable=self.resource_info_dict["sv_execution_after_time"])
+        self.resource_info_dict["sv_execution_after_time"].set(0)
+        spinbox_inspection_template_execution_after_time.grid(row=22, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-schedule_overlap_policy
+        label_inspection_template_schedule_overlap_policy = tkinter.Label(self.top_frame_widget_dict["frame"], text="上次作业未结束时")
+        label_inspection_template_schedule_overlap_policy.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_schedule_overlap_policy.grid(row=23, column=0, padx=self.padx, pady=self.pady)
+        schedule_overlap_policy_name_list = ["跳过本次", "结束后再执行", "同时执行"]
+        self.resource_info_dict["combobox_schedule_overlap_policy"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                                   values=schedule_overlap_policy_name_list,
+                                                                                   state="readonly")
+        self.resource_info_dict["combobox_schedule_overlap_policy"].current(SCHEDULE_OVERLAP_POLICY_SKIP)
+        self.resource_info_dict["combobox_schedule_overlap_policy"].grid(row=23, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-host_schedule_order
+        label_inspection_template_host_schedule_order = tkinter.Label(self.top_frame_widget_dict["frame"], text="主机巡检顺序")
+        label_inspection_template_host_schedule_order.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_host_schedule_order.grid(row=24, column=0, padx=self.padx, pady=self.pady)
+        host_schedule_order_name_list = ["按主机列表顺序", "按历史用时从长到短"]
+        self.resource_info_dict["combobox_host_schedule_order"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                               values=host_schedule_order_name_list,
+                                                                               state="readonly")
+        self.resource_info_dict["combobox_host_schedule_order"].current(HOST_SCHEDULE_ORDER_LONGEST_FIRST)
+        self.resource_info_dict["combobox_host_schedule_order"].grid(row=24, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-new_host_schedule_slot
+        label_inspection_template_new_host_schedule_slot = tkinter.Label(self.top_frame_widget_dict["frame"], text="无历史用时的主机")
+        label_inspection_template_new_host_schedule_slot.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_new_host_schedule_slot.grid(row=25, column=0, padx=self.padx, pady=self.pady)
+        new_host_schedule_slot_name_list = ["排在最前", "按用时中位数排序", "排在最后"]
+        self.resource_info_dict["combobox_new_host_schedule_slot"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                                  values=new_host_schedule_slot_name_list,
+                                                                                  state="readonly")
+        self.resource_info_dict["combobox_new_host_schedule_slot"].current(NEW_HOST_SCHEDULE_SLOT_FIRST)
+        self.resource_info_dict["combobox_new_host_schedule_slot"].grid(row=25, column=1, padx=self.padx, pady=self.pady)
 
     def create_custom_tag_config_scheme(self):
         self.resource_info_dict["pop_window"] = self.top_frame_widget_dict["pop_window"]
@@ -6947,7 +11215,7 @@ class ViewResourceInFrame:
 
     def view_inspection_code_block(self):
         # 查看-inspection_code_block
-        obj_info_text = tkinter.Text(master=self.top_frame_widget_dict["frame"], height=9)  # 创建多行文本框，用于显示资源信息
+        obj_info_text = tkinter.Text(master=self.top_frame_widget_dict["frame"], height=14)  # 创建多行文本框，用于显示资源信息
         obj_info_text.insert(tkinter.END, "★★ 查看巡检代码块 ★★\n")
         # ★inspection_code_block-名称
         inspection_code_block_name = "名称".ljust(self.view_width - 2, " ") + ": " + self.resource_obj.name + "\n"
@@ -6967,6 +11235,28 @@ class ViewResourceInFrame:
         obj_info_text.insert(tkinter.END, inspection_code_block_project_name)
         inspection_code_block_project_oid = "项目id".ljust(self.view_width - 2, " ") + ": " + self.resource_obj.project_oid + "\n"
         obj_info_text.insert(tkinter.END, inspection_code_block_project_oid)
+        # ★inspection_code_block-code_exec_method
+        code_exec_method_name_list = ["INVOKE_SHELL", "EXEC_COMMAND", "INVOKE_SHELL_PIPELINE", "SCRIPT"]
+        inspection_code_block_code_exec_method = "执行方式".ljust(self.view_width - 4, " ") + ": " + code_exec_method_name_list[
+            self.resource_obj.code_exec_method] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_code_block_code_exec_method)
+        # ★inspection_code_block-exec_command_concurrency
+        inspection_code_block_exec_command_concurrency = "exec并发数".ljust(self.view_width - 3, " ") + ": " + str(
+            self.resource_obj.exec_command_concurrency) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_code_block_exec_command_concurrency)
+        # ★inspection_code_block-code_source
+        code_source_name_list = ["LOCAL", "FILE", "GIT"]
+        inspection_code_block_code_source = "代码来源".ljust(self.view_width - 4, " ") + ": " + code_source_name_list[
+            self.resource_obj.code_source] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_code_block_code_source)
+        # ★inspection_code_block-code_source_path
+        inspection_code_block_code_source_path = "代码来源文件".ljust(self.view_width - 6, " ") + ": " + \
+                                                 self.resource_obj.code_source_path + "\n"
+        obj_info_text.insert(tkinter.END, inspection_code_block_code_source_path)
+        # ★inspection_code_block-code_source_git_url
+        inspection_code_block_code_source_git_url = "git仓库地址".ljust(self.view_width - 4, " ") + ": " + \
+                                                    self.resource_obj.code_source_git_url + "\n"
+        obj_info_text.insert(tkinter.END, inspection_code_block_code_source_git_url)
         # ★inspection_code_block-create_timestamp
         inspection_code_block_create_timestamp = "create_time".ljust(self.view_width, " ") + ": " \
                                                  + time.strftime("%Y-%m-%d %H:%M:%S",
@@ -7143,6 +11433,56 @@ class ViewResourceInFrame:
         inspection_template_name = "巡检日志文件名称".ljust(self.view_width - 8, " ") + ": " + output_file_name_style_name_list[
             self.resource_obj.output_file_name_style] + "\n"
         obj_info_text.insert(tkinter.END, inspection_template_name)
+        # ★inspection_template-job_exec_mode
+        job_exec_mode_name_list = ["THREAD_POOL", "ASYNCIO", "PROCESS_SHARDS"]
+        inspection_template_job_exec_mode = "执行引擎".ljust(self.view_width - 4, " ") + ": " + job_exec_mode_name_list[
+            self.resource_obj.job_exec_mode] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_job_exec_mode)
+        # ★inspection_template-code_exec_timeout/host_deadline/job_deadline
+        inspection_template_code_exec_timeout = "单条命令超时(秒)".ljust(self.view_width - 7, " ") + ": " + str(
+            self.resource_obj.code_exec_timeout) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_code_exec_timeout)
+        inspection_template_host_deadline = "单台主机截止时间(秒)".ljust(self.view_width - 9, " ") + ": " + str(
+            self.resource_obj.host_deadline) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_host_deadline)
+        inspection_template_job_deadline = "整个作业截止时间(秒)".ljust(self.view_width - 9, " ") + ": " + str(
+            self.resource_obj.job_deadline) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_job_deadline)
+        # ★inspection_template-adaptive_forks
+        adaptive_forks_name_list = ["No", "Yes"]
+        inspection_template_adaptive_forks = "自适应并发数".ljust(self.view_width - 6, " ") + ": " + adaptive_forks_name_list[
+            self.resource_obj.adaptive_forks] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_adaptive_forks)
+        # ★inspection_template-login_retry_times/login_retry_interval/circuit_breaker_threshold
+        inspection_template_login_retry_times = "登录失败重试次数".ljust(self.view_width - 8, " ") + ": " + str(
+            self.resource_obj.login_retry_times) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_login_retry_times)
+        inspection_template_login_retry_interval = "首次重试等待(秒)".ljust(self.view_width - 6, " ") + ": " + str(
+            self.resource_obj.login_retry_interval) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_login_retry_interval)
+        inspection_template_circuit_breaker_threshold = "熔断阈值(连续无法连接次数)".ljust(self.view_width - 10, " ") + ": " + str(
+            self.resource_obj.circuit_breaker_threshold) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_circuit_breaker_threshold)
+        # ★inspection_template-execution_crond_time/execution_after_time/schedule_overlap_policy
+        inspection_template_execution_crond_time = "execution_crond_time".ljust(self.view_width, " ") + ": " + \
+                                                   self.resource_obj.execution_crond_time + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_execution_crond_time)
+        inspection_template_execution_after_time = "After间隔(秒)".ljust(self.view_width - 4, " ") + ": " + str(
+            self.resource_obj.execution_after_time) + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_execution_after_time)
+        schedule_overlap_policy_name_list = ["跳过本次", "结束后再执行", "同时执行"]
+        inspection_template_schedule_overlap_policy = "上次作业未结束时".ljust(self.view_width - 8, " ") + ": " + \
+                                                      schedule_overlap_policy_name_list[self.resource_obj.schedule_overlap_policy] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_schedule_overlap_policy)
+        # ★inspection_template-host_schedule_order/new_host_schedule_slot
+        host_schedule_order_name_list = ["按主机列表顺序", "按历史用时从长到短"]
+        inspection_template_host_schedule_order = "主机巡检顺序".ljust(self.view_width - 6, " ") + ": " + \
+                                                  host_schedule_order_name_list[self.resource_obj.host_schedule_order] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_host_schedule_order)
+        new_host_schedule_slot_name_list = ["排在最前", "按用时中位数排序", "排在最后"]
+        inspection_template_new_host_schedule_slot = "无历史用时的主机".ljust(self.view_width - 8, " ") + ": " + \
+                                                     new_host_schedule_slot_name_list[self.resource_obj.new_host_schedule_slot] + "\n"
+        obj_info_text.insert(tkinter.END, inspection_template_new_host_schedule_slot)
         # ★inspection_template-create_timestamp
         inspection_template_create_timestamp = "create_time".ljust(self.view_width, " ") + ": " \
                                                + time.strftime("%Y-%m-%d %H:%M:%S",
@@ -7830,16 +12170,67 @@ class EditResourceInFrame:
                                                                    state="readonly")
         self.resource_info_dict["combobox_project"].current(project_obj_index)  # 显示初始值，可重新选择
         self.resource_info_dict["combobox_project"].grid(row=3, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_exec_method
+        label_inspection_code_block_code_exec_method = tkinter.Label(self.top_frame_widget_dict["frame"], text="执行方式")
+        label_inspection_code_block_code_exec_method.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_exec_method.grid(row=4, column=0, padx=self.padx, pady=self.pady)
+        code_exec_method_name_list = ["INVOKE_SHELL", "EXEC_COMMAND", "INVOKE_SHELL_PIPELINE", "SCRIPT"]
+        self.resource_info_dict["combobox_code_exec_method"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                            values=code_exec_method_name_list,
+                                                                            state="readonly")
+        self.resource_info_dict["combobox_code_exec_method"].current(self.resource_obj.code_exec_method)  # 显示初始值，可重新选择
+        self.resource_info_dict["combobox_code_exec_method"].grid(row=4, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-exec_command_concurrency
+        label_inspection_code_block_exec_command_concurrency = tkinter.Label(self.top_frame_widget_dict["frame"], text="exec并发数")
+        label_inspection_code_block_exec_command_concurrency.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_exec_command_concurrency.grid(row=5, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_exec_command_concurrency"] = tkinter.StringVar()
+        spinbox_inspection_code_block_exec_command_concurrency = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1,
+                                                                                 to=EXEC_COMMAND_CONCURRENCY_MAX, increment=1,
+                                                                                 textvariable=self.resource_info_dict[
+                                                                                     "sv_exec_command_concurrency"])
+        self.resource_info_dict["sv_exec_command_concurrency"].set(self.resource_obj.exec_command_concurrency)  # 显示初始值，可编辑
+        spinbox_inspection_code_block_exec_command_concurrency.grid(row=5, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_source
+        label_inspection_code_block_code_source = tkinter.Label(self.top_frame_widget_dict["frame"], text="代码来源")
+        label_inspection_code_block_code_source.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_source.grid(row=6, column=0, padx=self.padx, pady=self.pady)
+        code_source_name_list = ["LOCAL", "FILE", "GIT"]
+        self.resource_info_dict["combobox_code_source"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                       values=code_source_name_list,
+                                                                       state="readonly")
+        self.resource_info_dict["combobox_code_source"].current(self.resource_obj.code_source)  # 显示初始值，可重新选择
+        self.resource_info_dict["combobox_code_source"].grid(row=6, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_source_path
+        label_inspection_code_block_code_source_path = tkinter.Label(self.top_frame_widget_dict["frame"], text="代码来源文件")
+        label_inspection_code_block_code_source_path.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_source_path.grid(row=7, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_code_source_path"] = tkinter.StringVar()
+        entry_inspection_code_block_code_source_path = tkinter.Entry(self.top_frame_widget_dict["frame"],
+                                                                     textvariable=self.resource_info_dict["sv_code_source_path"])
+        entry_inspection_code_block_code_source_path.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        entry_inspection_code_block_code_source_path.insert(0, self.resource_obj.code_source_path)  # 显示初始值，可编辑
+        entry_inspection_code_block_code_source_path.grid(row=7, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_code_block-code_source_git_url
+        label_inspection_code_block_code_source_git_url = tkinter.Label(self.top_frame_widget_dict["frame"], text="git仓库地址")
+        label_inspection_code_block_code_source_git_url.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_code_block_code_source_git_url.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_code_source_git_url"] = tkinter.StringVar()
+        entry_inspection_code_block_code_source_git_url = tkinter.Entry(self.top_frame_widget_dict["frame"],
+                                                                        textvariable=self.resource_info_dict["sv_code_source_git_url"])
+        entry_inspection_code_block_code_source_git_url.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        entry_inspection_code_block_code_source_git_url.insert(0, self.resource_obj.code_source_git_url)  # 显示初始值，可编辑
+        entry_inspection_code_block_code_source_git_url.grid(row=8, column=1, padx=self.padx, pady=self.pady)
         # ★命令内容-列表
         # ★★★编辑巡检代码内容并在treeview里显示★★★
         self.resource_info_dict["one_line_code_obj_list"] = []
         label_inspection_code_block_code_content = tkinter.Label(self.top_frame_widget_dict["frame"], text="巡检代码内容:")
         label_inspection_code_block_code_content.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
-        label_inspection_code_block_code_content.grid(row=4, column=0, padx=self.padx, pady=self.pady)
+        label_inspection_code_block_code_content.grid(row=9, column=0, padx=self.padx, pady=self.pady)
         button_add_code_list = tkinter.Button(self.top_frame_widget_dict["frame"], text="编辑",
                                               command=lambda: self.click_button_add_code_list(treeview_code_content))  # 新建代码
         button_add_code_list.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
-        button_add_code_list.grid(row=4, column=1, padx=self.padx, pady=self.pady)
+        button_add_code_list.grid(row=9, column=1, padx=self.padx, pady=self.pady)
         treeview_code_content = ttk.Treeview(self.top_frame_widget_dict["frame"], cursor="arrow", height=7,
                                              columns=("index", "code_content", "need_interactive"), show="headings")
         # 设置每一个列的宽度和对齐的方式
@@ -7857,11 +12248,11 @@ class EditResourceInFrame:
             treeview_code_content.insert("", index,
                                          values=(index, code_obj.code_content, need_interactive_value[code_obj.need_interactive]))
             index += 1
-        treeview_code_content.grid(row=5, column=0, columnspan=2, padx=self.padx, pady=self.pady)
+        treeview_code_content.grid(row=10, column=0, columnspan=2, padx=self.padx, pady=self.pady)
         # 单击指定的命令行，进行高级属性编辑
         treeview_code_content.bind("<<TreeviewSelect>>", lambda event: self.edit_treeview_code_content_item(event, treeview_code_content))
         # ★★更新row_index
-        self.current_row_index = 5
+        self.current_row_index = 10
 
     def click_button_add_code_list(self, treeview_code_content):
         pop_window = tkinter.Toplevel(self.global_info.main_window.window_obj)
@@ -7928,7 +12319,7 @@ class EditResourceInFrame:
         screen_width = self.global_info.main_window.window_obj.winfo_screenwidth()
         screen_height = self.global_info.main_window.window_obj.winfo_screenheight()
         width = 420
-        height = 300
+        height = 460
         win_pos = f"{width}x{height}+{screen_width // 2 - width // 2}+{screen_height // 2 - height // 2}"
         pop_window.geometry(win_pos)  # 设置子窗口大小及位置，居中
         self.global_info.main_window.window_obj.attributes("-disabled", 1)  # 使主窗口关闭响应，无法点击它
@@ -7996,14 +12387,51 @@ class EditResourceInFrame:
         entry_description = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_description"])
         entry_description.insert(0, str(one_line_code_obj.description))  # 显示初始值，可编辑
         entry_description.grid(row=7, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-label
+        label_label = tkinter.Label(pop_window, text="标签")
+        label_label.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+        one_line_code_info_dict["sv_label"] = tkinter.StringVar()
+        entry_label = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_label"])
+        entry_label.insert(0, str(one_line_code_obj.label))  # 显示初始值，可编辑
+        entry_label.grid(row=8, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_type
+        label_condition_type = tkinter.Label(pop_window, text="执行条件")
+        label_condition_type.grid(row=9, column=0, padx=self.padx, pady=self.pady)
+        condition_type_name_list = ["NONE", "OUTPUT_MATCH", "OUTPUT_NOT_MATCH", "EXIT_STATUS_NONZERO", "EXIT_STATUS_ZERO"]
+        one_line_code_info_dict["combobox_condition_type"] = ttk.Combobox(pop_window, values=condition_type_name_list,
+                                                                          state="readonly")
+        one_line_code_info_dict["combobox_condition_type"].current(one_line_code_obj.condition_type)
+        one_line_code_info_dict["combobox_condition_type"].grid(row=9, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_pattern
+        label_condition_pattern = tkinter.Label(pop_window, text="条件正则")
+        label_condition_pattern.grid(row=10, column=0, padx=self.padx, pady=self.pady)
+        one_line_code_info_dict["sv_condition_pattern"] = tkinter.StringVar()
+        entry_condition_pattern = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_condition_pattern"])
+        entry_condition_pattern.insert(0, str(one_line_code_obj.condition_pattern))  # 显示初始值，可编辑
+        entry_condition_pattern.grid(row=10, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_action
+        label_condition_action = tkinter.Label(pop_window, text="满足条件时")
+        label_condition_action.grid(row=11, column=0, padx=self.padx, pady=self.pady)
+        condition_action_name_list = ["SKIP_REST", "GOTO_LABEL", "ABORT_HOST"]
+        one_line_code_info_dict["combobox_condition_action"] = ttk.Combobox(pop_window, values=condition_action_name_list,
+                                                                            state="readonly")
+        one_line_code_info_dict["combobox_condition_action"].current(one_line_code_obj.condition_action)
+        one_line_code_info_dict["combobox_condition_action"].grid(row=11, column=1, padx=self.padx, pady=self.pady)
+        # OneLineCode-condition_goto_label
+        label_condition_goto_label = tkinter.Label(pop_window, text="跳转到标签")
+        label_condition_goto_label.grid(row=12, column=0, padx=self.padx, pady=self.pady)
+        one_line_code_info_dict["sv_condition_goto_label"] = tkinter.StringVar()
+        entry_condition_goto_label = tkinter.Entry(pop_window, textvariable=one_line_code_info_dict["sv_condition_goto_label"])
+        entry_condition_goto_label.insert(0, str(one_line_code_obj.condition_goto_label))  # 显示初始值，可编辑
+        entry_condition_goto_label.grid(row=12, column=1, padx=self.padx, pady=self.pady)
         # 添加按钮
         ok_button = tkinter.Button(pop_window, text="保存修改",
                                    command=lambda: self.edit_treeview_code_content_item_save(one_line_code_info_dict,
                                                                                              one_line_code_obj,
                                                                                              pop_window, treeview_code_content))
-        ok_button.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+        ok_button.grid(row=13, column=0, padx=self.padx, pady=self.pady)
         cancel_button = tkinter.Button(pop_window, text="取消", command=lambda: self.edit_treeview_code_content_item_cancel(pop_window))
-        cancel_button.grid(row=8, column=1, padx=self.padx, pady=self.pady)
+        cancel_button.grid(row=13, column=1, padx=self.padx, pady=self.pady)
 
     def edit_treeview_code_content_item_cancel(self, pop_window):
         pop_window.destroy()  # 关闭子窗口
@@ -8011,6 +12439,11 @@ class EditResourceInFrame:
         self.global_info.main_window.window_obj.focus_force()  # 使主窗口获得焦点
 
     def edit_treeview_code_content_item_save(self, one_line_code_info_dict, one_line_code_obj, pop_window, treeview_code_content):
+        try:
+            re.compile(one_line_code_info_dict["sv_condition_pattern"].get())
+        except re.error as err:
+            messagebox.showinfo("设置巡检代码-Error", f"条件正则有误: {err}")
+            return
         one_line_code_obj.code_content = one_line_code_info_dict["sv_code_content"].get()
         one_line_code_obj.code_post_wait_time = float(one_line_code_info_dict["sv_code_post_wait_time"].get())
         if one_line_code_info_dict["combobox_need_interactive"].current() == -1:
@@ -8024,6 +12457,17 @@ class EditResourceInFrame:
         else:
             one_line_code_obj.interactive_process_method = one_line_code_info_dict["combobox_interactive_process_method"].current()
         one_line_code_obj.description = one_line_code_info_dict["sv_description"].get()
+        one_line_code_obj.label = one_line_code_info_dict["sv_label"].get().strip()
+        if one_line_code_info_dict["combobox_condition_type"].current() == -1:
+            one_line_code_obj.condition_type = CODE_CONDITION_NONE
+        else:
+            one_line_code_obj.condition_type = one_line_code_info_dict["combobox_condition_type"].current()
+        one_line_code_obj.condition_pattern = one_line_code_info_dict["sv_condition_pattern"].get()
+        if one_line_code_info_dict["combobox_condition_action"].current() == -1:
+            one_line_code_obj.condition_action = CODE_CONDITION_ACTION_SKIP_REST
+        else:
+            one_line_code_obj.condition_action = one_line_code_info_dict["combobox_condition_action"].current()
+        one_line_code_obj.condition_goto_label = one_line_code_info_dict["sv_condition_goto_label"].get().strip()
         pop_window.destroy()  # 关闭子窗口
         self.global_info.main_window.window_obj.attributes("-disabled", 0)  # 使主窗口响应
         self.global_info.main_window.window_obj.focus_force()  # 使主窗口获得焦点
@@ -8118,7 +12562,7 @@ class EditResourceInFrame:
         label_inspection_template_forks.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
         label_inspection_template_forks.grid(row=7, column=0, padx=self.padx, pady=self.pady)
         self.resource_info_dict["sv_forks"] = tkinter.StringVar()
-        spinbox_inspection_template_forks = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1, to=256, increment=1,
+        spinbox_inspection_template_forks = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1, to=MAX_JOB_FORKS, increment=1,
                                                             textvariable=self.resource_info_dict["sv_forks"])
         self.resource_info_dict["sv_forks"].set(self.resource_obj.forks)  # 显示初始值，可编辑
         spinbox_inspection_template_forks.grid(row=7, column=1, padx=self.padx, pady=self.pady)
@@ -8206,8 +12650,141 @@ class EditResourceInFrame:
         self.resource_info_dict["listbox_inspection_code_block"].pack(side="left")
         list_scrollbar.config(command=self.resource_info_dict["listbox_inspection_code_block"].yview)
         frame.grid(row=12, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-job_exec_mode
+        label_inspection_template_job_exec_mode = tkinter.Label(self.top_frame_widget_dict["frame"], text="执行引擎")
+        label_inspection_template_job_exec_mode.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_job_exec_mode.grid(row=13, column=0, padx=self.padx, pady=self.pady)
+        job_exec_mode_name_list = ["THREAD_POOL", "ASYNCIO", "PROCESS_SHARDS"]
+        self.resource_info_dict["combobox_job_exec_mode"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                         values=job_exec_mode_name_list,
+                                                                         state="readonly")
+        self.resource_info_dict["combobox_job_exec_mode"].current(self.resource_obj.job_exec_mode)
+        self.resource_info_dict["combobox_job_exec_mode"].grid(row=13, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-code_exec_timeout
+        label_inspection_template_code_exec_timeout = tkinter.Label(self.top_frame_widget_dict["frame"], text="单条命令超时(秒)")
+        label_inspection_template_code_exec_timeout.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_code_exec_timeout.grid(row=14, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_code_exec_timeout"] = tkinter.StringVar()
+        spinbox_inspection_template_code_exec_timeout = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1,
+                                                                        to=JOB_TIMEOUT_SETTING_MAX, increment=10,
+                                                                        textvariable=self.resource_info_dict["sv_code_exec_timeout"])
+        self.resource_info_dict["sv_code_exec_timeout"].set(int(self.resource_obj.code_exec_timeout))
+        spinbox_inspection_template_code_exec_timeout.grid(row=14, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-host_deadline
+        label_inspection_template_host_deadline = tkinter.Label(self.top_frame_widget_dict["frame"], text="单台主机截止时间(秒,0不限)")
+        label_inspection_template_host_deadline.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_host_deadline.grid(row=15, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_host_deadline"] = tkinter.StringVar()
+        spinbox_inspection_template_host_deadline = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                    to=JOB_TIMEOUT_SETTING_MAX, increment=60,
+                                                                    textvariable=self.resource_info_dict["sv_host_deadline"])
+        self.resource_info_dict["sv_host_deadline"].set(int(self.resource_obj.host_deadline))
+        spinbox_inspection_template_host_deadline.grid(row=15, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-job_deadline
+        label_inspection_template_job_deadline = tkinter.Label(self.top_frame_widget_dict["frame"], text="整个作业截止时间(秒,0不限)")
+        label_inspection_template_job_deadline.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_job_deadline.grid(row=16, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_job_deadline"] = tkinter.StringVar()
+        spinbox_inspection_template_job_deadline = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                   to=JOB_TIMEOUT_SETTING_MAX, increment=60,
+                                                                   textvariable=self.resource_info_dict["sv_job_deadline"])
+        self.resource_info_dict["sv_job_deadline"].set(int(self.resource_obj.job_deadline))
+        spinbox_inspection_template_job_deadline.grid(row=16, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-adaptive_forks
+        label_inspection_template_adaptive_forks = tkinter.Label(self.top_frame_widget_dict["frame"], text="自适应并发数")
+        label_inspection_template_adaptive_forks.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_adaptive_forks.grid(row=17, column=0, padx=self.padx, pady=self.pady)
+        adaptive_forks_name_list = ["No", "Yes"]
+        self.resource_info_dict["combobox_adaptive_forks"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                          values=adaptive_forks_name_list,
+                                                                          state="readonly")
+        self.resource_info_dict["combobox_adaptive_forks"].current(self.resource_obj.adaptive_forks)
+        self.resource_info_dict["combobox_adaptive_forks"].grid(row=17, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-login_retry_times
+        label_inspection_template_login_retry_times = tkinter.Label(self.top_frame_widget_dict["frame"], text="登录失败重试次数")
+        label_inspection_template_login_retry_times.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_login_retry_times.grid(row=18, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_login_retry_times"] = tkinter.StringVar()
+        spinbox_inspection_template_login_retry_times = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                        to=LOGIN_RETRY_TIMES_MAX, increment=1,
+                                                                        textvariable=self.resource_info_dict["sv_login_retry_times"])
+        self.resource_info_dict["sv_login_retry_times"].set(self.resource_obj.login_retry_times)
+        spinbox_inspection_template_login_retry_times.grid(row=18, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-login_retry_interval
+        label_inspection_template_login_retry_interval = tkinter.Label(self.top_frame_widget_dict["frame"], text="首次重试等待(秒,指数退避)")
+        label_inspection_template_login_retry_interval.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_login_retry_interval.grid(row=19, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_login_retry_interval"] = tkinter.StringVar()
+        spinbox_inspection_template_login_retry_interval = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1,
+                                                                           to=LOGIN_RETRY_BACKOFF_MAX, increment=5,
+                                                                           textvariable=self.resource_info_dict["sv_login_retry_interval"])
+        self.resource_info_dict["sv_login_retry_interval"].set(int(self.resource_obj.login_retry_interval))
+        spinbox_inspection_template_login_retry_interval.grid(row=19, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-circuit_breaker_threshold
+        label_inspection_template_circuit_breaker_threshold = tkinter.Label(self.top_frame_widget_dict["frame"],
+                                                                            text="连续几次无法连接后熔断(0不熔断)")
+        label_inspection_template_circuit_breaker_threshold.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_circuit_breaker_threshold.grid(row=20, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_circuit_breaker_threshold"] = tkinter.StringVar()
+        spinbox_inspection_template_circuit_breaker_threshold = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                                to=CIRCUIT_BREAKER_THRESHOLD_MAX, increment=1,
+                                                                                textvariable=self.resource_info_dict[
+                                                                                    "sv_circuit_breaker_threshold"])
+        self.resource_info_dict["sv_circuit_breaker_threshold"].set(self.resource_obj.circuit_breaker_threshold)
+        spinbox_inspection_template_circuit_breaker_threshold.grid(row=20, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-execution_crond_time 周期执行时使用，cron表达式
+        label_inspection_template_execution_crond_time = tkinter.Label(self.top_frame_widget_dict["frame"],
+                                                                       text="周期执行cron(分 时 日 月 星期)")
+        label_inspection_template_execution_crond_time.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_execution_crond_time.grid(row=21, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_execution_crond_time"] = tkinter.StringVar()
+        entry_inspection_template_execution_crond_time = tkinter.Entry(self.top_frame_widget_dict["frame"],
+                                                                       textvariable=self.resource_info_dict["sv_execution_crond_time"])
+        entry_inspection_template_execution_crond_time.insert(0, self.resource_obj.execution_crond_time)
+        entry_inspection_template_execution_crond_time.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        entry_inspection_template_execution_crond_time.grid(row=21, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-execution_after_time After方式使用
+        label_inspection_template_execution_after_time = tkinter.Label(self.top_frame_widget_dict["frame"], text="After间隔(秒)")
+        label_inspection_template_execution_after_time.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_execution_after_time.grid(row=22, column=0, padx=self.padx, pady=self.pady)
+        self.resource_info_dict["sv_execution_after_time"] = tkinter.StringVar()
+        spinbox_inspection_template_execution_after_time = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=0,
+                                                                           to=86400 * 30, increment=60,
+                                                                           textvariable=self.resource_info_dict["sv_execution_after_time"])
+        self.resource_info_dict["sv_execution_after_time"].set(self.resource_obj.execution_after_time)
+        spinbox_inspection_template_execution_after_time.grid(row=22, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-schedule_overlap_policy
+        label_inspection_template_schedule_overlap_policy = tkinter.Label(self.top_frame_widget_dict["frame"], text="上次作业未结束时")
+        label_inspection_template_schedule_overlap_policy.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_schedule_overlap_policy.grid(row=23, column=0, padx=self.padx, pady=self.pady)
+        schedule_overlap_policy_name_list = ["跳过本次", "结束后再执行", "同时执行"]
+        self.resource_info_dict["combobox_schedule_overlap_policy"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                                   values=schedule_overlap_policy_name_list,
+                                                                                   state="readonly")
+        self.resource_info_dict["combobox_schedule_overlap_policy"].current(self.resource_obj.schedule_overlap_policy)
+        self.resource_info_dict["combobox_schedule_overlap_policy"].grid(row=23, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-host_schedule_order
+        label_inspection_template_host_schedule_order = tkinter.Label(self.top_frame_widget_dict["frame"], text="主机巡检顺序")
+        label_inspection_template_host_schedule_order.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_host_schedule_order.grid(row=24, column=0, padx=self.padx, pady=self.pady)
+        host_schedule_order_name_list = ["按主机列表顺序", "按历史用时从长到短"]
+        self.resource_info_dict["combobox_host_schedule_order"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                               values=host_schedule_order_name_list,
+                                                                               state="readonly")
+        self.resource_info_dict["combobox_host_schedule_order"].current(self.resource_obj.host_schedule_order)
+        self.resource_info_dict["combobox_host_schedule_order"].grid(row=24, column=1, padx=self.padx, pady=self.pady)
+        # ★inspection_template-new_host_schedule_slot
+        label_inspection_template_new_host_schedule_slot = tkinter.Label(self.top_frame_widget_dict["frame"], text="无历史用时的主机")
+        label_inspection_template_new_host_schedule_slot.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_inspection_template_new_host_schedule_slot.grid(row=25, column=0, padx=self.padx, pady=self.pady)
+        new_host_schedule_slot_name_list = ["排在最前", "按用时中位数排序", "排在最后"]
+        self.resource_info_dict["combobox_new_host_schedule_slot"] = ttk.Combobox(self.top_frame_widget_dict["frame"],
+                                                                                  values=new_host_schedule_slot_name_list,
+                                                                                  state="readonly")
+        self.resource_info_dict["combobox_new_host_schedule_slot"].current(self.resource_obj.new_host_schedule_slot)
+        self.resource_info_dict["combobox_new_host_schedule_slot"].grid(row=25, column=1, padx=self.padx, pady=self.pady)
         # ★★更新row_index
-        self.current_row_index = 12
+        self.current_row_index = 25
 
     def edit_custome_tag_config_scheme(self):
         self.resource_info_dict["pop_window"] = self.top_frame_widget_dict["pop_window"]
@@ -8670,6 +13247,14 @@ class UpdateResourceInFrame:
             project_oid = self.global_info.project_obj_list[0].oid
         else:
             project_oid = self.global_info.project_obj_list[combobox_project_current].oid
+        # ★先检测选择的下级主机组是否会形成循环包含（如A含B，B又含A），会的话不做任何修改
+        selected_host_group_oid_list = [self.global_info.host_group_obj_list[selected_host_group_index].oid
+                                        for selected_host_group_index in self.resource_info_dict["listbox_host_group"].curselection()]
+        if self.resource_obj.oid in selected_host_group_oid_list:
+            selected_host_group_oid_list.remove(self.resource_obj.oid)  # 选中自己的会被add_host_group()忽略，不算循环包含
+        if self.global_info.host_group_resolver.is_host_group_cycle(self.resource_obj.oid, selected_host_group_oid_list):
+            messagebox.showinfo("更新主机组-Error", f"所选的下级主机组包含了本主机组，会形成循环包含")
+            return
         # 先更新host_group的 host_group_oid_list
         self.resource_obj.host_group_oid_list = []
         for selected_host_group_index in self.resource_info_dict["listbox_host_group"].curselection():  # host_group对象添加host_group列表
@@ -8702,6 +13287,26 @@ class UpdateResourceInFrame:
             project_oid = self.global_info.project_obj_list[0].oid
         else:
             project_oid = self.global_info.project_obj_list[combobox_project_current].oid
+        # ★code_exec_method
+        if self.resource_info_dict["combobox_code_exec_method"].current() == -1:
+            inspection_code_block_code_exec_method = CODE_EXEC_METHOD_INVOKE_SHELL
+        else:
+            inspection_code_block_code_exec_method = self.resource_info_dict["combobox_code_exec_method"].current()
+        # ★exec_command_concurrency  超出输入框范围的值截断到范围内
+        try:
+            inspection_code_block_exec_command_concurrency = int(self.resource_info_dict["sv_exec_command_concurrency"].get())
+        except ValueError:
+            messagebox.showinfo("更新巡检代码块-Error", f"exec并发数必须为整数")
+            return
+        inspection_code_block_exec_command_concurrency = min(max(inspection_code_block_exec_command_concurrency, 1),
+                                                             EXEC_COMMAND_CONCURRENCY_MAX)
+        # ★code_source
+        if self.resource_info_dict["combobox_code_source"].current() == -1:
+            inspection_code_block_code_source = CODE_SOURCE_LOCAL
+        else:
+            inspection_code_block_code_source = self.resource_info_dict["combobox_code_source"].current()
+        inspection_code_block_code_source_path = self.resource_info_dict["sv_code_source_path"].get().strip()
+        inspection_code_block_code_source_git_url = self.resource_info_dict["sv_code_source_git_url"].get().strip()
         # 这里不用更新inspection_code_block的 code_list，已在编辑窗口那里完成了
         # 更新-inspection_code_block-对象本身
         if inspection_code_block_name == '':
@@ -8712,10 +13317,23 @@ class UpdateResourceInFrame:
             messagebox.showinfo("更新巡检代码块-Error", f"巡检代码块名称>256字符")
         elif self.global_info.is_inspection_code_block_name_existed_except_self(inspection_code_block_name, self.resource_obj):
             messagebox.showinfo("更新巡检代码块-Error", f"巡检代码块名称已存在")
+        elif inspection_code_block_code_source != CODE_SOURCE_LOCAL and inspection_code_block_code_source_path == '':
+            messagebox.showinfo("更新巡检代码块-Error", f"代码来源为FILE或GIT时，代码来源文件不能为空")
+        elif inspection_code_block_code_source == CODE_SOURCE_GIT and inspection_code_block_code_source_git_url == '':
+            messagebox.showinfo("更新巡检代码块-Error", f"代码来源为GIT时，git仓库地址不能为空")
+        elif inspection_code_block_code_source == CODE_SOURCE_GIT and inspection_code_block_code_source_git_url.startswith("-"):
+            messagebox.showinfo("更新巡检代码块-Error", f"git仓库地址不能以-开头")
         else:
             self.resource_obj.update(name=inspection_code_block_name, description=inspection_code_block_description,
                                      project_oid=project_oid,
+                                     code_exec_method=inspection_code_block_code_exec_method,
+                                     exec_command_concurrency=inspection_code_block_exec_command_concurrency,
+                                     code_source=inspection_code_block_code_source,
+                                     code_source_path=inspection_code_block_code_source_path,
+                                     code_source_git_url=inspection_code_block_code_source_git_url,
                                      global_info=self.global_info)
+            if inspection_code_block_code_source != CODE_SOURCE_LOCAL and not self.resource_obj.update_code_from_source():
+                messagebox.showinfo("更新巡检代码块-Warning", f"读取代码来源失败，仍使用原有的巡检代码内容")
             self.global_info.main_window.list_resource_of_nav_frame_r_bottom_page(
                 RESOURCE_TYPE_INSPECTION_CODE_BLOCK, )  # 更新inspection_code_block信息后，返回
 
@@ -8753,6 +13371,56 @@ class UpdateResourceInFrame:
             inspection_template_output_file_name_style = 0
         else:
             inspection_template_output_file_name_style = self.resource_info_dict["combobox_output_file_name_style"].current()
+        # ★job_exec_mode
+        if self.resource_info_dict["combobox_job_exec_mode"].current() == -1:
+            inspection_template_job_exec_mode = JOB_EXEC_MODE_THREAD_POOL
+        else:
+            inspection_template_job_exec_mode = self.resource_info_dict["combobox_job_exec_mode"].current()
+        # ★code_exec_timeout/host_deadline/job_deadline
+        try:
+            inspection_template_code_exec_timeout = float(self.resource_info_dict["sv_code_exec_timeout"].get())
+            inspection_template_host_deadline = float(self.resource_info_dict["sv_host_deadline"].get())
+            inspection_template_job_deadline = float(self.resource_info_dict["sv_job_deadline"].get())
+        except ValueError:
+            messagebox.showinfo("更新巡检模板-Error", f"单条命令超时、单台主机截止时间、整个作业截止时间必须为数字")
+            return
+        # ★adaptive_forks
+        if self.resource_info_dict["combobox_adaptive_forks"].current() == -1:
+            inspection_template_adaptive_forks = COF_NO
+        else:
+            inspection_template_adaptive_forks = self.resource_info_dict["combobox_adaptive_forks"].current()
+        # ★login_retry_times/login_retry_interval/circuit_breaker_threshold  超出输入框范围的值截断到范围内
+        try:
+            inspection_template_login_retry_times = int(self.resource_info_dict["sv_login_retry_times"].get())
+            inspection_template_login_retry_interval = float(self.resource_info_dict["sv_login_retry_interval"].get())
+            inspection_template_circuit_breaker_threshold = int(self.resource_info_dict["sv_circuit_breaker_threshold"].get())
+        except ValueError:
+            messagebox.showinfo("更新巡检模板-Error", f"登录失败重试次数、熔断次数必须为整数，首次重试等待必须为数字")
+            return
+        inspection_template_login_retry_times = min(max(inspection_template_login_retry_times, 0), LOGIN_RETRY_TIMES_MAX)
+        inspection_template_login_retry_interval = min(max(inspection_template_login_retry_interval, 0), LOGIN_RETRY_BACKOFF_MAX)
+        inspection_template_circuit_breaker_threshold = min(max(inspection_template_circuit_breaker_threshold, 0),
+                                                            CIRCUIT_BREAKER_THRESHOLD_MAX)
+        # ★execution_crond_time/execution_after_time/schedule_overlap_policy
+        inspection_template_execution_crond_time = self.resource_info_dict["sv_execution_crond_time"].get().strip()
+        try:
+            inspection_template_execution_after_time = float(self.resource_info_dict["sv_execution_after_time"].get())
+        except ValueError:
+            messagebox.showinfo("更新巡检模板-Error", f"After间隔必须为数字")
+            return
+        if self.resource_info_dict["combobox_schedule_overlap_policy"].current() == -1:
+            inspection_template_schedule_overlap_policy = SCHEDULE_OVERLAP_POLICY_SKIP
+        else:
+            inspection_template_schedule_overlap_policy = self.resource_info_dict["combobox_schedule_overlap_policy"].current()
+        # ★host_schedule_order/new_host_schedule_slot
+        if self.resource_info_dict["combobox_host_schedule_order"].current() == -1:
+            inspection_template_host_schedule_order = HOST_SCHEDULE_ORDER_LONGEST_FIRST
+        else:
+            inspection_template_host_schedule_order = self.resource_info_dict["combobox_host_schedule_order"].current()
+        if self.resource_info_dict["combobox_new_host_schedule_slot"].current() == -1:
+            inspection_template_new_host_schedule_slot = NEW_HOST_SCHEDULE_SLOT_FIRST
+        else:
+            inspection_template_new_host_schedule_slot = self.resource_info_dict["combobox_new_host_schedule_slot"].current()
         # 先更新inspection_template的 host_group_oid_list
         self.resource_obj.host_group_oid_list = []
         for selected_host_group_index in self.resource_info_dict["listbox_host_group"].curselection():  # 添加host_group列表
@@ -8774,6 +13442,13 @@ class UpdateResourceInFrame:
             messagebox.showinfo("更新巡检模板-Error", f"巡检模板描述>256字符")
         elif self.global_info.is_inspection_template_name_existed_except_self(inspection_template_name, self.resource_obj):
             messagebox.showinfo("更新巡检模板-Error", f"巡检模板名称已存在")
+        elif inspection_template_execution_method == EXECUTION_METHOD_CROND and not CronExpression.is_valid(
+                inspection_template_execution_crond_time):
+            messagebox.showinfo("更新巡检模板-Error", f"cron表达式格式错误: {inspection_template_execution_crond_time}")
+        elif inspection_template_code_exec_timeout <= 0 or inspection_template_host_deadline < 0 or inspection_template_job_deadline < 0:
+            messagebox.showinfo("更新巡检模板-Error", f"单条命令超时必须大于0，单台主机截止时间、整个作业截止时间不能小于0")
+        elif inspection_template_execution_after_time < 0:
+            messagebox.showinfo("更新巡检模板-Error", f"After间隔不能小于0")
         else:
             self.resource_obj.update(name=inspection_template_name, description=inspection_template_description,
                                      project_oid=project_oid, execution_method=inspection_template_execution_method,
@@ -8781,12 +13456,27 @@ class UpdateResourceInFrame:
                                      update_code_on_launch=inspection_template_update_code_on_launch, forks=inspection_template_forks,
                                      save_output_to_file=inspection_template_save_output_to_file,
                                      output_file_name_style=inspection_template_output_file_name_style,
+                                     job_exec_mode=inspection_template_job_exec_mode,
+                                     code_exec_timeout=inspection_template_code_exec_timeout,
+                                     host_deadline=inspection_template_host_deadline,
+                                     job_deadline=inspection_template_job_deadline,
+                                     adaptive_forks=inspection_template_adaptive_forks,
+                                     login_retry_times=inspection_template_login_retry_times,
+                                     login_retry_interval=inspection_template_login_retry_interval,
+                                     circuit_breaker_threshold=inspection_template_circuit_breaker_threshold,
+                                     execution_crond_time=inspection_template_execution_crond_time,
+                                     execution_after_time=inspection_template_execution_after_time,
+                                     schedule_overlap_policy=inspection_template_schedule_overlap_policy,
+                                     host_schedule_order=inspection_template_host_schedule_order,
+                                     new_host_schedule_slot=inspection_template_new_host_schedule_slot,
                                      global_info=self.global_info)
             if self.resource_obj.launch_template_trigger_oid != "":
                 launch_template_trigger_obj = self.global_info.get_launch_template_trigger_obj_by_oid(
                     self.resource_obj.launch_template_trigger_oid)
                 print("xxxxxxxxxxxxxxyyyyyyyyyyyy update update update")
                 launch_template_trigger_obj.update()
+            elif self.resource_obj.execution_method != EXECUTION_METHOD_NONE:  # 原来执行方式为无，还没有触发器
+                self.global_info.create_launch_template_trigger(self.resource_obj)
             self.global_info.main_window.list_resource_of_nav_frame_r_bottom_page(RESOURCE_TYPE_INSPECTION_TEMPLATE, )  # 更新信息后，返回“显示资源列表”页面
 
     def update_custome_tag_config_scheme(self):
@@ -9091,6 +13781,26 @@ class SaveResourceInMainWindow:
             project_oid = self.global_info.project_obj_list[0].oid
         else:
             project_oid = self.global_info.project_obj_list[combobox_project_current].oid
+        # ★code_exec_method
+        if self.resource_info_dict["combobox_code_exec_method"].current() == -1:
+            inspection_code_block_code_exec_method = CODE_EXEC_METHOD_INVOKE_SHELL
+        else:
+            inspection_code_block_code_exec_method = self.resource_info_dict["combobox_code_exec_method"].current()
+        # ★exec_command_concurrency  超出输入框范围的值截断到范围内
+        try:
+            inspection_code_block_exec_command_concurrency = int(self.resource_info_dict["sv_exec_command_concurrency"].get())
+        except ValueError:
+            messagebox.showinfo("创建巡检代码块-Error", f"exec并发数必须为整数")
+            return
+        inspection_code_block_exec_command_concurrency = min(max(inspection_code_block_exec_command_concurrency, 1),
+                                                             EXEC_COMMAND_CONCURRENCY_MAX)
+        # ★code_source
+        if self.resource_info_dict["combobox_code_source"].current() == -1:
+            inspection_code_block_code_source = CODE_SOURCE_LOCAL
+        else:
+            inspection_code_block_code_source = self.resource_info_dict["combobox_code_source"].current()
+        inspection_code_block_code_source_path = self.resource_info_dict["sv_code_source_path"].get().strip()
+        inspection_code_block_code_source_git_url = self.resource_info_dict["sv_code_source_git_url"].get().strip()
         # 创建inspection_code_block
         if inspection_code_block_name == '':
             messagebox.showinfo("创建巡检代码块-Error", f"巡检代码块名称不能为空")
@@ -9100,13 +13810,26 @@ class SaveResourceInMainWindow:
             messagebox.showinfo("创建巡检代码块-Error", f"巡检代码块描述>256字符")
         elif self.global_info.is_inspection_code_block_name_existed(inspection_code_block_name):
             messagebox.showinfo("创建巡检代码块-Error", f"巡检代码块名称 {inspection_code_block_name} 已存在")
+        elif inspection_code_block_code_source != CODE_SOURCE_LOCAL and inspection_code_block_code_source_path == '':
+            messagebox.showinfo("创建巡检代码块-Error", f"代码来源为FILE或GIT时，代码来源文件不能为空")
+        elif inspection_code_block_code_source == CODE_SOURCE_GIT and inspection_code_block_code_source_git_url == '':
+            messagebox.showinfo("创建巡检代码块-Error", f"代码来源为GIT时，git仓库地址不能为空")
+        elif inspection_code_block_code_source == CODE_SOURCE_GIT and inspection_code_block_code_source_git_url.startswith("-"):
+            messagebox.showinfo("创建巡检代码块-Error", f"git仓库地址不能以-开头")
         else:
             inspection_code_block = InspectionCodeBlock(name=inspection_code_block_name, description=inspection_code_block_description,
                                                         project_oid=project_oid,
+                                                        code_source=inspection_code_block_code_source,
+                                                        code_exec_method=inspection_code_block_code_exec_method,
+                                                        exec_command_concurrency=inspection_code_block_exec_command_concurrency,
+                                                        code_source_path=inspection_code_block_code_source_path,
+                                                        code_source_git_url=inspection_code_block_code_source_git_url,
                                                         global_info=self.global_info)
             inspection_code_block.code_list = self.resource_info_dict["one_line_code_obj_list"]  # inspection_code_block对象添加code_line列表
             inspection_code_block.save()  # 保存资源对象
             self.global_info.inspection_code_block_obj_list.append(inspection_code_block)
+            if inspection_code_block_code_source != CODE_SOURCE_LOCAL and not inspection_code_block.update_code_from_source():
+                messagebox.showinfo("创建巡检代码块-Warning", f"读取代码来源失败，仍使用界面上添加的巡检代码内容")
             self.global_info.main_window.nav_frame_r_resource_top_page_display(RESOURCE_TYPE_INSPECTION_CODE_BLOCK)  # 保存后，返回展示页面
 
     def save_inspection_template(self):
@@ -9146,6 +13869,56 @@ class SaveResourceInMainWindow:
             inspection_template_output_file_name_style = 0
         else:
             inspection_template_output_file_name_style = self.resource_info_dict["combobox_output_file_name_style"].current()
+        # ★job_exec_mode
+        if self.resource_info_dict["combobox_job_exec_mode"].current() == -1:
+            inspection_template_job_exec_mode = JOB_EXEC_MODE_THREAD_POOL
+        else:
+            inspection_template_job_exec_mode = self.resource_info_dict["combobox_job_exec_mode"].current()
+        # ★code_exec_timeout/host_deadline/job_deadline
+        try:
+            inspection_template_code_exec_timeout = float(self.resource_info_dict["sv_code_exec_timeout"].get())
+            inspection_template_host_deadline = float(self.resource_info_dict["sv_host_deadline"].get())
+            inspection_template_job_deadline = float(self.resource_info_dict["sv_job_deadline"].get())
+        except ValueError:
+            messagebox.showinfo("创建巡检模板-Error", f"单条命令超时、单台主机截止时间、整个作业截止时间必须为数字")
+            return
+        # ★adaptive_forks
+        if self.resource_info_dict["combobox_adaptive_forks"].current() == -1:
+            inspection_template_adaptive_forks = COF_NO
+        else:
+            inspection_template_adaptive_forks = self.resource_info_dict["combobox_adaptive_forks"].current()
+        # ★login_retry_times/login_retry_interval/circuit_breaker_threshold  超出输入框范围的值截断到范围内
+        try:
+            inspection_template_login_retry_times = int(self.resource_info_dict["sv_login_retry_times"].get())
+            inspection_template_login_retry_interval = float(self.resource_info_dict["sv_login_retry_interval"].get())
+            inspection_template_circuit_breaker_threshold = int(self.resource_info_dict["sv_circuit_breaker_threshold"].get())
+        except ValueError:
+            messagebox.showinfo("创建巡检模板-Error", f"登录失败重试次数、熔断次数必须为整数，首次重试等待必须为数字")
+            return
+        inspection_template_login_retry_times = min(max(inspection_template_login_retry_times, 0), LOGIN_RETRY_TIMES_MAX)
+        inspection_template_login_retry_interval = min(max(inspection_template_login_retry_interval, 0), LOGIN_RETRY_BACKOFF_MAX)
+        inspection_template_circuit_breaker_threshold = min(max(inspection_template_circuit_breaker_threshold, 0),
+                                                            CIRCUIT_BREAKER_THRESHOLD_MAX)
+        # ★execution_crond_time/execution_after_time/schedule_overlap_policy
+        inspection_template_execution_crond_time = self.resource_info_dict["sv_execution_crond_time"].get().strip()
+        try:
+            inspection_template_execution_after_time = float(self.resource_info_dict["sv_execution_after_time"].get())
+        except ValueError:
+            messagebox.showinfo("创建巡检模板-Error", f"After间隔必须为数字")
+            return
+        if self.resource_info_dict["combobox_schedule_overlap_policy"].current() == -1:
+            inspection_template_schedule_overlap_policy = SCHEDULE_OVERLAP_POLICY_SKIP
+        else:
+            inspection_template_schedule_overlap_policy = self.resource_info_dict["combobox_schedule_overlap_policy"].current()
+        # ★host_schedule_order/new_host_schedule_slot
+        if self.resource_info_dict["combobox_host_schedule_order"].current() == -1:
+            inspection_template_host_schedule_order = HOST_SCHEDULE_ORDER_LONGEST_FIRST
+        else:
+            inspection_template_host_schedule_order = self.resource_info_dict["combobox_host_schedule_order"].current()
+        if self.resource_info_dict["combobox_new_host_schedule_slot"].current() == -1:
+            inspection_template_new_host_schedule_slot = NEW_HOST_SCHEDULE_SLOT_FIRST
+        else:
+            inspection_template_new_host_schedule_slot = self.resource_info_dict["combobox_new_host_schedule_slot"].current()
         # 创建inspection_template
         if inspection_template_name == '':
             messagebox.showinfo("创建巡检模板-Error", f"巡检模板名称不能为空")
@@ -9155,6 +13928,13 @@ class SaveResourceInMainWindow:
             messagebox.showinfo("创建巡检模板-Error", f"巡检模板描述>256字符")
         elif self.global_info.is_inspection_template_name_existed(inspection_template_name):
             messagebox.showinfo("创建巡检模板-Error", f"巡检模板名称 {inspection_template_name} 已存在")
+        elif inspection_template_execution_method == EXECUTION_METHOD_CROND and not CronExpression.is_valid(
+                inspection_template_execution_crond_time):
+            messagebox.showinfo("创建巡检模板-Error", f"cron表达式格式错误: {inspection_template_execution_crond_time}")
+        elif inspection_template_code_exec_timeout <= 0 or inspection_template_host_deadline < 0 or inspection_template_job_deadline < 0:
+            messagebox.showinfo("创建巡检模板-Error", f"单条命令超时必须大于0，单台主机截止时间、整个作业截止时间不能小于0")
+        elif inspection_template_execution_after_time < 0:
+            messagebox.showinfo("创建巡检模板-Error", f"After间隔不能小于0")
         else:
             inspection_template = InspectionTemplate(name=inspection_template_name, description=inspection_template_description,
                                                      project_oid=project_oid, forks=inspection_template_forks,
@@ -9163,6 +13943,19 @@ class SaveResourceInMainWindow:
                                                      update_code_on_launch=inspection_template_update_code_on_launch,
                                                      save_output_to_file=inspection_template_save_output_to_file,
                                                      output_file_name_style=inspection_template_output_file_name_style,
+                                                     job_exec_mode=inspection_template_job_exec_mode,
+                                                     code_exec_timeout=inspection_template_code_exec_timeout,
+                                                     host_deadline=inspection_template_host_deadline,
+                                                     job_deadline=inspection_template_job_deadline,
+                                                     adaptive_forks=inspection_template_adaptive_forks,
+                                                     login_retry_times=inspection_template_login_retry_times,
+                                                     login_retry_interval=inspection_template_login_retry_interval,
+                                                     circuit_breaker_threshold=inspection_template_circuit_breaker_threshold,
+                                                     execution_crond_time=inspection_template_execution_crond_time,
+                                                     execution_after_time=inspection_template_execution_after_time,
+                                                     schedule_overlap_policy=inspection_template_schedule_overlap_policy,
+                                                     host_schedule_order=inspection_template_host_schedule_order,
+                                                     new_host_schedule_slot=inspection_template_new_host_schedule_slot,
                                                      global_info=self.global_info)
             # ★inspection_template对象添加 主机、主机组、巡检代码块
             for selected_host_index in self.resource_info_dict["listbox_host"].curselection():  # 添加主机列表
@@ -9175,12 +13968,7 @@ class SaveResourceInMainWindow:
             self.global_info.inspection_template_obj_list.append(inspection_template)
             # 如果巡检模板创建了定时任务，则创建触发器
             if inspection_template.execution_method != EXECUTION_METHOD_NONE:
-                cron_trigger1 = LaunchTemplateTrigger(inspection_template_obj=inspection_template,
-                                                      global_info=self.global_info)
-                inspection_template.launch_template_trigger_oid = cron_trigger1.oid  # 将触发器id添加到巡检模板对象上
-                self.global_info.launch_template_trigger_obj_list.append(cron_trigger1)
-                # 开始执行监视任务，达到触发条件就执行相应巡检模板（由cofable.LaunchTemplateTrigger.start_crontab_job()方法触发）
-                cron_trigger1.start_crond_job()
+                self.global_info.create_launch_template_trigger(inspection_template)
             else:
                 pass
             self.global_info.main_window.nav_frame_r_resource_top_page_display(RESOURCE_TYPE_INSPECTION_TEMPLATE)  # 返回顶级展示页面
@@ -9535,7 +14323,8 @@ class ListInspectionJobInFrame:
         inspection_job_record_obj_list = self.global_info.inspection_job_record_obj_list
         # 列出资源
         label_display_resource = tkinter.Label(self.nav_frame_r_widget_dict["frame"],
-                                               text=resource_display_frame_title + "    数量: " + str(len(inspection_job_record_obj_list)))
+                                               text=resource_display_frame_title + "    数量: " + str(len(inspection_job_record_obj_list))
+                                               + "/" + str(self.global_info.get_inspection_job_record_total_num()))
         label_display_resource.grid(row=0, column=0, columnspan=2, padx=self.padx, pady=self.pady)
         index = 0
         for obj in inspection_job_record_obj_list:
@@ -9557,6 +14346,11 @@ class ListInspectionJobInFrame:
             button_delete.bind("<MouseWheel>", self.proces_mouse_scroll)
             button_delete.grid(row=index + 1, column=3, padx=self.padx, pady=self.pady)
             index += 1
+        # ★还有更旧的作业记录未加载时，添加“加载更多”按钮，每次从数据库再加载一页
+        if not self.global_info.is_all_inspection_job_record_loaded:
+            button_load_more = tkinter.Button(self.nav_frame_r_widget_dict["frame"], text="加载更多", command=self.load_more)
+            button_load_more.bind("<MouseWheel>", self.proces_mouse_scroll)
+            button_load_more.grid(row=index + 1, column=1, padx=self.padx, pady=self.pady)
         # 信息控件添加完毕
         self.nav_frame_r_widget_dict["frame"].update_idletasks()  # 更新Frame的尺寸
         self.nav_frame_r_widget_dict["canvas"].configure(
@@ -9564,6 +14358,13 @@ class ListInspectionJobInFrame:
         self.nav_frame_r_widget_dict["canvas"].bind("<MouseWheel>", self.proces_mouse_scroll)
         self.nav_frame_r_widget_dict["frame"].bind("<MouseWheel>", self.proces_mouse_scroll)
 
+    def load_more(self):
+        load_num = self.global_info.load_more_inspection_job_record()
+        print(f"ListInspectionJobInFrame.load_more: 加载了{load_num}条作业记录")
+        yview = self.nav_frame_r_widget_dict["canvas"].yview()
+        self.show()
+        self.nav_frame_r_widget_dict["canvas"].yview(tkinter.MOVETO, yview[0])  # 保持滚动位置，不跳回列表开头
+
 
 class ViewInspectionJobInFrame:
     """
@@ -9578,11 +14379,14 @@ class ViewInspectionJobInFrame:
         self.pady = 2
         self.current_row_index = 0
         self.inspection_template_obj = self.global_info.get_inspection_template_by_oid(inspection_job_record_obj.inspection_template_oid)
+        self.job_event_bus = None  # <InspectionJobEventBus> 作业执行中时才订阅
+        self.job_event_queue = None
 
     def show(self):
         # ★进入作业详情页面★
         for widget in self.top_frame_widget_dict["frame"].winfo_children():
             widget.destroy()
+        self.global_info.load_inspection_job_record_host_job_status(self.inspection_job_record_obj)  # 主机作业状态按需加载
         self.show_inspection_job_status()
         self.add_return_button_in_top_frame()
         self.update_top_frame()  # 更新Frame的尺寸，并将滚动条移到最开头
@@ -9610,6 +14414,21 @@ class ViewInspectionJobInFrame:
                                        command=lambda: self.global_info.main_window.list_inspection_job_of_nav_frame_r_page())
         button_return.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
         button_return.grid(row=self.current_row_index + 1, column=1, padx=self.padx, pady=self.pady)
+        # ★★作业正在执行时，添加“停止作业”按钮★★
+        if self.inspection_job_record_obj.oid in self.global_info.running_inspection_job_dict:
+            button_stop = tkinter.Button(self.top_frame_widget_dict["frame"], text="停止作业",
+                                         command=self.stop_inspection_job)
+            button_stop.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+            button_stop.grid(row=self.current_row_index + 1, column=0, padx=self.padx, pady=self.pady)
+
+    def stop_inspection_job(self):
+        launch_job_obj = self.global_info.running_inspection_job_dict.get(self.inspection_job_record_obj.oid, None)
+        if launch_job_obj is None:
+            messagebox.showinfo("停止巡检作业", "巡检作业已结束")
+            return
+        result = messagebox.askyesno("停止巡检作业", "是否停止巡检作业？未完成的主机将标记为failed")
+        if result:
+            launch_job_obj.cancel()
 
     def show_inspection_job_status(self):
         # ★巡检作业详情
@@ -9658,7 +14477,7 @@ class ViewInspectionJobInFrame:
         label_inspection_template_forks.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
         label_inspection_template_forks.grid(row=5, column=0, padx=self.padx, pady=self.pady)
         sv_forks = tkinter.StringVar()
-        spinbox_inspection_template_forks = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1, to=256, increment=1,
+        spinbox_inspection_template_forks = tkinter.Spinbox(self.top_frame_widget_dict["frame"], from_=1, to=MAX_JOB_FORKS, increment=1,
                                                             textvariable=sv_forks)
         sv_forks.set(self.inspection_template_obj.forks)  # 显示初始值，可编辑
         spinbox_inspection_template_forks.grid(row=5, column=1, padx=self.padx, pady=self.pady)
@@ -9666,6 +14485,22 @@ class ViewInspectionJobInFrame:
         label_inspection_job_status = tkinter.Label(self.top_frame_widget_dict["frame"], text="作业完成情况:")
         label_inspection_job_status.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
         label_inspection_job_status.grid(row=6, column=0, padx=self.padx, pady=self.pady)
+        # 作业执行中时订阅作业事件总线，之后只更新有变化的主机行；已结束的作业直接按主机作业状态显示，不再刷新
+        launch_job_obj = self.global_info.running_inspection_job_dict.get(self.inspection_job_record_obj.oid, None)
+        if launch_job_obj is not None and launch_job_obj.event_bus is not None:
+            self.job_event_bus = launch_job_obj.event_bus
+            self.job_event_queue, host_event_list, status_count_list = self.job_event_bus.subscribe()
+        else:
+            host_event_list = []
+            status_count_list = [0] * (INSPECTION_JOB_EXEC_STATE_FAILED + 1)
+            for host_index, host_job_status_obj in enumerate(self.inspection_job_record_obj.unduplicated_host_job_status_obj_list):
+                host_event_list.append((INSPECTION_JOB_EVENT_HOST_STATUS, host_index, host_job_status_obj.job_status,
+                                        host_job_status_obj.current_exec_code_num, host_job_status_obj.sum_of_code_lines,
+                                        host_job_status_obj.start_time, host_job_status_obj.end_time))
+                status_count_list[host_job_status_obj.job_status] += 1
+        label_status_count = tkinter.Label(self.top_frame_widget_dict["frame"], text=self.get_status_count_str(status_count_list))
+        label_status_count.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+        label_status_count.grid(row=6, column=1, padx=self.padx, pady=self.pady)
         # ★host-列表
         inspection_host_treeview = ttk.Treeview(self.top_frame_widget_dict["frame"], cursor="arrow", height=9,
                                                 columns=("index", "host", "status", "rate_or_progress", "time"), show="headings")
@@ -9682,65 +14517,88 @@ class ViewInspectionJobInFrame:
         inspection_host_treeview.heading("status", text="状态", anchor="w")
         inspection_host_treeview.heading("rate_or_progress", text="进度", anchor="w")
         inspection_host_treeview.heading("time", text="耗时(秒)", anchor="w")  # 单位：秒
-        # 插入数据，这里需要定时刷新★★
-        index = 0
-        status_name_list = ["unknown", "started", "completed", "part_completed", "failed"]
-        for host_job_status_obj in self.inspection_job_record_obj.unduplicated_host_job_status_obj_list:
-            host_obj = self.global_info.get_host_by_oid(host_job_status_obj.host_oid)
-            time_usage = host_job_status_obj.end_time - host_job_status_obj.start_time
-            if time_usage < 0:
-                time_usage_2 = 0
-            else:
-                time_usage_2 = time_usage
-            if host_job_status_obj.sum_of_code_lines <= 0:
-                rate_or_progress = 0.0
-            else:
-                rate_or_progress = host_job_status_obj.current_exec_code_num / host_job_status_obj.sum_of_code_lines
-            if host_obj is None:
-                inspection_host_treeview.insert("", index, values=(index, "Unknown!", status_name_list[host_job_status_obj.job_status],
-                                                                   "{:.2%}".format(rate_or_progress), time_usage_2))
-            else:
-                inspection_host_treeview.insert("", index, values=(index, host_obj.name, status_name_list[host_job_status_obj.job_status],
-                                                                   "{:.2%}".format(rate_or_progress), time_usage_2))
-            index += 1
-        inspection_host_treeview.grid(row=6, column=0, columnspan=2, padx=self.padx, pady=self.pady)
+        # 插入数据，行的iid为host_index，刷新时按iid只更新有变化的行★★
+        for host_event in host_event_list:
+            inspection_host_treeview.insert("", tkinter.END, iid=str(host_event[1]), values=self.get_host_status_row_values(host_event))
+        inspection_host_treeview.grid(row=7, column=0, columnspan=2, padx=self.padx, pady=self.pady)
         inspection_host_treeview.bind("<<TreeviewSelect>>", lambda event: self.view_inspection_host_item(event, inspection_host_treeview))
+        # ★inspection_job-自适应并发数的变化过程，开启了自适应并发数的作业才有
+        if self.inspection_job_record_obj.concurrency_history != '':
+            label_concurrency_history = tkinter.Label(self.top_frame_widget_dict["frame"], text="并发数变化(秒:并发数)")
+            label_concurrency_history.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+            label_concurrency_history.grid(row=8, column=0, padx=self.padx, pady=self.pady)
+            entry_concurrency_history = tkinter.Entry(self.top_frame_widget_dict["frame"], width=42)
+            entry_concurrency_history.bind("<MouseWheel>", self.proces_mouse_scroll_of_top_frame)
+            entry_concurrency_history.insert(0, self.inspection_job_record_obj.concurrency_history.replace(",", " → "))
+            entry_concurrency_history.grid(row=8, column=1, padx=self.padx, pady=self.pady)
         # 只有巡检作业未完成时才刷新主机巡检作业状态，完成（包含失败）都不再去更新主机状态
-        if self.inspection_job_record_obj.job_state == INSPECTION_JOB_EXEC_STATE_UNKNOWN:
-            inspection_host_treeview.after(1000, self.refresh_host_status, inspection_host_treeview)
-        elif self.inspection_job_record_obj.job_state == INSPECTION_JOB_EXEC_STATE_STARTED:
-            inspection_host_treeview.after(1000, self.refresh_host_status, inspection_host_treeview)
+        if self.job_event_queue is not None:
+            inspection_host_treeview.after(INSPECTION_JOB_EVENT_DRAIN_INTERVAL, self.refresh_host_status, inspection_host_treeview,
+                                           label_status_count)
         # ★★更新row_index
-        self.current_row_index = 6
+        self.current_row_index = 8
 
-    def refresh_host_status(self, inspection_host_treeview):
-        inspection_host_treeview.delete(*inspection_host_treeview.get_children())
-        # 插入数据，这里需要定时刷新★★
-        index = 0
+    @staticmethod
+    def get_status_count_str(status_count_list):
+        return "  ".join([f"共{sum(status_count_list)}台",
+                          f"执行中:{status_count_list[INSPECTION_JOB_EXEC_STATE_STARTED]}",
+                          f"完成:{status_count_list[INSPECTION_JOB_EXEC_STATE_COMPLETED]}",
+                          f"部分完成:{status_count_list[INSPECTION_JOB_EXEC_STATE_PART_COMPLETED]}",
+                          f"失败:{status_count_list[INSPECTION_JOB_EXEC_STATE_FAILED]}",
+                          f"未开始:{status_count_list[INSPECTION_JOB_EXEC_STATE_UNKNOWN]}"])
+
+    def get_host_status_row_values(self, host_event):
+        """
+        由作业事件 (事件类型, host_index, job_status, current_exec_code_num, sum_of_code_lines, start_time, end_time)
+        生成主机列表一行的values
+        """
+        _, host_index, job_status, current_exec_code_num, sum_of_code_lines, start_time, end_time = host_event
         status_name_list = ["unknown", "started", "completed", "part_completed", "failed"]
-        for host_job_status_obj in self.inspection_job_record_obj.unduplicated_host_job_status_obj_list:
-            host_obj = self.global_info.get_host_by_oid(host_job_status_obj.host_oid)
-            time_usage = host_job_status_obj.end_time - host_job_status_obj.start_time
-            if time_usage < 0:
-                time_usage_2 = 0
-            else:
-                time_usage_2 = time_usage
-            if host_job_status_obj.sum_of_code_lines <= 0:
-                rate_or_progress = 0.0
-            else:
-                rate_or_progress = host_job_status_obj.current_exec_code_num / host_job_status_obj.sum_of_code_lines
-            if host_obj is None:
-                inspection_host_treeview.insert("", index, values=(index, "Unknown!", status_name_list[host_job_status_obj.job_status],
-                                                                   "{:.2%}".format(rate_or_progress), time_usage_2))
-            else:
-                inspection_host_treeview.insert("", index, values=(index, host_obj.name, status_name_list[host_job_status_obj.job_status],
-                                                                   "{:.2%}".format(rate_or_progress), time_usage_2))
-            index += 1
-        # 只有巡检作业未完成时才刷新主机巡检作业状态，完成（包含失败）都不再去更新主机状态
-        if self.inspection_job_record_obj.job_state == INSPECTION_JOB_EXEC_STATE_UNKNOWN:
-            inspection_host_treeview.after(1000, self.refresh_host_status, inspection_host_treeview)
-        elif self.inspection_job_record_obj.job_state == INSPECTION_JOB_EXEC_STATE_STARTED:
-            inspection_host_treeview.after(1000, self.refresh_host_status, inspection_host_treeview)
+        host_oid = self.inspection_job_record_obj.unduplicated_host_job_status_obj_list[host_index].host_oid
+        host_obj = self.global_info.get_host_by_oid(host_oid)
+        time_usage = end_time - start_time
+        if time_usage < 0:
+            time_usage_2 = 0
+        else:
+            time_usage_2 = time_usage
+        if sum_of_code_lines <= 0:
+            rate_or_progress = 0.0
+        else:
+            rate_or_progress = current_exec_code_num / sum_of_code_lines
+        if host_obj is None:
+            host_name = "Unknown!"
+        else:
+            host_name = host_obj.name
+        return host_index, host_name, status_name_list[job_status], "{:.2%}".format(rate_or_progress), time_usage_2
+
+    def refresh_host_status(self, inspection_host_treeview, label_status_count):
+        """
+        取出订阅队列里的作业事件，同一台主机的多个事件只取最后一个，只更新这些主机的行及各状态的主机数
+        """
+        if not inspection_host_treeview.winfo_exists():  # 已离开作业详情界面，取消订阅
+            self.job_event_bus.unsubscribe(self.job_event_queue)
+            return
+        changed_host_event_dict = {}
+        is_job_finished = False
+        for _ in range(INSPECTION_JOB_EVENT_DRAIN_MAX_NUM):
+            try:
+                host_event = self.job_event_queue.get_nowait()
+            except queue.Empty:
+                break
+            if host_event[0] == INSPECTION_JOB_EVENT_JOB_FINISHED:
+                is_job_finished = True
+                break
+            changed_host_event_dict[host_event[1]] = host_event
+        for host_index, host_event in changed_host_event_dict.items():
+            inspection_host_treeview.item(str(host_index), values=self.get_host_status_row_values(host_event))
+        if len(changed_host_event_dict) != 0:
+            label_status_count.configure(text=self.get_status_count_str(self.job_event_bus.get_status_count_list()))
+        # 作业结束后不再刷新主机巡检作业状态
+        if is_job_finished:
+            self.job_event_bus.unsubscribe(self.job_event_queue)
+        else:
+            inspection_host_treeview.after(INSPECTION_JOB_EVENT_DRAIN_INTERVAL, self.refresh_host_status, inspection_host_treeview,
+                                           label_status_count)
 
     def view_inspection_host_item(self, _, inspection_host_treeview):
         item_index = inspection_host_treeview.focus()
@@ -9854,11 +14712,7 @@ class ViewInspectionJobInFrame:
             label_inspection_code_block_name.grid(row=7 + index * 2, column=0, padx=self.padx, pady=self.pady)
             code_exec_log_text = tkinter.Text(master=frame, height=20)  # 创建多行文本框，用于显示资源信息，需要绑定滚动条
             for output_obj in code_exec_output_obj_list:
-                plain_text = Vt100ToPlaintext(vt100_data_bytes=output_obj.invoke_shell_output_bytes).parse()
-                code_exec_log_text.insert(tkinter.END, plain_text)
-                for interactive_output_bytes in output_obj.interactive_output_bytes_list:
-                    plain_text2 = Vt100ToPlaintext(vt100_data_bytes=interactive_output_bytes).parse()
-                    code_exec_log_text.insert(tkinter.END, plain_text2)
+                code_exec_log_text.insert(tkinter.END, output_obj.get_plain_text())
             # 显示info Text文本框
             code_exec_log_text.grid(row=7 + index * 2 + 1, column=0, columnspan=2, padx=self.padx, pady=self.pady)
             index += 1
@@ -9893,11 +14747,7 @@ class ViewInspectionJobInFrame:
                     inspection_code_block_obj = self.global_info.get_inspection_code_block_by_oid(inspection_code_block_oid)
                     fileobj.write(f"\n#巡检代码块 {inspection_code_block_obj.name} 执行详情如下（本行为软件打印日志，不是巡检命令输出内容）\n")
                     for output_obj in code_exec_output_obj_list:
-                        plain_text = Vt100ToPlaintext(vt100_data_bytes=output_obj.invoke_shell_output_bytes).parse()
-                        fileobj.write(plain_text)
-                        for interactive_output_bytes in output_obj.interactive_output_bytes_list:
-                            plain_text2 = Vt100ToPlaintext(vt100_data_bytes=interactive_output_bytes).parse()
-                            fileobj.write(plain_text2)
+                        fileobj.write(output_obj.get_plain_text())
         pop_window.focus_force()  # 使子窗口获得焦点
 
     @staticmethod
@@ -10688,173 +15538,60 @@ class TerminalFrontend:
 
     def process_received_bytes_on_normal_mode(self, received_bytes):
         self.before_recv_text_index = self.terminal_normal_text.index(tkinter.INSERT)  # 对每次接收信息处理前的索引
-        output_block_ctrl_and_normal_content_list = received_bytes.split(b'\033')
-        output_block_ctrl_and_normal_content_list_new = [x for x in output_block_ctrl_and_normal_content_list if x]  # 新列表不含空元素
-        if len(output_block_ctrl_and_normal_content_list_new) == 0:
-            print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 本次接收到的信息拆分后列表为空")
-            self.terminal_normal_text.yview(tkinter.MOVETO, 1.0)  # MOVETO表示移动到，0.0表示最开头，1.0表示最底端
-            self.terminal_normal_text.focus_force()
-            return
-        # process_received_pool = ThreadPoolExecutor(max_workers=10000)
-        # ★★★★★★ 对一次recv接收后的信息拆分后的每个属性块进行解析，普通输出模式 ★★★★★★
-        for block_bytes in output_block_ctrl_and_normal_content_list_new:
-            block_str = block_bytes.decode("utf8").replace("\r\n", "\n")
-            # ★匹配 [m 或 [0m  -->清除所有属性
-            match_pattern = r'^\[0{,1}m'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                # 在self.terminal_text里输出解析后的内容
-                new_block_str = block_str[ret.end():]
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                if len(new_block_str) > 0:
-                    self.normal_mode_print_all_no_replace(new_block_str, 'default')
-                continue
-            # ★匹配 [01m 到 [08m  [01;34m  [01;34;42m   -->字体风格
-            match_pattern = r'^\[([0-9]{1,2};){,3}[0-9]{1,2}m'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                # print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                new_block_str = block_str[ret.end():]
-                output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1]
-                vt100_output_block_obj = Vt100OutputBlockNormal(output_block_control_seq=output_block_control_seq,
-                                                                terminal_normal_text=self.terminal_normal_text,
-                                                                start_index=self.terminal_normal_text.index(tkinter.INSERT),
-                                                                fg_color=self.fg_color,
-                                                                bg_color=self.bg_color)
-                self.normal_mode_print_all_no_replace(new_block_str, "default")  # 输出内容到Text组件
-                vt100_output_block_obj.end_index = self.terminal_normal_text.index(tkinter.INSERT)
-                # 处理vt100输出自带的颜色风格
-                # set_vt100_tag_thread = threading.Thread(target=vt100_output_block_obj.set_tag_config_font_and_color)
-                # set_vt100_tag_thread.start()
-                self.process_received_pool.submit(vt100_output_block_obj.set_tag_config_font_and_color)
-                continue
-            # ★匹配 [C  [8C  -->[数字C  向右移动vt100_cursor（text_cursor光标在本轮for循环结束后，一次recv处理完成后，再显示）
-            match_pattern = r'^\[[0-9]*C'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                new_block_str = block_str[ret.end():]
-                output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1].replace("\0", "")
-                vt100_output_block_obj = Vt100OutputBlock(output_block_content=new_block_str,
-                                                          output_block_control_seq=output_block_control_seq,
-                                                          terminal_vt100_obj=self, terminal_mode=VT100_TERMINAL_MODE_NORMAL)
-                vt100_output_block_obj.move_text_index_right()  # 向右移动索引
-                # 有时匹配了控制序列后，在其末尾还会有回退符，这里得再匹配一次
-                self.normal_mode_print_chars(new_block_str, 'default')
-                continue
+        # ★★★★★★ 由<Vt100Tokenizer>对一次recv接收的信息只扫描一遍，按token类型依次处理，普通输出模式 ★★★★★★
+        vt100_output_block_obj = None  # 当前字体风格块，遇到下一个[..m时结束
+        for token_type, token_value, csi_final_char in Vt100Tokenizer.iter_tokens(received_bytes):
+            if token_type == VT100_TOKEN_TEXT:
+                # 普通文本，使用当前字体风格，光标在末尾时直接插入，否则覆盖光标右边的字符
+                current_index = self.terminal_normal_text.index(tkinter.INSERT)
+                end_index = self.terminal_normal_text.index(tkinter.END + "-1c")
+                if current_index == end_index:
+                    self.normal_mode_print_all_no_replace(token_value, "default")
+                else:
+                    self.normal_mode_print_all(token_value, "default")
+            elif token_type == VT100_TOKEN_CTRL:
+                # \r \n 回退符\x08 响铃\x07 等，单独的ESC（不完整的控制序列）忽略
+                if token_value != '\033':
+                    self.normal_mode_print_chars(token_value, "default")
+            elif token_type != VT100_TOKEN_CSI:
+                continue  # OSC（如设置窗口标题）及 ESC= ESC> 等，普通模式不处理
+            # ★匹配 [m [0m [01m [01;34m [01;34;42m  -->字体风格，[m及[0m为清除所有属性
+            elif csi_final_char == 'm':
+                if vt100_output_block_obj is not None:
+                    vt100_output_block_obj.end_index = self.terminal_normal_text.index(tkinter.INSERT)
+                    self.process_received_pool.submit(vt100_output_block_obj.set_tag_config_font_and_color)
+                    vt100_output_block_obj = None
+                if token_value not in ('', '0') and token_value.replace(';', '').isdigit():
+                    vt100_output_block_obj = Vt100OutputBlockNormal(output_block_control_seq=token_value,
+                                                                    terminal_normal_text=self.terminal_normal_text,
+                                                                    start_index=self.terminal_normal_text.index(tkinter.INSERT),
+                                                                    fg_color=self.fg_color,
+                                                                    bg_color=self.bg_color)
+            # ★匹配 [C  [8C  -->[数字C  向右移动vt100_cursor
+            elif csi_final_char == 'C':
+                Vt100OutputBlock(output_block_control_seq=token_value, terminal_vt100_obj=self,
+                                 terminal_mode=VT100_TERMINAL_MODE_NORMAL).move_text_index_right()
             # ★匹配 [K  -->从当前vt100_cursor光标位置向右清除到本行行尾所有内容
-            match_pattern = r'^\[K'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                # if self.vt100_cursor_normal.get_current_right_counts() > 0:
-                self.terminal_normal_text.delete(tkinter.INSERT, tkinter.INSERT + " lineend")
-                # 有时匹配了控制序列后，在其末尾还会有回退符，这里得再匹配一次
-                new_block_str = block_str[ret.end():]
-                self.normal_mode_print_chars(new_block_str, "default")
-                continue
-            # ★匹配 [H  -->vt100_cursor光标回到屏幕开头，复杂清屏，一般vt100光标回到开头后，插入的内容会覆盖原界面的内容，未覆盖到的内容还得继续展示
-            match_pattern = r'^\[H'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                self.terminal_normal_text.mark_set(tkinter.INSERT, "1.0")
-                continue
-            # ★匹配 [42D  -->vt100_cursor光标左移42格，一般vt100光标回到当前行开头后，插入的内容会覆盖同行相应位置的内容，
-            # 未覆盖的地方不动它，不折行，不产生新行
-            match_pattern = r'^\[[0-9]*D'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 是新的内容，要覆盖同一行相应长度的字符
-                # need to copy_current_page_move_cursor_to_head_and_cover_content
-                new_block_str = block_str[ret.end():]
-                output_block_control_seq = block_str[ret.start() + 1:ret.end() - 1]
-                print("TerminalFrontend.process_received_bytes_on_normal_mode ★匹配 [数字D -->光标左移n格，复杂清屏",
-                      block_str.encode("utf8"))
-                vt100_output_block_obj = Vt100OutputBlock(
-                    output_block_content=new_block_str,
-                    output_block_control_seq=output_block_control_seq,
-                    terminal_vt100_obj=self, terminal_mode=VT100_TERMINAL_MODE_NORMAL)
-                vt100_output_block_obj.left_move_vt100_cursor_and_or_overwrite_content_in_current_line()
-                continue
+            elif csi_final_char == 'K':
+                if token_value in ('', '0'):
+                    self.terminal_normal_text.delete(tkinter.INSERT, tkinter.INSERT + " lineend")
+            # ★匹配 [H  -->vt100_cursor光标回到屏幕开头；[6;26H 光标移动到指定行列，普通模式暂不处理
+            elif csi_final_char == 'H':
+                if token_value == '':
+                    self.terminal_normal_text.mark_set(tkinter.INSERT, "1.0")
+            # ★匹配 [42D  -->vt100_cursor光标左移42格，之后输出的内容会覆盖同行相应位置的内容
+            elif csi_final_char == 'D':
+                Vt100OutputBlock(output_block_control_seq=token_value, terminal_vt100_obj=self,
+                                 terminal_mode=VT100_TERMINAL_MODE_NORMAL).left_move_vt100_cursor_and_or_overwrite_content_in_current_line()
             # ★匹配 [J  -->清空屏幕，一般和[H一起出现
-            match_pattern = r'^\[J'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: ★单独匹配到了 {match_pattern}")
-                # to do
+            elif csi_final_char == 'J':
                 self.terminal_normal_text.insert(tkinter.END, "\n", 'default')  # 暂时在Text组件末尾插入一个空行
-                continue
-            # ★匹配  b'\x08'  -->回退符，向左移动光标
-            match_pattern = b'\x08'
-            ret = re.search(match_pattern, block_bytes)
-            if ret is not None:
-                self.normal_mode_print_chars(block_str, "default")
-                continue
-            # ★匹配  b'\x07'  -->响铃
-            match_pattern = b'\x07'
-            ret = re.search(match_pattern, block_bytes)
-            if ret is not None:
-                self.normal_mode_print_chars(block_str, "default")
-                continue
-            # ★匹配  b'\x0d'  --> '\r'
-            match_pattern = '^\\r'
-            new_block_str = block_str.replace("\r\n", "\n")
-            ret = re.search(match_pattern, new_block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode 普通输出模式: ★单独匹配到了 {match_pattern}")
-                self.normal_mode_print_chars(new_block_str, "default")
-                continue
-            # ★匹配 [6;26H  -->光标移动到指定行列，普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
-            match_pattern = r'^\[\d{1,};\d{1,}H'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 没有其他内容了，要覆盖的内容在接下来的几轮循环
-                # 如果有内容，那就输出呗
-                new_block_str = block_str[ret.end():]
-                if len(new_block_str) > 0:
-                    self.normal_mode_print_lines(new_block_str, "default")
-                continue
-            # ★匹配 [?25h  [?2004h  -->  显示光标；普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
-            match_pattern = r'^\[\?\d{1,}h'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 有其他内容
-                new_block_str = block_str[ret.end():]
-                if len(new_block_str) > 0:
-                    self.normal_mode_print_lines(new_block_str, "default")
-                continue
-            # ★匹配 [?25l  [?2004l  -->  隐藏光标；普通模式暂不处理这个，直接在当前位置插入剩下的普通字符
-            match_pattern = r'^\[\?\d{1,}l'
-            ret = re.search(match_pattern, block_str)
-            if ret is not None:
-                print(f"TerminalFrontend.process_received_bytes_on_normal_mode: 匹配到了 {match_pattern}")
-                # 匹配到之后，可能 block_bytes[ret.end():] 之后有个\r（光标移到行首）
-                new_block_str = block_str[ret.end():]
-                if len(new_block_str) > 0:
-                    self.normal_mode_print_chars(new_block_str, "default")
-                continue
-            # ★★最后，未匹配到任何属性（非控制序列，非特殊字符如\x08\x07这些）则视为普通文本，使用默认颜色方案
-            # print("TerminalFrontend.process_received_bytes_on_normal_mode: 最后未匹配到任何属性，视为普通文本，使用默认颜色方案")
-            current_index = self.terminal_normal_text.index(tkinter.INSERT)
-            end_index = self.terminal_normal_text.index(tkinter.END + "-1c")
-            if current_index == end_index:
-                self.normal_mode_print_all_no_replace(block_str, "default")
-            else:
-                self.normal_mode_print_lines(block_str, "default")
+            # ★其他CSI，如 [?25h [?2004l 显示/隐藏光标等，普通模式暂不处理
+        if vt100_output_block_obj is not None:  # 本次接收的最后一个字体风格块，到当前位置结束
+            vt100_output_block_obj.end_index = self.terminal_normal_text.index(tkinter.INSERT)
+            self.process_received_pool.submit(vt100_output_block_obj.set_tag_config_font_and_color)
         # ★★★ 对一次recv接收后的信息解析输出完成后，页面滚动到Text末尾 ★★★
-        # 一次输出解析完成后，要等待所有的字体颜色设置线程完成再继续，不再单独等待，全部都放一个线程池里
-        # 匹配用户自定义高亮词汇，已单独做成一个线程了
-        # last_recv_content_str = self.terminal_normal_text.get(self.before_recv_text_index, tkinter.INSERT)
-        # custom_tag_config_obj = CustomTagConfigSet(output_recv_content=last_recv_content_str, terminal_vt100_obj=self,
-        #                                            start_index=str(self.last_set_color_end_line) + ".0", host_obj=self.host_obj,
-        #                                            terminal_mode=VT100_TERMINAL_MODE_NORMAL, global_info=self.global_info)
-        # custom_tag_config_obj.set_custom_tag()
-        # 字体颜色风格设置完成后，再显示焦点
+        # 一次输出解析完成后，不再单独等待字体颜色设置线程，全部都放一个线程池里
         self.terminal_normal_text.yview(tkinter.MOVETO, 1.0)  # MOVETO表示移动到，0.0表示最开头，1.0表示最底端
         self.terminal_normal_text.focus_force()
 
@@ -10908,7 +15645,7 @@ class TerminalFrontend:
             return
         process_received_pool = ThreadPoolExecutor(max_workers=1000)
         for block_bytes in output_block_ctrl_and_normal_content_list_new:
-            block_str = block_bytes.decode("utf8").replace("\r\n", "\n")
+            block_str = block_bytes.decode("utf8", errors="replace").replace("\r\n", "\n")
             # ★匹配 [m 或 [0m  -->清除所有属性
             match_pattern = r'^\[[0]?m'
             ret = re.search(match_pattern, block_str)
@@ -11299,6 +16036,7 @@ class TerminalBackend:
         self.is_closed = False
         self.ssh_client = None
         self.ssh_invoke_shell = None
+        self.ssh_transport_pool_entry = None  # <SSHTransportPoolEntry> 从连接池取用的连接，关闭终端时归还
         self.shell_terminal_width = shell_terminal_width
         self.shell_terminal_height = shell_terminal_height
         self.send_user_input_data_thread = None
@@ -11340,77 +16078,57 @@ class TerminalBackend:
 
     def find_ssh_credential(self, host):
         """
-        查找可用的ssh凭据，会登录一次目标主机（因为一台主机可以绑定多个同类型的凭据，依次尝试，直到找到可用的凭据）
+        检测主机的ssh登录凭据是否可用，会登录一次目标主机，认证成功的连接保留在连接池里，之后创建终端会话时直接复用
         :param host:
         :return:
         """
-        # if host.login_protocol == LOGIN_PROTOCOL_SSH:
-        for cred_oid in host.credential_oid_list:
-            cred = self.global_info.get_credential_by_oid(cred_oid)
-            if cred.cred_type == CRED_TYPE_SSH_PASS:
-                ssh_client = paramiko.client.SSHClient()
-                ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 允许连接host_key不在know_hosts文件里的主机
-                try:
-                    ssh_client.connect(hostname=host.address, port=host.port, username=cred.username,
-                                       password=cred.password,
-                                       timeout=LOGIN_AUTH_TIMEOUT)
-                except paramiko.AuthenticationException as e:
-                    # print(f"Authentication Error: {e}")
-                    raise e
-                ssh_client.close()
-                return cred
-            if cred.cred_type == CRED_TYPE_SSH_KEY:
-                ssh_client = paramiko.client.SSHClient()
-                ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 允许连接host_key不在know_hosts文件里的主机
-                prikey_obj = io.StringIO(cred.private_key)
-                try:
-                    pri_key = paramiko.RSAKey.from_private_key(prikey_obj)
-                except paramiko.ssh_exception.SSHException as e:
-                    # print("not a valid RSA private key file")
-                    raise e
-                try:
-                    ssh_client.connect(hostname=host.address, port=host.port, username=cred.username,
-                                       pkey=pri_key,
-                                       timeout=LOGIN_AUTH_TIMEOUT)
-                except paramiko.AuthenticationException as e:
-                    # print(f"Authentication Error: {e}")
-                    raise e
-                ssh_client.close()
-                return cred
-            else:
-                continue
-        return None
+        cred = self.global_info.get_credential_by_oid(host.login_credential_oid)
+        if cred is None or cred.cred_type not in (CRED_TYPE_SSH_PASS, CRED_TYPE_SSH_KEY):
+            return None
+        entry = self.global_info.ssh_transport_pool.acquire(host.address, host.port, cred.username,
+                                                            self.get_auth_method_of_cred(cred), password=cred.password,
+                                                            private_key=cred.private_key, timeout=LOGIN_AUTH_TIMEOUT)
+        self.global_info.ssh_transport_pool.release(entry)
+        return cred
+
+    @staticmethod
+    def get_auth_method_of_cred(cred):
+        if cred.cred_type == CRED_TYPE_SSH_KEY:
+            return AUTH_METHOD_SSH_KEY
+        return AUTH_METHOD_SSH_PASS
 
     def create_invoke_shell(self, cred):
-        # ★★创建ssh连接★★
-        self.ssh_client = paramiko.client.SSHClient()
-        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 允许连接host_key不在known_hosts文件里的主机
+        # ★★从连接池取用ssh连接（没有可复用的则新建），并在其上创建invoke_shell交互式shell★★
         try:
-            if cred.cred_type == CRED_TYPE_SSH_PASS:
-                print("TerminalBackend.create_invoke_shell : 使用ssh_password密码登录")
-                self.ssh_client.connect(hostname=self.host_obj.address, port=self.host_obj.port, username=cred.username,
-                                        password=cred.password, timeout=LOGIN_AUTH_TIMEOUT)
-            elif cred.cred_type == CRED_TYPE_SSH_KEY:
-                prikey_string_io = io.StringIO(cred.private_key)
-                pri_key = paramiko.RSAKey.from_private_key(prikey_string_io)
-                print("TerminalBackend.create_invoke_shell : 使用ssh_priKey密钥登录")
-                self.ssh_client.connect(hostname=self.host_obj.address, port=self.host_obj.port, username=cred.username,
-                                        pkey=pri_key, timeout=LOGIN_AUTH_TIMEOUT)
-            else:
-                pass
+            self.ssh_transport_pool_entry, self.ssh_invoke_shell = self.global_info.ssh_transport_pool.open_channel(
+                lambda ssh_client: ssh_client.invoke_shell(width=self.shell_terminal_width, height=self.shell_terminal_height),
+                self.host_obj.address, self.host_obj.port, cred.username, self.get_auth_method_of_cred(cred),
+                password=cred.password, private_key=cred.private_key, timeout=LOGIN_AUTH_TIMEOUT)
         except paramiko.AuthenticationException as e:
             print(f"TerminalBackend.create_invoke_shell : Authentication Error: {e}")
             raise e
-        # ★★连接后，创建invoke_shell交互式shell★★
-        self.ssh_invoke_shell = self.ssh_client.invoke_shell(width=self.shell_terminal_width, height=self.shell_terminal_height)
+        self.ssh_client = self.ssh_transport_pool_entry.ssh_client
+
+    def release_ssh_connection(self):
+        """
+        关闭终端时调用，关闭shell通道并把ssh连接归还给连接池，可重复调用
+        """
+        if self.ssh_invoke_shell is not None:
+            try:
+                self.ssh_invoke_shell.close()  # 如果已经关闭了，则再次关闭会抛出EOFError异常
+            except EOFError as err:
+                print(err)
+        entry, self.ssh_transport_pool_entry = self.ssh_transport_pool_entry, None  # 先置为None，防止两个线程重复归还
+        if entry is not None:
+            self.global_info.ssh_transport_pool.release(entry)
+        self.ssh_client = None
 
     def send_user_input_data(self):
         # ★★下面只负责发送用户输入的所有字符，包括从剪贴板复制的★★
         cmd_index = 0
         while True:
             if self.is_closed:
-                self.ssh_invoke_shell.close()
-                self.ssh_client.close()
+                self.release_ssh_connection()
                 print("TerminalBackend.send_user_input_data: 本函数结束了 在 while True: 处")
                 return
             try:
@@ -11426,6 +16144,7 @@ class TerminalBackend:
 
     def recv_vt100_output_data(self):
         # 不停地从ssh_shell接收输出信息，直到关闭了终端窗口
+        stream_decoder = Vt100StreamDecoder()  # 在中文字符或控制序列中间断开的数据，等下一段数据到达后拼接完整再交给前端
         with ThreadPoolExecutor(max_workers=1) as pool:
             index = 0
             while True:
@@ -11433,18 +16152,33 @@ class TerminalBackend:
                     print("TerminalBackend.recv_vt100_output_data: 关闭了终端窗口，退出了本函数")
                     return
                 try:
-                    received_bytes = self.ssh_invoke_shell.recv(65535)
+                    received_bytes = self.ssh_invoke_shell.recv(CHANNEL_RECV_BUFFER_SIZE)
                     # print("TerminalBackend.recv_vt100_output_data: 接收到信息:", received_bytes)
                     print("TerminalBackend.recv_vt100_output_data: 接收到信息:", index)
                     # ★★★开始解析接收到的vt100输出★★★
                     if len(received_bytes) == 0:
                         print("TerminalBackend.recv_vt100_output_data: received_bytes为空，关闭 ssh_client, 退出了本函数")
+                        pending_bytes = stream_decoder.flush()
+                        if len(pending_bytes) > 0:
+                            pool.submit(self.host_session_record_obj.terminal_frontend_obj.parse_received_vt100_data_2, pending_bytes)
                         self.is_closed = True
                         return
+                    # 大量输出时（如cat大文件），通道里已有的数据连续读取合并，减少前端解析及刷新界面的次数
+                    received_bytes_list = [received_bytes]
+                    received_len = len(received_bytes)
+                    while received_len < TERMINAL_RECV_COALESCE_SIZE and self.ssh_invoke_shell.recv_ready():
+                        more_bytes = self.ssh_invoke_shell.recv(CHANNEL_RECV_BUFFER_SIZE)
+                        if len(more_bytes) == 0:
+                            break
+                        received_bytes_list.append(more_bytes)
+                        received_len += len(more_bytes)
+                    complete_bytes = stream_decoder.feed(b''.join(received_bytes_list))
+                    if len(complete_bytes) == 0:
+                        continue
                     # 有数据就往列队里扔
                     # self.vt100_receive_byte_queue.put(received_bytes)
                     # self.host_session_record_obj.terminal_frontend_obj.parse_received_vt100_data_2(received_bytes)  # 有数据就直接调前端界面处理
-                    pool.submit(self.host_session_record_obj.terminal_frontend_obj.parse_received_vt100_data_2, received_bytes)
+                    pool.submit(self.host_session_record_obj.terminal_frontend_obj.parse_received_vt100_data_2, complete_bytes)
                     index += 1
                 except Exception as e:
                     print(e)
@@ -11733,22 +16467,9 @@ class CustomTagConfigScheme:
         self.global_info = global_info
 
     def save(self):
-        sqlite_conn = sqlite3.connect(self.global_info.sqlite3_dbfile_name)  # 连接数据库文件
-        sqlite_cursor = sqlite_conn.cursor()  # 创建一个游标，用于执行sql语句
-        # ★查询是否有名为'tb_host'的表★
-        sql = f'SELECT * FROM sqlite_master WHERE "type"="table" and "tbl_name"="tb_custome_tag_config_scheme"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        # 若未查询到有此表，则创建此表
-        if len(result) == 0:
-            sql_list = ["create table tb_custome_tag_config_scheme  ( oid varchar(36) NOT NULL PRIMARY KEY,",
-                        "name varchar(128),",
-                        "description varchar(256),",
-                        "project_oid varchar(36),",
-                        "create_timestamp double,",
-                        "last_modify_timestamp double )"]
-            sqlite_cursor.execute(" ".join(sql_list))
+        self.global_info.sqlite_storage.execute_write(self.write_to_sqlite)
+
+    def write_to_sqlite(self, sqlite_cursor):
         # 开始插入数据
         sql = f"select * from tb_custome_tag_config_scheme where oid='{self.oid}'"
         sqlite_cursor.execute(sql)
@@ -11777,29 +16498,10 @@ class CustomTagConfigScheme:
                         f"oid='{self.oid}'"]
             # print(" ".join(sql_list))
             sqlite_cursor.execute(" ".join(sql_list))
-        # ★查询是否有名为'tb_custome_tag_config_scheme_include_match_object'的表★
-        sql = 'SELECT * FROM sqlite_master WHERE \
-                        "type"="table" and "tbl_name"="tb_custome_tag_config_scheme_include_match_object"'
-        sqlite_cursor.execute(sql)
-        result = sqlite_cursor.fetchall()  # fetchall()从结果中获取所有记录，返回一个list，元素为<tuple>（即查询到的结果）
-        print("exist tables: ", result)
-        if len(result) == 0:  # 若未查询到有此表，则创建此表
-            sql_list = ["create table tb_custome_tag_config_scheme_include_match_object  (scheme_oid varchar(36),",
-                        "match_pattern_lines varchar(4096),",
-                        "foreground varchar(32),",
-                        "backgroun varchar(32),",
-                        "underline int,",
-                        "underlinefg varchar(32),",
-                        "overstrike int,",
-                        "overstrikefg varchar(32),",
-                        "bold int,",
-                        "italic int",
-                        " );"]
-            sqlite_cursor.execute(" ".join(sql_list))
         # 开始插入数据
         sql = f"delete from tb_custome_tag_config_scheme_include_match_object where scheme_oid='{self.oid}'"
         sqlite_cursor.execute(sql)  # ★先清空所有的match_obj，再重新插入（既可用于新建，又可用于更新）
-        for match_obj_oid in self.custom_match_object_list:
+        for match_index, match_obj_oid in enumerate(self.custom_match_object_list):
             match_pattern_lines_b64 = base64.b64encode(match_obj_oid.match_pattern_lines.encode("utf8")).decode("utf8")
             sql_list = [f"insert into tb_custome_tag_config_scheme_include_match_object (scheme_oid,",
                         "match_pattern_lines,",
@@ -11810,7 +16512,8 @@ class CustomTagConfigScheme:
                         "overstrike,",
                         "overstrikefg,",
                         "bold,",
-                        "italic ) values ",
+                        "italic,",
+                        "match_index ) values ",
                         f"('{self.oid}',",
                         f"'{match_pattern_lines_b64}',",
                         f"'{match_obj_oid.foreground}',",
@@ -11820,12 +16523,10 @@ class CustomTagConfigScheme:
                         f"{match_obj_oid.overstrike},",
                         f"'{match_obj_oid.overstrikefg}',",
                         f"{match_obj_oid.bold},",
-                        f"{match_obj_oid.italic}",
+                        f"{match_obj_oid.italic},",
+                        f"{match_index}",
                         " )"]
             sqlite_cursor.execute(" ".join(sql_list))
-        sqlite_cursor.close()
-        sqlite_conn.commit()  # 保存，提交
-        sqlite_conn.close()  # 关闭数据库连接
 
     def update(self, name=None, description=None, project_oid=None, last_modify_timestamp=None,
                create_timestamp=None, global_info=None):
@@ -11843,6 +16544,7 @@ class CustomTagConfigScheme:
             self.create_timestamp = create_timestamp
         if global_info is not None:
             self.global_info = global_info
+        self.global_info.custome_tag_config_scheme_obj_list.reindex_obj(self)  # ★名称/所属项目可能已修改，刷新<ResourceObjList>的索引
         # 最后更新数据库
         self.save()
 
@@ -11987,7 +16689,185 @@ class CustomTagConfigSetMatchObjectRetItem:
             self.terminal_vt100_obj = None
 
 
+def cofable_migrate_output_blob_main(argv):
+    """
+    一次性迁移工具，把数据库里旧格式（base64文本）的巡检命令输出转换为压缩的BLOB，并回收数据库文件空间
+    用法: python cofable.py migrate-output-blob [数据库文件，默认为cofable_default.db]
+    """
+    sqlite3_dbfile_name = argv[0] if len(argv) > 0 else "cofable_default.db"
+    if not os.path.exists(sqlite3_dbfile_name):
+        print(f"cofable_migrate_output_blob_main: 数据库文件不存在 {sqlite3_dbfile_name}")
+        return 1
+    size_before = os.path.getsize(sqlite3_dbfile_name)
+    sqlite_storage = SqliteStorage(sqlite3_dbfile_name)
+    sqlite_storage.open()  # 旧数据库会在建表阶段添加output_format等新列
+    converted_output_num, converted_interactive_output_num = sqlite_storage.migrate_inspection_output_to_blob()
+    sqlite_storage.close()
+    print("cofable_migrate_output_blob_main: 转换完成，正在执行VACUUM回收空间")
+    sqlite_storage.vacuum()
+    size_after = os.path.getsize(sqlite3_dbfile_name)
+    print(f"cofable_migrate_output_blob_main: 命令输出 {converted_output_num} 行，交互输出 {converted_interactive_output_num} 行，",
+          f"数据库文件 {size_before} 字节 → {size_after} 字节")
+    return 0
+
+
+def cofable_parse_headless_argv(argv):
+    """
+    解析无界面运行的参数，返回 (数据库文件, 其余参数列表)，-d 数据库文件 可放在任意位置
+    """
+    sqlite3_dbfile_name = "cofable_default.db"
+    arg_list = []
+    arg_index = 0
+    while arg_index < len(argv):
+        if argv[arg_index] in ("-d", "--db") and arg_index + 1 < len(argv):
+            sqlite3_dbfile_name = argv[arg_index + 1]
+            arg_index += 2
+        else:
+            arg_list.append(argv[arg_index])
+            arg_index += 1
+    return sqlite3_dbfile_name, arg_list
+
+
+def cofable_load_global_info_headless(sqlite3_dbfile_name, start_template_trigger):
+    """
+    无界面运行时加载全局信息，不导入界面相关依赖，不加载字体文件
+    """
+    global_info_obj = GlobalInfo(sqlite3_dbfile_name=sqlite3_dbfile_name)
+    global_info_obj.project_obj_list = global_info_obj.load_project_from_dbfile()
+    global_info_obj.load_all_data_from_sqlite3(start_template_trigger=start_template_trigger)
+    return global_info_obj
+
+
+def cofable_run_template_main(argv):
+    """
+    无界面执行指定的巡检模板（名称或oid），依次执行，每个作业结束后向stdout输出一行json格式的作业摘要，日志输出到stderr
+    用法: python cofable.py run-template [-d 数据库文件，默认为cofable_default.db] 巡检模板名称 [巡检模板名称 ...]
+    返回值: 所有作业都完成为0，有作业未全部完成为1，参数错误为2
+    """
+    sqlite3_dbfile_name, template_name_list = cofable_parse_headless_argv(argv)
+    if len(template_name_list) == 0 or not os.path.exists(sqlite3_dbfile_name):
+        print(f"cofable_run_template_main: 未指定巡检模板或数据库文件不存在 {sqlite3_dbfile_name}", file=sys.stderr)
+        return 2
+    summary_output = sys.stdout
+    exit_code = 0
+    with contextlib.redirect_stdout(sys.stderr):  # 巡检过程的日志都输出到stderr，stdout只输出作业摘要
+        global_info_obj = cofable_load_global_info_headless(sqlite3_dbfile_name, start_template_trigger=False)
+        inspection_template_obj_list = []
+        for template_name in template_name_list:
+            matched_template_obj_list = [inspection_template_obj for inspection_template_obj in global_info_obj.inspection_template_obj_list
+                                         if template_name in (inspection_template_obj.name, inspection_template_obj.oid)]
+            if len(matched_template_obj_list) == 0:
+                print(f"cofable_run_template_main: 巡检模板不存在 {template_name}")
+                global_info_obj.sqlite_storage.close()
+                return 2
+            inspection_template_obj_list.extend(matched_template_obj_list)
+        for inspection_template_obj in inspection_template_obj_list:
+            inspect_job_name = "job@" + inspection_template_obj.name + "@" + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+            launch_job_obj = LaunchInspectionJob(name=inspect_job_name, project_oid=inspection_template_obj.project_oid,
+                                                 inspection_template=inspection_template_obj, global_info=global_info_obj)
+            launch_job_obj.start_job()
+            if launch_job_obj.job_record_obj is None:  # 巡检模板为空时没有作业记录
+                exit_code = 1
+                continue
+            print(json.dumps(launch_job_obj.job_record_obj.get_summary_dict(), ensure_ascii=False), file=summary_output, flush=True)
+            if launch_job_obj.job_state != INSPECTION_JOB_EXEC_STATE_COMPLETED:
+                exit_code = 1
+        global_info_obj.sqlite_storage.close()  # 等待排队中的写操作全部完成
+    return exit_code
+
+
+def cofable_daemon_main(argv):
+    """
+    无界面常驻运行，按巡检模板设置的执行方式定时执行巡检，每个作业结束后向stdout输出一行json格式的作业摘要，日志输出到stderr，
+    收到SIGTERM或Ctrl+C后停止正在执行的作业，等待其保存后退出
+    用法: python cofable.py daemon [-d 数据库文件，默认为cofable_default.db]
+    """
+    sqlite3_dbfile_name, _ = cofable_parse_headless_argv(argv)
+    if not os.path.exists(sqlite3_dbfile_name):
+        print(f"cofable_daemon_main: 数据库文件不存在 {sqlite3_dbfile_name}", file=sys.stderr)
+        return 2
+    summary_output = sys.stdout
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    with contextlib.redirect_stdout(sys.stderr):
+        global_info_obj = GlobalInfo(sqlite3_dbfile_name=sqlite3_dbfile_name)
+        global_info_obj.finished_inspection_job_record_queue = queue.SimpleQueue()  # 先创建，加载时启动的定时作业结束后才能放入
+        global_info_obj.project_obj_list = global_info_obj.load_project_from_dbfile()
+        global_info_obj.load_all_data_from_sqlite3(start_template_trigger=True)
+        print(f"cofable_daemon_main: 已启动，定时巡检模板数 {len(global_info_obj.launch_template_trigger_obj_list)}")
+        try:
+            while not stop_event.is_set():
+                try:
+                    job_record_obj = global_info_obj.finished_inspection_job_record_queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                print(json.dumps(job_record_obj.get_summary_dict(), ensure_ascii=False), file=summary_output, flush=True)
+        except KeyboardInterrupt:
+            pass
+        print("cofable_daemon_main: 正在停止")
+        # 停止调度器启动的所有作业，含还在更新巡检代码（如拉取git仓库）、还未登记到running_inspection_job_dict的作业
+        global_info_obj.template_scheduler.stop(cancel_running_job=True)
+        # 等待作业线程都结束后再关闭数据库，否则作业的输出及作业记录会因数据库已关闭而丢失
+        while not global_info_obj.template_scheduler.is_all_job_finished():
+            try:
+                job_record_obj = global_info_obj.finished_inspection_job_record_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            print(json.dumps(job_record_obj.get_summary_dict(), ensure_ascii=False), file=summary_output, flush=True)
+        global_info_obj.template_scheduler.join_job_threads()
+        while True:  # 最后结束的作业的作业记录
+            try:
+                job_record_obj = global_info_obj.finished_inspection_job_record_queue.get_nowait()
+            except queue.Empty:
+                break
+            print(json.dumps(job_record_obj.get_summary_dict(), ensure_ascii=False), file=summary_output, flush=True)
+        global_info_obj.sqlite_storage.close()
+    return 0
+
+
+def cofable_inspection_job_shard_main(sqlite3_dbfile_name, job_oid, inspection_template_obj, inspection_code_block_obj_list,
+                                      host_oid_list, host_index_list, shard_forks, job_deadline, result_queue, cancel_event,
+                                      shard_index):
+    """
+    多进程分片模式下工作进程的入口，由<LaunchInspectionJob>.run_all_host_by_process_shards()以spawn方式启动，
+    巡检模板及巡检代码块由主进程传入，主机、凭据、熔断记录从数据库只读加载（不建表不升级，没有写线程），
+    巡检分到本分片的主机，结束时（含出错）发送SHARD_MSG_SHARD_FINISHED，日志输出到stderr
+    """
+    try:
+        with contextlib.redirect_stdout(sys.stderr):  # 无界面运行时stdout只输出作业摘要
+            global_info_obj = GlobalInfo(sqlite3_dbfile_name=sqlite3_dbfile_name, read_only_storage=True)
+            global_info_obj.credential_obj_list = global_info_obj.load_credential_from_dbfile()
+            global_info_obj.host_obj_list = global_info_obj.load_host_from_dbfile()
+            global_info_obj.host_circuit_breaker.load()
+            for inspection_code_block_obj in inspection_code_block_obj_list:
+                inspection_code_block_obj.global_info = global_info_obj
+            global_info_obj.inspection_code_block_obj_list = inspection_code_block_obj_list
+            inspection_template_obj.global_info = global_info_obj
+            global_info_obj.inspection_template_obj_list = [inspection_template_obj]
+            # 只修改本进程里的巡检模板对象，不保存
+            inspection_template_obj.forks = shard_forks
+            inspection_template_obj.job_exec_mode = JOB_EXEC_MODE_THREAD_POOL
+            shard_job_obj = LaunchInspectionJobShard(oid=job_oid, inspection_template=inspection_template_obj,
+                                                     global_info=global_info_obj, shard_index=shard_index, result_queue=result_queue)
+            cancel_watch_thread = threading.Thread(target=shard_job_obj.watch_cancel_event, args=(cancel_event,), daemon=True)
+            cancel_watch_thread.start()
+            shard_job_obj.run_shard(host_oid_list, host_index_list, job_deadline)
+            global_info_obj.sqlite_storage.close()
+    except Exception as err:
+        print(f"cofable_inspection_job_shard_main: 分片{shard_index}出错 {err}", file=sys.stderr)
+    finally:
+        result_queue.put((SHARD_MSG_SHARD_FINISHED, shard_index, None))
+
+
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # 打包为exe后，多进程分片模式的工作进程从这里进入
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate-output-blob":
+        sys.exit(cofable_migrate_output_blob_main(sys.argv[2:]))
+    if len(sys.argv) >= 2 and sys.argv[1] == "run-template":
+        sys.exit(cofable_run_template_main(sys.argv[2:]))
+    if len(sys.argv) >= 2 and sys.argv[1] == "daemon":
+        sys.exit(cofable_daemon_main(sys.argv[2:]))
+    cofable_import_gui_modules()  # 以下为启动程序主界面
     # 创建全局信息类，用于存储所有资源类的对象，（若未指定数据库文件名称，则默认为"cofable_default.db"）
     # 本程序终端窗口使用字体为 JetBrainsMono开源等宽字体，下载地址： https://www.jetbrains.com/lp/mono/
     builtin_font_file_path1 = os.path.join(os.path.dirname(__file__), "builtin_resource", "JetBrainsMono-Regular.ttf")